@@ -0,0 +1,374 @@
+"""
+Benchmark offline end-to-end de `/api/ai/chat`.
+
+Lanza peticiones HTTP contra la app FastAPI (en proceso, vía ASGI) a varios
+niveles de concurrencia, con OpenAI, Chroma, Redis, Mongo y Kafka sustituidos
+por dobles con distribuciones de latencia inyectables. Reporta throughput,
+percentiles de latencia total y por etapa (embed, search, prompt build, LLM
+y evaluation write, que sólo deja la evaluación en el buffer), el overhead propio del servicio y
+el lag del event loop.
+Con `--stream` usa `/api/ai/chat/stream` y reporta también el tiempo hasta el
+primer token.
+
+Uso:
+    LOG_LEVEL=WARNING python -m benchmarks.chat_benchmark --concurrency 1 8 32 \\
+        --requests 500 --llm-latency lognormal:800:0.4 --embedding-latency lognormal:150:0.3 \\
+        --output benchmarks/results/chat.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import random
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from unittest.mock import patch, MagicMock
+
+import httpx
+
+from benchmarks.fakes import (
+    LatencyModel,
+    FakeLLMService,
+    FakeEmbeddingService,
+    FakeVectorSearch,
+    FakePromptRepository,
+    FakeEvaluationRepository,
+    NullEventPublisher,
+    StaticCollectionRegistry,
+    current_trace,
+)
+from benchmarks.stats import latency_summary, environment_info, write_results
+from src.domain.entities.prompt_template import PromptTemplate
+from src.infrastructure.repositories.cached_prompt_repository import CachedPromptRepository
+from src.infrastructure.services.cached_embedding_service import CachedEmbeddingService
+from src.infrastructure.services.batching_embedding_service import BatchingEmbeddingService
+from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+
+STAGES = ["prompt_fetch", "embed", "search", "prompt_build", "llm", "evaluation_write"]
+
+TOPICS = [
+    "vacaciones", "reembolso de gastos", "trabajo remoto", "seguro médico", "horario de oficina",
+    "evaluación de desempeño", "capacitación", "nómina", "viajes de negocio", "seguridad de la información",
+]
+QUESTIONS = [
+    "¿Cuál es la política de {topic} para empleados nuevos?",
+    "¿Cómo solicito {topic} y quién lo aprueba?",
+    "Resume los puntos principales sobre {topic} en los documentos",
+    "¿Qué requisitos hay para {topic} este año?",
+]
+
+
+class LoopLagMonitor:
+    """Mide cuánto tarda el event loop en despertar un sleep de `interval_ms`"""
+
+    def __init__(self, interval_ms: float = 10.0):
+        self.interval = interval_ms / 1000
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> List[float]:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return self.samples
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            self.samples.append(max(lag, 0.0) * 1000)
+
+
+class ChatFakes:
+    def __init__(self, args):
+        seed = args.seed
+        self.llm_service = FakeLLMService(LatencyModel(args.llm_latency, seed), output_tokens=args.output_tokens)
+        self.embedding_service = FakeEmbeddingService(LatencyModel(args.embedding_latency, seed + 1), dimensions=args.dim)
+        self.embedding_batcher = None
+        if getattr(args, "embedding_batch", False):
+            self.embedding_batcher = BatchingEmbeddingService(self.embedding_service)
+            self.embedding_service = self.embedding_batcher
+        if getattr(args, "embedding_cache", False):
+            # Sólo el nivel en memoria: el benchmark no tiene Redis
+            self.embedding_service = CachedEmbeddingService(self.embedding_service)
+        self.vector_search = FakeVectorSearch(LatencyModel(args.search_latency, seed + 2), results=args.chunks)
+        self.prompt_repository = FakePromptRepository(LatencyModel(args.redis_latency, seed + 3))
+        if getattr(args, "prompt_cache", False):
+            self.prompt_repository = CachedPromptRepository(self.prompt_repository)
+        self.evaluation_repository = FakeEvaluationRepository(LatencyModel(args.mongo_latency, seed + 4))
+        self.event_publisher = NullEventPublisher()
+        self.collection_registry = StaticCollectionRegistry()
+        # Sin caché de respuestas por defecto: cada petición mide el camino completo
+        self.answer_cache = SemanticAnswerCache() if getattr(args, "answer_cache", False) else None
+        self.exact_answer_cache = None
+        self.conversation_memory = None
+
+
+@contextmanager
+def chat_service(fakes: ChatFakes):
+    """
+    Importa `src.main` sin conectar con Chroma, Redis, Mongo ni Kafka y sustituye
+    sus dependencias por los dobles mientras dura el contexto.
+    """
+    with patch("src.infrastructure.vector_db.chroma_vector_search.ChromaVectorSearch", MagicMock()), \
+            patch("src.infrastructure.vector_db.collection_registry.CollectionRegistry", MagicMock()), \
+            patch("src.infrastructure.repositories.redis_prompt_repository.RedisPromptRepository", MagicMock()), \
+            patch("src.infrastructure.repositories.mongo_evaluation_repository.MongoEvaluationRepository", MagicMock()), \
+            patch("src.infrastructure.messaging.kafka_event_publisher.KafkaEventPublisher", MagicMock()), \
+            patch("src.infrastructure.messaging.kafka_event_consumer.KafkaEventConsumer", MagicMock()):
+        main = importlib.import_module("src.main")
+
+    replacements = {
+        name: getattr(fakes, name)
+        for name in (
+            "llm_service", "embedding_service", "vector_search", "prompt_repository",
+            "evaluation_repository", "event_publisher", "collection_registry", "answer_cache",
+            "exact_answer_cache", "conversation_memory",
+        )
+    }
+    original = {name: getattr(main, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(main, name, value)
+    try:
+        yield main
+    finally:
+        for name, value in original.items():
+            setattr(main, name, value)
+
+
+def build_payloads(count: int, unique_queries: int, template_ratio: float, template_id: str, seed: int) -> List[Dict[str, Any]]:
+    """Mensajes de chat (no genéricos, para que pasen por RAG) con repetición controlada"""
+    rng = random.Random(seed)
+    pool = [
+        rng.choice(QUESTIONS).format(topic=rng.choice(TOPICS)) + f" (caso {i})"
+        for i in range(max(1, unique_queries))
+    ]
+    payloads = []
+    for i in range(count):
+        payload = {"message": rng.choice(pool), "conversationId": f"bench-{i}"}
+        if rng.random() < template_ratio:
+            payload["promptTemplateId"] = template_id
+        payloads.append(payload)
+    return payloads
+
+
+def stage_durations(trace: Dict[str, Tuple[float, float]], started: float, finished: float) -> Dict[str, float]:
+    """Duración (ms) de cada etapa de una petición, incluido el overhead propio del servicio"""
+    durations = {stage: (end - start) * 1000 for stage, (start, end) in trace.items()}
+
+    # Construcción del prompt: desde que termina la última etapa previa al LLM hasta que empieza el LLM
+    if "llm" in trace:
+        llm_start = trace["llm"][0]
+        previous_ends = [end for stage, (_, end) in trace.items() if stage != "llm" and end <= llm_start]
+        durations["prompt_build"] = (llm_start - max(previous_ends, default=started)) * 1000
+
+    # Sólo cuenta lo que ocurre antes de responder (la evaluación se escribe después)
+    intervals = sorted(trace.values())
+    covered = 0.0
+    cursor = started
+    for start, end in intervals:
+        start = max(start, cursor)
+        end = min(end, finished)
+        if end > start:
+            covered += end - start
+            cursor = end
+    durations["service_overhead"] = max((finished - started - covered) * 1000, 0.0)
+    return durations
+
+
+def parse_sse(body: str) -> List[Tuple[str, Dict[str, Any]]]:
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines.get("data", "{}"))))
+    return events
+
+
+async def run_level(
+    app,
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+    loop_lag_interval_ms: float = 10.0,
+    stream: bool = False,
+    background_tasks: Optional[Any] = None,
+) -> Dict[str, Any]:
+    """
+    Lanza todas las peticiones con `concurrency` clientes concurrentes (bucle
+    cerrado). Las etapas que la app deja en `background_tasks` (eventos de
+    auditoría) se esperan al final del nivel y se reportan aparte de la latencia.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    totals: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    traces: List[Tuple[Dict[str, Tuple[float, float]], float, float]] = []
+    errors = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            trace: Dict[str, Tuple[float, float]] = {}
+            token = current_trace.set(trace)
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/ai/chat/stream" if stream else "/api/ai/chat", json=payload)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                if stream:
+                    events = dict(parse_sse(response.text))
+                    if "done" not in events:
+                        errors += 1
+                        continue
+                    first_token = events["done"].get("timeToFirstToken")
+                    if first_token is not None:
+                        stages.setdefault("time_to_first_token", []).append(float(first_token))
+            except Exception:
+                errors += 1
+                continue
+            finally:
+                current_trace.reset(token)
+            finished = time.perf_counter()
+            totals.append((finished - started) * 1000)
+            traces.append((trace, started, finished))
+
+    monitor = LoopLagMonitor(loop_lag_interval_ms)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(max(1, concurrency))])
+        elapsed = time.perf_counter() - started
+        if background_tasks is not None:
+            await background_tasks.drain()
+        lag = await monitor.stop()
+
+    for trace, request_started, request_finished in traces:
+        for stage, duration in stage_durations(trace, request_started, request_finished).items():
+            stages.setdefault(stage, []).append(duration)
+
+    return {
+        "concurrency": concurrency,
+        "stream": stream,
+        "requests": len(payloads),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(totals) / elapsed, 2),
+        "latency_ms": latency_summary(totals),
+        "stages_ms": {stage: latency_summary(samples) for stage, samples in sorted(stages.items())},
+        "loop_lag_ms": latency_summary(lag),
+    }
+
+
+async def main(args) -> Dict[str, Any]:
+    fakes = ChatFakes(args)
+    template = PromptTemplate(
+        id="benchmark-template",
+        name="Benchmark",
+        description="Template del benchmark",
+        system_prompt="Eres un asistente de recursos humanos. Responde con precisión.",
+        user_prompt_template="Pregunta del empleado: {message}",
+    )
+    await fakes.prompt_repository.create(template)
+
+    results = []
+    with chat_service(fakes) as service:
+        warmup = build_payloads(args.warmup, args.unique_queries, args.template_ratio, template.id, args.seed)
+        await run_level(service.app, warmup, concurrency=1, background_tasks=service.background_tasks)
+
+        for concurrency in args.concurrency:
+            payloads = build_payloads(args.requests, args.unique_queries, args.template_ratio, template.id, args.seed + concurrency)
+            results.append(await run_level(
+                service.app, payloads, concurrency, args.loop_lag_interval_ms,
+                stream=args.stream, background_tasks=service.background_tasks,
+            ))
+
+    # Acumulado de todos los niveles (incluido el warmup)
+    caches = {}
+    if isinstance(fakes.embedding_service, CachedEmbeddingService):
+        caches["embedding"] = fakes.embedding_service.stats()
+    if fakes.embedding_batcher is not None:
+        caches["embedding_batcher"] = fakes.embedding_batcher.stats()
+    if isinstance(fakes.prompt_repository, CachedPromptRepository):
+        caches["prompt"] = fakes.prompt_repository.stats()
+    if fakes.answer_cache is not None:
+        caches["answer"] = fakes.answer_cache.stats()
+
+    payload = {
+        "benchmark": "chat",
+        "environment": environment_info(),
+        "workload": {
+            "requests": args.requests,
+            "unique_queries": args.unique_queries,
+            "template_ratio": args.template_ratio,
+            "chunks": args.chunks,
+            "seed": args.seed,
+        },
+        "fakes": {
+            "llm_latency": args.llm_latency,
+            "embedding_latency": args.embedding_latency,
+            "search_latency": args.search_latency,
+            "redis_latency": args.redis_latency,
+            "mongo_latency": args.mongo_latency,
+            "output_tokens": args.output_tokens,
+            "dim": args.dim,
+        },
+        "caches": caches,
+        "results": results,
+    }
+    write_results(args.output, payload)
+    return payload
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark for /api/ai/chat")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--unique-queries", type=int, default=50, help="Tamaño del pool de preguntas distintas")
+    parser.add_argument("--template-ratio", type=float, default=0.5, help="Fracción de peticiones con promptTemplateId")
+    parser.add_argument("--chunks", type=int, default=5, help="Chunks devueltos por la búsqueda")
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--stream", action="store_true", help="Usar /api/ai/chat/stream (SSE)")
+    parser.add_argument("--embedding-cache", action="store_true", help="Caché de embeddings de consultas en memoria")
+    parser.add_argument("--embedding-batch", action="store_true", help="Agrupar embeddings de peticiones concurrentes")
+    parser.add_argument("--answer-cache", action="store_true", help="Caché semántica de respuestas")
+    parser.add_argument("--prompt-cache", action="store_true", help="Templates en memoria (sin prompt_fetch tras el primer acceso)")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=42)
+    # Distribuciones: fixed:MS, uniform:MIN:MAX, lognormal:MEDIANA:SIGMA
+    parser.add_argument("--llm-latency", default="lognormal:800:0.4")
+    parser.add_argument("--embedding-latency", default="lognormal:150:0.3")
+    parser.add_argument("--search-latency", default="lognormal:20:0.3")
+    parser.add_argument("--redis-latency", default="fixed:1")
+    parser.add_argument("--mongo-latency", default="lognormal:5:0.3")
+    parser.add_argument("--loop-lag-interval-ms", type=float, default=10.0)
+    parser.add_argument("--output", default="benchmarks/results/chat.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    payload = asyncio.run(main(parse_args()))
+    for row in payload["results"]:
+        stages = " ".join(f"{stage}={summary['p50']:.1f}" for stage, summary in row["stages_ms"].items())
+        print(
+            f"c={row['concurrency']:<4d} rps={row['throughput_rps']:<8.2f} p50={row['latency_ms']['p50']:.1f}ms "
+            f"p99={row['latency_ms']['p99']:.1f}ms lag_p99={row['loop_lag_ms']['p99']:.1f}ms errors={row['errors']} "
+            f"p50 stages(ms): {stages}"
+        )
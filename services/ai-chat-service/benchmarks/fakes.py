@@ -0,0 +1,272 @@
+"""
+Dobles de los puertos del servicio (OpenAI, Chroma, Redis, Mongo, Kafka) con
+latencias inyectables, para medir el overhead propio del servicio sin red.
+"""
+import asyncio
+import contextvars
+import hashlib
+import random
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.ievent_publisher import IEventPublisher
+from src.application.ports.illm_service import ILLMService
+from src.application.ports.ivector_search import IVectorSearch
+from src.domain.entities.prompt_template import PromptTemplate
+from src.domain.repositories.iprompt_repository import IPromptRepository
+from src.infrastructure.vector_db.collection_registry import ActiveCollection
+
+# Traza de la petición en curso: etapa -> (inicio, fin) en segundos de perf_counter
+current_trace: contextvars.ContextVar[Optional[Dict[str, Tuple[float, float]]]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+class LatencyModel:
+    """
+    Distribución de latencia en ms. Formatos aceptados:
+    `fixed:50`, `uniform:20:80` (mín:máx) y `lognormal:200:0.5` (mediana:sigma).
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed: Optional[int] = None):
+        parts = spec.split(":")
+        self.spec = spec
+        self.kind = parts[0]
+        self.params = [float(value) for value in parts[1:]]
+        self.rng = random.Random(seed)
+        if self.kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return self.rng.lognormvariate(0.0, sigma) * median
+
+    async def wait(self) -> None:
+        delay = self.sample_ms() / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class traced:
+    """Registra la duración del bloque en la traza de la petición actual"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    async def __aenter__(self):
+        self.started = time.perf_counter()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        trace = current_trace.get()
+        if trace is not None:
+            trace[self.stage] = (self.started, time.perf_counter())
+
+
+class FakeLLMService(ILLMService):
+    """La latencia es la de la respuesta completa; en streaming se reparte entre `stream_chunks` fragmentos"""
+
+    def __init__(self, latency: LatencyModel, output_tokens: int = 150, stream_chunks: int = 20):
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.stream_chunks = max(1, stream_chunks)
+
+    async def generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        async with traced("llm"):
+            await self.latency.wait()
+        return {"content": self._content(), "tokens": self._tokens(messages)}
+
+    async def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with traced("llm"):
+            delay = self.latency.sample_ms() / 1000 / self.stream_chunks
+            content = self._content()
+            size = max(1, len(content) // self.stream_chunks)
+            for start in range(0, len(content), size):
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield {"type": "token", "content": content[start:start + size]}
+        yield {"type": "usage", "tokens": self._tokens(messages)}
+
+    def _content(self) -> str:
+        return "Respuesta simulada. " * (self.output_tokens // 4)
+
+    def _tokens(self, messages: List[Dict[str, str]]) -> Dict[str, int]:
+        input_tokens = sum(len(message["content"]) for message in messages) // 4
+        return {
+            "input": input_tokens,
+            "output": self.output_tokens,
+            "total": input_tokens + self.output_tokens,
+        }
+
+
+class FakeEmbeddingService(IEmbeddingService):
+    """Embeddings deterministas por texto (hash) con latencia inyectable"""
+
+    def __init__(self, latency: LatencyModel, dimensions: int = 1536):
+        self.latency = latency
+        self.dimensions = dimensions
+        self.requests = 0
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        return (await self.generate_embeddings_batch([text]))[0]
+
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        async with traced("embed"):
+            self.requests += 1
+            await self.latency.wait()
+        return [self._embed(text) for text in texts]
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+
+
+class FakeVectorSearch(IVectorSearch):
+    """Devuelve `results` chunks con el formato de ChromaVectorSearch"""
+
+    def __init__(self, latency: LatencyModel, results: int = 5, chunk_chars: int = 1000):
+        self.latency = latency
+        self.results = results
+        self.content = ("Contenido del documento sobre políticas internas. " * (chunk_chars // 50 + 1))[:chunk_chars]
+        self.collection_name = "documents"
+
+    def get_active_collection_name(self) -> str:
+        return self.collection_name
+
+    async def search_similar(
+        self, query_embedding: List[float], limit: int = 5, include_embeddings: bool = False
+    ) -> List[Dict]:
+        async with traced("search"):
+            await self.latency.wait()
+        chunks = [
+            {
+                "id": f"doc-{i}_0",
+                "score": 0.9 - i * 0.05,
+                "content": self.content,
+                "document_id": f"doc-{i}",
+                "chunk_index": 0,
+                "metadata": {"document_name": f"documento-{i}.pdf"},
+            }
+            for i in range(min(limit, self.results))
+        ]
+        if include_embeddings:
+            for chunk in chunks:
+                chunk["embedding"] = query_embedding
+        return chunks
+
+    async def get_chunks(self, document_id: Optional[str] = None) -> List[Dict]:
+        return []
+
+
+class FakePromptRepository(IPromptRepository):
+    """Stand-in de Redis para los prompt templates"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.prompts: Dict[str, PromptTemplate] = {}
+
+    async def create(self, prompt: PromptTemplate) -> PromptTemplate:
+        self.prompts[prompt.id] = prompt
+        return prompt
+
+    async def get_by_id(self, prompt_id: str) -> Optional[PromptTemplate]:
+        async with traced("prompt_fetch"):
+            await self.latency.wait()
+        return self.prompts.get(prompt_id)
+
+    async def get_all(self) -> List[PromptTemplate]:
+        await self.latency.wait()
+        return sorted(self.prompts.values(), key=lambda p: p.created_at, reverse=True)
+
+    async def get_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[PromptTemplate], Optional[str]]:
+        prompts = await self.get_all()
+        start = int(cursor or 0)
+        next_cursor = str(start + limit) if start + limit < len(prompts) else None
+        return prompts[start:start + limit], next_cursor
+
+    async def update(self, prompt: PromptTemplate) -> PromptTemplate:
+        self.prompts[prompt.id] = prompt
+        return prompt
+
+    async def delete(self, prompt_id: str) -> bool:
+        return self.prompts.pop(prompt_id, None) is not None
+
+
+class FakeEvaluationRepository:
+    """Stand-in de Mongo para las evaluaciones: como MongoEvaluationRepository, `create` sólo
+    deja la evaluación en el buffer y la escritura (con su latencia) va en `flush`"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.evaluations: List[dict] = []
+
+    async def create(
+        self,
+        conversation_id: str,
+        prompt_template_id: Optional[str],
+        metrics: dict,
+        quality: Optional[dict] = None,
+    ) -> dict:
+        async with traced("evaluation_write"):
+            pass
+        evaluation = {
+            "conversationId": conversation_id,
+            "promptTemplateId": prompt_template_id,
+            "metrics": metrics,
+            "quality": quality,
+            "timestamp": time.time(),
+        }
+        self.evaluations.append(evaluation)
+        return evaluation
+
+    async def flush(self) -> None:
+        await self.latency.wait()
+
+    async def get_all(self, limit: Optional[int] = None, offset: Optional[int] = None):
+        return list(reversed(self.evaluations))[offset or 0:][:limit], len(self.evaluations)
+
+    async def close(self):
+        pass
+
+
+class NullEventPublisher(IEventPublisher):
+    def __init__(self):
+        self.events: Dict[str, int] = defaultdict(int)
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def publish(self, event_name: str, payload: Dict[str, Any]) -> None:
+        self.events[event_name] += 1
+
+
+class StaticCollectionRegistry:
+    def __init__(self, collection: str = "documents", embedding_model: str = "fake-embedding"):
+        self.active = ActiveCollection(collection, embedding_model)
+
+    def get_active(self, refresh: bool = False) -> ActiveCollection:
+        return self.active
+
+    def invalidate(self) -> None:
+        pass
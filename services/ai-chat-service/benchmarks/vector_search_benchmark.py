@@ -0,0 +1,299 @@
+"""
+Benchmark de recall@k y latencia para la búsqueda vectorial.
+
+Carga (o genera) un corpus de embeddings, calcula el top-k exacto por fuerza
+bruta con NumPy y mide recall@k y latencias p50/p95/p99 de
+`ChromaVectorSearch.search_similar` (contra un Chroma local, sin red) y de
+backends alternativos.
+
+Uso:
+    python -m benchmarks.vector_search_benchmark --docs 5000 --k 1 5 10 \\
+        --search-ef 10 100 --score-threshold 0.0 0.5 \\
+        --output benchmarks/results/vector_search.json
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from benchmarks.stats import latency_summary, environment_info, write_results
+
+
+def generate_corpus(
+    n_docs: int,
+    n_queries: int,
+    dim: int,
+    n_clusters: int = 50,
+    noise: float = 0.05,
+    seed: int = 42,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Genera un corpus sintético agrupado en clusters (similar a chunks de varios documentos)"""
+    rng = np.random.default_rng(seed)
+    centers = _normalize(rng.standard_normal((n_clusters, dim)).astype(np.float32))
+    assignments = rng.integers(0, n_clusters, size=n_docs)
+    corpus = centers[assignments] + noise * rng.standard_normal((n_docs, dim)).astype(np.float32)
+
+    # Las consultas son paráfrasis (perturbaciones) de chunks existentes
+    sources = rng.integers(0, n_docs, size=n_queries)
+    queries = corpus[sources] + noise * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    return _normalize(corpus), _normalize(queries)
+
+
+def load_corpus(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Carga un corpus grabado (.npz con `embeddings` y `queries`)"""
+    data = np.load(path)
+    corpus = np.asarray(data["embeddings"], dtype=np.float32)
+    queries = np.asarray(data["queries"], dtype=np.float32)
+    return corpus, queries
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Top-k exacto por distancia L2 al cuadrado (la métrica por defecto de Chroma)"""
+    k = min(k, corpus.shape[0])
+    corpus_norms = np.einsum("ij,ij->i", corpus, corpus)
+    query_norms = np.einsum("ij,ij->i", queries, queries)
+    distances = query_norms[:, None] - 2.0 * (queries @ corpus.T) + corpus_norms[None, :]
+
+    candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(candidate_distances, axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def recall_at_k(retrieved: Sequence[Sequence[int]], exact: np.ndarray) -> float:
+    """Fracción del top-k exacto que devuelve el backend, promediada sobre las consultas"""
+    if len(retrieved) == 0:
+        return 0.0
+    k = exact.shape[1]
+    hits = [len(set(found[:k]) & set(expected.tolist())) / k for found, expected in zip(retrieved, exact)]
+    return float(sum(hits) / len(hits))
+
+
+class NumpyExactBackend:
+    """Búsqueda exacta por fuerza bruta (referencia de recall 1.0 y de coste de búsqueda exacta)"""
+
+    name = "numpy-exact"
+
+    def __init__(self):
+        self.corpus: Optional[np.ndarray] = None
+
+    def params(self) -> Dict[str, Any]:
+        return {}
+
+    def build(self, corpus: np.ndarray) -> None:
+        self.corpus = corpus
+
+    async def search(self, query: np.ndarray, k: int) -> List[int]:
+        return exact_top_k(self.corpus, query[None, :], k)[0].tolist()
+
+    def close(self) -> None:
+        self.corpus = None
+
+
+class ChromaBackend:
+    """`ChromaVectorSearch.search_similar` contra un Chroma local persistido en disco"""
+
+    name = "chroma"
+
+    def __init__(
+        self,
+        score_threshold: float = 0.5,
+        search_ef: Optional[int] = None,
+        construction_ef: Optional[int] = None,
+        max_neighbors: Optional[int] = None,
+        path: Optional[str] = None,
+    ):
+        self.score_threshold = score_threshold
+        self.search_ef = search_ef
+        self.construction_ef = construction_ef
+        self.max_neighbors = max_neighbors
+        self.path = path
+        self._tmpdir = None
+        self.search_service = None
+
+    def params(self) -> Dict[str, Any]:
+        return {
+            "score_threshold": self.score_threshold,
+            "search_ef": self.search_ef,
+            "construction_ef": self.construction_ef,
+            "max_neighbors": self.max_neighbors,
+        }
+
+    def build(self, corpus: np.ndarray) -> None:
+        # Imports locales: chromadb sólo es necesario para este backend
+        import chromadb
+        from chromadb.config import Settings
+        from src.infrastructure.vector_db.chroma_vector_search import ChromaVectorSearch
+
+        if not self.path:
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="chroma-bench-")
+            self.path = self._tmpdir.name
+
+        client = chromadb.PersistentClient(path=self.path, settings=Settings(anonymized_telemetry=False))
+        metadata = {"hnsw:space": "l2"}
+        if self.search_ef:
+            metadata["hnsw:search_ef"] = self.search_ef
+        if self.construction_ef:
+            metadata["hnsw:construction_ef"] = self.construction_ef
+        if self.max_neighbors:
+            metadata["hnsw:M"] = self.max_neighbors
+
+        collection_name = "benchmark"
+        try:
+            client.delete_collection(name=collection_name)
+        except Exception:
+            pass
+        collection = client.create_collection(name=collection_name, metadata=metadata)
+
+        batch_size = 1000
+        for start in range(0, corpus.shape[0], batch_size):
+            batch = corpus[start:start + batch_size]
+            ids = [str(i) for i in range(start, start + batch.shape[0])]
+            collection.add(
+                ids=ids,
+                embeddings=batch.tolist(),
+                documents=[f"chunk {i}" for i in ids],
+                metadatas=[{"document_id": f"doc-{i}", "chunk_index": "0"} for i in ids],
+            )
+
+        self.search_service = ChromaVectorSearch(client=client)
+        self.search_service.collection_name = collection_name
+        self.search_service.score_threshold = self.score_threshold
+
+    async def search(self, query: np.ndarray, k: int) -> List[int]:
+        results = await self.search_service.search_similar(query.tolist(), limit=k)
+        return [int(result["id"]) for result in results]
+
+    def close(self) -> None:
+        self.search_service = None
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+            self._tmpdir = None
+            self.path = None
+
+
+async def run_backend(backend, corpus: np.ndarray, queries: np.ndarray, ks: List[int], warmup: int = 5) -> List[Dict[str, Any]]:
+    """Construye el índice del backend y mide recall@k y latencia para cada k"""
+    build_start = time.perf_counter()
+    backend.build(corpus)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    results = []
+    for k in ks:
+        exact = exact_top_k(corpus, queries, k)
+
+        for query in queries[:warmup]:
+            await backend.search(query, k)
+
+        retrieved = []
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            found = await backend.search(query, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            retrieved.append(found)
+
+        results.append({
+            "backend": backend.name,
+            "params": backend.params(),
+            "k": k,
+            "recall_at_k": round(recall_at_k(retrieved, exact), 4),
+            "avg_returned": round(sum(len(r) for r in retrieved) / len(retrieved), 3),
+            "latency_ms": latency_summary(latencies),
+            "build_ms": round(build_ms, 1),
+        })
+    return results
+
+
+def build_backends(args) -> List[Any]:
+    backends = []
+    if "numpy" in args.backends:
+        backends.append(NumpyExactBackend())
+    if "chroma" in args.backends:
+        search_efs = args.search_ef or [None]
+        for threshold, search_ef in itertools.product(args.score_threshold, search_efs):
+            backends.append(ChromaBackend(
+                score_threshold=threshold,
+                search_ef=search_ef,
+                construction_ef=args.construction_ef,
+                max_neighbors=args.max_neighbors,
+            ))
+    return backends
+
+
+async def main(args) -> Dict[str, Any]:
+    if args.corpus:
+        corpus, queries = load_corpus(args.corpus)
+        corpus_info = {"source": os.path.basename(args.corpus)}
+    else:
+        corpus, queries = generate_corpus(
+            n_docs=args.docs,
+            n_queries=args.queries,
+            dim=args.dim,
+            n_clusters=args.clusters,
+            noise=args.noise,
+            seed=args.seed,
+        )
+        corpus_info = {
+            "source": "synthetic",
+            "clusters": args.clusters,
+            "noise": args.noise,
+            "seed": args.seed,
+        }
+    corpus_info.update({"docs": int(corpus.shape[0]), "queries": int(queries.shape[0]), "dim": int(corpus.shape[1])})
+
+    results = []
+    for backend in build_backends(args):
+        try:
+            results.extend(await run_backend(backend, corpus, queries, args.k))
+        finally:
+            backend.close()
+
+    payload = {
+        "benchmark": "vector_search",
+        "environment": environment_info(),
+        "corpus": corpus_info,
+        "results": results,
+    }
+    write_results(args.output, payload)
+    return payload
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Recall@k / latency benchmark for vector search")
+    parser.add_argument("--corpus", help="Corpus grabado (.npz con 'embeddings' y 'queries')")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"], choices=["numpy", "chroma"])
+    parser.add_argument("--score-threshold", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=None)
+    parser.add_argument("--construction-ef", type=int, default=None)
+    parser.add_argument("--max-neighbors", type=int, default=None)
+    parser.add_argument("--output", default="benchmarks/results/vector_search.json")
+    return parser.parse_args(argv)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+if __name__ == "__main__":
+    payload = asyncio.run(main(parse_args()))
+    for row in payload["results"]:
+        print(
+            f"{row['backend']:12s} k={row['k']:<3d} recall={row['recall_at_k']:.4f} "
+            f"p50={row['latency_ms']['p50']:.2f}ms p95={row['latency_ms']['p95']:.2f}ms "
+            f"p99={row['latency_ms']['p99']:.2f}ms params={row['params']}"
+        )
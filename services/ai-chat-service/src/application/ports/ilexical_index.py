@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict
+
+
+class ILexicalIndex(ABC):
+    @abstractmethod
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        """Chunks que contienen los términos de la consulta, con el formato de IVectorSearch"""
+        pass
+
+    @abstractmethod
+    def strong_match(self, query: str) -> bool:
+        """True si la consulta se puede responder sólo con la búsqueda léxica (sin embedding)"""
+        pass
+
+    @abstractmethod
+    def add_document(self, document_id: str, chunks: List[Dict]) -> None:
+        """Indexa (o reindexa) los chunks de un documento"""
+        pass
+
+    @abstractmethod
+    def remove_document(self, document_id: str) -> None:
+        pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 
 
 class ILLMService(ABC):
@@ -9,6 +9,26 @@ class ILLMService(ABC):
         messages: List[Dict[str, str]],
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        """Genera una respuesta del LLM"""
+        """
+        Genera una respuesta del LLM. `routing` describe la petición para
+        elegir modelo (`query`, `contextTokens`, `policy`); la respuesta
+        incluye el `model` usado y la decisión en `routing`.
+        """
+        pass
+
+    @abstractmethod
+    def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera la respuesta en streaming. Emite `{"type": "token", "content": ...}`
+        por cada fragmento y termina con `{"type": "usage", "tokens": {...}}`
+        (con `model` y `routing` como en generate_response).
+        """
         pass
@@ -0,0 +1,28 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Dict, Any
+
+
+class ISemanticAnswerCache(ABC):
+    @abstractmethod
+    def corpus_version(self) -> int:
+        """Versión del corpus: cambia cada vez que se procesa o elimina un documento"""
+        pass
+
+    @abstractmethod
+    async def lookup(self, query_embedding: List[float], scope: str) -> Optional[Dict[str, Any]]:
+        """Respuesta guardada para una consulta parecida (`{"answer", "similarity"}`) o None"""
+        pass
+
+    @abstractmethod
+    async def store(
+        self,
+        query_embedding: List[float],
+        scope: str,
+        answer: Dict[str, Any],
+        corpus_version: int,
+    ) -> bool:
+        pass
+
+    @abstractmethod
+    def invalidate(self, reason: str = "") -> None:
+        pass
@@ -1,11 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 class IVectorSearch(ABC):
     @abstractmethod
     async def search_similar(
-        self, query_embedding: List[float], limit: int = 5
+        self, query_embedding: List[float], limit: int = 5, include_embeddings: bool = False
     ) -> List[Dict]:
-        """Busca documentos similares usando embeddings"""
+        """Busca documentos similares usando embeddings (con `include_embeddings`, cada chunk trae su "embedding")"""
+        pass
+
+    @abstractmethod
+    async def get_chunks(self, document_id: Optional[str] = None) -> List[Dict]:
+        """Chunks (texto y metadatos) de un documento, o de toda la colección activa"""
         pass
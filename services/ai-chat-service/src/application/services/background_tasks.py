@@ -0,0 +1,53 @@
+import asyncio
+import os
+from typing import Awaitable, Optional, Set
+from src.infrastructure.config.logger import logger
+
+
+class BackgroundTaskSupervisor:
+    """
+    Trabajo fuera del camino de la respuesta (evaluaciones, eventos de
+    auditoría). Cada tarea queda registrada hasta que termina, sus errores se
+    registran sin afectar a la petición y `drain()` espera las pendientes al
+    apagar el servicio. Con `BACKGROUND_MAX_PENDING` tareas en curso la
+    siguiente se ejecuta en línea: si Mongo o Kafka se atascan la memoria queda
+    acotada y la latencia vuelve a reflejarlo.
+    """
+
+    def __init__(self, max_pending: Optional[int] = None, inline: bool = False):
+        self.max_pending = max_pending or int(os.getenv("BACKGROUND_MAX_PENDING", "1000"))
+        # En línea siempre (tests): la tarea termina antes de responder
+        self.inline = inline
+        self._tasks: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self.ran_inline = 0
+
+    async def submit(self, name: str, work: Awaitable) -> None:
+        if self.inline or len(self._tasks) >= self.max_pending:
+            self.ran_inline += 1
+            await self._supervise(name, work)
+            return
+        task = asyncio.create_task(self._supervise(name, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "ranInline": self.ran_inline,
+        }
+
+    async def _supervise(self, name: str, work: Awaitable) -> None:
+        try:
+            await work
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Background task failed", task=name, error=str(e))
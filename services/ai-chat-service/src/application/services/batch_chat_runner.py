@@ -0,0 +1,280 @@
+import asyncio
+import contextlib
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.ilexical_index import ILexicalIndex
+from src.application.use_cases.send_message_use_case import SendMessageUseCase, embed_queries
+from src.domain.repositories.ichat_job_repository import IChatJobRepository
+from src.infrastructure.config.logger import logger
+from src.infrastructure.services.cached_embedding_service import normalize_query
+
+NOT_EMBEDDED = object()
+
+
+class AdaptiveLimiter:
+    """
+    Concurrencia de los jobs por lotes (AIMD): sube de uno en uno con cada
+    ronda de respuestas correctas hasta `max_limit` y se reduce a la mitad
+    cuando OpenAI responde 429. Cada petición interactiva en curso le quita
+    un hueco, así que el chat nunca compite con un lote por el límite de la
+    API (como mínimo sigue avanzando una pregunta).
+    """
+
+    def __init__(self, max_limit: int, interactive_load: Callable[[], int], poll_seconds: float = 0.05):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.interactive_load = interactive_load
+        self.poll_seconds = poll_seconds
+        self.active = 0
+        self.rate_limited = 0
+
+    def capacity(self) -> int:
+        return max(1, int(self.limit) - self.interactive_load())
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        while self.active >= self.capacity():
+            await asyncio.sleep(self.poll_seconds)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_rate_limited(self) -> None:
+        self.rate_limited += 1
+        self.limit = max(1.0, self.limit / 2)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Segundos a esperar si el error es un 429 (cabecera `retry-after` si viene), o None"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class BatchChatRunner:
+    """
+    Procesa los jobs de chat por lotes en segundo plano. Cada réplica toma de
+    la cola un job cada vez; sus preguntas se agrupan por texto normalizado
+    (las repetidas comparten búsqueda y respuesta) y se embeben en llamadas de
+    `BATCH_CHAT_PAGE_SIZE` (100). `BATCH_CHAT_WORKERS` (8) workers responden
+    las preguntas con el caso de uso del chat, sin memoria de conversación,
+    limitados por `AdaptiveLimiter`; un 429 se reintenta hasta
+    `BATCH_CHAT_MAX_RETRIES` veces tras el `retry-after`. Los resultados se
+    guardan por páginas, así que un job interrumpido se reanuda donde quedó.
+    """
+
+    def __init__(
+        self,
+        repository: IChatJobRepository,
+        build_use_case: Callable[[Optional[str]], Awaitable[SendMessageUseCase]],
+        embedding_service: IEmbeddingService,
+        lexical_index: Optional[ILexicalIndex] = None,
+        workers: Optional[int] = None,
+        page_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        stale_seconds: Optional[float] = None,
+    ):
+        self.repository = repository
+        self.build_use_case = build_use_case
+        self.embedding_service = embedding_service
+        self.lexical_index = lexical_index
+        self.workers = workers or int(os.getenv("BATCH_CHAT_WORKERS", "8"))
+        self.page_size = page_size or int(os.getenv("BATCH_CHAT_PAGE_SIZE", "100"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("BATCH_CHAT_MAX_RETRIES", "3"))
+        self.poll_seconds = poll_seconds or float(os.getenv("BATCH_CHAT_POLL_SECONDS", "2"))
+        self.stale_seconds = stale_seconds or float(os.getenv("BATCH_CHAT_STALE_SECONDS", "60"))
+        self.interactive_requests = 0
+        self.limiter = AdaptiveLimiter(self.workers, lambda: self.interactive_requests)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.current_job: Optional[str] = None
+        self.jobs_completed = 0
+        self.questions_answered = 0
+
+    @contextlib.contextmanager
+    def interactive(self):
+        """Marca una petición de chat interactiva en curso (los lotes le ceden capacidad)"""
+        self.interactive_requests += 1
+        try:
+            yield
+        finally:
+            self.interactive_requests -= 1
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    def notify(self) -> None:
+        """Hay un job nuevo en cola: no esperar al siguiente sondeo"""
+        self._wakeup.set()
+
+    async def close(self) -> None:
+        # Las preguntas sin resultado siguen pendientes: el job se retoma al quedar sin latido
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "currentJob": self.current_job,
+            "concurrency": int(self.limiter.limit),
+            "active": self.limiter.active,
+            "interactiveRequests": self.interactive_requests,
+            "rateLimited": self.limiter.rate_limited,
+            "jobsCompleted": self.jobs_completed,
+            "questionsAnswered": self.questions_answered,
+        }
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                job = await self.repository.claim(self.stale_seconds)
+            except Exception as e:
+                logger.warning("Error claiming chat job", error=str(e))
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                continue
+            await self.run_job(job)
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["_id"]
+        self.current_job = job_id
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            use_case = await self.build_use_case(job.get("promptTemplateId"))
+            groups: Dict[str, List[Dict]] = {}
+            for item in await self.repository.pending_items(job_id):
+                groups.setdefault(normalize_query(item["question"]), []).append(item)
+            logger.info("Chat job started", job_id=job_id, pending=sum(map(len, groups.values())), distinct=len(groups))
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.page_size * 2)
+            results: List[Dict] = []
+            workers = [
+                asyncio.create_task(self._worker(job, use_case, queue, results))
+                for _ in range(self.workers)
+            ]
+            try:
+                await self._produce(list(groups.values()), queue)
+                await queue.join()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            await self.repository.save_results(job_id, results)
+            await self.repository.finish(job_id, "completed")
+            self.jobs_completed += 1
+            logger.info("Chat job completed", job_id=job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Chat job failed", job_id=job_id, error=str(e), exc_info=True)
+            await self.repository.finish(job_id, "failed", error=str(e))
+        finally:
+            heartbeat.cancel()
+            self.current_job = None
+
+    async def _produce(self, groups: List[List[Dict]], queue: asyncio.Queue) -> None:
+        # Embeddings de una página en una sola llamada, mientras los workers responden la anterior
+        for start in range(0, len(groups), self.page_size):
+            page = groups[start:start + self.page_size]
+            try:
+                embeddings = await embed_queries(
+                    self.embedding_service, [group[0]["question"] for group in page], self.lexical_index
+                )
+            except Exception as e:
+                # Sin el lote, cada pregunta calcula su embedding en el caso de uso
+                logger.warning("Chat job embedding batch failed", questions=len(page), error=str(e))
+                embeddings = [NOT_EMBEDDED] * len(page)
+            for group, embedding in zip(page, embeddings):
+                await queue.put((group, embedding))
+
+    async def _worker(
+        self,
+        job: Dict[str, Any],
+        use_case: SendMessageUseCase,
+        queue: asyncio.Queue,
+        results: List[Dict],
+    ) -> None:
+        while True:
+            group, embedding = await queue.get()
+            try:
+                answer = await self._answer(job, use_case, group[0]["question"], embedding)
+                for position, item in enumerate(group):
+                    results.append({**answer, "index": item["index"], "shared": position > 0})
+                self.questions_answered += len(group)
+                if len(results) >= self.page_size:
+                    page = results[:]
+                    results.clear()
+                    try:
+                        await self.repository.save_results(job["_id"], page)
+                    except Exception as e:
+                        # Se reintenta con la página siguiente (o al terminar el job)
+                        logger.warning("Error saving chat job results", job_id=job["_id"], error=str(e))
+                        results.extend(page)
+            finally:
+                queue.task_done()
+
+    async def _answer(
+        self,
+        job: Dict[str, Any],
+        use_case: SendMessageUseCase,
+        question: str,
+        embedding: Any,
+    ) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            async with self.limiter.slot():
+                try:
+                    response = await use_case.execute(
+                        user_message=question,
+                        conversation_id=None,
+                        user_id=job.get("userId", ""),
+                        use_rag=True,
+                        query_embedding=None if embedding is NOT_EMBEDDED else _ready(embedding),
+                    )
+                    self.limiter.on_success()
+                    return {
+                        "status": "done",
+                        "message": response.get("message", ""),
+                        "sources": response.get("sources", []),
+                        "tokens": response.get("tokens"),
+                        "latency": response.get("latency"),
+                    }
+                except Exception as e:
+                    delay = retry_after(e)
+                    if delay is None or attempt == self.max_retries:
+                        return {"status": "failed", "error": str(e)}
+                    self.limiter.on_rate_limited()
+            logger.warning("Chat job rate limited, retrying", job_id=job["_id"], delay=delay, attempt=attempt + 1)
+            await asyncio.sleep(delay)
+        return {"status": "failed", "error": "Rate limited"}
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.stale_seconds / 3)
+            try:
+                await self.repository.heartbeat(job_id)
+            except Exception as e:
+                logger.warning("Chat job heartbeat failed", job_id=job_id, error=str(e))
+
+
+def _ready(value: Optional[List[float]]) -> asyncio.Future:
+    # Future ya resuelto (no queda una corrutina sin esperar si el caso de uso falla antes)
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
@@ -0,0 +1,117 @@
+import os
+from typing import Dict, List, Optional
+from src.infrastructure.config.logger import logger
+from src.infrastructure.services.token_counter import TokenCounter
+
+# Tokens del encabezado "[Fuente N - documento (Relevancia: xx%)]" de cada bloque
+SOURCE_HEADER_TOKENS = 20
+# El vectorization-service solapa 200 caracteres entre chunks consecutivos
+MAX_OVERLAP_CHARS = 400
+MIN_OVERLAP_CHARS = 20
+# Por debajo de esto no vale la pena recortar un bloque para que quepa
+MIN_TRUNCATED_TOKENS = 50
+
+
+class ContextPacker:
+    """
+    Arma el contexto RAG dentro de un presupuesto de tokens. De los
+    `RAG_CANDIDATES` chunks recuperados descarta los que vienen después de una
+    caída de score mayor que `CONTEXT_SCORE_GAP` (con resultados fusionados por
+    RRF se respeta ese orden, sin corte), une los chunks consecutivos
+    del mismo documento quitando el texto solapado y añade los bloques por
+    relevancia mientras quepan en `CONTEXT_TOKEN_BUDGET` (o el presupuesto del
+    template). Así la profundidad de la búsqueda se adapta a la consulta y el
+    prompt no crece con chunks poco relevantes o repetidos.
+    """
+
+    def __init__(
+        self,
+        token_counter: TokenCounter,
+        candidates: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        score_gap: Optional[float] = None,
+    ):
+        self.token_counter = token_counter
+        self.candidates = candidates or int(os.getenv("RAG_CANDIDATES", "8"))
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+        self.score_gap = score_gap if score_gap is not None else float(os.getenv("CONTEXT_SCORE_GAP", "0.1"))
+
+    def pack(self, chunks: List[Dict], token_budget: Optional[int] = None) -> List[Dict]:
+        budget = token_budget or self.token_budget
+        if any("rrf" in chunk for chunk in chunks):
+            # Rankings fusionados: los scores vienen en escalas distintas (vectorial y léxica),
+            # así que se respeta el orden RRF y no se corta por caída de score
+            relevant = sorted(chunks, key=_relevance, reverse=True)
+        else:
+            relevant = self._cut_at_gap(sorted(chunks, key=_relevance, reverse=True))
+        blocks = self._merge_adjacent(relevant)
+
+        packed = []
+        used = 0
+        for block in blocks:
+            remaining = budget - used - SOURCE_HEADER_TOKENS
+            tokens = self.token_counter.count(block["content"])
+            if tokens > remaining:
+                # Sólo se recorta el bloque más relevante; los demás se saltan por si cabe uno menor
+                if packed or remaining < MIN_TRUNCATED_TOKENS:
+                    continue
+                block = {**block, "content": self.token_counter.truncate(block["content"], remaining)}
+                tokens = self.token_counter.count(block["content"])
+            packed.append(block)
+            used += tokens + SOURCE_HEADER_TOKENS
+
+        logger.info(
+            "Context packed",
+            candidates=len(chunks),
+            relevant=len(relevant),
+            blocks=len(packed),
+            tokens=used,
+            budget=budget,
+        )
+        return packed
+
+    def _cut_at_gap(self, chunks: List[Dict]) -> List[Dict]:
+        for idx in range(1, len(chunks)):
+            if chunks[idx - 1].get("score", 0) - chunks[idx].get("score", 0) > self.score_gap:
+                return chunks[:idx]
+        return chunks
+
+    def _merge_adjacent(self, chunks: List[Dict]) -> List[Dict]:
+        """Une los chunks consecutivos de un mismo documento; cada bloque conserva el mejor score"""
+        by_document: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            by_document.setdefault(chunk.get("document_id") or chunk.get("id"), []).append(chunk)
+
+        blocks = []
+        for document_chunks in by_document.values():
+            document_chunks.sort(key=lambda chunk: chunk.get("chunk_index", 0))
+            block = None
+            for chunk in document_chunks:
+                if block and chunk.get("chunk_index", 0) == block["chunk_indexes"][-1] + 1:
+                    block["content"] = _join_overlapping(block["content"], chunk.get("content", ""))
+                    block["chunk_indexes"].append(chunk.get("chunk_index", 0))
+                    if _relevance(chunk) > _relevance(block):
+                        block["score"] = chunk.get("score", 0)
+                        block["metadata"] = chunk.get("metadata", {})
+                        if "rrf" in chunk:
+                            block["rrf"] = chunk["rrf"]
+                    continue
+                block = {**chunk, "score": chunk.get("score", 0), "chunk_indexes": [chunk.get("chunk_index", 0)]}
+                blocks.append(block)
+
+        blocks.sort(key=_relevance, reverse=True)
+        return blocks
+
+
+def _relevance(chunk: Dict) -> float:
+    """Clave de orden: la puntuación RRF si el chunk viene de una fusión, si no su score"""
+    return chunk["rrf"] if "rrf" in chunk else chunk.get("score", 0)
+
+
+def _join_overlapping(first: str, second: str) -> str:
+    """Concatena dos chunks consecutivos quitando el prefijo de `second` que repite el final de `first`"""
+    longest = min(len(first), len(second), MAX_OVERLAP_CHARS)
+    for size in range(longest, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return f"{first}\n{second}"
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import uuid
+from typing import Dict, List, Optional, Set
+from src.application.ports.illm_service import ILLMService
+from src.domain.entities.conversation import Conversation
+from src.domain.entities.message import Message, MessageRole
+from src.domain.repositories.iconversation_repository import IConversationRepository
+from src.infrastructure.config.logger import logger
+from src.infrastructure.services.token_counter import estimate_tokens
+
+SUMMARY_PROMPT = """Eres un asistente que resume conversaciones.
+Actualiza el resumen con los nuevos mensajes. Conserva los hechos, datos, decisiones y preguntas pendientes que puedan hacer falta para continuar la conversación; omite saludos y repeticiones.
+Responde sólo con el resumen, en el idioma de la conversación y en menos de 200 palabras."""
+
+
+class ConversationMemory:
+    """
+    Historial de las conversaciones para el prompt. Cada turno incluye el
+    resumen acumulado y los mensajes más recientes que caben en
+    `CONVERSATION_HISTORY_TOKENS`. Cuando lo pendiente de resumir supera
+    `CONVERSATION_SUMMARY_TRIGGER_TOKENS`, los mensajes más antiguos se pliegan
+    en el resumen con una llamada al LLM en segundo plano (fuera del camino de
+    la respuesta), así que el tamaño del prompt queda acotado sin importar la
+    longitud de la conversación.
+    """
+
+    def __init__(
+        self,
+        repository: IConversationRepository,
+        llm_service: ILLMService,
+        history_tokens: Optional[int] = None,
+        summary_trigger_tokens: Optional[int] = None,
+        window_messages: Optional[int] = None,
+    ):
+        self.repository = repository
+        self.llm_service = llm_service
+        self.history_tokens = history_tokens or int(os.getenv("CONVERSATION_HISTORY_TOKENS", "1500"))
+        self.summary_trigger_tokens = summary_trigger_tokens or int(
+            os.getenv("CONVERSATION_SUMMARY_TRIGGER_TOKENS", str(self.history_tokens * 2))
+        )
+        self.window_messages = window_messages or int(os.getenv("CONVERSATION_WINDOW_MESSAGES", "50"))
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def history(self, conversation_id: str, user_id: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Mensajes de historial para el LLM ([] si la conversación es nueva), o
+        None si la conversación es de otro usuario: en ese caso el turno no
+        usa ni guarda memoria.
+        """
+        try:
+            conversation = await self.repository.get(conversation_id, limit=self.window_messages)
+        except Exception as e:
+            logger.warning("Error loading conversation history", conversation_id=conversation_id, error=str(e))
+            return []
+
+        if conversation is None:
+            return []
+        if conversation.user_id != user_id:
+            logger.warning("Conversation belongs to another user, ignoring history", conversation_id=conversation_id)
+            return None
+        return self.window(conversation)
+
+    def window(self, conversation: Conversation) -> List[Dict[str, str]]:
+        budget = self.history_tokens
+        summary = []
+        if conversation.summary:
+            content = f"Resumen de la conversación hasta ahora:\n{conversation.summary}"
+            summary = [{"role": "system", "content": content}]
+            budget -= estimate_tokens(content)
+
+        recent = []
+        for message in reversed(conversation.messages):
+            cost = estimate_tokens(message.content)
+            if cost > budget:
+                break
+            budget -= cost
+            recent.append({"role": message.role.value, "content": message.content})
+        recent.reverse()
+        return summary + recent
+
+    async def record_turn(self, conversation_id: str, user_id: str, user_message: str, response: dict) -> None:
+        """Guarda el turno (pregunta y respuesta) y programa el resumen si hace falta"""
+        messages = [
+            Message(
+                id=str(uuid.uuid4()),
+                role=MessageRole.USER,
+                content=user_message,
+                conversation_id=conversation_id,
+            ),
+            Message(
+                id=str(uuid.uuid4()),
+                role=MessageRole.ASSISTANT,
+                content=response.get("message", ""),
+                conversation_id=conversation_id,
+                tokens=response.get("tokens"),
+                latency=response.get("latency"),
+                sources=response.get("sources"),
+            ),
+        ]
+        try:
+            await self.repository.append_messages(conversation_id, user_id, messages)
+        except Exception as e:
+            logger.warning("Error saving conversation turn", conversation_id=conversation_id, error=str(e))
+            return
+
+        task = asyncio.create_task(self._summarize_safely(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def summarize_if_needed(self, conversation_id: str) -> bool:
+        lock = self._locks.setdefault(conversation_id, asyncio.Lock())
+        async with lock:
+            conversation = await self.repository.get(conversation_id, limit=self.window_messages)
+            if not conversation:
+                return False
+            pending = sum(estimate_tokens(message.content) for message in conversation.messages)
+            if pending <= self.summary_trigger_tokens:
+                return False
+
+            # Se conservan literales los mensajes que caben en medio presupuesto; el resto se resume
+            keep_budget = self.history_tokens // 2
+            keep = 0
+            for message in reversed(conversation.messages):
+                cost = estimate_tokens(message.content)
+                if cost > keep_budget:
+                    break
+                keep_budget -= cost
+                keep += 1
+            to_fold = conversation.messages[:len(conversation.messages) - keep]
+            if not to_fold:
+                return False
+
+            summary = await self._summarize(conversation.summary, to_fold)
+            await self.repository.save_summary(conversation_id, summary, to_fold[-1].sequence + 1)
+            logger.info("Conversation summarized", conversation_id=conversation_id, folded_messages=len(to_fold))
+            return True
+
+    async def drain(self) -> None:
+        """Espera los resúmenes en curso (al apagar el servicio)"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _summarize_safely(self, conversation_id: str) -> None:
+        try:
+            await self.summarize_if_needed(conversation_id)
+        except Exception as e:
+            logger.warning("Error summarizing conversation", conversation_id=conversation_id, error=str(e))
+        finally:
+            lock = self._locks.get(conversation_id)
+            if lock and not lock.locked():
+                self._locks.pop(conversation_id, None)
+
+    async def _summarize(self, previous_summary: Optional[str], messages: List[Message]) -> str:
+        transcript = "\n".join(f"{message.role.value}: {message.content}" for message in messages)
+        prompt = f"Resumen previo:\n{previous_summary or '(ninguno)'}\n\nNuevos mensajes:\n{transcript}"
+        response = await self.llm_service.generate_response(
+            [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": prompt}],
+            temperature=0.2,
+            # Tarea interna fuera del camino de la respuesta: siempre el modelo rápido
+            routing={"query": prompt, "policy": "fast"},
+        )
+        return response.get("content", "").strip()
@@ -0,0 +1,66 @@
+import os
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+class MMRSelector:
+    """
+    Diversifica los chunks recuperados con Maximal Marginal Relevance. La
+    búsqueda trae `RAG_MMR_FETCH` candidatos con sus embeddings y se eligen
+    uno a uno los que maximizan `λ · relevancia − (1 − λ) · similitud con los
+    ya elegidos`: con el solapamiento entre chunks consecutivos, varios
+    resultados suelen ser casi el mismo pasaje. `λ` es `RAG_MMR_LAMBDA` (o el
+    del template); 1 equivale a ordenar sólo por relevancia.
+
+    La relevancia de todos los candidatos es un producto matriz-vector y cada
+    paso sólo actualiza el vector de similitud máxima con el último elegido
+    (sin la matriz completa de similitudes, que no hace falta para `limit`
+    pasos).
+    """
+
+    def __init__(self, fetch_k: Optional[int] = None, default_lambda: Optional[float] = None):
+        self.fetch_k = fetch_k or int(os.getenv("RAG_MMR_FETCH", "50"))
+        self.default_lambda = (
+            default_lambda if default_lambda is not None
+            else float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+        )
+
+    def select(
+        self,
+        query_embedding: Sequence[float],
+        candidates: List[Dict],
+        limit: int,
+        lambda_mult: Optional[float] = None,
+    ) -> List[Dict]:
+        """Los `limit` candidatos elegidos, en orden de selección y sin su embedding"""
+        lambda_mult = self.default_lambda if lambda_mult is None else lambda_mult
+        if len(candidates) <= limit or lambda_mult >= 1 or any(c.get("embedding") is None for c in candidates):
+            return [_without_embedding(c) for c in candidates[:limit]]
+
+        embeddings = _normalize(np.asarray([c["embedding"] for c in candidates], dtype=np.float32))
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32))
+        relevance = embeddings @ query
+
+        selected = [int(np.argmax(relevance))]
+        max_similarity = embeddings @ embeddings[selected[0]]
+        available = np.ones(len(candidates), dtype=bool)
+        available[selected[0]] = False
+        while len(selected) < limit:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            np.maximum(max_similarity, embeddings @ embeddings[best], out=max_similarity)
+
+        return [_without_embedding(candidates[idx]) for idx in selected]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _without_embedding(chunk: Dict) -> Dict:
+    # El embedding no viaja al prompt, a las fuentes ni a la caché de respuestas
+    return {k: v for k, v in chunk.items() if k != "embedding"}
@@ -0,0 +1,23 @@
+from typing import Dict, List
+
+# Constante habitual de RRF: amortigua la diferencia entre los primeros puestos
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict]], limit: int, k: int = RRF_K) -> List[Dict]:
+    """
+    Fusiona rankings (vectorial y léxico) por reciprocal-rank fusion: cada
+    chunk suma 1 / (k + posición) en cada lista donde aparece. El orden y el
+    corte a `limit` salen de esa suma (`rrf`). Cada chunk conserva el `score`
+    de la primera lista donde aparece (el vectorial si lo encontraron ambos):
+    las escalas de cada buscador no son comparables, así que `score` sólo
+    sirve para mostrar la relevancia y filtrar fuentes, no para ordenar.
+    """
+    fused: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, chunk in enumerate(results, 1):
+            entry = fused.get(chunk["id"])
+            if entry is None:
+                entry = fused[chunk["id"]] = {**chunk, "rrf": 0.0}
+            entry["rrf"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda chunk: chunk["rrf"], reverse=True)[:limit]
@@ -1,13 +1,91 @@
+import asyncio
 import time
-from typing import Optional
+from typing import Optional, List, Dict, Any, AsyncIterator, Awaitable
 from src.domain.entities.message import Message, MessageRole
 from src.domain.entities.conversation import Conversation
 from src.application.ports.illm_service import ILLMService
 from src.application.ports.ivector_search import IVectorSearch
 from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.isemantic_answer_cache import ISemanticAnswerCache
+from src.application.ports.ilexical_index import ILexicalIndex
+from src.application.services.context_packer import ContextPacker
+from src.application.services.conversation_memory import ConversationMemory
+from src.application.services.mmr import MMRSelector
+from src.application.services.rank_fusion import reciprocal_rank_fusion
 from src.infrastructure.config.logger import logger
+from src.infrastructure.services.token_counter import estimate_tokens
 import uuid
 
+GENERIC_QUERIES = [
+    "hola", "hi", "hello", "hey", "buenos días", "buenas tardes", "buenas noches",
+    "como estas", "como estás", "qué tal", "que tal", "cómo te llamas", "como te llamas",
+    "quien eres", "quién eres", "que eres", "qué eres", "ayuda", "help"
+]
+
+
+def is_generic_query(user_message: str) -> bool:
+    """Consultas genéricas (saludos, mensajes muy cortos) que no requieren búsqueda en documentos"""
+    message_lower = user_message.lower().strip()
+    message_words = message_lower.split()
+    
+    # Si el mensaje es muy corto (menos de 3 palabras) y contiene solo saludos genéricos, no buscar
+    return (
+        len(message_words) <= 3 and 
+        any(generic in message_lower for generic in GENERIC_QUERIES)
+    ) or (
+        len(message_words) <= 2  # Mensajes muy cortos probablemente son saludos
+    )
+
+
+async def embed_query(
+    embedding_service: IEmbeddingService,
+    user_message: str,
+    use_rag: bool = True,
+    lexical_index: Optional[ILexicalIndex] = None,
+) -> Optional[List[float]]:
+    """
+    Embedding de la consulta, o None si no se usa RAG, es una consulta genérica
+    o tiene una coincidencia léxica fuerte (se busca sólo en el índice léxico).
+    No depende del template, así que el endpoint puede lanzarlo mientras lo carga.
+    """
+    if not use_rag:
+        return None
+
+    if is_generic_query(user_message):
+        logger.info("Generic query detected, skipping document search", message_preview=user_message[:50])
+        return None
+
+    if lexical_index and lexical_index.strong_match(user_message):
+        logger.info("Strong lexical match, skipping embedding", message_preview=user_message[:50])
+        return None
+
+    logger.info("Generating embedding for query", message_preview=user_message[:100])
+    try:
+        query_embedding = await embedding_service.generate_embedding(user_message)
+        logger.info("Embedding generated", embedding_length=len(query_embedding))
+    except Exception as e:
+        logger.error("Error generating embedding", error=str(e), exc_info=True)
+        raise
+    return query_embedding
+
+
+async def embed_queries(
+    embedding_service: IEmbeddingService,
+    user_messages: List[str],
+    lexical_index: Optional[ILexicalIndex] = None,
+) -> List[Optional[List[float]]]:
+    """`embed_query` para varias consultas con una sola llamada al servicio de embeddings"""
+    needed = [
+        i for i, message in enumerate(user_messages)
+        if not is_generic_query(message) and not (lexical_index and lexical_index.strong_match(message))
+    ]
+    embeddings: List[Optional[List[float]]] = [None] * len(user_messages)
+    if needed:
+        computed = await embedding_service.generate_embeddings_batch([user_messages[i] for i in needed])
+        for i, embedding in zip(needed, computed):
+            embeddings[i] = embedding
+    return embeddings
+
 
 class SendMessageUseCase:
     def __init__(
@@ -17,12 +95,30 @@ class SendMessageUseCase:
         embedding_service: IEmbeddingService,
         system_prompt: Optional[str] = None,
         user_prompt_template: Optional[str] = None,
+        answer_cache: Optional[ISemanticAnswerCache] = None,
+        cache_scope: str = "default",
+        conversation_memory: Optional[ConversationMemory] = None,
+        context_packer: Optional[ContextPacker] = None,
+        context_token_budget: Optional[int] = None,
+        lexical_index: Optional[ILexicalIndex] = None,
+        mmr_selector: Optional[MMRSelector] = None,
+        mmr_lambda: Optional[float] = None,
+        model_policy: Optional[str] = None,
     ):
         self.llm_service = llm_service
         self.vector_search = vector_search
         self.embedding_service = embedding_service
         self.system_prompt = system_prompt
         self.user_prompt_template = user_prompt_template
+        self.answer_cache = answer_cache
+        self.cache_scope = cache_scope
+        self.conversation_memory = conversation_memory
+        self.context_packer = context_packer
+        self.context_token_budget = context_token_budget
+        self.lexical_index = lexical_index
+        self.mmr_selector = mmr_selector
+        self.mmr_lambda = mmr_lambda
+        self.model_policy = model_policy
 
     async def execute(
         self,
@@ -30,64 +126,285 @@ class SendMessageUseCase:
         conversation_id: Optional[str],
         user_id: str,
         use_rag: bool = True,
+        query_embedding: Optional[Awaitable[Optional[List[float]]]] = None,
     ) -> dict:
+        """`query_embedding`: embedding ya en curso (ver `embed_query`); si no, se calcula aquí"""
         start_time = time.time()
+        conversation_id = conversation_id or str(uuid.uuid4())
 
-        # 1. Buscar contexto relevante (RAG)
-        context_chunks = []
-        if use_rag:
-            # Detectar consultas genéricas que no requieren búsqueda en documentos
-            generic_queries = [
-                "hola", "hi", "hello", "hey", "buenos días", "buenas tardes", "buenas noches",
-                "como estas", "como estás", "qué tal", "que tal", "cómo te llamas", "como te llamas",
-                "quien eres", "quién eres", "que eres", "qué eres", "ayuda", "help"
-            ]
-            
-            message_lower = user_message.lower().strip()
-            message_words = message_lower.split()
-            
-            # Si el mensaje es muy corto (menos de 3 palabras) y contiene solo saludos genéricos, no buscar
-            is_generic = (
-                len(message_words) <= 3 and 
-                any(generic in message_lower for generic in generic_queries)
-            ) or (
-                len(message_words) <= 2  # Mensajes muy cortos probablemente son saludos
-            )
-            
-            if is_generic:
-                logger.info("Generic query detected, skipping document search", message_preview=user_message[:50])
-                context_chunks = []
+        # Historial de la conversación (resumen + mensajes recientes dentro del presupuesto)
+        # y embedding de la consulta en paralelo; si una parecida ya tiene respuesta, reutilizarla
+        history, query_embedding = await self._load_history_and_embedding(
+            conversation_id, user_id, user_message, use_rag, query_embedding
+        )
+        corpus_version = self._corpus_version()
+        cached = await self._lookup_answer(query_embedding, history)
+        if cached:
+            response = self._cached_response(cached, conversation_id, start_time)
+            await self._record_turn(conversation_id, user_id, user_message, response, history)
+            return response
+
+        # Buscar contexto relevante (RAG)
+        context_chunks = await self._search_context(query_embedding, user_message, use_rag)
+
+        # 2-3. Construir contexto y mensajes para el LLM
+        messages = self._build_messages(user_message, context_chunks, history)
+
+        # 4. Generar respuesta del LLM (el modelo se elige según la pregunta, el contexto y el template)
+        response = await self.llm_service.generate_response(
+            messages, routing=self._routing(user_message, context_chunks, history)
+        )
+
+        latency = int((time.time() - start_time) * 1000)  # en milisegundos
+
+        # 5. Preparar respuesta
+        assistant_message = {
+            "message": response.get("content", ""),
+            "conversationId": conversation_id,
+            "tokens": {
+                "input": response.get("tokens", {}).get("input", 0),
+                "output": response.get("tokens", {}).get("output", 0),
+                "total": response.get("tokens", {}).get("total", 0),
+            },
+            "latency": latency,
+            "sources": self._build_sources(context_chunks),
+            "model": response.get("model"),
+            "routing": response.get("routing"),
+        }
+
+        if not history:
+            await self._store_answer(query_embedding, context_chunks, assistant_message, corpus_version)
+        await self._record_turn(conversation_id, user_id, user_message, assistant_message, history)
+
+        return assistant_message
+
+    async def execute_stream(
+        self,
+        user_message: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        use_rag: bool = True,
+        query_embedding: Optional[Awaitable[Optional[List[float]]]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Igual que execute, pero en streaming: emite primero las fuentes, después
+        los tokens según llegan del LLM y al final la respuesta completa con
+        tokens y latencia (`{"event": ..., "data": ...}`).
+        """
+        start_time = time.time()
+        conversation_id = conversation_id or str(uuid.uuid4())
+
+        history, query_embedding = await self._load_history_and_embedding(
+            conversation_id, user_id, user_message, use_rag, query_embedding
+        )
+        corpus_version = self._corpus_version()
+        cached = await self._lookup_answer(query_embedding, history)
+        if cached:
+            response = self._cached_response(cached, conversation_id, start_time)
+            yield {"event": "sources", "data": {"conversationId": conversation_id, "sources": response["sources"]}}
+            yield {"event": "token", "data": {"content": response["message"]}}
+            yield {"event": "done", "data": {**response, "timeToFirstToken": response["latency"]}}
+            await self._record_turn(conversation_id, user_id, user_message, response, history)
+            return
+
+        context_chunks = await self._search_context(query_embedding, user_message, use_rag)
+        messages = self._build_messages(user_message, context_chunks, history)
+
+        yield {
+            "event": "sources",
+            "data": {"conversationId": conversation_id, "sources": self._build_sources(context_chunks)},
+        }
+
+        content_parts = []
+        tokens = {"input": 0, "output": 0, "total": 0}
+        time_to_first_token = None
+        routing = None
+        async for chunk in self.llm_service.stream_response(
+            messages, routing=self._routing(user_message, context_chunks, history)
+        ):
+            if chunk.get("type") == "token":
+                if time_to_first_token is None:
+                    time_to_first_token = int((time.time() - start_time) * 1000)
+                content_parts.append(chunk["content"])
+                yield {"event": "token", "data": {"content": chunk["content"]}}
+            elif chunk.get("type") == "usage":
+                tokens = {
+                    "input": chunk.get("tokens", {}).get("input", 0),
+                    "output": chunk.get("tokens", {}).get("output", 0),
+                    "total": chunk.get("tokens", {}).get("total", 0),
+                }
+                routing = chunk.get("routing")
+
+        done = {
+            "message": "".join(content_parts),
+            "conversationId": conversation_id,
+            "tokens": tokens,
+            "latency": int((time.time() - start_time) * 1000),
+            "timeToFirstToken": time_to_first_token,
+            "model": routing["model"] if routing else None,
+            "routing": routing,
+        }
+        final = {**done, "sources": self._build_sources(context_chunks)}
+        if not history:
+            await self._store_answer(query_embedding, context_chunks, final, corpus_version)
+        yield {"event": "done", "data": done}
+        await self._record_turn(conversation_id, user_id, user_message, final, history)
+
+    async def _embed_query(self, user_message: str, use_rag: bool) -> Optional[List[float]]:
+        return await embed_query(self.embedding_service, user_message, use_rag, self.lexical_index)
+
+    async def _load_history_and_embedding(
+        self,
+        conversation_id: str,
+        user_id: str,
+        user_message: str,
+        use_rag: bool,
+        query_embedding: Optional[Awaitable[Optional[List[float]]]],
+    ):
+        return await asyncio.gather(
+            self._load_history(conversation_id, user_id),
+            query_embedding or self._embed_query(user_message, use_rag),
+        )
+
+    async def _search_context(
+        self,
+        query_embedding: Optional[List[float]],
+        user_message: str,
+        use_rag: bool,
+    ) -> List[Dict]:
+        if not use_rag or is_generic_query(user_message):
+            return []
+        if query_embedding is None and not self.lexical_index:
+            return []
+
+        try:
+            logger.info("Searching for similar chunks")
+            limit = self.context_packer.candidates if self.context_packer else 5
+            lexical_chunks = self.lexical_index.search(user_message, limit=limit) if self.lexical_index else []
+            if query_embedding is None:
+                # Coincidencia léxica fuerte: sin embedding ni búsqueda vectorial
+                context_chunks = lexical_chunks
             else:
-                logger.info("Generating embedding for query", message_preview=user_message[:100])
-                try:
-                    query_embedding = await self.embedding_service.generate_embedding(
-                        user_message
+                context_chunks = await self._search_vectors(query_embedding, limit)
+                if lexical_chunks:
+                    context_chunks = reciprocal_rank_fusion([context_chunks, lexical_chunks], limit)
+            if self.context_packer:
+                context_chunks = self.context_packer.pack(context_chunks, self.context_token_budget)
+            logger.info("Found context chunks", chunks_count=len(context_chunks))
+            if context_chunks:
+                for idx, chunk in enumerate(context_chunks):
+                    logger.debug("Context chunk found",
+                        chunk_index=idx+1,
+                        score=chunk.get('score', 0),
+                        document_name=chunk.get('metadata', {}).get('document_name', 'unknown')
                     )
-                    logger.info("Embedding generated", embedding_length=len(query_embedding))
-                except Exception as e:
-                    logger.error("Error generating embedding", error=str(e), exc_info=True)
-                    raise
-                
-                try:
-                    logger.info("Searching for similar chunks")
-                    context_chunks = await self.vector_search.search_similar(
-                        query_embedding, limit=5  # Aumentar a 5 chunks para mejor contexto
-                    )
-                    logger.info("Found context chunks", chunks_count=len(context_chunks))
-                    if context_chunks:
-                        for idx, chunk in enumerate(context_chunks):
-                            logger.debug("Context chunk found",
-                                chunk_index=idx+1,
-                                score=chunk.get('score', 0),
-                                document_name=chunk.get('metadata', {}).get('document_name', 'unknown')
-                            )
-                    else:
-                        logger.warning("No context chunks found, RAG will not work properly")
-                except Exception as e:
-                    logger.error("Error searching similar", error=str(e), exc_info=True)
-                    # Continuar sin contexto en lugar de fallar
-                    context_chunks = []
+            else:
+                logger.warning("No context chunks found, RAG will not work properly")
+        except Exception as e:
+            logger.error("Error searching similar", error=str(e), exc_info=True)
+            # Continuar sin contexto en lugar de fallar
+            context_chunks = []
+
+        return context_chunks
+
+    async def _search_vectors(self, query_embedding: List[float], limit: int) -> List[Dict]:
+        if not self.mmr_selector:
+            return await self.vector_search.search_similar(query_embedding, limit=limit)
+        # Más candidatos de los necesarios y selección diversa entre ellos (MMR)
+        candidates = await self.vector_search.search_similar(
+            query_embedding,
+            limit=max(self.mmr_selector.fetch_k, limit),
+            include_embeddings=True,
+        )
+        return self.mmr_selector.select(query_embedding, candidates, limit, self.mmr_lambda)
+
+    def _corpus_version(self) -> int:
+        return self.answer_cache.corpus_version() if self.answer_cache else 0
+
+    async def _load_history(self, conversation_id: str, user_id: str) -> Optional[List[Dict[str, str]]]:
+        if not self.conversation_memory:
+            return []
+        return await self.conversation_memory.history(conversation_id, user_id)
+
+    async def _record_turn(
+        self,
+        conversation_id: str,
+        user_id: str,
+        user_message: str,
+        response: Dict[str, Any],
+        history: Optional[List[Dict[str, str]]],
+    ) -> None:
+        # history es None cuando la conversación es de otro usuario
+        if self.conversation_memory and history is not None:
+            await self.conversation_memory.record_turn(conversation_id, user_id, user_message, response)
+
+    async def _lookup_answer(
+        self,
+        query_embedding: Optional[List[float]],
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        # Con historial la respuesta depende de la conversación: no se reutilizan respuestas
+        if not self.answer_cache or query_embedding is None or history:
+            return None
+        try:
+            return await self.answer_cache.lookup(query_embedding, self.cache_scope)
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed", error=str(e))
+            return None
+
+    async def _store_answer(
+        self,
+        query_embedding: Optional[List[float]],
+        context_chunks: List[Dict],
+        response: Dict[str, Any],
+        corpus_version: int,
+    ) -> None:
+        # Solo se reutilizan respuestas apoyadas en contexto recuperado
+        if not self.answer_cache or query_embedding is None or not context_chunks:
+            return
+        try:
+            await self.answer_cache.store(
+                query_embedding,
+                self.cache_scope,
+                {"message": response["message"], "sources": response["sources"]},
+                corpus_version,
+            )
+        except Exception as e:
+            logger.warning("Semantic cache store failed", error=str(e))
 
+    def _cached_response(self, cached: Dict[str, Any], conversation_id: str, start_time: float) -> dict:
+        logger.info("Semantic cache hit", similarity=cached["similarity"], scope=self.cache_scope)
+        return {
+            "message": cached["answer"]["message"],
+            "conversationId": conversation_id,
+            "tokens": {"input": 0, "output": 0, "total": 0},
+            "latency": int((time.time() - start_time) * 1000),
+            "sources": cached["answer"]["sources"],
+            "cache": {"type": "semantic", "similarity": cached["similarity"]},
+        }
+
+    def _routing(
+        self,
+        user_message: str,
+        context_chunks: List[Dict],
+        history: Optional[List[Dict[str, str]]],
+    ) -> Dict[str, Any]:
+        """Datos para elegir modelo: la pregunta, el contexto que la acompaña (chunks e historial) y la política del template"""
+        context = [chunk.get("content", "") for chunk in context_chunks] + [
+            message.get("content", "") for message in history or []
+        ]
+        return {
+            "query": user_message,
+            "contextTokens": sum(estimate_tokens(text) for text in context),
+            "policy": self.model_policy,
+        }
+
+    def _build_messages(
+        self,
+        user_message: str,
+        context_chunks: List[Dict],
+        history: Optional[List[Dict[str, str]]] = None,
+    ) -> List[Dict[str, str]]:
         # 2. Construir contexto para el LLM con mejor formato
         context_text = ""
         if context_chunks:
@@ -107,11 +424,9 @@ class SendMessageUseCase:
 {context_text}
 
 INSTRUCCIONES:
-- Responde la pregunta del usuario basándote ÚNICAMENTE en la información proporcionada arriba.
-- Si la información no está en los documentos, di claramente que no tienes esa información en los documentos disponibles.
-- Cita las fuentes cuando uses información específica de los documentos (ej: "Según el documento [nombre del documento]...").
-- Sé preciso y conciso en tu respuesta.
-- Si la pregunta requiere información que no está en los documentos, indica claramente que no tienes esa información.
+- Responde ÚNICAMENTE con la información de arriba; si no está, di que no la tienes en los documentos disponibles.
+- Cita el documento cuando uses información específica (ej: "Según el documento [nombre]...").
+- Sé preciso y conciso.
 
 """
         else:
@@ -146,6 +461,10 @@ INSTRUCCIONES:
             messages.append({"role": "system", "content": base_system_prompt})
             logger.debug("System prompt without RAG context")
 
+        # Historial de la conversación entre el system prompt y la pregunta actual
+        if history:
+            messages.extend(history)
+
         # Aplicar user prompt template si existe
         if self.user_prompt_template:
             # Si hay un template, reemplazar {message} o usar el mensaje directamente
@@ -158,31 +477,16 @@ INSTRUCCIONES:
         else:
             messages.append({"role": "user", "content": user_message})
 
-        # 4. Generar respuesta del LLM
-        response = await self.llm_service.generate_response(messages)
-
-        latency = int((time.time() - start_time) * 1000)  # en milisegundos
-
-        # 5. Preparar respuesta
-        assistant_message = {
-            "message": response.get("content", ""),
-            "conversationId": conversation_id or str(uuid.uuid4()),
-            "tokens": {
-                "input": response.get("tokens", {}).get("input", 0),
-                "output": response.get("tokens", {}).get("output", 0),
-                "total": response.get("tokens", {}).get("total", 0),
-            },
-            "latency": latency,
-            "sources": [
-                {
-                    "documentId": chunk.get("document_id"),
-                    "documentName": chunk.get("metadata", {}).get("document_name", ""),
-                    "relevance": chunk.get("score", 0),
-                    "excerpt": chunk.get("content", "")[:150],  # Reducir excerpt a 150 caracteres
-                }
-                for chunk in context_chunks
-                if chunk.get("score", 0) >= 0.5  # Solo incluir fuentes con relevancia >= 50%
-            ],
-        }
+        return messages
 
-        return assistant_message
+    def _build_sources(self, context_chunks: List[Dict]) -> List[Dict]:
+        return [
+            {
+                "documentId": chunk.get("document_id"),
+                "documentName": chunk.get("metadata", {}).get("document_name", ""),
+                "relevance": chunk.get("score", 0),
+                "excerpt": chunk.get("content", "")[:150],  # Reducir excerpt a 150 caracteres
+            }
+            for chunk in context_chunks
+            if chunk.get("score", 0) >= 0.5  # Solo incluir fuentes con relevancia >= 50%
+        ]
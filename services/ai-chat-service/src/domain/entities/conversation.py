@@ -12,11 +12,18 @@ class Conversation:
         messages: List[Message],
         created_at: Optional[datetime] = None,
         updated_at: Optional[datetime] = None,
+        summary: Optional[str] = None,
+        summarized_until: int = 0,
+        message_count: Optional[int] = None,
     ):
         self.id = id
         self.user_id = user_id
         self.title = title
         self.messages = messages
+        # Resumen acumulado de los mensajes con sequence < summarized_until
+        self.summary = summary
+        self.summarized_until = summarized_until
+        self.message_count = message_count if message_count is not None else len(messages)
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
 
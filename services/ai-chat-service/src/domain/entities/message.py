@@ -20,6 +20,7 @@ class Message:
         latency: Optional[int] = None,
         sources: Optional[list] = None,
         created_at: Optional[datetime] = None,
+        sequence: Optional[int] = None,
     ):
         self.id = id
         self.role = role
@@ -29,6 +30,8 @@ class Message:
         self.latency = latency
         self.sources = sources
         self.created_at = created_at or datetime.utcnow()
+        # Posición del mensaje dentro de la conversación (la asigna el repositorio)
+        self.sequence = sequence
 
     def to_dict(self):
         return {
@@ -11,6 +11,9 @@ class PromptTemplate:
         system_prompt: str,
         user_prompt_template: Optional[str] = None,
         parameters: Optional[List[Dict]] = None,
+        context_token_budget: Optional[int] = None,
+        mmr_lambda: Optional[float] = None,
+        model_policy: Optional[str] = None,
         created_at: Optional[datetime] = None,
         updated_at: Optional[datetime] = None,
     ):
@@ -20,6 +23,12 @@ class PromptTemplate:
         self.system_prompt = system_prompt
         self.user_prompt_template = user_prompt_template
         self.parameters = parameters or []
+        # Tokens de contexto RAG para este template (None = CONTEXT_TOKEN_BUDGET)
+        self.context_token_budget = context_token_budget
+        # Peso de la relevancia frente a la diversidad de los chunks (None = RAG_MMR_LAMBDA)
+        self.mmr_lambda = mmr_lambda
+        # Elección de modelo: "auto" (por petición), "fast", "default" o "strong" (None = LLM_ROUTING_POLICY)
+        self.model_policy = model_policy
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
 
@@ -31,6 +40,9 @@ class PromptTemplate:
             "systemPrompt": self.system_prompt,
             "userPromptTemplate": self.user_prompt_template,
             "parameters": self.parameters,
+            "contextTokenBudget": self.context_token_budget,
+            "mmrLambda": self.mmr_lambda,
+            "modelPolicy": self.model_policy,
             "createdAt": self.created_at.isoformat(),
             "updatedAt": self.updated_at.isoformat(),
         }
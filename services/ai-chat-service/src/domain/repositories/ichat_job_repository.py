@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class IChatJobRepository(ABC):
+    @abstractmethod
+    async def create(self, user_id: str, prompt_template_id: Optional[str], questions: List[str]) -> Dict:
+        """Crea el job en estado `queued` con una pregunta pendiente por posición"""
+        pass
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Dict]:
+        pass
+
+    @abstractmethod
+    async def claim(self, stale_seconds: float) -> Optional[Dict]:
+        """Toma el job en cola más antiguo (o uno en curso sin latido en `stale_seconds`) y lo marca `running`"""
+        pass
+
+    @abstractmethod
+    async def heartbeat(self, job_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def pending_items(self, job_id: str) -> List[Dict]:
+        """Preguntas del job aún sin resultado (`index`, `question`), por posición"""
+        pass
+
+    @abstractmethod
+    async def save_results(self, job_id: str, results: List[Dict]) -> None:
+        """Guarda los resultados (con su `index`) y suma su progreso y tokens al job"""
+        pass
+
+    @abstractmethod
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def get_results(self, job_id: str, after: int, limit: int) -> List[Dict]:
+        """Resultados con `index` > `after`, por posición"""
+        pass
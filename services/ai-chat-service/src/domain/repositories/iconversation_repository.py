@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+from typing import Optional, List
+from src.domain.entities.conversation import Conversation
+from src.domain.entities.message import Message
+
+
+class IConversationRepository(ABC):
+    @abstractmethod
+    async def get(self, conversation_id: str, limit: int) -> Optional[Conversation]:
+        """Conversación con sus últimos `limit` mensajes aún no resumidos (en orden cronológico)"""
+        pass
+
+    @abstractmethod
+    async def append_messages(self, conversation_id: str, user_id: str, messages: List[Message]) -> List[Message]:
+        """Añade mensajes (creando la conversación si no existe) y les asigna `sequence`"""
+        pass
+
+    @abstractmethod
+    async def save_summary(self, conversation_id: str, summary: str, summarized_until: int) -> None:
+        pass
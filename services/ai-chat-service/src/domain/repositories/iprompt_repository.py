@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from src.domain.entities.prompt_template import PromptTemplate
 
 
@@ -16,6 +16,11 @@ class IPromptRepository(ABC):
     async def get_all(self) -> List[PromptTemplate]:
         pass
 
+    @abstractmethod
+    async def get_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[PromptTemplate], Optional[str]]:
+        """Prompts más recientes primero y cursor de la página siguiente (ValueError si el cursor no es válido)"""
+        pass
+
     @abstractmethod
     async def update(self, prompt: PromptTemplate) -> PromptTemplate:
         pass
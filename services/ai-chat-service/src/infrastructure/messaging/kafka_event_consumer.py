@@ -0,0 +1,69 @@
+from kafka import KafkaConsumer
+from typing import Callable, Awaitable, Dict, Any, List, Optional
+import asyncio
+import json
+import os
+import socket
+from src.infrastructure.config.logger import logger
+
+
+class KafkaEventConsumer:
+    """
+    Consumidor de eventos de otros servicios. Por defecto cada réplica usa su
+    propio consumer group, de modo que todas reciben todos los eventos (los
+    usamos para invalidar estado local). El poll bloqueante corre en un hilo
+    para no frenar el event loop del chat.
+    """
+
+    def __init__(self, group_id: Optional[str] = None):
+        kafka_broker = os.getenv("KAFKA_BROKER", "localhost:9092")
+        self.group_id = group_id or os.getenv("KAFKA_CONSUMER_GROUP") or f"ai-chat-service-{socket.gethostname()}"
+        self.consumer = KafkaConsumer(
+            bootstrap_servers=[kafka_broker],
+            group_id=self.group_id,
+            value_deserializer=lambda m: json.loads(m.decode("utf-8")),
+            auto_offset_reset="latest",
+        )
+        self.handlers: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+        self.poll_timeout_ms = int(os.getenv("KAFKA_POLL_TIMEOUT_MS", "1000"))
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        self.handlers.setdefault(topic, []).append(handler)
+
+    async def start(self) -> None:
+        if self._task or not self.handlers:
+            return
+        self.consumer.subscribe(list(self.handlers))
+        self._task = asyncio.create_task(self._consume())
+        logger.info("Subscribed to topics", topics=list(self.handlers), group_id=self.group_id)
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.consumer.close()
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                records = await asyncio.to_thread(self.consumer.poll, self.poll_timeout_ms)
+            except Exception as e:
+                logger.error("Error polling Kafka", error=str(e))
+                await asyncio.sleep(self.poll_timeout_ms / 1000)
+                continue
+
+            for topic_partition, messages in records.items():
+                for message in messages:
+                    await self.dispatch(topic_partition.topic, message.value)
+
+    async def dispatch(self, topic: str, payload: Dict[str, Any]) -> None:
+        for handler in self.handlers.get(topic, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                logger.error("Error processing message from topic", topic=topic, error=str(e), exc_info=True)
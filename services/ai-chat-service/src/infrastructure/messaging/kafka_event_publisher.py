@@ -1,5 +1,6 @@
 from kafka import KafkaProducer
 from typing import Dict, Any
+import asyncio
 import json
 import os
 from src.application.ports.ievent_publisher import IEventPublisher
@@ -30,8 +31,12 @@ class KafkaEventPublisher(IEventPublisher):
                 "eventType": event_name,
                 "timestamp": __import__("datetime").datetime.utcnow().isoformat(),
             }
-            self.producer.send(event_name, key=key, value=value)
-            self.producer.flush()
+            # send + flush bloquean hasta que el broker confirma: fuera del event loop
+            await asyncio.to_thread(self._send, event_name, key, value)
         except Exception as e:
             logger.error("Error publishing event", event_name=event_name, error=str(e), exc_info=True)
             raise
+
+    def _send(self, event_name: str, key: str, value: Dict[str, Any]) -> None:
+        self.producer.send(event_name, key=key, value=value)
+        self.producer.flush()
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.domain.entities.prompt_template import PromptTemplate
+from src.domain.repositories.iprompt_repository import IPromptRepository
+from src.infrastructure.config.logger import logger
+
+
+class CachedPromptRepository(IPromptRepository):
+    """
+    Prompt templates en memoria delante de otro IPromptRepository. `create`,
+    `update` y `delete` publican el id del template en un canal de Redis
+    pub/sub y todas las réplicas lo descartan de su caché, así que `get_by_id`
+    (el camino del chat) no hace ninguna llamada a Redis mientras el template
+    siga en memoria. Los ids inexistentes se recuerdan durante
+    `PROMPT_CACHE_NEGATIVE_TTL_SECONDS`.
+
+    Sólo se sirve desde memoria mientras la suscripción está activa: si se
+    pierde la conexión se vacía la caché y se lee del repositorio hasta volver
+    a suscribirse, para no servir templates obsoletos.
+    """
+
+    def __init__(
+        self,
+        inner: IPromptRepository,
+        redis_client: Optional[Any] = None,
+        channel: Optional[str] = None,
+        negative_ttl_seconds: Optional[float] = None,
+    ):
+        self.inner = inner
+        self.redis = redis_client
+        self.channel = channel or os.getenv("PROMPT_CACHE_CHANNEL", "prompts:invalidate")
+        self.negative_ttl_seconds = (
+            negative_ttl_seconds if negative_ttl_seconds is not None
+            else float(os.getenv("PROMPT_CACHE_NEGATIVE_TTL_SECONDS", "5"))
+        )
+        self._prompts: Dict[str, PromptTemplate] = {}
+        self._missing: Dict[str, float] = {}
+        # Cambia con cada invalidación: una lectura que se cruza con una no se cachea
+        self._generation = 0
+        # Sin Redis (un solo proceso) las escrituras locales bastan para invalidar
+        self._listening = redis_client is None
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def start(self) -> None:
+        if self.redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def create(self, prompt: PromptTemplate) -> PromptTemplate:
+        created = await self.inner.create(prompt)
+        await self._invalidate(prompt.id)
+        return created
+
+    async def get_by_id(self, prompt_id: str) -> Optional[PromptTemplate]:
+        if self._listening:
+            if prompt_id in self._prompts:
+                self.hits += 1
+                return self._prompts[prompt_id]
+            if self._missing.get(prompt_id, 0.0) > time.monotonic():
+                self.hits += 1
+                return None
+
+        self.misses += 1
+        generation = self._generation
+        prompt = await self.inner.get_by_id(prompt_id)
+        if self._listening and generation == self._generation:
+            if prompt:
+                self._prompts[prompt_id] = prompt
+            else:
+                self._missing[prompt_id] = time.monotonic() + self.negative_ttl_seconds
+        return prompt
+
+    async def get_all(self) -> List[PromptTemplate]:
+        return await self.inner.get_all()
+
+    async def get_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[PromptTemplate], Optional[str]]:
+        return await self.inner.get_page(limit, cursor)
+
+    async def update(self, prompt: PromptTemplate) -> PromptTemplate:
+        updated = await self.inner.update(prompt)
+        await self._invalidate(prompt.id)
+        return updated
+
+    async def delete(self, prompt_id: str) -> bool:
+        deleted = await self.inner.delete(prompt_id)
+        await self._invalidate(prompt_id)
+        return deleted
+
+    def clear(self) -> None:
+        self._prompts.clear()
+        self._missing.clear()
+        self._generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._prompts),
+            "listening": self._listening,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    def _evict(self, prompt_id: str) -> None:
+        self._prompts.pop(prompt_id, None)
+        self._missing.pop(prompt_id, None)
+        self._generation += 1
+        self.invalidations += 1
+
+    async def _invalidate(self, prompt_id: str) -> None:
+        self._evict(prompt_id)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, prompt_id)
+        except Exception as e:
+            logger.warning("Error publishing prompt invalidation", prompt_id=prompt_id, error=str(e))
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Lo cacheado antes de suscribirse pudo perder invalidaciones
+                self.clear()
+                self._listening = True
+                logger.info("Listening for prompt invalidations", channel=self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._evict(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Prompt invalidation listener disconnected", error=str(e))
+            finally:
+                self._listening = False
+                self.clear()
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+            await asyncio.sleep(1)
@@ -0,0 +1,154 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+from src.domain.repositories.ichat_job_repository import IChatJobRepository
+from src.infrastructure.config.logger import logger
+
+INSERT_BATCH_SIZE = 1000
+
+
+class MongoChatJobRepository(IChatJobRepository):
+    """
+    Jobs de chat por lotes. `chat_jobs` guarda un documento por job (estado,
+    progreso, tokens y latido de la réplica que lo procesa) y `chat_job_items`
+    uno por pregunta, con su resultado cuando termina: un job interrumpido se
+    reanuda con las preguntas que quedan pendientes y los resultados se leen
+    por páginas sobre (`jobId`, `index`).
+    """
+
+    def __init__(self, db: Any):
+        self.jobs = db.chat_jobs
+        self.items = db.chat_job_items
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            await self.items.create_index([("jobId", 1), ("index", 1)], unique=True)
+            await self.items.create_index([("jobId", 1), ("status", 1), ("index", 1)])
+            await self.jobs.create_index([("status", 1), ("createdAt", 1)])
+            self._indexes_ready = True
+        except Exception as e:
+            logger.warning("Error creating chat job indexes", error=str(e))
+
+    async def create(self, user_id: str, prompt_template_id: Optional[str], questions: List[str]) -> Dict:
+        await self._ensure_indexes()
+        now = datetime.utcnow()
+        job = {
+            "_id": str(uuid.uuid4()),
+            "userId": user_id,
+            "promptTemplateId": prompt_template_id,
+            "status": "queued",
+            "total": len(questions),
+            "completed": 0,
+            "failed": 0,
+            "tokens": {"input": 0, "output": 0, "total": 0},
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        # Las preguntas antes que el job: un job en cola siempre tiene todas sus preguntas
+        for start in range(0, len(questions), INSERT_BATCH_SIZE):
+            await self.items.insert_many([
+                {"jobId": job["_id"], "index": index, "question": question, "status": "pending"}
+                for index, question in enumerate(questions[start:start + INSERT_BATCH_SIZE], start)
+            ])
+        await self.jobs.insert_one(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self.jobs.find_one({"_id": job_id})
+
+    async def claim(self, stale_seconds: float) -> Optional[Dict]:
+        now = datetime.utcnow()
+        return await self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                # Réplica caída a mitad de un job: lo retoma otra
+                {"status": "running", "updatedAt": {"$lt": now - timedelta(seconds=stale_seconds)}},
+            ]},
+            {"$set": {"status": "running", "updatedAt": now}, "$min": {"startedAt": now}},
+            sort=[("createdAt", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def heartbeat(self, job_id: str) -> None:
+        await self.jobs.update_one({"_id": job_id}, {"$set": {"updatedAt": datetime.utcnow()}})
+
+    async def pending_items(self, job_id: str) -> List[Dict]:
+        cursor = self.items.find(
+            {"jobId": job_id, "status": "pending"},
+            {"_id": 0, "index": 1, "question": 1},
+        ).sort("index", 1)
+        return [item async for item in cursor]
+
+    async def save_results(self, job_id: str, results: List[Dict]) -> None:
+        if not results:
+            return
+        now = datetime.utcnow()
+        written = await self.items.bulk_write(
+            [
+                UpdateOne(
+                    {"jobId": job_id, "index": result["index"], "status": "pending"},
+                    {"$set": {**{k: v for k, v in result.items() if k != "index"}, "completedAt": now}},
+                )
+                for result in results
+            ],
+            ordered=False,
+        )
+        if not written.modified_count:
+            # Página ya guardada (reintento tras un fallo o job retomado por otra réplica)
+            return
+        # El progreso se recalcula desde las preguntas resueltas en lugar de sumar la página:
+        # una pregunta guardada dos veces sólo cuenta una
+        progress = await self.items.aggregate(self._progress_pipeline(job_id)).to_list(length=1)
+        if not progress:
+            return
+        progress = progress[0]
+        await self.jobs.update_one(
+            {"_id": job_id},
+            {
+                # $max: con dos réplicas sobre el mismo job, un recálculo anterior no hace retroceder el progreso
+                "$max": {
+                    "completed": progress["completed"],
+                    "failed": progress["failed"],
+                    "tokens.input": progress["input"],
+                    "tokens.output": progress["output"],
+                    "tokens.total": progress["total"],
+                },
+                "$set": {"updatedAt": now},
+            },
+        )
+
+    @staticmethod
+    def _progress_pipeline(job_id: str) -> List[Dict]:
+        def computed_tokens(field: str) -> Dict:
+            # Los tokens se cuentan una vez por pregunta distinta (las repetidas comparten la respuesta)
+            return {"$sum": {"$cond": [{"$eq": ["$shared", True]}, 0, {"$ifNull": [f"$tokens.{field}", 0]}]}}
+
+        return [
+            {"$match": {"jobId": job_id, "status": {"$in": ["done", "failed"]}}},
+            {"$group": {
+                "_id": None,
+                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "done"]}, 1, 0]}},
+                "failed": {"$sum": {"$cond": [{"$eq": ["$status", "failed"]}, 1, 0]}},
+                "input": computed_tokens("input"),
+                "output": computed_tokens("output"),
+                "total": computed_tokens("total"),
+            }},
+        ]
+
+    async def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        update = {"status": status, "finishedAt": datetime.utcnow(), "updatedAt": datetime.utcnow()}
+        if error:
+            update["error"] = error
+        await self.jobs.update_one({"_id": job_id}, {"$set": update})
+
+    async def get_results(self, job_id: str, after: int, limit: int) -> List[Dict]:
+        cursor = (
+            self.items.find({"jobId": job_id, "index": {"$gt": after}}, {"_id": 0, "jobId": 0})
+            .sort("index", 1)
+            .limit(limit)
+        )
+        return [item async for item in cursor]
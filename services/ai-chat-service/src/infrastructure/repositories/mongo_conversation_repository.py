@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Any, List, Optional
+from pymongo import ReturnDocument
+from src.domain.entities.conversation import Conversation
+from src.domain.entities.message import Message, MessageRole
+from src.domain.repositories.iconversation_repository import IConversationRepository
+from src.infrastructure.config.logger import logger
+
+
+class MongoConversationRepository(IConversationRepository):
+    """
+    Nivel frío (persistente) de las conversaciones. `conversations` guarda un
+    documento por conversación (resumen y contador de mensajes) y
+    `conversation_messages` un documento por mensaje, para no acercarse al
+    límite de tamaño de documento en conversaciones largas.
+    """
+
+    def __init__(self, db: Any):
+        self.conversations = db.conversations
+        self.messages = db.conversation_messages
+        self._indexes_ready = False
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            await self.messages.create_index([("conversationId", 1), ("sequence", 1)], unique=True)
+            await self.conversations.create_index([("userId", 1), ("updatedAt", -1)])
+            self._indexes_ready = True
+        except Exception as e:
+            logger.warning("Error creating conversation indexes", error=str(e))
+
+    async def get(self, conversation_id: str, limit: int) -> Optional[Conversation]:
+        doc = await self.conversations.find_one({"_id": conversation_id})
+        if not doc:
+            return None
+
+        summarized_until = doc.get("summarizedUntil", 0)
+        cursor = (
+            self.messages.find({"conversationId": conversation_id, "sequence": {"$gte": summarized_until}})
+            .sort("sequence", -1)
+            .limit(limit)
+        )
+        messages = [self._to_message(message) async for message in cursor]
+        messages.reverse()
+
+        return Conversation(
+            id=conversation_id,
+            user_id=doc.get("userId", ""),
+            title=doc.get("title", ""),
+            messages=messages,
+            created_at=doc.get("createdAt"),
+            updated_at=doc.get("updatedAt"),
+            summary=doc.get("summary"),
+            summarized_until=summarized_until,
+            message_count=doc.get("messageCount", 0),
+        )
+
+    async def append_messages(self, conversation_id: str, user_id: str, messages: List[Message]) -> List[Message]:
+        if not messages:
+            return messages
+        await self._ensure_indexes()
+
+        now = datetime.utcnow()
+        # Reserva las posiciones de los mensajes de forma atómica
+        doc = await self.conversations.find_one_and_update(
+            {"_id": conversation_id},
+            {
+                "$inc": {"messageCount": len(messages)},
+                "$set": {"updatedAt": now},
+                "$setOnInsert": {
+                    "userId": user_id,
+                    "title": messages[0].content[:60],
+                    "createdAt": now,
+                    "summarizedUntil": 0,
+                },
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        first_sequence = doc["messageCount"] - len(messages)
+        for offset, message in enumerate(messages):
+            message.sequence = first_sequence + offset
+
+        await self.messages.insert_many([
+            {
+                "conversationId": conversation_id,
+                "sequence": message.sequence,
+                "messageId": message.id,
+                "role": message.role.value,
+                "content": message.content,
+                "tokens": message.tokens,
+                "latency": message.latency,
+                "sources": message.sources,
+                "createdAt": message.created_at,
+            }
+            for message in messages
+        ])
+        return messages
+
+    async def save_summary(self, conversation_id: str, summary: str, summarized_until: int) -> None:
+        # Nunca retroceder: dos resúmenes concurrentes se quedan con el más avanzado
+        await self.conversations.update_one(
+            {"_id": conversation_id, "summarizedUntil": {"$lt": summarized_until}},
+            {"$set": {"summary": summary, "summarizedUntil": summarized_until}},
+        )
+
+    def _to_message(self, doc: dict) -> Message:
+        return Message(
+            id=doc.get("messageId", ""),
+            role=MessageRole(doc["role"]),
+            content=doc.get("content", ""),
+            conversation_id=doc["conversationId"],
+            tokens=doc.get("tokens"),
+            latency=doc.get("latency"),
+            sources=doc.get("sources"),
+            created_at=doc.get("createdAt"),
+            sequence=doc.get("sequence"),
+        )
@@ -0,0 +1,363 @@
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from src.infrastructure.config.logger import logger
+
+# Granularidades de los rollups; "total" acumula todo el histórico en un único bucket
+GRANULARITIES = ("minute", "hour", "day", "total")
+TOTAL_BUCKET = datetime(1970, 1, 1)
+# Template de los chats sin prompt template: `$merge` no admite claves nulas
+DEFAULT_TEMPLATE = "default"
+# Un rango se consulta con la granularidad más fina que no supere estos buckets
+MAX_MINUTE_RANGE = timedelta(hours=6)
+MAX_HOUR_RANGE = timedelta(days=14)
+# Histograma de latencia en escala logarítmica: el bin i cubre [1.25^i, 1.25^(i+1)) ms (error < 12%)
+LATENCY_BIN_GROWTH = 1.25
+PERCENTILES = (50, 90, 95, 99)
+
+
+def truncate(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return TOTAL_BUCKET
+
+
+def choose_granularity(start: Optional[datetime], end: Optional[datetime]) -> str:
+    """Granularidad para un rango: acota el número de buckets que se leen"""
+    if start is None:
+        return "total"
+    span = (end or datetime.utcnow()) - start
+    if span <= MAX_MINUTE_RANGE:
+        return "minute"
+    if span <= MAX_HOUR_RANGE:
+        return "hour"
+    return "day"
+
+
+def latency_bin(latency_ms: float) -> int:
+    return int(math.floor(math.log(max(latency_ms, 1)) / math.log(LATENCY_BIN_GROWTH)))
+
+
+def percentiles(histogram: Dict[int, int], points: Iterable[int] = PERCENTILES) -> Dict[str, float]:
+    """Percentiles de latencia (ms) a partir del histograma: centro geométrico del bin"""
+    total = sum(histogram.values())
+    result = {f"p{point}": 0.0 for point in points}
+    if not total:
+        return result
+    bins = sorted(histogram.items())
+    for point in points:
+        rank = point / 100 * total
+        seen = 0
+        for index, count in bins:
+            seen += count
+            if seen >= rank:
+                result[f"p{point}"] = round(LATENCY_BIN_GROWTH ** (index + 0.5), 1)
+                break
+    return result
+
+
+def rollup_increments(evaluations: Iterable[dict]) -> Dict[Tuple[str, datetime, Optional[str], str], Dict[str, float]]:
+    """Incrementos ($inc) por (granularidad, bucket, template, modelo) para un lote de evaluaciones"""
+    increments: Dict[Tuple[str, datetime, Optional[str], str], Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    for evaluation in evaluations:
+        metrics = evaluation.get("metrics") or {}
+        # Documentos time-series: template y modelo en `meta`
+        meta = evaluation.get("meta") or {}
+        tokens = metrics.get("tokens") or {}
+        latency = metrics.get("latency") or 0
+        fields = {
+            "count": 1,
+            "conversations": 1 if metrics.get("newConversation") else 0,
+            "cached": 1 if metrics.get("cached") else 0,
+            "tokens.input": tokens.get("input", 0),
+            "tokens.output": tokens.get("output", 0),
+            "tokens.total": tokens.get("total", 0),
+            "cost": (metrics.get("cost") or {}).get("total", 0),
+        }
+        if latency > 0:
+            fields["latency.count"] = 1
+            fields["latency.total"] = latency
+            fields[f"latency.histogram.{latency_bin(latency)}"] = 1
+        for granularity in GRANULARITIES:
+            key = (
+                granularity,
+                truncate(evaluation["timestamp"], granularity),
+                meta.get("promptTemplateId", evaluation.get("promptTemplateId")) or DEFAULT_TEMPLATE,
+                meta.get("model") or metrics.get("model") or "unknown",
+            )
+            for field, value in fields.items():
+                if value:
+                    increments[key][field] += value
+    return increments
+
+
+class MongoEvaluationRollups:
+    """
+    Rollups de las evaluaciones por minuto, hora y día (y el histórico total),
+    por prompt template y modelo: contadores, tokens, coste y un histograma
+    logarítmico de latencia que permite sumar buckets y calcular percentiles.
+    Se actualizan con `$inc` en cada lote que vuelca MongoEvaluationRepository,
+    así que `/api/ai/metrics` agrega como mucho unos cientos de documentos sea
+    cual sea el tamaño del histórico. Los rangos se redondean al bucket.
+    """
+
+    def __init__(self, db: Any, legacy_model: Optional[str] = None):
+        self.collection = db.evaluation_rollups
+        self.evaluations = db.evaluations
+        # Las evaluaciones anteriores al router no guardan el modelo: todas usaban `LLM_MODEL`
+        self.legacy_model = legacy_model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self._indexes_ready = False
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.collection.create_index(
+            [("granularity", 1), ("bucket", 1), ("promptTemplateId", 1), ("model", 1)],
+            unique=True,
+        )
+        self._indexes_ready = True
+
+    async def apply(self, evaluations: List[dict]) -> None:
+        """Suma un lote de evaluaciones a los rollups (un bulk_write por lote)"""
+        increments = rollup_increments(evaluations)
+        if not increments:
+            return
+        await self.ensure_indexes()
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"granularity": granularity, "bucket": bucket, "promptTemplateId": template_id, "model": model},
+                    {"$inc": dict(fields)},
+                    upsert=True,
+                )
+                for (granularity, bucket, template_id, model), fields in increments.items()
+            ],
+            ordered=False,
+        )
+
+    async def backfill(self) -> bool:
+        """
+        Construye los rollups desde las evaluaciones existentes si aún no hay
+        ninguno (primer arranque con histórico previo). Se ejecuta entero en
+        Mongo con un pipeline de agregación por granularidad y `$merge`.
+        """
+        if await self.collection.find_one({}) is not None or await self.evaluations.find_one({}) is None:
+            return False
+        await self.ensure_indexes()
+        for granularity in GRANULARITIES:
+            await self.evaluations.aggregate(self._backfill_pipeline(granularity)).to_list(length=None)
+        logger.info("Evaluation rollups backfilled")
+        return True
+
+    async def downsample(self, retention: timedelta, window: timedelta, now: Optional[datetime] = None) -> None:
+        """
+        Antes de que caduquen los datos originales (`retention`), recalcula
+        desde ellos los rollups por hora de la franja `window` siguiente al
+        corte, y borra los rollups por minuto ya caducados. Las horas que
+        empiezan en la primera hora tras el corte pueden estar ya a medio
+        borrar por el TTL (se borra por buckets de hasta una hora), así que se
+        dejan con sus incrementos.
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - retention
+        start = truncate(cutoff, "hour") + timedelta(hours=2)
+        end = min(start + window, truncate(now, "hour"))
+        if start < end:
+            await self.evaluations.aggregate(self._backfill_pipeline("hour", start, end)).to_list(length=None)
+        deleted = await self.collection.delete_many({"granularity": "minute", "bucket": {"$lt": cutoff}})
+        logger.info("Evaluation rollups downsampled", hours_from=start, hours_to=end, minutes_deleted=deleted.deleted_count)
+
+    async def summary(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        prompt_template_id: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> dict:
+        """
+        Métricas agregadas de un rango (todo el histórico si no hay `start`).
+        Los chats sin prompt template aparecen (y se filtran) como "default".
+        """
+        granularity = choose_granularity(start, end)
+        match: Dict[str, Any] = {"granularity": granularity}
+        if granularity != "total":
+            match["bucket"] = {"$gte": truncate(start, granularity)}
+            if end is not None:
+                match["bucket"]["$lte"] = end
+        if prompt_template_id == DEFAULT_TEMPLATE:
+            # Rollups anteriores guardaban los chats sin template con clave nula
+            match["promptTemplateId"] = {"$in": [DEFAULT_TEMPLATE, None]}
+        elif prompt_template_id is not None:
+            match["promptTemplateId"] = prompt_template_id
+        if model is not None:
+            match["model"] = model
+
+        result = await self.collection.aggregate(self._summary_pipeline(match)).to_list(length=1)
+        facets = result[0] if result else {}
+        totals = (facets.get("totals") or [{}])[0]
+        histogram = {int(row["_id"]): row["count"] for row in facets.get("latency", [])}
+        return {
+            "granularity": granularity,
+            "totals": _format_group(totals),
+            "latencyPercentiles": percentiles(histogram),
+            "byTemplate": [
+                {"promptTemplateId": row["_id"]["promptTemplateId"], "model": row["_id"]["model"], **_format_group(row)}
+                for row in facets.get("byTemplate", [])
+            ],
+        }
+
+    @staticmethod
+    def _summary_pipeline(match: dict) -> List[dict]:
+        group = {
+            "messages": {"$sum": "$count"},
+            "conversations": {"$sum": "$conversations"},
+            "cached": {"$sum": "$cached"},
+            "tokensInput": {"$sum": "$tokens.input"},
+            "tokensOutput": {"$sum": "$tokens.output"},
+            "tokensTotal": {"$sum": "$tokens.total"},
+            "cost": {"$sum": "$cost"},
+            "latencyCount": {"$sum": "$latency.count"},
+            "latencyTotal": {"$sum": "$latency.total"},
+        }
+        return [
+            {"$match": match},
+            {"$facet": {
+                "totals": [{"$group": {"_id": None, **group}}],
+                "byTemplate": [
+                    {"$group": {
+                        "_id": {"promptTemplateId": {"$ifNull": ["$promptTemplateId", DEFAULT_TEMPLATE]}, "model": "$model"},
+                        **group,
+                    }},
+                    {"$sort": {"messages": -1}},
+                ],
+                "latency": [
+                    {"$project": {"bins": {"$objectToArray": {"$ifNull": ["$latency.histogram", {}]}}}},
+                    {"$unwind": "$bins"},
+                    {"$group": {"_id": "$bins.k", "count": {"$sum": "$bins.v"}}},
+                ],
+            }},
+        ]
+
+    def _backfill_pipeline(
+        self,
+        granularity: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[dict]:
+        bucket = (
+            {"$literal": TOTAL_BUCKET} if granularity == "total"
+            else {"$dateTrunc": {"date": "$timestamp", "unit": granularity}}
+        )
+        latency = {"$ifNull": ["$metrics.latency", 0]}
+        key = {
+            "bucket": bucket,
+            "promptTemplateId": {"$ifNull": ["$meta.promptTemplateId", "$promptTemplateId", DEFAULT_TEMPLATE]},
+            "model": {"$ifNull": ["$meta.model", "$metrics.model", self.legacy_model]},
+        }
+        # Las evaluaciones anteriores no marcan `newConversation`: cuenta la primera de cada
+        # conversación, numerada antes de filtrar por `start` para que una conversación que
+        # empieza antes del rango no cuente otra vez (en el downsampling, lo anterior a `start`
+        # son sólo las horas que aún no ha borrado el TTL)
+        stages: List[dict] = []
+        if end is not None:
+            stages.append({"$match": {"timestamp": {"$lt": end}}})
+        stages.append({"$setWindowFields": {
+            "partitionBy": "$conversationId",
+            "sortBy": {"timestamp": 1},
+            "output": {"conversationMessage": {"$documentNumber": {}}},
+        }})
+        if start is not None:
+            stages.append({"$match": {"timestamp": {"$gte": start}}})
+        return [
+            *stages,
+            {"$project": {
+                "key": key,
+                "count": {"$literal": 1},
+                "conversations": {"$cond": [
+                    {"$eq": [{"$type": "$metrics.newConversation"}, "missing"]},
+                    {"$cond": [{"$eq": ["$conversationMessage", 1]}, 1, 0]},
+                    {"$cond": ["$metrics.newConversation", 1, 0]},
+                ]},
+                "cached": {"$cond": ["$metrics.cached", 1, 0]},
+                "tokensInput": {"$ifNull": ["$metrics.tokens.input", 0]},
+                "tokensOutput": {"$ifNull": ["$metrics.tokens.output", 0]},
+                "tokensTotal": {"$ifNull": ["$metrics.tokens.total", 0]},
+                "cost": {"$ifNull": ["$metrics.cost.total", 0]},
+                "latency": latency,
+                "bin": {"$cond": [
+                    {"$gt": [latency, 0]},
+                    {"$toString": {"$toInt": {"$floor": {"$divide": [{"$ln": {"$max": [latency, 1]}}, math.log(LATENCY_BIN_GROWTH)]}}}},
+                    None,
+                ]},
+            }},
+            # Primero por bin de latencia, después por bucket con el histograma como objeto
+            {"$group": {
+                "_id": {"key": "$key", "bin": "$bin"},
+                "count": {"$sum": "$count"},
+                "conversations": {"$sum": "$conversations"},
+                "cached": {"$sum": "$cached"},
+                "tokensInput": {"$sum": "$tokensInput"},
+                "tokensOutput": {"$sum": "$tokensOutput"},
+                "tokensTotal": {"$sum": "$tokensTotal"},
+                "cost": {"$sum": "$cost"},
+                "latencyTotal": {"$sum": "$latency"},
+            }},
+            {"$group": {
+                "_id": "$_id.key",
+                "count": {"$sum": "$count"},
+                "conversations": {"$sum": "$conversations"},
+                "cached": {"$sum": "$cached"},
+                "tokensInput": {"$sum": "$tokensInput"},
+                "tokensOutput": {"$sum": "$tokensOutput"},
+                "tokensTotal": {"$sum": "$tokensTotal"},
+                "cost": {"$sum": "$cost"},
+                "latencyTotal": {"$sum": "$latencyTotal"},
+                "bins": {"$push": {"$cond": [{"$ne": ["$_id.bin", None]}, {"k": "$_id.bin", "v": "$count"}, "$$REMOVE"]}},
+            }},
+            {"$project": {
+                "_id": 0,
+                "granularity": {"$literal": granularity},
+                "bucket": "$_id.bucket",
+                "promptTemplateId": "$_id.promptTemplateId",
+                "model": "$_id.model",
+                "count": 1,
+                "conversations": 1,
+                "cached": 1,
+                "tokens": {"input": "$tokensInput", "output": "$tokensOutput", "total": "$tokensTotal"},
+                "cost": 1,
+                "latency": {
+                    "count": {"$sum": "$bins.v"},
+                    "total": "$latencyTotal",
+                    "histogram": {"$arrayToObject": "$bins"},
+                },
+            }},
+            {"$merge": {
+                "into": self.collection.name,
+                "on": ["granularity", "bucket", "promptTemplateId", "model"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+
+
+def _format_group(row: dict) -> dict:
+    latency_count = row.get("latencyCount", 0)
+    return {
+        "messages": row.get("messages", 0),
+        "conversations": row.get("conversations", 0),
+        "cachedMessages": row.get("cached", 0),
+        "tokens": {
+            "input": row.get("tokensInput", 0),
+            "output": row.get("tokensOutput", 0),
+            "total": row.get("tokensTotal", 0),
+        },
+        "cost": round(row.get("cost", 0), 6),
+        "averageLatency": row.get("latencyTotal", 0) / latency_count if latency_count else 0,
+    }
@@ -0,0 +1,156 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional
+from src.domain.entities.conversation import Conversation
+from src.domain.entities.message import Message, MessageRole
+from src.domain.repositories.iconversation_repository import IConversationRepository
+from src.infrastructure.config.logger import logger
+
+
+class RedisConversationRepository(IConversationRepository):
+    """
+    Nivel caliente de las conversaciones delante del repositorio persistente:
+    un hash con los metadatos (resumen incluido) y una lista con los últimos
+    `CONVERSATION_HOT_MESSAGES` mensajes, con TTL renovado en cada turno. Las
+    escrituras van primero al nivel frío (que asigna `sequence`) y después a
+    Redis; si Redis no tiene la conversación se carga del nivel frío.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        cold: IConversationRepository,
+        hot_messages: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+    ):
+        self.redis = redis_client
+        self.cold = cold
+        self.hot_messages = hot_messages or int(os.getenv("CONVERSATION_HOT_MESSAGES", "50"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "86400"))
+        self.key_prefix = "conversation:"
+        self.hot_hits = 0
+        self.cold_reads = 0
+
+    def _meta_key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}{conversation_id}"
+
+    def _messages_key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}{conversation_id}:messages"
+
+    async def get(self, conversation_id: str, limit: int) -> Optional[Conversation]:
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.hgetall(self._meta_key(conversation_id))
+            pipeline.lrange(self._messages_key(conversation_id), -self.hot_messages, -1)
+            meta, raw_messages = await pipeline.execute()
+        except Exception as e:
+            logger.warning("Conversation hot tier read failed", conversation_id=conversation_id, error=str(e))
+            return await self.cold.get(conversation_id, limit)
+
+        # Sin userId el hash está incompleto (caducó y sólo se escribió el contador)
+        if meta and meta.get("userId") is not None:
+            self.hot_hits += 1
+            summarized_until = int(meta.get("summarizedUntil", 0))
+            messages = [_decode_message(conversation_id, raw) for raw in raw_messages]
+            messages = [message for message in messages if (message.sequence or 0) >= summarized_until]
+            return Conversation(
+                id=conversation_id,
+                user_id=meta["userId"],
+                title=meta.get("title", ""),
+                messages=messages[-limit:] if limit else [],
+                created_at=_parse_datetime(meta.get("createdAt")),
+                updated_at=_parse_datetime(meta.get("updatedAt")),
+                summary=meta.get("summary") or None,
+                summarized_until=summarized_until,
+                message_count=int(meta.get("messageCount", 0)),
+            )
+
+        self.cold_reads += 1
+        conversation = await self.cold.get(conversation_id, self.hot_messages)
+        if conversation:
+            await self._populate(conversation)
+            conversation.messages = conversation.messages[-limit:] if limit else []
+        return conversation
+
+    async def append_messages(self, conversation_id: str, user_id: str, messages: List[Message]) -> List[Message]:
+        messages = await self.cold.append_messages(conversation_id, user_id, messages)
+        if not messages:
+            return messages
+        try:
+            meta_key = self._meta_key(conversation_id)
+            messages_key = self._messages_key(conversation_id)
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.hset(meta_key, mapping={
+                "messageCount": (messages[-1].sequence or 0) + 1,
+                "updatedAt": datetime.utcnow().isoformat(),
+            })
+            pipeline.rpush(messages_key, *[_encode_message(message) for message in messages])
+            pipeline.ltrim(messages_key, -self.hot_messages, -1)
+            pipeline.expire(meta_key, self.ttl_seconds)
+            pipeline.expire(messages_key, self.ttl_seconds)
+            await pipeline.execute()
+        except Exception as e:
+            logger.warning("Conversation hot tier write failed", conversation_id=conversation_id, error=str(e))
+        return messages
+
+    async def save_summary(self, conversation_id: str, summary: str, summarized_until: int) -> None:
+        await self.cold.save_summary(conversation_id, summary, summarized_until)
+        try:
+            await self.redis.hset(self._meta_key(conversation_id), mapping={
+                "summary": summary,
+                "summarizedUntil": summarized_until,
+            })
+        except Exception as e:
+            logger.warning("Conversation hot tier write failed", conversation_id=conversation_id, error=str(e))
+
+    async def _populate(self, conversation: Conversation) -> None:
+        try:
+            meta_key = self._meta_key(conversation.id)
+            messages_key = self._messages_key(conversation.id)
+            pipeline = self.redis.pipeline(transaction=True)
+            pipeline.delete(messages_key)
+            pipeline.hset(meta_key, mapping={
+                "userId": conversation.user_id,
+                "title": conversation.title,
+                "summary": conversation.summary or "",
+                "summarizedUntil": conversation.summarized_until,
+                "messageCount": conversation.message_count,
+                "createdAt": conversation.created_at.isoformat(),
+                "updatedAt": conversation.updated_at.isoformat(),
+            })
+            if conversation.messages:
+                pipeline.rpush(messages_key, *[_encode_message(message) for message in conversation.messages])
+            pipeline.expire(meta_key, self.ttl_seconds)
+            pipeline.expire(messages_key, self.ttl_seconds)
+            await pipeline.execute()
+        except Exception as e:
+            logger.warning("Conversation hot tier populate failed", conversation_id=conversation.id, error=str(e))
+
+
+def _encode_message(message: Message) -> str:
+    return json.dumps({
+        "id": message.id,
+        "role": message.role.value,
+        "content": message.content,
+        "sequence": message.sequence,
+        "tokens": message.tokens,
+        "createdAt": message.created_at.isoformat(),
+    }, ensure_ascii=False)
+
+
+def _decode_message(conversation_id: str, raw: str) -> Message:
+    data = json.loads(raw)
+    return Message(
+        id=data.get("id", ""),
+        role=MessageRole(data["role"]),
+        content=data.get("content", ""),
+        conversation_id=conversation_id,
+        tokens=data.get("tokens"),
+        created_at=_parse_datetime(data.get("createdAt")),
+        sequence=data.get("sequence"),
+    )
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
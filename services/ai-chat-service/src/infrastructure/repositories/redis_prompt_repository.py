@@ -1,10 +1,12 @@
+import base64
 import json
 import os
 import redis.asyncio as redis
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 from src.domain.entities.prompt_template import PromptTemplate
 from src.domain.repositories.iprompt_repository import IPromptRepository
+from src.infrastructure.config.logger import logger
 
 
 class RedisPromptRepository(IPromptRepository):
@@ -18,11 +20,35 @@ class RedisPromptRepository(IPromptRepository):
             socket_connect_timeout=5,
         )
         self.key_prefix = "prompt:"
-        self.index_key = "prompts:index"
+        # Índice ordenado por created_at (score = timestamp); reemplaza al SET `prompts:index`
+        self.index_key = "prompts:by-created"
+        self.legacy_index_key = "prompts:index"
+        self._index_ready = False
 
     def _get_key(self, prompt_id: str) -> str:
         return f"{self.key_prefix}{prompt_id}"
 
+    async def _ensure_index(self) -> None:
+        """Migra una sola vez el índice antiguo (SET sin orden) al sorted set"""
+        if self._index_ready:
+            return
+        if not await self.client.exists(self.index_key) and await self.client.exists(self.legacy_index_key):
+            prompt_ids = list(await self.client.smembers(self.legacy_index_key))
+            pipeline = self.client.pipeline(transaction=False)
+            for prompt_id in prompt_ids:
+                pipeline.hget(self._get_key(prompt_id), "created_at")
+            created = await pipeline.execute()
+            scores = {
+                prompt_id: datetime.fromisoformat(created_at).timestamp()
+                for prompt_id, created_at in zip(prompt_ids, created)
+                if created_at
+            }
+            if scores:
+                await self.client.zadd(self.index_key, scores)
+            await self.client.delete(self.legacy_index_key)
+            logger.info("Migrated prompt index to sorted set", prompts=len(scores))
+        self._index_ready = True
+
     async def create(self, prompt: PromptTemplate) -> PromptTemplate:
         try:
             key = self._get_key(prompt.id)
@@ -33,15 +59,20 @@ class RedisPromptRepository(IPromptRepository):
                 "system_prompt": prompt.system_prompt,
                 "user_prompt_template": prompt.user_prompt_template or "",
                 "parameters": json.dumps(prompt.parameters or []),
+                "context_token_budget": prompt.context_token_budget or "",
+                "mmr_lambda": "" if prompt.mmr_lambda is None else prompt.mmr_lambda,
+                "model_policy": prompt.model_policy or "",
                 "created_at": prompt.created_at.isoformat(),
                 "updated_at": prompt.updated_at.isoformat(),
             }
             
-            # Guardar el prompt
-            await self.client.hset(key, mapping=data)
-            
-            # Agregar a la lista de índices
-            await self.client.sadd(self.index_key, prompt.id)
+            await self._ensure_index()
+
+            # Guardar el prompt y agregarlo al índice en una sola ida y vuelta
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.hset(key, mapping=data)
+            pipeline.zadd(self.index_key, {prompt.id: prompt.created_at.timestamp()})
+            await pipeline.execute()
             
             return prompt
         except Exception as e:
@@ -63,23 +94,57 @@ class RedisPromptRepository(IPromptRepository):
 
     async def get_all(self) -> List[PromptTemplate]:
         try:
-            # Obtener todos los IDs del índice
-            prompt_ids = await self.client.smembers(self.index_key)
-            
-            prompts = []
-            for prompt_id in prompt_ids:
-                prompt = await self.get_by_id(prompt_id)
-                if prompt:
-                    prompts.append(prompt)
-            
-            # Ordenar por fecha de creación (más recientes primero)
-            prompts.sort(key=lambda p: p.created_at, reverse=True)
-            
-            return prompts
+            await self._ensure_index()
+
+            # IDs ya ordenados por fecha de creación (más recientes primero)
+            prompt_ids = await self.client.zrevrange(self.index_key, 0, -1)
+            return await self._get_many(prompt_ids)
         except Exception as e:
             logger.error("Error getting all prompts from Redis", error=str(e), exc_info=True)
             return []
 
+    async def get_page(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[PromptTemplate], Optional[str]]:
+        """
+        Página de prompts (más recientes primero) a partir de `cursor` y cursor
+        de la siguiente página (None si no hay más). El cursor es la posición
+        (created_at, id) del último prompt devuelto, así que crear o borrar
+        prompts entre páginas no duplica ni salta resultados.
+        """
+        after = _decode_cursor(cursor) if cursor else None
+        await self._ensure_index()
+
+        entries: List[Tuple[str, float]] = []
+        max_score = after[0] if after else "+inf"
+        start = 0
+        while len(entries) <= limit:
+            batch = await self.client.zrevrangebyscore(
+                self.index_key, max_score, "-inf", start=start, num=limit + 1, withscores=True
+            )
+            start += len(batch)
+            for prompt_id, score in batch:
+                # Empates de score: Redis los devuelve en orden lexicográfico inverso
+                if after and score == after[0] and prompt_id >= after[1]:
+                    continue
+                entries.append((prompt_id, score))
+            if len(batch) < limit + 1:
+                break
+
+        page = entries[:limit]
+        prompts = await self._get_many([prompt_id for prompt_id, _ in page])
+        next_cursor = None
+        if len(entries) > limit:
+            last_id, last_score = page[-1]
+            next_cursor = _encode_cursor(last_score, last_id)
+        return prompts, next_cursor
+
+    async def _get_many(self, prompt_ids: List[str]) -> List[PromptTemplate]:
+        if not prompt_ids:
+            return []
+        pipeline = self.client.pipeline(transaction=False)
+        for prompt_id in prompt_ids:
+            pipeline.hgetall(self._get_key(prompt_id))
+        return [self._deserialize(data) for data in await pipeline.execute() if data]
+
     async def update(self, prompt: PromptTemplate) -> PromptTemplate:
         try:
             key = self._get_key(prompt.id)
@@ -97,6 +162,9 @@ class RedisPromptRepository(IPromptRepository):
                 "system_prompt": prompt.system_prompt,
                 "user_prompt_template": prompt.user_prompt_template or "",
                 "parameters": json.dumps(prompt.parameters or []),
+                "context_token_budget": prompt.context_token_budget or "",
+                "mmr_lambda": "" if prompt.mmr_lambda is None else prompt.mmr_lambda,
+                "model_policy": prompt.model_policy or "",
                 "updated_at": prompt.updated_at.isoformat(),
             }
             
@@ -111,11 +179,13 @@ class RedisPromptRepository(IPromptRepository):
         try:
             key = self._get_key(prompt_id)
             
-            # Eliminar el prompt
-            deleted = await self.client.delete(key)
-            
-            # Eliminar del índice
-            await self.client.srem(self.index_key, prompt_id)
+            await self._ensure_index()
+
+            # Eliminar el prompt y sacarlo del índice en una sola ida y vuelta
+            pipeline = self.client.pipeline(transaction=True)
+            pipeline.delete(key)
+            pipeline.zrem(self.index_key, prompt_id)
+            deleted, _ = await pipeline.execute()
             
             return deleted > 0
         except Exception as e:
@@ -138,6 +208,21 @@ class RedisPromptRepository(IPromptRepository):
             system_prompt=data["system_prompt"],
             user_prompt_template=data.get("user_prompt_template") or None,
             parameters=parameters,
+            context_token_budget=int(data["context_token_budget"]) if data.get("context_token_budget") else None,
+            mmr_lambda=float(data["mmr_lambda"]) if data.get("mmr_lambda") not in (None, "") else None,
+            model_policy=data.get("model_policy") or None,
             created_at=datetime.fromisoformat(data["created_at"]),
             updated_at=datetime.fromisoformat(data["updated_at"]),
         )
+
+
+def _encode_cursor(score: float, prompt_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([score, prompt_id]).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        score, prompt_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(score), str(prompt_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,115 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.infrastructure.config.logger import logger
+
+
+class BatchingEmbeddingService(IEmbeddingService):
+    """
+    Agrupa en una sola llamada a la API los embeddings que piden peticiones
+    concurrentes, delante de otro IEmbeddingService. Cada texto espera como
+    mucho `EMBEDDING_BATCH_MAX_WAIT_MS` (5) a que lleguen otros; el lote se
+    envía antes si junta `EMBEDDING_BATCH_SIZE` (64) textos, y los vectores se
+    reparten a cada petición. Con carga se gasta una request por lote en vez
+    de una por consulta (límite de requests por minuto y conexiones); sin
+    carga sólo añade la espera máxima. Con espera 0 no agrupa.
+
+    Los textos repetidos en un lote se envían una vez y los de peticiones que
+    ya no esperan el resultado (p. ej. acierto de la caché de respuestas) se
+    descartan antes de enviarlo. Un lote nunca mezcla modelos: si cambia el de
+    la colección activa, lo pendiente se envía antes.
+    """
+
+    def __init__(
+        self,
+        inner: IEmbeddingService,
+        max_wait_ms: Optional[float] = None,
+        max_batch_size: Optional[int] = None,
+    ):
+        self.inner = inner
+        self.max_wait_ms = (
+            max_wait_ms if max_wait_ms is not None
+            else float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+        )
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_model: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sending: set = set()
+        self.texts = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.discarded = 0
+
+    def current_model(self) -> str:
+        if hasattr(self.inner, "current_model"):
+            return self.inner.current_model()
+        return getattr(self.inner, "model", "default")
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        return (await self.generate_embeddings_batch([text]))[0]
+
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        if self.max_wait_ms <= 0 or len(texts) >= self.max_batch_size:
+            return await self.inner.generate_embeddings_batch(texts)
+
+        model = self.current_model()
+        if self._pending and model != self._pending_model:
+            self._flush()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+        self._pending_model = model
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def stats(self) -> dict:
+        return {
+            "texts": self.texts,
+            "batches": self.batches,
+            "averageBatchSize": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "largestBatch": self.largest_batch,
+            "discarded": self.discarded,
+            "pending": len(self._pending),
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._send(batch))
+        # Referencia fuerte hasta que termine (el event loop sólo guarda referencias débiles)
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        waiting = [(text, future) for text, future in batch if not future.done()]
+        self.discarded += len(batch) - len(waiting)
+        if not waiting:
+            return
+        unique = list(dict.fromkeys(text for text, _ in waiting))
+        self.texts += len(unique)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(unique))
+        try:
+            embeddings: Dict[str, List[float]] = dict(zip(unique, await self.inner.generate_embeddings_batch(unique)))
+        except Exception as e:
+            logger.warning("Embedding batch failed", texts=len(unique), error=str(e))
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in waiting:
+            if not future.done():
+                future.set_result(embeddings[text])
@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import math
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from src.application.ports.ilexical_index import ILexicalIndex
+from src.infrastructure.config.logger import logger
+
+# Códigos y referencias ("AB-1234", "v2.1", "rfc_7231") se indexan completos y por partes
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*", re.IGNORECASE)
+TOKEN_SEPARATORS = re.compile(r"[-_./]")
+STOPWORDS = {
+    "a", "al", "algo", "como", "con", "cual", "cuales", "cuando", "cuanto", "cuanta", "cuantos", "cuantas",
+    "de", "del", "donde", "el", "en", "es", "esta", "este", "esto", "hay", "la", "las", "lo", "los", "mas",
+    "me", "mi", "no", "o", "para", "pero", "por", "que", "quien", "se", "si", "sin", "sobre", "son", "su",
+    "sus", "te", "tengo", "un", "una", "y", "ya",
+    "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "how", "in", "is", "it", "of",
+    "on", "or", "the", "to", "what", "when", "where", "which", "who", "with",
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _strip_accents(text: str) -> str:
+    if text.isascii():
+        return text
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Términos en minúsculas y sin acentos, sin stopwords"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(_strip_accents(text.lower())):
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS)
+    return terms
+
+
+def identifier_terms(text: str) -> Set[str]:
+    """Términos que parecen códigos (con dígitos o separadores) o nombres propios (en mayúscula tras la primera palabra)"""
+    identifiers = set()
+    for position, token in enumerate(TOKEN_PATTERN.findall(_strip_accents(text))):
+        if any(char.isdigit() for char in token) or TOKEN_SEPARATORS.search(token) or (position > 0 and token[0].isupper()):
+            identifiers.add(token.lower())
+    return identifiers
+
+
+class _IndexState:
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.chunks: Dict[str, Dict] = {}
+        self.by_document: Dict[str, Set[str]] = defaultdict(set)
+        self.total_length = 0
+
+    def add(self, document_id: str, chunks: List[Dict]) -> None:
+        self.remove(document_id)
+        for chunk in chunks:
+            terms = tokenize(chunk.get("content", ""))
+            if not terms:
+                continue
+            chunk_id = chunk["id"]
+            for term in terms:
+                self.postings[term][chunk_id] = self.postings[term].get(chunk_id, 0) + 1
+            self.lengths[chunk_id] = len(terms)
+            self.total_length += len(terms)
+            self.chunks[chunk_id] = chunk
+            self.by_document[document_id].add(chunk_id)
+
+    def remove(self, document_id: str) -> None:
+        for chunk_id in self.by_document.pop(document_id, set()):
+            for term in set(tokenize(self.chunks[chunk_id].get("content", ""))):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.lengths.pop(chunk_id, 0)
+            del self.chunks[chunk_id]
+
+
+def _build_state(chunks: List[Dict]) -> _IndexState:
+    by_document: Dict[str, List[Dict]] = defaultdict(list)
+    for chunk in chunks:
+        by_document[chunk.get("document_id") or chunk["id"]].append(chunk)
+    state = _IndexState()
+    for document_id, document_chunks in by_document.items():
+        state.add(document_id, document_chunks)
+    return state
+
+
+class BM25Index(ILexicalIndex):
+    """
+    Índice invertido en memoria sobre el texto de los chunks, con puntuación
+    BM25. Se construye al arrancar con todos los chunks de la colección activa
+    y se mantiene con los eventos `document.processed` / `document.deleted`.
+
+    El `score` de cada resultado es la fracción (ponderada por IDF) de los
+    términos de la consulta que contiene el chunk, comparable con el score de
+    Chroma; el orden es el de BM25. Una consulta tiene coincidencia fuerte
+    cuando el mejor chunk cubre al menos `LEXICAL_FAST_PATH_COVERAGE` de la
+    consulta e incluye uno de sus códigos o nombres propios que aparece en
+    como mucho `LEXICAL_FAST_PATH_MAX_DF` chunks: esas consultas se responden
+    sin embedding (una cobertura > 1 lo desactiva).
+    """
+
+    def __init__(self, fast_path_coverage: Optional[float] = None, fast_path_max_df: Optional[int] = None):
+        self.fast_path_coverage = (
+            fast_path_coverage if fast_path_coverage is not None
+            else float(os.getenv("LEXICAL_FAST_PATH_COVERAGE", "0.8"))
+        )
+        self.fast_path_max_df = fast_path_max_df or int(os.getenv("LEXICAL_FAST_PATH_MAX_DF", "3"))
+        self._state = _IndexState()
+        # Cambios recibidos durante una reconstrucción, se aplican sobre el índice nuevo
+        self._journal: Optional[List[Tuple[str, str, List[Dict]]]] = None
+        self.ready = False
+        self.searches = 0
+        self.strong_matches = 0
+
+    async def rebuild(self, load_chunks: Callable[[], Awaitable[List[Dict]]]) -> None:
+        """Reconstruye el índice completo (arranque o cambio de colección) sin bloquear el event loop"""
+        self._journal = []
+        try:
+            chunks = await load_chunks()
+            state = await asyncio.to_thread(_build_state, chunks)
+            for operation, document_id, document_chunks in self._journal:
+                if operation == "add":
+                    state.add(document_id, document_chunks)
+                else:
+                    state.remove(document_id)
+            self._state = state
+            self.ready = True
+            logger.info("Lexical index built", chunks=len(state.chunks), documents=len(state.by_document))
+        finally:
+            self._journal = None
+
+    def add_document(self, document_id: str, chunks: List[Dict]) -> None:
+        self._state.add(document_id, chunks)
+        if self._journal is not None:
+            self._journal.append(("add", document_id, chunks))
+
+    def remove_document(self, document_id: str) -> None:
+        self._state.remove(document_id)
+        if self._journal is not None:
+            self._journal.append(("remove", document_id, []))
+
+    def search(self, query: str, limit: int = 5) -> List[Dict]:
+        self.searches += 1
+        state = self._state
+        return [
+            {**state.chunks[chunk_id], "score": round(coverage, 4), "lexical_score": round(score, 4)}
+            for chunk_id, score, coverage in self._rank(state, query, limit)
+        ]
+
+    def strong_match(self, query: str) -> bool:
+        if not self.ready or self.fast_path_coverage > 1:
+            return False
+        state = self._state
+        ranked = self._rank(state, query, 1)
+        if not ranked or ranked[0][2] < self.fast_path_coverage:
+            return False
+        best = ranked[0][0]
+        strong = any(
+            best in state.postings.get(term, {}) and len(state.postings[term]) <= self.fast_path_max_df
+            for term in identifier_terms(query)
+        )
+        if strong:
+            self.strong_matches += 1
+        return strong
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "chunks": len(self._state.chunks),
+            "documents": len(self._state.by_document),
+            "terms": len(self._state.postings),
+            "searches": self.searches,
+            "strongMatches": self.strong_matches,
+        }
+
+    def _rank(self, state: _IndexState, query: str, limit: int) -> List[Tuple[str, float, float]]:
+        """(chunk_id, score BM25, cobertura de la consulta) de los mejores `limit` chunks"""
+        terms = set(tokenize(query))
+        total_chunks = len(state.chunks)
+        if not terms or not total_chunks:
+            return []
+        average_length = state.total_length / total_chunks
+
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, float] = defaultdict(float)
+        query_weight = 0.0
+        for term in terms:
+            postings = state.postings.get(term, {})
+            idf = math.log(1 + (total_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+            query_weight += idf
+            # Un término en más de la mitad de los chunks apenas aporta: no se recorre su lista
+            if len(postings) * 2 > total_chunks:
+                continue
+            for chunk_id, frequency in postings.items():
+                length_norm = 1 - BM25_B + BM25_B * state.lengths[chunk_id] / average_length
+                scores[chunk_id] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                matched[chunk_id] += idf
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(chunk_id, score, matched[chunk_id] / query_weight) for chunk_id, score in best]
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import os
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import List, Optional, Any, Tuple
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.infrastructure.config.logger import logger
+
+
+def normalize_query(text: str) -> str:
+    """Normaliza la consulta para que variaciones triviales compartan entrada de caché"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class CachedEmbeddingService(IEmbeddingService):
+    """
+    Caché de embeddings de consultas en dos niveles, delante de otro
+    IEmbeddingService: LRU en memoria con TTL y Redis compartido entre réplicas.
+    La clave es (modelo, consulta normalizada), así que un cambio de modelo en el
+    alias de colecciones nunca devuelve vectores del modelo anterior. Un fallo de
+    Redis no rompe el chat: se trata como miss.
+    """
+
+    def __init__(
+        self,
+        inner: IEmbeddingService,
+        redis_client: Optional[Any] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        redis_ttl_seconds: Optional[int] = None,
+    ):
+        self.inner = inner
+        self.redis = redis_client
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", "1000"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+        self.redis_ttl_seconds = redis_ttl_seconds or int(os.getenv("EMBEDDING_CACHE_REDIS_TTL_SECONDS", "86400"))
+        self.key_prefix = "embedding:"
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def current_model(self) -> str:
+        if hasattr(self.inner, "current_model"):
+            return self.inner.current_model()
+        return getattr(self.inner, "model", "default")
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        return (await self.generate_embeddings_batch([text]))[0]
+
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        model = self.current_model()
+        keys = [(model, normalize_query(text)) for text in texts]
+        results: List[Optional[List[float]]] = [self._get_local(key) for key in keys]
+        self.memory_hits += sum(1 for result in results if result is not None)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            for i, embedding in zip(pending, await self._get_redis([keys[i] for i in pending])):
+                if embedding is not None:
+                    results[i] = embedding
+                    self.redis_hits += 1
+                    self._set_local(keys[i], embedding)
+
+        # Textos repetidos dentro del mismo lote se embeben una sola vez
+        missing = list(dict.fromkeys(keys[i] for i, result in enumerate(results) if result is None))
+        if missing:
+            self.misses += len(missing)
+            first_text = {}
+            for text, key in zip(texts, keys):
+                first_text.setdefault(key, text)
+            embeddings = await self.inner.generate_embeddings_batch([first_text[key] for key in missing])
+            computed = dict(zip(missing, embeddings))
+            for key, embedding in computed.items():
+                self._set_local(key, embedding)
+            await self._set_redis(computed)
+            results = [result if result is not None else computed[key] for result, key in zip(results, keys)]
+
+        return results
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memoryHits": self.memory_hits,
+            "redisHits": self.redis_hits,
+            "misses": self.misses,
+            "hitRatio": round((self.memory_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _get_local(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, embedding = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return embedding
+
+    def _set_local(self, key: Tuple[str, str], embedding: List[float]) -> None:
+        self._entries[key] = (time.monotonic(), embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _redis_key(self, key: Tuple[str, str]) -> str:
+        model, query = key
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{model}:{digest}"
+
+    async def _get_redis(self, keys: List[Tuple[str, str]]) -> List[Optional[List[float]]]:
+        if not self.redis:
+            return [None] * len(keys)
+        try:
+            values = await self.redis.mget([self._redis_key(key) for key in keys])
+        except Exception as e:
+            logger.warning("Embedding cache read failed", error=str(e))
+            return [None] * len(keys)
+        return [_decode(value) if value else None for value in values]
+
+    async def _set_redis(self, computed: dict) -> None:
+        if not self.redis or not computed:
+            return
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for key, embedding in computed.items():
+                pipeline.set(self._redis_key(key), _encode(embedding), ex=self.redis_ttl_seconds)
+            await pipeline.execute()
+        except Exception as e:
+            logger.warning("Embedding cache write failed", error=str(e))
+
+
+def _encode(embedding: List[float]) -> str:
+    # float32 en base64: ~4x más compacto que JSON y compatible con decode_responses=True
+    return base64.b64encode(array("f", embedding).tobytes()).decode("ascii")
+
+
+def _decode(value: str) -> List[float]:
+    vector = array("f")
+    vector.frombytes(base64.b64decode(value))
+    return vector.tolist()
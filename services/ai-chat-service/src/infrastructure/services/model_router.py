@@ -0,0 +1,181 @@
+import os
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from src.infrastructure.services.token_counter import estimate_tokens
+
+# Precios por 1M tokens (actualizados a enero 2024)
+MODEL_PRICING = {
+    "gpt-4o-mini": {
+        "input": 0.15 / 1_000_000,  # $0.15 por 1M tokens
+        "output": 0.60 / 1_000_000,  # $0.60 por 1M tokens
+    },
+    "gpt-4o": {
+        "input": 2.50 / 1_000_000,  # $2.50 por 1M tokens
+        "output": 10.00 / 1_000_000,  # $10.00 por 1M tokens
+    },
+    "gpt-4-turbo": {
+        "input": 10.00 / 1_000_000,  # $10.00 por 1M tokens
+        "output": 30.00 / 1_000_000,  # $30.00 por 1M tokens
+    },
+}
+
+# Niveles de modelo, del más barato al más capaz
+TIERS = ("fast", "default", "strong")
+# Política de modelo de un prompt template: "auto" enruta cada petición, el resto fija el nivel
+MODEL_POLICIES = ("auto",) + TIERS
+# Preguntas que piden razonar, comparar o resumir: nunca van al modelo rápido
+COMPLEX_MARKERS = (
+    "por qué", "compara", "diferencia", "explica", "analiza", "resume", "paso a paso", "ventajas",
+    "why", "compare", "difference", "explain", "analyze", "summarize", "step by step",
+)
+# Observaciones de latencia de un modelo necesarias antes de desviar peticiones por lentitud
+MIN_LATENCY_SAMPLES = 10
+
+
+def model_pricing(model: str) -> Dict[str, float]:
+    return MODEL_PRICING.get(model, MODEL_PRICING["gpt-4o-mini"])
+
+
+def cheapest_model() -> str:
+    return min(MODEL_PRICING, key=lambda model: model_pricing(model)["input"] + model_pricing(model)["output"])
+
+
+class ModelRouter:
+    """
+    Elige el modelo de cada petición entre tres niveles: `LLM_FAST_MODEL`
+    (por defecto el más barato de MODEL_PRICING), `LLM_MODEL` y
+    `LLM_STRONG_MODEL` (por defecto `LLM_MODEL`, sin escalado). Con la política
+    "auto" (`LLM_ROUTING_POLICY` o la del template):
+    - preguntas largas o contexto grande (`LLM_ROUTER_STRONG_MIN_QUERY_TOKENS`,
+      300; `LLM_ROUTER_STRONG_MIN_CONTEXT_TOKENS`, 6000) escalan al fuerte;
+    - preguntas que piden razonar (COMPLEX_MARKERS) van a `LLM_MODEL`;
+    - preguntas cortas con poco contexto (`LLM_ROUTER_FAST_MAX_QUERY_TOKENS`,
+      32; `LLM_ROUTER_FAST_MAX_CONTEXT_TOKENS`, 1500) van al rápido;
+    - si el p90 de las últimas `LLM_ROUTER_LATENCY_WINDOW` (50) llamadas del
+      modelo elegido supera `LLM_ROUTER_LATENCY_BUDGET_MS` (8000; 0 lo
+      desactiva), la petición baja al nivel más barato que lo cumple. Las
+      observaciones caducan a los `LLM_ROUTER_LATENCY_MAX_AGE_SECONDS` (300):
+      un modelo desviado no recibe tráfico nuevo, así que vuelve a usarse
+      cuando caducan las muestras que lo desviaron.
+    Si el modelo rápido falla, la llamada escala a `LLM_MODEL` (ver
+    `fallback`). Cada decisión se devuelve con la respuesta y se guarda en
+    las métricas de la evaluación.
+    """
+
+    def __init__(
+        self,
+        default_model: Optional[str] = None,
+        fast_model: Optional[str] = None,
+        strong_model: Optional[str] = None,
+        policy: Optional[str] = None,
+        latency_budget_ms: Optional[float] = None,
+        latency_window: Optional[int] = None,
+        latency_max_age_seconds: Optional[float] = None,
+    ):
+        default_model = default_model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self.models = {
+            "fast": fast_model or os.getenv("LLM_FAST_MODEL") or cheapest_model(),
+            "default": default_model,
+            "strong": strong_model or os.getenv("LLM_STRONG_MODEL") or default_model,
+        }
+        self.policy = policy or os.getenv("LLM_ROUTING_POLICY", "auto")
+        self.fast_max_query_tokens = int(os.getenv("LLM_ROUTER_FAST_MAX_QUERY_TOKENS", "32"))
+        self.fast_max_context_tokens = int(os.getenv("LLM_ROUTER_FAST_MAX_CONTEXT_TOKENS", "1500"))
+        self.strong_min_query_tokens = int(os.getenv("LLM_ROUTER_STRONG_MIN_QUERY_TOKENS", "300"))
+        self.strong_min_context_tokens = int(os.getenv("LLM_ROUTER_STRONG_MIN_CONTEXT_TOKENS", "6000"))
+        self.latency_budget_ms = (
+            latency_budget_ms if latency_budget_ms is not None
+            else float(os.getenv("LLM_ROUTER_LATENCY_BUDGET_MS", "8000"))
+        )
+        self.latency_window = latency_window or int(os.getenv("LLM_ROUTER_LATENCY_WINDOW", "50"))
+        self.latency_max_age_seconds = (
+            latency_max_age_seconds if latency_max_age_seconds is not None
+            else float(os.getenv("LLM_ROUTER_LATENCY_MAX_AGE_SECONDS", "300"))
+        )
+        # (instante, latencia) de las últimas llamadas de cada modelo
+        self._latencies: Dict[str, Deque[Tuple[float, float]]] = {}
+        self.decisions: Counter = Counter()
+        self.reasons: Counter = Counter()
+        self.escalations = 0
+
+    def route(self, query: str, context_tokens: int = 0, policy: Optional[str] = None) -> Dict[str, Any]:
+        """Decisión para una petición: nivel, modelo y motivo (`policy` = la del template)"""
+        policy = policy or self.policy
+        query_tokens = estimate_tokens(query)
+        if policy in TIERS:
+            tier, reason = policy, "policy"
+        else:
+            tier, reason = self._within_latency_budget(*self._classify(query, query_tokens, context_tokens))
+        self.decisions[tier] += 1
+        self.reasons[reason] += 1
+        return {
+            "tier": tier,
+            "model": self.models[tier],
+            "reason": reason,
+            "queryTokens": query_tokens,
+            "contextTokens": context_tokens,
+        }
+
+    def fallback(self, decision: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Decisión escalada a `LLM_MODEL` si falla el modelo rápido (None si no hay a dónde escalar)"""
+        if decision["tier"] != "fast" or self.models["default"] == decision["model"]:
+            return None
+        self.escalations += 1
+        return {**decision, "tier": "default", "model": self.models["default"], "escalatedFrom": decision["model"]}
+
+    def cache_key(self) -> str:
+        """Política y modelos por nivel: cualquiera de ellos puede haber generado una respuesta cacheada"""
+        return "|".join([self.policy, *(self.models[tier] for tier in TIERS)])
+
+    def observe(self, model: str, latency_ms: float) -> None:
+        self._latencies.setdefault(model, deque(maxlen=self.latency_window)).append((time.monotonic(), latency_ms))
+
+    def latency_p90(self, model: str) -> Optional[float]:
+        samples = self._latencies.get(model)
+        if samples and self.latency_max_age_seconds:
+            expired_before = time.monotonic() - self.latency_max_age_seconds
+            while samples and samples[0][0] < expired_before:
+                samples.popleft()
+        if not samples or len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(latency for _, latency in samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def stats(self) -> dict:
+        return {
+            "models": dict(self.models),
+            "policy": self.policy,
+            "decisions": dict(self.decisions),
+            "reasons": dict(self.reasons),
+            "escalations": self.escalations,
+            "latencyP90": {model: self.latency_p90(model) for model in self._latencies},
+        }
+
+    def _classify(self, query: str, query_tokens: int, context_tokens: int) -> Tuple[str, str]:
+        if query_tokens >= self.strong_min_query_tokens:
+            return "strong", "long_query"
+        if context_tokens >= self.strong_min_context_tokens:
+            return "strong", "large_context"
+        lowered = query.lower()
+        if any(marker in lowered for marker in COMPLEX_MARKERS):
+            return "default", "complex_query"
+        if query_tokens <= self.fast_max_query_tokens and context_tokens <= self.fast_max_context_tokens:
+            return "fast", "simple"
+        return "default", "default"
+
+    def _within_latency_budget(self, tier: str, reason: str) -> Tuple[str, str]:
+        if not self._over_budget(self.models[tier]):
+            return tier, reason
+        # El modelo elegido va lento: el nivel más capaz de los más baratos que cumpla el presupuesto
+        for cheaper in reversed(TIERS[:TIERS.index(tier)]):
+            model = self.models[cheaper]
+            if model != self.models[tier] and not self._over_budget(model):
+                return cheaper, "latency"
+        return tier, reason
+
+    def _over_budget(self, model: str) -> bool:
+        if not self.latency_budget_ms:
+            return False
+        p90 = self.latency_p90(model)
+        return p90 is not None and p90 > self.latency_budget_ms
@@ -1,13 +1,19 @@
 import os
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, AsyncIterator
 from openai import AsyncOpenAI
 from src.application.ports.illm_service import ILLMService
+from src.infrastructure.config.logger import logger
+from src.infrastructure.services.model_router import ModelRouter
+from src.infrastructure.services.token_counter import estimate_tokens
 
 
 class OpenAILLMService(ILLMService):
-    def __init__(self):
+    def __init__(self, router: Optional[ModelRouter] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model = os.getenv("LLM_MODEL", "gpt-4o-mini")
+        # Modelo por petición según coste y latencia (ver ModelRouter)
+        self.router = router or ModelRouter(default_model=self.model)
         self.client = None
         # El cliente se inicializará lazy cuando se necesite
 
@@ -23,6 +29,7 @@ class OpenAILLMService(ILLMService):
         messages: List[Dict[str, str]],
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         # Asegurar que el cliente esté inicializado
         self._ensure_client()
@@ -33,12 +40,16 @@ class OpenAILLMService(ILLMService):
             chat_messages.append({"role": "system", "content": system_prompt})
         chat_messages.extend(messages)
 
-        # Llamar a OpenAI
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=chat_messages,
-            temperature=temperature,
-        )
+        # Llamar a OpenAI con el modelo elegido (escalando si falla el rápido)
+        decision = self._route(chat_messages, routing)
+        started = time.time()
+        try:
+            response = await self._create(decision["model"], chat_messages, temperature)
+        except Exception as e:
+            decision = self._escalate(decision, e)
+            started = time.time()
+            response = await self._create(decision["model"], chat_messages, temperature)
+        self.router.observe(decision["model"], (time.time() - started) * 1000)
 
         content = response.choices[0].message.content
         usage = response.usage
@@ -50,4 +61,78 @@ class OpenAILLMService(ILLMService):
                 "output": usage.completion_tokens,
                 "total": usage.total_tokens,
             },
+            "model": decision["model"],
+            "routing": decision,
+        }
+
+    async def stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        routing: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        self._ensure_client()
+
+        chat_messages = []
+        if system_prompt:
+            chat_messages.append({"role": "system", "content": system_prompt})
+        chat_messages.extend(messages)
+
+        # include_usage: el último chunk (sin choices) trae el uso de tokens.
+        # Sólo se escala si falla antes de empezar el stream
+        decision = self._route(chat_messages, routing)
+        started = time.time()
+        try:
+            stream = await self._create(decision["model"], chat_messages, temperature, stream=True)
+        except Exception as e:
+            decision = self._escalate(decision, e)
+            started = time.time()
+            stream = await self._create(decision["model"], chat_messages, temperature, stream=True)
+
+        usage = None
+        async for chunk in stream:
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield {"type": "token", "content": content}
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+
+        yield {
+            "type": "usage",
+            "tokens": {
+                "input": usage.prompt_tokens if usage else 0,
+                "output": usage.completion_tokens if usage else 0,
+                "total": usage.total_tokens if usage else 0,
+            },
+            "model": decision["model"],
+            "routing": decision,
         }
+        self.router.observe(decision["model"], (time.time() - started) * 1000)
+
+    def _create(self, model: str, chat_messages: List[Dict[str, str]], temperature: float, stream: bool = False):
+        if not stream:
+            return self.client.chat.completions.create(model=model, messages=chat_messages, temperature=temperature)
+        return self.client.chat.completions.create(
+            model=model,
+            messages=chat_messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+    def _route(self, chat_messages: List[Dict[str, str]], routing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if routing is None:
+            # Sin datos de la petición: la pregunta es el último mensaje del usuario y el resto, contexto
+            query = next((m.get("content") or "" for m in reversed(chat_messages) if m.get("role") == "user"), "")
+            context_tokens = sum(estimate_tokens(m.get("content") or "") for m in chat_messages) - estimate_tokens(query)
+            return self.router.route(query, context_tokens)
+        return self.router.route(routing.get("query", ""), routing.get("contextTokens", 0), routing.get("policy"))
+
+    def _escalate(self, decision: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        escalated = self.router.fallback(decision)
+        if escalated is None:
+            raise error
+        logger.warning("LLM call failed, escalating model", model=decision["model"], fallback=escalated["model"], error=str(error))
+        return escalated
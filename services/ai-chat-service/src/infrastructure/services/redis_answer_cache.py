@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.infrastructure.config.logger import logger
+from src.infrastructure.services.cached_embedding_service import normalize_query
+
+
+class RedisAnswerCache:
+    """
+    Caché de respuestas por coincidencia exacta, compartida entre réplicas en
+    Redis. La clave es un hash de (mensaje normalizado, scope del template,
+    modelo, versión del corpus), así que editar un template, cambiar de modelo
+    o procesar/eliminar un documento hace que las entradas anteriores dejen de
+    encontrarse (y caducan por TTL).
+
+    La versión del corpus es un contador en Redis que incrementan los eventos de
+    documentos; cada réplica lo relee como mucho cada
+    `ANSWER_CACHE_VERSION_TTL_SECONDS`. Ante un miss, sólo la réplica que toma
+    el lock (`SET NX`) llama al LLM; el resto espera a que aparezca la respuesta
+    hasta `ANSWER_CACHE_WAIT_SECONDS` y, si no llega, la calcula por su cuenta.
+    Un fallo de Redis no rompe el chat: se trata como miss.
+
+    Dentro de la réplica las peticiones idénticas simultáneas (misma clave) se
+    agrupan antes de ir a Redis: comparten la consulta y el cálculo de la
+    primera, aunque la respuesta no llegue a cachearse, y la primera petición
+    puede cancelarse sin interrumpir a las demás.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        lock_seconds: Optional[int] = None,
+        wait_seconds: Optional[float] = None,
+        version_ttl_seconds: Optional[float] = None,
+    ):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds or int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+        self.max_entries = max_entries or int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+        self.max_bytes = max_bytes or int(os.getenv("ANSWER_CACHE_MAX_BYTES", "65536"))
+        self.lock_seconds = lock_seconds or int(os.getenv("ANSWER_CACHE_LOCK_SECONDS", "30"))
+        self.wait_seconds = wait_seconds if wait_seconds is not None else float(os.getenv("ANSWER_CACHE_WAIT_SECONDS", "10"))
+        self.version_ttl_seconds = (
+            version_ttl_seconds if version_ttl_seconds is not None
+            else float(os.getenv("ANSWER_CACHE_VERSION_TTL_SECONDS", "1"))
+        )
+        self.key_prefix = "answer:"
+        self.lock_prefix = "answer-lock:"
+        self.index_key = "answers:index"
+        self.version_key = "answers:corpus-version"
+        self._version: Optional[str] = None
+        self._version_read_at = 0.0
+        # Clave -> tarea en curso que calcula (o lee) la respuesta
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.waited_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def corpus_version(self) -> str:
+        if self._version is not None and time.monotonic() - self._version_read_at < self.version_ttl_seconds:
+            return self._version
+        self._version = str(await self.redis.get(self.version_key) or "0")
+        self._version_read_at = time.monotonic()
+        return self._version
+
+    async def bump_corpus_version(self) -> None:
+        """El corpus cambió: las respuestas guardadas con la versión anterior dejan de servirse"""
+        try:
+            self._version = str(await self.redis.incr(self.version_key))
+            self._version_read_at = time.monotonic()
+        except Exception as e:
+            self._version = None
+            logger.warning("Answer cache version bump failed", error=str(e))
+
+    def make_key(self, message: str, scope: str, model: str, corpus_version: str) -> str:
+        payload = json.dumps([normalize_query(message), scope, model, corpus_version], ensure_ascii=False)
+        return f"{self.key_prefix}{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    async def get_or_compute(
+        self,
+        message: str,
+        scope: str,
+        model: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        `({"message", "sources"}, True)` si la respuesta estaba cacheada (o la
+        calculaba ya una petición idéntica), o la respuesta completa de
+        `compute()` y False si hubo que calcularla.
+        """
+        try:
+            key = self.make_key(message, scope, model, await self.corpus_version())
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                cached = await self._get(key)
+                if cached:
+                    self.hits += 1
+                    return cached, True
+                inflight = self._inflight.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Answer cache read failed", error=str(e))
+            return await compute(), False
+
+        if inflight is not None:
+            self.coalesced += 1
+            response, _ = await asyncio.shield(inflight)
+            return {"message": response.get("message", ""), "sources": response.get("sources", [])}, True
+
+        task = asyncio.create_task(self._lock_and_compute(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.waited_hits + self.coalesced + self.misses
+        return {
+            "corpusVersion": self._version,
+            "hits": self.hits,
+            "waitedHits": self.waited_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hitRatio": round((self.hits + self.waited_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    async def _lock_and_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        lock_key = f"{self.lock_prefix}{key}"
+        try:
+            acquired = await self.redis.set(lock_key, "1", ex=self.lock_seconds, nx=True)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Answer cache lock failed", error=str(e))
+            return await compute(), False
+
+        if not acquired:
+            cached = await self._wait_for(key)
+            if cached:
+                self.waited_hits += 1
+                return cached, True
+
+        self.misses += 1
+        try:
+            response = await compute()
+            await self._set(key, response)
+            return response, False
+        finally:
+            if acquired:
+                try:
+                    await self.redis.delete(lock_key)
+                except Exception as e:
+                    logger.warning("Answer cache unlock failed", error=str(e))
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Si todas las peticiones que esperaban se cancelaron, el error no queda sin recoger
+        if not task.cancelled():
+            task.exception()
+
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = await self.redis.get(key)
+        return json.loads(value) if value else None
+
+    async def _wait_for(self, key: str) -> Optional[Dict[str, Any]]:
+        # Otra réplica está generando la misma respuesta
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.05
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            try:
+                cached = await self._get(key)
+            except Exception:
+                return None
+            if cached:
+                return cached
+        return None
+
+    async def _set(self, key: str, response: Dict[str, Any]) -> None:
+        # Sólo respuestas apoyadas en documentos y de tamaño acotado
+        if not response.get("sources"):
+            return
+        value = json.dumps({"message": response.get("message", ""), "sources": response["sources"]}, ensure_ascii=False)
+        if len(value.encode("utf-8")) > self.max_bytes:
+            return
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.set(key, value, ex=self.ttl_seconds)
+            pipeline.zadd(self.index_key, {key: time.time()})
+            pipeline.zcard(self.index_key)
+            *_, size = await pipeline.execute()
+            if size > self.max_entries:
+                evicted = await self.redis.zpopmin(self.index_key, size - self.max_entries)
+                if evicted:
+                    await self.redis.delete(*[member for member, _ in evicted])
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Answer cache write failed", error=str(e))
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.infrastructure.config.logger import logger
+
+
+class IdempotencyKeyInUse(Exception):
+    """Otra petición con la misma `Idempotency-Key` todavía se está procesando"""
+
+
+class RedisIdempotencyStore:
+    """
+    Respuestas de las peticiones con cabecera `Idempotency-Key`, guardadas en
+    Redis durante `IDEMPOTENCY_TTL_SECONDS` por usuario y clave: un reintento
+    del cliente (timeout, red caída) recibe la respuesta original sin volver a
+    llamar al LLM ni guardar otra evaluación.
+
+    Al empezar se reserva la clave (`SET NX`, caduca a los
+    `IDEMPOTENCY_LOCK_SECONDS` si la réplica cae) con una huella de la
+    petición: reutilizar la clave con otra petición es un `ValueError` y
+    repetirla mientras la primera sigue en curso, `IdempotencyKeyInUse`. Si el
+    cálculo falla la clave se libera para que el reintento lo repita. Un fallo
+    de Redis no rompe el chat: la petición se procesa sin idempotencia.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any,
+        ttl_seconds: Optional[int] = None,
+        lock_seconds: Optional[int] = None,
+    ):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds or int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.lock_seconds = lock_seconds or int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+        self.key_prefix = "idempotency:"
+        self.replays = 0
+        self.stored = 0
+        self.errors = 0
+
+    def make_key(self, user_id: str, idempotency_key: str) -> str:
+        payload = json.dumps([user_id, idempotency_key], ensure_ascii=False)
+        return f"{self.key_prefix}{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    async def run(
+        self,
+        user_id: str,
+        idempotency_key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """La respuesta guardada y True si es un reintento, o la de `compute()` y False"""
+        key = self.make_key(user_id, idempotency_key)
+        try:
+            reserved = await self.redis.set(key, json.dumps({"fingerprint": fingerprint}), ex=self.lock_seconds, nx=True)
+            stored = None if reserved else await self.redis.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Idempotency store read failed", error=str(e))
+            return await compute(), False
+
+        if not reserved and stored:
+            entry = json.loads(stored)
+            if entry["fingerprint"] != fingerprint:
+                raise ValueError("Idempotency-Key already used with a different request")
+            if "response" not in entry:
+                raise IdempotencyKeyInUse("A request with this Idempotency-Key is still in progress")
+            self.replays += 1
+            return entry["response"], True
+
+        try:
+            response = await compute()
+        except BaseException:
+            await self._release(key)
+            raise
+        await self._save(key, fingerprint, response)
+        return response, False
+
+    def stats(self) -> dict:
+        return {"replays": self.replays, "stored": self.stored, "errors": self.errors}
+
+    async def _save(self, key: str, fingerprint: str, response: Dict[str, Any]) -> None:
+        try:
+            value = json.dumps({"fingerprint": fingerprint, "response": response}, ensure_ascii=False)
+            await self.redis.set(key, value, ex=self.ttl_seconds)
+            self.stored += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Idempotency store write failed", error=str(e))
+
+    async def _release(self, key: str) -> None:
+        try:
+            await self.redis.delete(key)
+        except Exception as e:
+            logger.warning("Idempotency store release failed", error=str(e))
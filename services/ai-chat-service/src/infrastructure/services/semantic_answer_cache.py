@@ -0,0 +1,115 @@
+import os
+import time
+from typing import List, Optional, Dict, Any
+import numpy as np
+from src.application.ports.isemantic_answer_cache import ISemanticAnswerCache
+from src.infrastructure.config.logger import logger
+
+
+class _ScopeEntries:
+    """Embeddings normalizados (una fila por respuesta) de un scope, en orden de inserción"""
+
+    def __init__(self, dimensions: int):
+        self.vectors = np.empty((0, dimensions), dtype=np.float32)
+        self.stored_at: List[float] = []
+        self.answers: List[Dict[str, Any]] = []
+
+    def append(self, vector: np.ndarray, answer: Dict[str, Any], max_entries: int) -> None:
+        self.vectors = np.vstack([self.vectors, vector[np.newaxis, :]])[-max_entries:]
+        self.stored_at = (self.stored_at + [time.monotonic()])[-max_entries:]
+        self.answers = (self.answers + [answer])[-max_entries:]
+
+
+class SemanticAnswerCache(ISemanticAnswerCache):
+    """
+    Caché de respuestas por similitud de la consulta: si una pregunta embebida
+    está a menos de `SEMANTIC_CACHE_THRESHOLD` (coseno) de otra ya respondida
+    con el mismo scope (template) y la misma versión del corpus, se reutiliza
+    la respuesta y sus fuentes sin llamar al LLM.
+
+    Procesar o eliminar un documento incrementa la versión del corpus y vacía la
+    caché; una respuesta calculada con una versión anterior se descarta al
+    guardarla, así que nunca se sirven respuestas con contexto obsoleto.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_SIZE", "500"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+        self._version = 0
+        self._scopes: Dict[str, _ScopeEntries] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def corpus_version(self) -> int:
+        return self._version
+
+    async def lookup(self, query_embedding: List[float], scope: str) -> Optional[Dict[str, Any]]:
+        entries = self._scopes.get(scope)
+        query = _normalize(query_embedding)
+        if entries is None or query is None or entries.vectors.shape[1] != query.shape[0] or not entries.answers:
+            self.misses += 1
+            return None
+
+        similarities = entries.vectors @ query
+        expired = np.asarray(entries.stored_at) < time.monotonic() - self.ttl_seconds
+        similarities[expired] = -1.0
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {"answer": entries.answers[best], "similarity": round(float(similarities[best]), 4)}
+
+    async def store(
+        self,
+        query_embedding: List[float],
+        scope: str,
+        answer: Dict[str, Any],
+        corpus_version: int,
+    ) -> bool:
+        if corpus_version != self._version:
+            # El corpus cambió mientras se generaba la respuesta
+            return False
+        vector = _normalize(query_embedding)
+        if vector is None:
+            return False
+
+        entries = self._scopes.get(scope)
+        if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+            entries = _ScopeEntries(vector.shape[0])
+            self._scopes[scope] = entries
+        entries.append(vector, answer, self.max_entries)
+        return True
+
+    def invalidate(self, reason: str = "") -> None:
+        self._version += 1
+        self._scopes.clear()
+        self.invalidations += 1
+        logger.info("Semantic answer cache invalidated", reason=reason, corpus_version=self._version)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": sum(len(entries.answers) for entries in self._scopes.values()),
+            "corpusVersion": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if vector.ndim != 1 or norm == 0.0:
+        return None
+    return vector / norm
@@ -0,0 +1,54 @@
+import os
+from typing import Any, Optional
+from src.infrastructure.config.logger import logger
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación local (~4 caracteres por token con los tokenizadores de OpenAI)"""
+    return (len(text) + 3) // 4 if text else 0
+
+
+class TokenCounter:
+    """
+    Cuenta tokens localmente con la codificación de tiktoken del modelo
+    (`LLM_MODEL`), sin llamar a la API. La codificación se carga una sola vez;
+    si no está disponible (sin tiktoken o sin el fichero BPE en la caché, ver
+    `TIKTOKEN_CACHE_DIR` en el Dockerfile) se usa `estimate_tokens`.
+    """
+
+    def __init__(self, model: Optional[str] = None, use_tiktoken: bool = True):
+        self.model = model or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        self._encoding: Optional[Any] = None
+        self._loaded = not use_tiktoken
+
+    @property
+    def encoding(self) -> Optional[Any]:
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning("Tokenizer not available, using token estimate", model=self.model, error=str(e))
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        encoding = self.encoding
+        if encoding is None:
+            return estimate_tokens(text)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Los primeros `max_tokens` tokens de `text`"""
+        if max_tokens <= 0:
+            return ""
+        encoding = self.encoding
+        if encoding is None:
+            return text[:max_tokens * 4]
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
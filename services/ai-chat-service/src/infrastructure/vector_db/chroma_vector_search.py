@@ -1,50 +1,137 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Any
+import asyncio
 import os
+import time
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 from src.application.ports.ivector_search import IVectorSearch
 from src.infrastructure.config.logger import logger
 
 
+class CollectionSnapshot:
+    def __init__(self, name: str, handle: Any, count: int, fetched_at: float):
+        self.name = name
+        self.handle = handle
+        self.count = count
+        self.fetched_at = fetched_at
+
+
 class ChromaVectorSearch(IVectorSearch):
-    def __init__(self):
-        host = os.getenv("CHROMA_HOST", "localhost")
-        port = int(os.getenv("CHROMA_PORT", "8000"))
-        self.client = chromadb.HttpClient(
-            host=host,
-            port=port,
+    """
+    Búsqueda de chunks por similitud en Chroma. El handle de la colección
+    activa y su número de chunks se guardan en memoria y se releen cuando
+    llegan eventos de documentos (`invalidate()`), cambia la colección del
+    alias o pasan `CHROMA_COLLECTION_TTL_SECONDS`: cada búsqueda es una sola
+    petición a Chroma (`query`), hecha fuera del event loop.
+    """
+
+    def __init__(self, client: Optional[Any] = None, collection_registry: Optional[Any] = None):
+        self.host = os.getenv("CHROMA_HOST", "localhost")
+        self.port = int(os.getenv("CHROMA_PORT", "8000"))
+        # Permite inyectar un cliente local (p. ej. PersistentClient en benchmarks)
+        self.client = client or chromadb.HttpClient(
+            host=self.host,
+            port=self.port,
             settings=Settings(anonymized_telemetry=False)
         )
         self.collection_name = os.getenv("CHROMA_COLLECTION_NAME", "documents")
+        # Resuelve el alias a la colección versionada activa (migraciones de embeddings)
+        self.collection_registry = collection_registry
+        # Score mínimo (1 / (1 + distancia)) para devolver un chunk
+        self.score_threshold = float(os.getenv("CHROMA_SCORE_THRESHOLD", "0.5"))
+        # Chunks por petición al leer la colección completa (índice léxico)
+        self.page_size = int(os.getenv("CHROMA_PAGE_SIZE", "1000"))
+        self.collection_ttl_seconds = float(os.getenv("CHROMA_COLLECTION_TTL_SECONDS", "30"))
+        self._snapshot: Optional[CollectionSnapshot] = None
+        self.snapshot_refreshes = 0
+
+    def get_active_collection_name(self) -> str:
+        if self.collection_registry:
+            try:
+                return self.collection_registry.get_active().collection
+            except Exception as e:
+                logger.warning("Could not resolve active collection, using default", error=str(e))
+        return self.collection_name
+
+    def invalidate(self) -> None:
+        """El corpus cambió: la próxima búsqueda relee el handle y el número de chunks"""
+        self._snapshot = None
+
+    def collection_snapshot(self, refresh: bool = False) -> CollectionSnapshot:
+        """Handle y número de chunks de la colección activa (cacheados, ver la clase)"""
+        name = self.get_active_collection_name()
+        snapshot = self._snapshot
+        if (
+            not refresh
+            and snapshot is not None
+            and snapshot.name == name
+            and time.monotonic() - snapshot.fetched_at < self.collection_ttl_seconds
+        ):
+            return snapshot
+        logger.debug("Loading ChromaDB collection", host=self.host, port=self.port, collection_name=name)
+        handle = self.client.get_collection(name=name)
+        snapshot = CollectionSnapshot(name, handle, handle.count(), time.monotonic())
+        self._snapshot = snapshot
+        self.snapshot_refreshes += 1
+        return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "collection": snapshot.name if snapshot else None,
+            "count": snapshot.count if snapshot else None,
+            "snapshotRefreshes": self.snapshot_refreshes,
+        }
 
     async def search_similar(
-        self, query_embedding: List[float], limit: int = 5
+        self, query_embedding: List[float], limit: int = 5, include_embeddings: bool = False
     ) -> List[Dict]:
+        # El cliente de Chroma es síncrono: fuera del event loop
+        return await asyncio.to_thread(self._search_similar, query_embedding, limit, include_embeddings)
+
+    def _search_similar(self, query_embedding: List[float], limit: int, include_embeddings: bool) -> List[Dict]:
         try:
-            chroma_host = os.getenv('CHROMA_HOST', 'localhost')
-            chroma_port = os.getenv('CHROMA_PORT', '8000')
-            logger.debug("Connecting to ChromaDB", host=chroma_host, port=chroma_port, collection_name=self.collection_name)
-            
-            collection = self.client.get_collection(name=self.collection_name)
-            logger.debug("Collection retrieved successfully", collection_name=self.collection_name)
-            
-            # Verificar si la colección tiene datos
-            count_result = collection.count()
-            logger.debug("Collection count", collection_name=self.collection_name, count=count_result)
-            
-            if count_result == 0:
-                logger.warning("Collection is empty, no documents to search", collection_name=self.collection_name)
+            snapshot = self.collection_snapshot()
+            collection_name = snapshot.name
+
+            # Nunca comparar embeddings de modelos distintos: darían resultados basura
+            if self.collection_registry:
+                stamped_model = (snapshot.handle.metadata or {}).get("embedding_model")
+                expected_model = self.collection_registry.get_active().embedding_model
+                if isinstance(stamped_model, str) and stamped_model != expected_model:
+                    logger.error("Embedding model mismatch, skipping search",
+                        collection_name=collection_name,
+                        collection_model=stamped_model,
+                        query_model=expected_model
+                    )
+                    return []
+
+            # Verificar si la colección tiene datos (número cacheado, sin petición a Chroma)
+            if snapshot.count == 0:
+                logger.warning("Collection is empty, no documents to search", collection_name=collection_name)
                 return []
-            
-            score_threshold = 0.7
-            distance_threshold = 1.0 - score_threshold
-            
+
             logger.debug("Querying ChromaDB", limit=limit, embedding_dim=len(query_embedding))
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=limit,
-            )
+            include = ["documents", "metadatas", "distances"]
+            if include_embeddings:
+                include.append("embeddings")
+            try:
+                results = snapshot.handle.query(query_embeddings=[query_embedding], n_results=limit, include=include)
+            except Exception as e:
+                # El handle puede haber quedado obsoleto (colección recreada): se relee una vez
+                logger.warning("Query failed, reloading collection", collection_name=collection_name, error=str(e))
+                snapshot = self.collection_snapshot(refresh=True)
+                if snapshot.count == 0:
+                    return []
+                results = snapshot.handle.query(query_embeddings=[query_embedding], n_results=limit, include=include)
             logger.debug("Query completed", results_structure=list(results.keys()))
+            # Una sola matriz float32 (filas sin copia) para el MMR
+            embeddings = (
+                np.asarray(results["embeddings"][0], dtype=np.float32)
+                if include_embeddings and results.get("embeddings") is not None
+                else None
+            )
             
             # Chroma devuelve resultados en formato diferente
             output = []
@@ -56,7 +143,7 @@ class ChromaVectorSearch(IVectorSearch):
                 
                     score = 1.0 / (1.0 + distance)
                     
-                    if score >= 0.5:
+                    if score >= self.score_threshold:
                         metadata_dict = {}
                         if results.get('metadatas') and len(results['metadatas'][0]) > i:
                             metadata_dict = results['metadatas'][0][i] if isinstance(results['metadatas'][0][i], dict) else {}
@@ -71,7 +158,7 @@ class ChromaVectorSearch(IVectorSearch):
                             score=score
                         )
                         
-                        output.append({
+                        chunk = {
                             "id": results['ids'][0][i],
                             "score": score,
                             "content": content,
@@ -82,7 +169,10 @@ class ChromaVectorSearch(IVectorSearch):
                                 for k, v in metadata_dict.items()
                                 if k not in ["document_id", "chunk_index"]
                             },
-                        })
+                        }
+                        if embeddings is not None:
+                            chunk["embedding"] = embeddings[i]
+                        output.append(chunk)
                     else:
                         logger.debug("Result filtered out", chunk_index=i+1, score=score)
             else:
@@ -93,3 +183,36 @@ class ChromaVectorSearch(IVectorSearch):
         except Exception as e:
             logger.error("Error searching similar", error=str(e), exc_info=True)
             return []
+
+    async def get_chunks(self, document_id: Optional[str] = None) -> List[Dict]:
+        # El cliente de Chroma es síncrono: fuera del event loop
+        return await asyncio.to_thread(self._get_chunks, document_id)
+
+    def _get_chunks(self, document_id: Optional[str]) -> List[Dict]:
+        collection = self.client.get_collection(name=self.get_active_collection_name())
+        where = {"document_id": document_id} if document_id else None
+        chunks = []
+        offset = 0
+        while True:
+            batch = collection.get(
+                where=where,
+                include=["documents", "metadatas"],
+                limit=self.page_size,
+                offset=offset,
+            )
+            ids = batch.get("ids") or []
+            documents = batch.get("documents") or [""] * len(ids)
+            metadatas = batch.get("metadatas") or [{}] * len(ids)
+            for chunk_id, content, metadata in zip(ids, documents, metadatas):
+                metadata = metadata or {}
+                chunks.append({
+                    "id": chunk_id,
+                    "score": 0.0,
+                    "content": content or "",
+                    "document_id": metadata.get("document_id"),
+                    "chunk_index": int(metadata.get("chunk_index", 0)),
+                    "metadata": {k: v for k, v in metadata.items() if k not in ["document_id", "chunk_index"]},
+                })
+            if len(ids) < self.page_size:
+                return chunks
+            offset += len(ids)
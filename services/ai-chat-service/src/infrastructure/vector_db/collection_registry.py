@@ -0,0 +1,99 @@
+import asyncio
+import os
+import time
+from typing import Any, Optional
+
+
+class ActiveCollection:
+    def __init__(self, collection: str, embedding_model: str):
+        self.collection = collection
+        self.embedding_model = embedding_model
+
+    def to_dict(self):
+        return {
+            "collection": self.collection,
+            "embeddingModel": self.embedding_model,
+        }
+
+
+class CollectionRegistry:
+    """
+    Lee el alias de colecciones que mantiene vectorization-service en Chroma:
+    colección versionada activa y modelo de embeddings con el que se generó.
+    El cliente de Chroma es síncrono: desde el event loop se usa
+    `get_active_nowait`, que nunca espera a Chroma.
+    """
+
+    def __init__(self, client: Any, alias: Optional[str] = None):
+        self.client = client
+        self.alias = alias or os.getenv("CHROMA_COLLECTION_NAME", "documents")
+        self.aliases_collection = os.getenv("CHROMA_ALIASES_COLLECTION", "collection_aliases")
+        self.default_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.ttl_seconds = float(os.getenv("CHROMA_ALIAS_TTL_SECONDS", "10"))
+        self._cached: Optional[ActiveCollection] = None
+        self._cached_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def get_active(self, refresh: bool = False) -> ActiveCollection:
+        """Colección activa para el alias (cacheada durante `CHROMA_ALIAS_TTL_SECONDS`)"""
+        if not refresh and self._cached and time.monotonic() - self._cached_at < self.ttl_seconds:
+            return self._cached
+
+        active = self._read_alias() or self._legacy_collection()
+        self._cached = active
+        self._cached_at = time.monotonic()
+        return active
+
+    def get_active_nowait(self) -> ActiveCollection:
+        """Última colección leída; si caducó se relee en un hilo (una sola lectura a la vez)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self.get_active()
+        if self._cached and time.monotonic() - self._cached_at < self.ttl_seconds:
+            return self._cached
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = loop.create_task(self.refresh())
+        # Sin ninguna lectura todavía (Chroma no respondía al arrancar): el modelo por defecto
+        return self._cached or ActiveCollection(collection=self.alias, embedding_model=self.default_model)
+
+    async def refresh(self) -> ActiveCollection:
+        return await asyncio.to_thread(self.get_active, True)
+
+    def set_active(self, collection: str, embedding_model: str) -> ActiveCollection:
+        """Colección activa conocida sin leer Chroma (evento collection.switched)"""
+        self._cached = ActiveCollection(collection=collection, embedding_model=embedding_model)
+        self._cached_at = time.monotonic()
+        return self._cached
+
+    def invalidate(self) -> None:
+        self._cached = None
+
+    def _read_alias(self) -> Optional[ActiveCollection]:
+        try:
+            aliases = self.client.get_collection(name=self.aliases_collection)
+            records = aliases.get(ids=[self.alias], include=["metadatas"])
+        except Exception:
+            return None
+
+        if not isinstance(records, dict) or not records.get("metadatas"):
+            return None
+        metadata = records["metadatas"][0] or {}
+        if not isinstance(metadata.get("collection"), str):
+            return None
+        return ActiveCollection(
+            collection=metadata["collection"],
+            embedding_model=metadata.get("embedding_model") or self.default_model,
+        )
+
+    def _legacy_collection(self) -> ActiveCollection:
+        # Sin alias: la colección se llama igual que el alias y el modelo se lee de su metadata
+        embedding_model = self.default_model
+        try:
+            collection = self.client.get_collection(name=self.alias)
+            stamped = (collection.metadata or {}).get("embedding_model")
+            if isinstance(stamped, str) and stamped:
+                embedding_model = stamped
+        except Exception:
+            pass
+        return ActiveCollection(collection=self.alias, embedding_model=embedding_model)
@@ -1,20 +1,44 @@
-from fastapi import FastAPI, HTTPException, Depends, Header, Query
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, List, Dict
+import asyncio
+import hashlib
+import json
 import os
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from jose import jwt, JWTError
 from dotenv import load_dotenv
 
 from src.infrastructure.services.openai_llm_service import OpenAILLMService
 from src.infrastructure.services.openai_embedding_service import OpenAIEmbeddingService
+from src.infrastructure.services.cached_embedding_service import CachedEmbeddingService
+from src.infrastructure.services.batching_embedding_service import BatchingEmbeddingService
+from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+from src.infrastructure.services.redis_answer_cache import RedisAnswerCache
+from src.infrastructure.services.redis_idempotency_store import IdempotencyKeyInUse, RedisIdempotencyStore
+from src.infrastructure.services.token_counter import TokenCounter
+from src.infrastructure.services.model_router import model_pricing
+from src.infrastructure.services.bm25_index import BM25Index
 from src.infrastructure.vector_db.chroma_vector_search import ChromaVectorSearch
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
 from src.infrastructure.repositories.redis_prompt_repository import RedisPromptRepository
+from src.infrastructure.repositories.cached_prompt_repository import CachedPromptRepository
 from src.infrastructure.repositories.mongo_evaluation_repository import MongoEvaluationRepository
+from src.infrastructure.repositories.mongo_conversation_repository import MongoConversationRepository
+from src.infrastructure.repositories.redis_conversation_repository import RedisConversationRepository
+from src.infrastructure.repositories.mongo_chat_job_repository import MongoChatJobRepository
 from src.infrastructure.messaging.kafka_event_publisher import KafkaEventPublisher
-from src.application.use_cases.send_message_use_case import SendMessageUseCase
+from src.infrastructure.messaging.kafka_event_consumer import KafkaEventConsumer
+from src.application.use_cases.send_message_use_case import SendMessageUseCase, embed_query
+from src.application.services.background_tasks import BackgroundTaskSupervisor
+from src.application.services.batch_chat_runner import BatchChatRunner
+from src.application.services.context_packer import ContextPacker
+from src.application.services.mmr import MMRSelector
+from src.application.services.conversation_memory import ConversationMemory
 from src.domain.entities.prompt_template import PromptTemplate
 from src.infrastructure.config.logger import logger
 
@@ -33,35 +57,109 @@ app.add_middleware(
 
 # Dependencies
 llm_service = OpenAILLMService()
-embedding_service = OpenAIEmbeddingService()
 vector_search = ChromaVectorSearch()
-prompt_repository = RedisPromptRepository()
+# El alias `documents` apunta a la colección activa; las consultas se embeben con su modelo
+collection_registry = CollectionRegistry(vector_search.client)
+vector_search.collection_registry = collection_registry
+redis_prompt_repository = RedisPromptRepository()
+redis_client = redis_prompt_repository.client
+# Templates en memoria, invalidados entre réplicas por Redis pub/sub
+prompt_repository = CachedPromptRepository(redis_prompt_repository, redis_client=redis_client)
+# Los fallos de la caché de embeddings de peticiones concurrentes van a OpenAI en un solo lote
+embedding_batcher = BatchingEmbeddingService(OpenAIEmbeddingService(collection_registry=collection_registry))
+# Caché de embeddings de consultas (memoria + Redis, reutilizando la conexión de prompts)
+embedding_service = CachedEmbeddingService(embedding_batcher, redis_client=redis_client)
 evaluation_repository = MongoEvaluationRepository()
 event_publisher = KafkaEventPublisher()
+# Memoria de conversaciones: Redis (turnos recientes) delante de Mongo (histórico completo)
+conversation_memory = ConversationMemory(
+    RedisConversationRepository(redis_client, MongoConversationRepository(evaluation_repository.db)),
+    llm_service,
+)
+# Índice léxico (BM25) de los chunks: búsqueda híbrida y consultas sin embedding
+lexical_index = BM25Index()
+# Contexto RAG dentro de un presupuesto de tokens (contados localmente)
+context_packer = ContextPacker(TokenCounter())
+# Chunks diversos entre los candidatos de Chroma (sin casi duplicados por el solapamiento)
+mmr_selector = MMRSelector()
+# Caché semántica de respuestas; se invalida con los eventos de documentos de vectorization-service
+answer_cache = SemanticAnswerCache()
+# Caché de respuestas por coincidencia exacta, compartida entre réplicas
+exact_answer_cache = RedisAnswerCache(redis_client)
+# Respuestas por `Idempotency-Key`: los reintentos de un POST no pagan otra respuesta
+idempotency_store = RedisIdempotencyStore(redis_client)
+event_consumer = KafkaEventConsumer()
+# Evaluaciones y auditoría se escriben después de responder
+background_tasks = BackgroundTaskSupervisor()
+chat_job_repository = MongoChatJobRepository(evaluation_repository.db)
+
+
+async def handle_corpus_changed(event: dict):
+    """Un documento procesado o eliminado cambia el corpus: las respuestas cacheadas dejan de valer"""
+    vector_search.invalidate()
+    answer_cache.invalidate(reason=event.get("eventType") or "corpus.changed")
+    await exact_answer_cache.bump_corpus_version()
+    await update_lexical_index(event)
+
+
+async def handle_collection_switched(event: dict):
+    if event.get("collection") and event.get("embeddingModel"):
+        collection_registry.set_active(event["collection"], event["embeddingModel"])
+    else:
+        await collection_registry.refresh()
+    vector_search.invalidate()
+    answer_cache.invalidate(reason="collection.switched")
+    await exact_answer_cache.bump_corpus_version()
+    await background_tasks.submit("lexical_index.rebuild", rebuild_lexical_index())
+
+
+async def update_lexical_index(event: dict):
+    document_id = event.get("documentId")
+    if not document_id:
+        return
+    try:
+        if event.get("eventType") == "document.deleted":
+            lexical_index.remove_document(document_id)
+        else:
+            lexical_index.add_document(document_id, await vector_search.get_chunks(document_id))
+    except Exception as e:
+        logger.warning("Error updating lexical index", document_id=document_id, error=str(e))
+
+
+async def rebuild_lexical_index():
+    try:
+        await lexical_index.rebuild(vector_search.get_chunks)
+    except Exception as e:
+        logger.warning("Error building lexical index, using vector search only", error=str(e))
+
+
+@app.on_event("startup")
+async def startup():
+    if isinstance(prompt_repository, CachedPromptRepository):
+        await prompt_repository.start()
+    # Alias leído antes de la primera consulta (después se refresca en segundo plano)
+    await collection_registry.refresh()
+    try:
+        event_consumer.subscribe("document.processed", handle_corpus_changed)
+        event_consumer.subscribe("document.deleted", handle_corpus_changed)
+        event_consumer.subscribe("collection.switched", handle_collection_switched)
+        await event_consumer.start()
+    except Exception as e:
+        logger.error("Error starting event consumer", error=str(e), exc_info=True)
+    # Sin esperar: hasta que termine, las consultas usan sólo la búsqueda vectorial
+    await background_tasks.submit("lexical_index.rebuild", rebuild_lexical_index())
+    # Índices de evaluaciones y volcado periódico del buffer, sin bloquear el arranque si Mongo tarda
+    await background_tasks.submit("evaluations.start", evaluation_repository.start())
+    # Jobs de chat por lotes en cola (también los que dejó a medias otra réplica)
+    batch_chat_runner.start()
 
 # Función helper para calcular costo basado en tokens y modelo
 def calculate_cost(tokens_input: int, tokens_output: int, model: str = "gpt-4o-mini") -> dict:
-    """Calcula el costo en USD basado en los tokens y el modelo usado"""
-    # Precios por 1M tokens (actualizados a enero 2024)
-    pricing = {
-        "gpt-4o-mini": {
-            "input": 0.15 / 1_000_000,  # $0.15 por 1M tokens
-            "output": 0.60 / 1_000_000,  # $0.60 por 1M tokens
-        },
-        "gpt-4o": {
-            "input": 2.50 / 1_000_000,  # $2.50 por 1M tokens
-            "output": 10.00 / 1_000_000,  # $10.00 por 1M tokens
-        },
-        "gpt-4-turbo": {
-            "input": 10.00 / 1_000_000,  # $10.00 por 1M tokens
-            "output": 30.00 / 1_000_000,  # $30.00 por 1M tokens
-        },
-    }
+    """Calcula el costo en USD basado en los tokens y el modelo usado (precios en MODEL_PRICING)"""
+    pricing = model_pricing(model)
     
-    model_pricing = pricing.get(model, pricing["gpt-4o-mini"])
-    
-    cost_input = tokens_input * model_pricing["input"]
-    cost_output = tokens_output * model_pricing["output"]
+    cost_input = tokens_input * pricing["input"]
+    cost_output = tokens_output * pricing["output"]
     cost_total = cost_input + cost_output
     
     return {
@@ -111,12 +209,20 @@ class ChatRequest(BaseModel):
         allow_population_by_field_name = True
 
 
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(min_length=1)
+    promptTemplateId: Optional[str] = None
+
+
 class CreatePromptRequest(BaseModel):
     name: str
     description: str
     systemPrompt: str
     userPromptTemplate: Optional[str] = None
     parameters: Optional[List[Dict]] = None
+    contextTokenBudget: Optional[int] = Field(default=None, gt=0)
+    mmrLambda: Optional[float] = Field(default=None, ge=0, le=1)
+    modelPolicy: Optional[Literal["auto", "fast", "default", "strong"]] = None
 
 
 class UpdatePromptRequest(BaseModel):
@@ -125,6 +231,9 @@ class UpdatePromptRequest(BaseModel):
     systemPrompt: Optional[str] = None
     userPromptTemplate: Optional[str] = None
     parameters: Optional[List[Dict]] = None
+    contextTokenBudget: Optional[int] = Field(default=None, gt=0)
+    mmrLambda: Optional[float] = Field(default=None, ge=0, le=1)
+    modelPolicy: Optional[Literal["auto", "fast", "default", "strong"]] = None
 
 
 @app.get("/health")
@@ -137,7 +246,8 @@ async def rag_status():
     """Endpoint de diagnóstico para verificar el estado del RAG"""
     try:
         # Intentar obtener la colección
-        collection = vector_search.client.get_collection(name=vector_search.collection_name)
+        collection_name = vector_search.get_active_collection_name()
+        collection = vector_search.client.get_collection(name=collection_name)
         count = collection.count()
         
         # Intentar una búsqueda de prueba
@@ -151,11 +261,12 @@ async def rag_status():
             "success": True,
             "data": {
                 "chroma_connected": True,
-                "collection_name": vector_search.collection_name,
+                "collection_name": collection_name,
+                "collection_alias": vector_search.collection_name,
                 "document_count": count,
                 "chroma_host": os.getenv("CHROMA_HOST", "localhost"),
                 "chroma_port": os.getenv("CHROMA_PORT", "8000"),
-                "embedding_model": os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+                "embedding_model": collection_registry.get_active().embedding_model,
                 "has_documents": count > 0,
                 "test_query_works": True,
             }
@@ -176,97 +287,384 @@ async def rag_status():
         }
 
 
-@app.post("/api/ai/chat")
-async def chat(
-    request: ChatRequest,
-    user_id: str = Depends(get_user_id),
-):
-
-    # Obtener el prompt del template si se especifica, sino usar el default
-    system_prompt = os.getenv(
-        "DEFAULT_SYSTEM_PROMPT",
-        "Eres un asistente útil. Responde preguntas basándote en el contexto proporcionado.",
+async def resolve_prompt(prompt_template_id: Optional[str]) -> PromptTemplate:
+    """Template a usar: el solicitado si existe, sino uno con el system prompt por defecto"""
+    default_prompt = PromptTemplate(
+        id="default",
+        name="default",
+        description="",
+        system_prompt=os.getenv(
+            "DEFAULT_SYSTEM_PROMPT",
+            "Eres un asistente útil. Responde preguntas basándote en el contexto proporcionado.",
+        ),
     )
-    user_prompt_template = None
-    
-    if request.promptTemplateId:
-        logger.info("Using prompt template", prompt_template_id=request.promptTemplateId)
+
+    if prompt_template_id:
+        logger.info("Using prompt template", prompt_template_id=prompt_template_id)
         try:
-            prompt_template = await prompt_repository.get_by_id(request.promptTemplateId)
+            prompt_template = await prompt_repository.get_by_id(prompt_template_id)
             if prompt_template:
-                system_prompt = prompt_template.system_prompt
                 user_prompt_template = prompt_template.user_prompt_template
                 logger.info("Loaded prompt template", 
                     prompt_name=prompt_template.name,
-                    system_prompt_length=len(system_prompt),
+                    system_prompt_length=len(prompt_template.system_prompt),
                     has_user_template=user_prompt_template is not None,
                     user_template_length=len(user_prompt_template) if user_prompt_template else 0
                 )
+                return prompt_template
             else:
-                logger.warning("Prompt template not found in Redis", prompt_template_id=request.promptTemplateId)
-                try:
-                    all_prompts = await prompt_repository.get_all()
-                    logger.info("Available prompts in Redis", prompt_count=len(all_prompts))
-                except Exception as e:
-                    logger.error("Error listing prompts", error=str(e))
+                logger.warning("Prompt template not found", prompt_template_id=prompt_template_id)
         except Exception as e:
-            logger.error("Error loading prompt template", prompt_template_id=request.promptTemplateId, error=str(e), exc_info=True)
+            logger.error("Error loading prompt template", prompt_template_id=prompt_template_id, error=str(e), exc_info=True)
     else:
         logger.info("No prompt template ID provided, using default system prompt")
 
-    use_case = SendMessageUseCase(
+    return default_prompt
+
+
+async def save_evaluation(response: dict, prompt_template_id: Optional[str], new_conversation: bool = False) -> None:
+    """Guarda la evaluación de la conversación en el buffer del repositorio (no falla la petición si falla)"""
+    try:
+        tokens = response.get("tokens", {})
+        # Modelo elegido por el router (los aciertos de caché no llaman al LLM)
+        model = response.get("model") or os.getenv("LLM_MODEL", "gpt-4o-mini")
+        cost = calculate_cost(
+            tokens_input=tokens.get("input", 0),
+            tokens_output=tokens.get("output", 0),
+            model=model,
+        )
+        metrics = {
+            "latency": response.get("latency", 0),
+            "tokens": tokens,
+            "cost": cost,
+            "model": model,
+            "cached": response.get("cache") is not None,
+            # Primer mensaje de la conversación: cuenta conversaciones en los rollups
+            "newConversation": new_conversation,
+        }
+        if response.get("cache"):
+            metrics["cache"] = response["cache"]
+        if response.get("routing"):
+            metrics["routing"] = response["routing"]
+        
+        await evaluation_repository.create(
+            conversation_id=response.get("conversationId", ""),
+            prompt_template_id=prompt_template_id,
+            metrics=metrics,
+            quality=None,  # TODO: Implementar evaluación de calidad
+        )
+    except Exception as e:
+        logger.warning("Error saving evaluation", error=str(e))
+        # No fallar la petición si falla guardar la evaluación
+
+
+async def build_send_message_use_case(prompt_template_id: Optional[str], with_memory: bool = True) -> SendMessageUseCase:
+    prompt = await resolve_prompt(prompt_template_id)
+    return SendMessageUseCase(
         llm_service=llm_service,
         vector_search=vector_search,
         embedding_service=embedding_service,
-        system_prompt=system_prompt,
-        user_prompt_template=user_prompt_template,
+        system_prompt=prompt.system_prompt,
+        user_prompt_template=prompt.user_prompt_template,
+        answer_cache=answer_cache,
+        cache_scope=answer_cache_scope(prompt_template_id, prompt),
+        conversation_memory=conversation_memory if with_memory else None,
+        context_packer=context_packer,
+        context_token_budget=prompt.context_token_budget,
+        lexical_index=lexical_index,
+        mmr_selector=mmr_selector,
+        mmr_lambda=prompt.mmr_lambda,
+        model_policy=prompt.model_policy,
     )
 
-    try:
-        response = await use_case.execute(
+
+async def build_batch_use_case(prompt_template_id: Optional[str]) -> SendMessageUseCase:
+    # Las preguntas de un lote no son conversaciones: sin memoria
+    return await build_send_message_use_case(prompt_template_id, with_memory=False)
+
+
+batch_chat_runner = BatchChatRunner(chat_job_repository, build_batch_use_case, embedding_service, lexical_index)
+
+
+async def prepare_chat(message: str, prompt_template_id: Optional[str]) -> tuple[SendMessageUseCase, asyncio.Task]:
+    """
+    Caso de uso con su template y embedding de la consulta ya en curso: son
+    etapas independientes, así que el embedding se solapa con la lectura del
+    template (y con la caché exacta).
+    """
+    query_embedding = asyncio.create_task(embed_query(embedding_service, message, lexical_index=lexical_index))
+    use_case = await build_send_message_use_case(prompt_template_id)
+    return use_case, query_embedding
+
+
+def discard_task(task: asyncio.Task) -> None:
+    """Cancela una tarea cuyo resultado ya no hace falta (sin dejar excepciones sin recoger)"""
+    task.cancel()
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+
+def answer_cache_scope(prompt_template_id: Optional[str], prompt: PromptTemplate) -> str:
+    """Scope de la caché de respuestas: template y hash de su contenido (editar el template cambia el scope)"""
+    content = (
+        f"{prompt.system_prompt}\0{prompt.user_prompt_template or ''}"
+        f"\0{prompt.context_token_budget or ''}\0{'' if prompt.mmr_lambda is None else prompt.mmr_lambda}"
+        f"\0{prompt.model_policy or ''}"
+    )
+    digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+    return f"{prompt_template_id or 'default'}:{digest}"
+
+
+def answer_cache_models() -> str:
+    """Modelos de la clave de la caché exacta: con el router, los de todos los niveles y la política"""
+    if isinstance(llm_service, OpenAILLMService):
+        return llm_service.router.cache_key()
+    return os.getenv("LLM_MODEL", "gpt-4o-mini")
+
+
+def cached_answer_response(answer: dict, conversation_id: Optional[str], started: float) -> dict:
+    return {
+        "message": answer["message"],
+        "conversationId": conversation_id or str(uuid.uuid4()),
+        "tokens": {"input": 0, "output": 0, "total": 0},
+        "latency": int((time.time() - started) * 1000),
+        "sources": answer.get("sources", []),
+        "cache": {"type": "exact"},
+    }
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def chat_fingerprint(request: ChatRequest) -> str:
+    """Huella de la petición: una `Idempotency-Key` sólo puede repetirse con la misma petición"""
+    payload = json.dumps([request.message, request.conversationId, request.promptTemplateId], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@app.post("/api/ai/chat")
+async def chat(
+    request: ChatRequest,
+    http_response: Response,
+    user_id: str = Depends(get_user_id),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    # Mientras dure, los jobs por lotes ceden un hueco de concurrencia
+    with batch_chat_runner.interactive():
+        if not idempotency_key or idempotency_store is None:
+            return {"success": True, "data": await answer_chat(request, user_id)}
+
+        try:
+            response, replayed = await idempotency_store.run(
+                user_id,
+                idempotency_key,
+                chat_fingerprint(request),
+                lambda: answer_chat(request, user_id),
+            )
+        except IdempotencyKeyInUse as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if replayed:
+            http_response.headers["Idempotent-Replayed"] = "true"
+        return {"success": True, "data": response}
+
+
+async def answer_chat(request: ChatRequest, user_id: str) -> dict:
+    use_case, query_embedding = await prepare_chat(request.message, request.promptTemplateId)
+
+    async def generate():
+        return await use_case.execute(
             user_message=request.message,
             conversation_id=request.conversationId,
             user_id=user_id,
             use_rag=True,
+            query_embedding=query_embedding,
         )
 
-        # Guardar evaluación de la conversación
-        try:
-            tokens = response.get("tokens", {})
-            model = os.getenv("LLM_MODEL", "gpt-4o-mini")
-            cost = calculate_cost(
-                tokens_input=tokens.get("input", 0),
-                tokens_output=tokens.get("output", 0),
-                model=model,
-            )
-            
-            await evaluation_repository.create(
-                conversation_id=response.get("conversationId", ""),
-                prompt_template_id=request.promptTemplateId,
-                metrics={
-                    "latency": response.get("latency", 0),
-                    "tokens": tokens,
-                    "cost": cost,
-                },
-                quality=None,  # TODO: Implementar evaluación de calidad
+    try:
+        started = time.time()
+        # Con memoria, una conversación existente depende de su historial: sin caché exacta
+        if exact_answer_cache is None or (conversation_memory is not None and request.conversationId):
+            response = await generate()
+        else:
+            # Las peticiones idénticas simultáneas comparten el cálculo de la primera
+            result, cached = await exact_answer_cache.get_or_compute(
+                request.message,
+                use_case.cache_scope,
+                answer_cache_models(),
+                generate,
             )
+            response = cached_answer_response(result, request.conversationId, started) if cached else result
+            if cached:
+                discard_task(query_embedding)
+            if cached and conversation_memory is not None:
+                await conversation_memory.record_turn(response["conversationId"], user_id, request.message, response)
+
+        # Guardar evaluación de la conversación (también en aciertos de caché, marcada como cached)
+        await save_evaluation(response, request.promptTemplateId, new_conversation=not request.conversationId)
+
+        return response
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/ai/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Chat en streaming (Server-Sent Events): `sources` con las fuentes,
+    `token` por cada fragmento de la respuesta y `done` con la respuesta
+    completa, tokens y latencia. La evaluación se guarda al terminar el stream.
+    """
+    use_case, query_embedding = await prepare_chat(request.message, request.promptTemplateId)
+
+    async def event_stream():
+        final = None
+        try:
+            with batch_chat_runner.interactive():
+                async for item in use_case.execute_stream(
+                    user_message=request.message,
+                    conversation_id=request.conversationId,
+                    user_id=user_id,
+                    use_rag=True,
+                    query_embedding=query_embedding,
+                ):
+                    if item["event"] == "done":
+                        final = item["data"]
+                    yield sse_event(item["event"], item["data"])
         except Exception as e:
-            logger.warning("Error saving evaluation", error=str(e))
-            # No fallar la petición si falla guardar la evaluación
+            logger.error("Error streaming chat response", error=str(e), exc_info=True)
+            yield sse_event("error", {"detail": str(e)})
+            return
 
-        return {"success": True, "data": response}
+        if final:
+            await save_evaluation(final, request.promptTemplateId, new_conversation=not request.conversationId)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/ai/chat/jobs", status_code=202)
+async def create_chat_job(
+    request: BatchChatRequest,
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Encola un job con muchas preguntas (evaluaciones offline, conjuntos de
+    preguntas) que se responden en segundo plano con el template indicado.
+    El estado se consulta en `/api/ai/chat/jobs/{id}` y las respuestas en
+    `/api/ai/chat/jobs/{id}/results`.
+    """
+    max_questions = int(os.getenv("BATCH_CHAT_MAX_QUESTIONS", "10000"))
+    if len(request.questions) > max_questions:
+        raise HTTPException(status_code=400, detail=f"A job accepts at most {max_questions} questions")
+    if any(not question.strip() for question in request.questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    try:
+        job = await chat_job_repository.create(user_id, request.promptTemplateId, request.questions)
+        batch_chat_runner.notify()
+        return {"success": True, "data": format_chat_job(job)}
     except Exception as e:
+        logger.error("Error creating chat job", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/ai/chat/jobs/{job_id}")
+async def get_chat_job(job_id: str, user_id: str = Depends(get_user_id)):
+    return {"success": True, "data": format_chat_job(await get_user_chat_job(job_id, user_id))}
+
+
+@app.get("/api/ai/chat/jobs/{job_id}/results")
+async def get_chat_job_results(
+    job_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor `nextCursor` de la página anterior"),
+    user_id: str = Depends(get_user_id),
+):
+    """Respuestas del job por posición de la pregunta (las pendientes con `status: pending`)"""
+    await get_user_chat_job(job_id, user_id)
+    try:
+        after = int(cursor) if cursor else -1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    results = await chat_job_repository.get_results(job_id, after=after, limit=limit + 1)
+    next_cursor = str(results[limit - 1]["index"]) if len(results) > limit else None
+    return {
+        "success": True,
+        "data": [format_chat_job_result(result) for result in results[:limit]],
+        "nextCursor": next_cursor,
+    }
+
+
+async def get_user_chat_job(job_id: str, user_id: str) -> dict:
+    job = await chat_job_repository.get(job_id)
+    if not job or job.get("userId") != user_id:
+        raise HTTPException(status_code=404, detail="Chat job not found")
+    return job
+
+
+def format_chat_job(job: dict) -> dict:
+    def iso(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    return {
+        "id": job["_id"],
+        "status": job["status"],
+        "promptTemplateId": job.get("promptTemplateId"),
+        "total": job.get("total", 0),
+        "completed": job.get("completed", 0),
+        "failed": job.get("failed", 0),
+        "tokens": job.get("tokens"),
+        "error": job.get("error"),
+        "createdAt": iso(job.get("createdAt")),
+        "startedAt": iso(job.get("startedAt")),
+        "finishedAt": iso(job.get("finishedAt")),
+    }
+
+
+def format_chat_job_result(result: dict) -> dict:
+    completed_at = result.get("completedAt")
+    return {
+        "index": result["index"],
+        "question": result.get("question"),
+        "status": result.get("status"),
+        "message": result.get("message"),
+        "sources": result.get("sources", []),
+        "tokens": result.get("tokens"),
+        "latency": result.get("latency"),
+        "shared": result.get("shared", False),
+        "error": result.get("error"),
+        "completedAt": completed_at.isoformat() if isinstance(completed_at, datetime) else completed_at,
+    }
+
+
 @app.get("/api/ai/prompts")
-async def get_prompts():
+async def get_prompts(
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Tamaño de página (sin limit se devuelven todos)"),
+    cursor: Optional[str] = Query(None, description="Cursor `nextCursor` de la página anterior"),
+):
     try:
-        prompts = await prompt_repository.get_all()
+        if limit is None and cursor is None:
+            prompts = await prompt_repository.get_all()
+            return {
+                "success": True,
+                "data": [prompt.to_dict() for prompt in prompts]
+            }
+
+        prompts, next_cursor = await prompt_repository.get_page(limit=limit or 50, cursor=cursor)
         return {
             "success": True,
-            "data": [prompt.to_dict() for prompt in prompts]
+            "data": [prompt.to_dict() for prompt in prompts],
+            "nextCursor": next_cursor,
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error("Error getting prompts", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -285,27 +683,27 @@ async def create_prompt(
             system_prompt=request.systemPrompt,
             user_prompt_template=request.userPromptTemplate,
             parameters=request.parameters or [],
+            context_token_budget=request.contextTokenBudget,
+            mmr_lambda=request.mmrLambda,
+            model_policy=request.modelPolicy,
         )
         
         created_prompt = await prompt_repository.create(prompt)
         
         # Publicar evento de auditoría: Prompt creado
-        try:
-            await event_publisher.publish(
-                "audit.event",
-                {
-                    "userId": user_id,
-                    "action": "CREATE",
-                    "entityType": "PROMPT",
-                    "entityId": created_prompt.id,
-                    "details": {
-                        "name": created_prompt.name,
-                        "description": created_prompt.description,
-                    },
+        await background_tasks.submit("audit.event", event_publisher.publish(
+            "audit.event",
+            {
+                "userId": user_id,
+                "action": "CREATE",
+                "entityType": "PROMPT",
+                "entityId": created_prompt.id,
+                "details": {
+                    "name": created_prompt.name,
+                    "description": created_prompt.description,
                 },
-            )
-        except:
-            pass  # No crítico si falla
+            },
+        ))
         
         return {
             "success": True,
@@ -356,26 +754,29 @@ async def update_prompt(
             prompt.user_prompt_template = request.userPromptTemplate
         if request.parameters is not None:
             prompt.parameters = request.parameters
+        if request.contextTokenBudget is not None:
+            prompt.context_token_budget = request.contextTokenBudget
+        if request.mmrLambda is not None:
+            prompt.mmr_lambda = request.mmrLambda
+        if request.modelPolicy is not None:
+            prompt.model_policy = request.modelPolicy
         
         updated_prompt = await prompt_repository.update(prompt)
         
         # Publicar evento de auditoría: Prompt actualizado
-        try:
-            await event_publisher.publish(
-                "audit.event",
-                {
-                    "userId": user_id,
-                    "action": "UPDATE",
-                    "entityType": "PROMPT",
-                    "entityId": prompt_id,
-                    "details": {
-                        "name": updated_prompt.name,
-                        "description": updated_prompt.description,
-                    },
+        await background_tasks.submit("audit.event", event_publisher.publish(
+            "audit.event",
+            {
+                "userId": user_id,
+                "action": "UPDATE",
+                "entityType": "PROMPT",
+                "entityId": prompt_id,
+                "details": {
+                    "name": updated_prompt.name,
+                    "description": updated_prompt.description,
                 },
-            )
-        except:
-            pass  # No crítico si falla
+            },
+        ))
         
         return {
             "success": True,
@@ -403,21 +804,18 @@ async def delete_prompt(
             raise HTTPException(status_code=404, detail="Prompt not found")
         
         # Publicar evento de auditoría: Prompt eliminado
-        try:
-            await event_publisher.publish(
-                "audit.event",
-                {
-                    "userId": user_id,
-                    "action": "DELETE",
-                    "entityType": "PROMPT",
-                    "entityId": prompt_id,
-                    "details": {
-                        "name": prompt_name,
-                    },
+        await background_tasks.submit("audit.event", event_publisher.publish(
+            "audit.event",
+            {
+                "userId": user_id,
+                "action": "DELETE",
+                "entityType": "PROMPT",
+                "entityId": prompt_id,
+                "details": {
+                    "name": prompt_name,
                 },
-            )
-        except:
-            pass  # No crítico si falla
+            },
+        ))
         
         return {
             "success": True,
@@ -432,53 +830,95 @@ async def delete_prompt(
 
 @app.get("/api/ai/evaluations")
 async def get_evaluations(
-    limit: Optional[int] = Query(None, description="Número máximo de evaluaciones a retornar"),
-    offset: Optional[int] = Query(None, description="Número de evaluaciones a saltar"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página (50 por defecto)"),
+    offset: Optional[int] = Query(None, description="Número de evaluaciones a saltar (obsoleto: usar cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor `nextCursor` de la página anterior"),
+    count: Literal["estimated", "exact", "none"] = Query("estimated", description="Cómo calcular `total`"),
 ):
-    """Obtiene las evaluaciones de las conversaciones con paginación"""
+    """Obtiene las evaluaciones de las conversaciones con paginación por cursor"""
     try:
-        evaluations, total = await evaluation_repository.get_all(limit=limit, offset=offset)
-        
-        # Convertir datetime a string ISO para JSON
-        formatted_evaluations = []
-        for eval in evaluations:
-            formatted_eval = {
-                "conversationId": eval["conversationId"],
-                "promptTemplateId": eval.get("promptTemplateId"),
-                "metrics": eval["metrics"],
-                "quality": eval.get("quality"),
-                "timestamp": eval["timestamp"].isoformat() if isinstance(eval["timestamp"], datetime) else eval["timestamp"],
-            }
-            formatted_evaluations.append(formatted_eval)
+        if offset:
+            evaluations, total = await evaluation_repository.get_all(limit=limit or 50, offset=offset)
+            next_cursor = None
+        else:
+            evaluations, next_cursor, total = await evaluation_repository.get_page(
+                limit=limit or 50, cursor=cursor, count=count
+            )
         
         return {
             "success": True,
-            "data": formatted_evaluations,
+            "data": [format_evaluation(evaluation) for evaluation in evaluations],
             "total": total,
+            "nextCursor": next_cursor,
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error("Error getting evaluations", error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/ai/evaluations/export")
+async def export_evaluations(
+    start: Optional[datetime] = Query(None, alias="from", description="Inicio del rango (ISO 8601, UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Fin del rango (ISO 8601, UTC)"),
+):
+    """Exporta las evaluaciones como NDJSON (una por línea), sin cargarlas en memoria"""
+    batch_size = int(os.getenv("EVALUATION_EXPORT_BATCH_SIZE", "1000"))
+
+    async def lines():
+        batch = []
+        try:
+            async for evaluation in evaluation_repository.iter_all(batch_size, _utc_naive(start), _utc_naive(end)):
+                batch.append(json.dumps(format_evaluation(evaluation), default=str))
+                if len(batch) >= batch_size:
+                    yield "\n".join(batch) + "\n"
+                    batch = []
+            if batch:
+                yield "\n".join(batch) + "\n"
+        except Exception as e:
+            # Ya se envió la cabecera: el export queda truncado y se registra
+            logger.error("Error exporting evaluations", error=str(e), exc_info=True)
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="evaluations.ndjson"'},
+    )
+
+
+def format_evaluation(evaluation: dict) -> dict:
+    # Convertir datetime a string ISO para JSON
+    timestamp = evaluation["timestamp"]
+    return {
+        "conversationId": evaluation["conversationId"],
+        "promptTemplateId": evaluation.get("promptTemplateId"),
+        "metrics": evaluation["metrics"],
+        "quality": evaluation.get("quality"),
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+    }
+
+
 @app.get("/api/ai/metrics")
-async def get_metrics():
-    """Obtiene métricas agregadas del servicio"""
+async def get_metrics(
+    start: Optional[datetime] = Query(None, alias="from", description="Inicio del rango (ISO 8601, UTC)"),
+    end: Optional[datetime] = Query(None, alias="to", description="Fin del rango (ISO 8601, UTC)"),
+    prompt_template_id: Optional[str] = Query(None, alias="promptTemplateId"),
+    model: Optional[str] = Query(None),
+):
+    """Obtiene métricas agregadas del servicio (todo el histórico o un rango) desde los rollups"""
     try:
-        # Obtener todas las evaluaciones para calcular métricas
-        evaluations, total = await evaluation_repository.get_all(limit=1000)
-        
-        total_conversations = len(set(eval["conversationId"] for eval in evaluations))
-        total_messages = len(evaluations)
-        total_tokens = sum(eval["metrics"].get("tokens", {}).get("total", 0) for eval in evaluations)
-        total_cost = sum(eval["metrics"].get("cost", {}).get("total", 0) for eval in evaluations)
-        
-        latencies = [eval["metrics"].get("latency", 0) for eval in evaluations if eval["metrics"].get("latency", 0) > 0]
-        average_latency = sum(latencies) / len(latencies) if latencies else 0
+        summary = await evaluation_repository.rollups.summary(
+            start=_utc_naive(start),
+            end=_utc_naive(end),
+            prompt_template_id=prompt_template_id,
+            model=model,
+        )
+        totals = summary["totals"]
         
         # Obtener conteo de documentos desde ChromaDB
         try:
-            collection = vector_search.client.get_collection(name=vector_search.collection_name)
+            collection = vector_search.client.get_collection(name=vector_search.get_active_collection_name())
             documents_processed = collection.count()
         except:
             documents_processed = 0
@@ -486,12 +926,30 @@ async def get_metrics():
         return {
             "success": True,
             "data": {
-                "totalConversations": total_conversations,
-                "totalMessages": total_messages,
-                "totalTokens": total_tokens,
-                "totalCost": total_cost,
-                "averageLatency": average_latency,
+                "totalConversations": totals["conversations"],
+                "totalMessages": totals["messages"],
+                "totalTokens": totals["tokens"]["total"],
+                "totalCost": totals["cost"],
+                "averageLatency": totals["averageLatency"],
+                "latencyPercentiles": summary["latencyPercentiles"],
+                "byTemplate": summary["byTemplate"],
+                "range": {
+                    "from": start.isoformat() if start else None,
+                    "to": end.isoformat() if end else None,
+                    "granularity": summary["granularity"],
+                },
                 "documentsProcessed": documents_processed,
+                "cachedMessages": totals["cachedMessages"],
+                "embeddingCache": embedding_service.stats() if isinstance(embedding_service, CachedEmbeddingService) else None,
+                "embeddingBatcher": embedding_batcher.stats() if isinstance(embedding_batcher, BatchingEmbeddingService) else None,
+                "answerCache": answer_cache.stats() if isinstance(answer_cache, SemanticAnswerCache) else None,
+                "exactAnswerCache": exact_answer_cache.stats() if isinstance(exact_answer_cache, RedisAnswerCache) else None,
+                "idempotency": idempotency_store.stats() if isinstance(idempotency_store, RedisIdempotencyStore) else None,
+                "batchChat": batch_chat_runner.stats() if isinstance(batch_chat_runner, BatchChatRunner) else None,
+                "modelRouter": llm_service.router.stats() if isinstance(llm_service, OpenAILLMService) else None,
+                "backgroundTasks": background_tasks.stats(),
+                "lexicalIndex": lexical_index.stats() if isinstance(lexical_index, BM25Index) else None,
+                "evaluationWriter": evaluation_repository.stats() if isinstance(evaluation_repository, MongoEvaluationRepository) else None,
             },
         }
     except Exception as e:
@@ -510,9 +968,23 @@ async def get_metrics():
         }
 
 
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Las evaluaciones guardan `datetime.utcnow()` (UTC sin zona)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
 @app.on_event("shutdown")
 async def shutdown():
+    if isinstance(prompt_repository, CachedPromptRepository):
+        await prompt_repository.stop()
+    if conversation_memory is not None:
+        await conversation_memory.drain()
+    await event_consumer.stop()
+    await background_tasks.drain()
     await event_publisher.disconnect()
+    await batch_chat_runner.close()
     await evaluation_repository.close()
 
 
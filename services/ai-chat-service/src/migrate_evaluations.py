@@ -0,0 +1,42 @@
+"""
+Migración de las evaluaciones a una colección time-series.
+
+Completa los rollups con el histórico, renombra la colección `evaluations`
+actual a `evaluations_legacy`, crea `evaluations` como time-series y copia
+las evaluaciones en lotes. Se puede interrumpir y volver a lanzar: reanuda
+tras la última evaluación copiada. Lanzar con el ai-chat-service parado: sus
+escrituras durante el cambio de nombre crearían `evaluations` como colección
+normal.
+
+Uso:
+    python -m src.migrate_evaluations --batch-size 1000 --drop-legacy
+"""
+import argparse
+import asyncio
+from typing import List, Optional
+from dotenv import load_dotenv
+
+from src.infrastructure.repositories.mongo_evaluation_repository import MongoEvaluationRepository
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Move evaluations to a MongoDB time-series collection")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-legacy", action="store_true", help="Borrar `evaluations_legacy` al terminar")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> dict:
+    load_dotenv()
+    args = parse_args(argv)
+
+    repository = MongoEvaluationRepository()
+    try:
+        return await repository.migrate_legacy(batch_size=args.batch_size, drop_legacy=args.drop_legacy)
+    finally:
+        repository.client.close()
+
+
+if __name__ == "__main__":
+    result = asyncio.run(main())
+    print(result)
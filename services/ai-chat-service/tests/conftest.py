@@ -120,3 +120,162 @@ def sample_conversation(sample_message):
         title="Test Conversation",
         messages=[sample_message],
     )
+
+
+class FakeRedis:
+    """Redis en memoria (subconjunto de redis.asyncio con decode_responses=True)"""
+
+    def __init__(self):
+        self.data = {}
+        self.expirations = {}
+        self.sorted_sets = {}
+        self.subscribers = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if ex:
+            self.expirations[key] = ex
+        return True
+
+    async def delete(self, *keys):
+        return sum(
+            1 for key in keys
+            if self.data.pop(key, None) is not None or self.sorted_sets.pop(key, None) is not None
+        )
+
+    async def exists(self, *keys):
+        return sum(1 for key in keys if key in self.data or key in self.sorted_sets)
+
+    async def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+        return len(members)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    async def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    async def lrange(self, key, start, end):
+        values = self.data.get(key, [])
+        start = max(len(values) + start, 0) if start < 0 else start
+        end = len(values) + end if end < 0 else end
+        return values[start:end + 1]
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = await self.lrange(key, start, end)
+        return True
+
+    async def expire(self, key, seconds):
+        self.expirations[key] = seconds
+        return key in self.data
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def zrem(self, key, *members):
+        return sum(1 for member in members if self.sorted_sets.get(key, {}).pop(member, None) is not None)
+
+    def _zrevsorted(self, key):
+        return sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    async def zrevrange(self, key, start, end):
+        members = [member for member, _ in self._zrevsorted(key)]
+        return members[start:] if end == -1 else members[start:end + 1]
+
+    async def zrevrangebyscore(self, key, max, min, start=None, num=None, withscores=False):
+        max_score = float("inf") if max == "+inf" else float(max)
+        min_score = float("-inf") if min == "-inf" else float(min)
+        items = [item for item in self._zrevsorted(key) if min_score <= item[1] <= max_score]
+        if start is not None:
+            items = items[start:start + num]
+        return items if withscores else [member for member, _ in items]
+
+    async def zcard(self, key):
+        return len(self.sorted_sets.get(key, {}))
+
+    async def zpopmin(self, key, count=1):
+        members = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: item[1])[:count]
+        for member, _ in members:
+            del self.sorted_sets[key][member]
+        return members
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self)
+
+    async def publish(self, channel, message):
+        for pubsub in self.subscribers:
+            if channel in pubsub.channels:
+                pubsub.messages.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(self.subscribers)
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        import asyncio
+        self.redis = redis
+        self.channels = set()
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+        self.redis.subscribers.append(self)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def reset(self):
+        self.channels.clear()
+        if self in self.redis.subscribers:
+            self.redis.subscribers.remove(self)
+
+
+class FakeRedisPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        results = [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def fake_redis():
+    """Redis en memoria para cachés"""
+    return FakeRedis()
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from src.application.services.background_tasks import BackgroundTaskSupervisor
+
+
+class TestBackgroundTaskSupervisor:
+    @pytest.mark.asyncio
+    async def test_submit_runs_off_the_caller_and_drains(self):
+        """Test de que la tarea no bloquea a quien la envía y drain() la espera"""
+        supervisor = BackgroundTaskSupervisor()
+        release = asyncio.Event()
+        done = []
+
+        async def work():
+            await release.wait()
+            done.append(True)
+
+        await supervisor.submit("work", work())
+        assert supervisor.stats()["pending"] == 1
+
+        release.set()
+        await supervisor.drain()
+
+        assert done == [True]
+        assert supervisor.stats() == {"pending": 0, "completed": 1, "failed": 0, "ranInline": 0}
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_not_raised(self):
+        """Test de que el error de una tarea se registra sin propagarse"""
+        supervisor = BackgroundTaskSupervisor(inline=True)
+
+        async def failing():
+            raise RuntimeError("mongo down")
+
+        await supervisor.submit("save_evaluation", failing())
+
+        assert supervisor.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_runs_inline_when_too_many_pending(self):
+        """Test de back-pressure: con el máximo de tareas en curso la siguiente se ejecuta en línea"""
+        supervisor = BackgroundTaskSupervisor(max_pending=1)
+        release = asyncio.Event()
+
+        await supervisor.submit("slow", release.wait())
+        await supervisor.submit("fast", asyncio.sleep(0))
+
+        assert supervisor.stats()["ranInline"] == 1
+        assert supervisor.stats()["pending"] == 1
+        release.set()
+        await supervisor.drain()
@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.application.services.batch_chat_runner import AdaptiveLimiter, BatchChatRunner, retry_after
+
+JOB = {"_id": "job-1", "userId": "user-1", "promptTemplateId": "prompt-1"}
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after_header="0"):
+        super().__init__("rate limited")
+        self.response = Mock(headers={"retry-after": retry_after_header})
+
+
+def repository(questions):
+    repo = Mock()
+    repo.pending_items = AsyncMock(return_value=[{"index": i, "question": q} for i, q in enumerate(questions)])
+    repo.save_results = AsyncMock()
+    repo.finish = AsyncMock()
+    repo.heartbeat = AsyncMock()
+    return repo
+
+
+def saved_results(repo):
+    return sorted(
+        (result for call in repo.save_results.await_args_list for result in call.args[1]),
+        key=lambda result: result["index"],
+    )
+
+
+def runner(repo, use_case, embedding_service, **kwargs):
+    return BatchChatRunner(repo, AsyncMock(return_value=use_case), embedding_service, workers=4, page_size=2, **kwargs)
+
+
+def answer(message="Respuesta"):
+    return {"message": message, "sources": [], "tokens": {"input": 10, "output": 5, "total": 15}, "latency": 100}
+
+
+class TestBatchChatRunner:
+    @pytest.fixture
+    def embedding_service(self):
+        service = Mock()
+        service.generate_embeddings_batch = AsyncMock(side_effect=lambda texts: [[float(len(t)), 1.0] for t in texts])
+        return service
+
+    @pytest.mark.asyncio
+    async def test_duplicates_share_answer_and_embeddings_are_batched(self, embedding_service):
+        """Test de que las preguntas repetidas se responden una vez y los embeddings van por páginas"""
+        questions = [
+            "¿Cuántos días de vacaciones tengo?",
+            "¿Cuál es la política de teletrabajo?",
+            "¿cuántos días de  VACACIONES tengo?",
+            "¿Quién aprueba los gastos de viaje?",
+        ]
+        repo = repository(questions)
+        use_case = Mock(execute=AsyncMock(side_effect=lambda **kwargs: answer(kwargs["user_message"])))
+
+        await runner(repo, use_case, embedding_service).run_job(JOB)
+
+        assert use_case.execute.await_count == 3
+        assert [len(call.args[0]) for call in embedding_service.generate_embeddings_batch.await_args_list] == [2, 1]
+        results = saved_results(repo)
+        assert [result["status"] for result in results] == ["done"] * 4
+        assert results[2]["message"] == questions[0] and results[2]["shared"] is True
+        assert results[0]["shared"] is False
+        assert use_case.execute.await_args_list[0].kwargs["conversation_id"] is None
+        repo.finish.assert_awaited_once_with("job-1", "completed")
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_questions_are_retried_with_less_concurrency(self, embedding_service):
+        """Test de que un 429 reduce la concurrencia y la pregunta se reintenta"""
+        repo = repository(["¿Cuál es la política de teletrabajo?"])
+        use_case = Mock(execute=AsyncMock(side_effect=[RateLimitError(), answer()]))
+        batch = runner(repo, use_case, embedding_service)
+
+        await batch.run_job(JOB)
+
+        assert saved_results(repo)[0]["status"] == "done"
+        assert batch.stats()["rateLimited"] == 1
+        assert batch.limiter.limit < 4
+
+    @pytest.mark.asyncio
+    async def test_failures_are_stored_per_question(self, embedding_service):
+        """Test de que un error que no es de límite marca la pregunta como fallida sin parar el job"""
+        repo = repository(["¿Cuál es la política de teletrabajo?", "¿Quién aprueba los gastos de viaje?"])
+        use_case = Mock(execute=AsyncMock(side_effect=[RuntimeError("boom"), answer()]))
+
+        await runner(repo, use_case, embedding_service, max_retries=0).run_job(JOB)
+
+        assert sorted(result["status"] for result in saved_results(repo)) == ["done", "failed"]
+        repo.finish.assert_awaited_once_with("job-1", "completed")
+
+    @pytest.mark.asyncio
+    async def test_embedding_batch_failure_falls_back_to_use_case(self, embedding_service):
+        """Test de que si falla el lote de embeddings cada pregunta lo calcula en el caso de uso"""
+        embedding_service.generate_embeddings_batch = AsyncMock(side_effect=RuntimeError("embeddings down"))
+        repo = repository(["¿Cuál es la política de teletrabajo?"])
+        use_case = Mock(execute=AsyncMock(return_value=answer()))
+
+        await runner(repo, use_case, embedding_service).run_job(JOB)
+
+        assert use_case.execute.await_args.kwargs["query_embedding"] is None
+        assert saved_results(repo)[0]["status"] == "done"
+
+
+class TestAdaptiveLimiter:
+    def test_interactive_requests_take_capacity(self):
+        """Test de que cada chat interactivo en curso quita un hueco a los lotes (sin bajar de uno)"""
+        interactive = {"requests": 0}
+        limiter = AdaptiveLimiter(4, lambda: interactive["requests"])
+
+        assert limiter.capacity() == 4
+        interactive["requests"] = 2
+        assert limiter.capacity() == 2
+        interactive["requests"] = 10
+        assert limiter.capacity() == 1
+
+    def test_aimd(self):
+        """Test de que la concurrencia se reduce a la mitad con un 429 y se recupera poco a poco"""
+        limiter = AdaptiveLimiter(8, lambda: 0)
+
+        limiter.on_rate_limited()
+        assert limiter.capacity() == 4
+        # Una ronda de respuestas correctas (tantas como la concurrencia) suma uno
+        for _ in range(5):
+            limiter.on_success()
+        assert limiter.capacity() == 5
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.capacity() == 8
+
+    def test_retry_after(self):
+        """Test de que sólo los 429 se reintentan, con la espera de `retry-after`"""
+        assert retry_after(RateLimitError("2.5")) == 2.5
+        assert retry_after(RateLimitError(None)) == 1.0
+        assert retry_after(RuntimeError("boom")) is None
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.services.batching_embedding_service import BatchingEmbeddingService
+
+
+class TestBatchingEmbeddingService:
+    @pytest.fixture
+    def inner(self):
+        mock = AsyncMock()
+        mock.current_model = Mock(return_value="text-embedding-3-small")
+
+        async def embed(texts):
+            return [[float(len(text)), 0.5] for text in texts]
+
+        mock.generate_embeddings_batch.side_effect = embed
+        return mock
+
+    @pytest.fixture
+    def service(self, inner):
+        return BatchingEmbeddingService(inner, max_wait_ms=20, max_batch_size=4)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_call(self, service, inner):
+        """Test de que las consultas de peticiones concurrentes van en una sola llamada y cada una recibe su vector"""
+        results = await asyncio.gather(*[service.generate_embedding(text) for text in ["a", "bb", "ccc"]])
+
+        assert results == [[1.0, 0.5], [2.0, 0.5], [3.0, 0.5]]
+        inner.generate_embeddings_batch.assert_awaited_once_with(["a", "bb", "ccc"])
+        assert service.stats()["averageBatchSize"] == 3
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_without_waiting(self, inner):
+        """Test de que un lote completo se envía sin esperar a la espera máxima"""
+        service = BatchingEmbeddingService(inner, max_wait_ms=10_000, max_batch_size=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(service.generate_embedding("a"), service.generate_embedding("bb")), timeout=1,
+        )
+
+        assert results == [[1.0, 0.5], [2.0, 0.5]]
+
+    @pytest.mark.asyncio
+    async def test_duplicates_and_cancelled_requests(self, service, inner):
+        """Test de que los textos repetidos se envían una vez y los que nadie espera se descartan"""
+        cancelled = asyncio.create_task(service.generate_embedding("descartada"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        results = await asyncio.gather(service.generate_embedding("igual"), service.generate_embedding("igual"))
+
+        assert results[0] == results[1]
+        inner.generate_embeddings_batch.assert_awaited_once_with(["igual"])
+        assert service.stats()["discarded"] == 1
+
+    @pytest.mark.asyncio
+    async def test_model_change_flushes_pending_batch(self, service, inner):
+        """Test de que un lote nunca mezcla textos de dos modelos"""
+        first = asyncio.create_task(service.generate_embedding("a"))
+        await asyncio.sleep(0)
+        inner.current_model.return_value = "text-embedding-3-large"
+
+        await asyncio.gather(first, service.generate_embedding("b"))
+
+        assert [call.args[0] for call in inner.generate_embeddings_batch.await_args_list] == [["a"], ["b"]]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiting_request(self, service, inner):
+        """Test de que un fallo de la API llega a todas las peticiones del lote"""
+        inner.generate_embeddings_batch.side_effect = RuntimeError("rate limited")
+
+        results = await asyncio.gather(
+            service.generate_embedding("a"), service.generate_embedding("b"), return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        inner.generate_embeddings_batch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_zero_wait_disables_batching(self, inner):
+        """Test de que con espera 0 cada consulta va directa"""
+        service = BatchingEmbeddingService(inner, max_wait_ms=0)
+
+        await asyncio.gather(service.generate_embedding("a"), service.generate_embedding("b"))
+
+        assert inner.generate_embeddings_batch.await_count == 2
@@ -0,0 +1,80 @@
+import pytest
+from src.infrastructure.services.bm25_index import BM25Index, identifier_terms, tokenize
+
+
+def chunk(document_id, chunk_index, content):
+    return {
+        "id": f"{document_id}_chunk_{chunk_index}",
+        "score": 0.0,
+        "content": content,
+        "document_id": document_id,
+        "chunk_index": chunk_index,
+        "metadata": {"document_name": f"{document_id}.pdf"},
+    }
+
+
+CORPUS = [
+    chunk("manual", 0, "La válvula VX-2041 se reemplaza cada 12 meses según el plan de mantenimiento."),
+    chunk("manual", 1, "El plan de mantenimiento incluye revisión de filtros y válvulas."),
+    chunk("politicas", 0, "Las vacaciones se solicitan con 15 días de anticipación al jefe directo."),
+    chunk("politicas", 1, "El plan de vacaciones anual se publica en enero."),
+]
+
+
+async def build_index(**kwargs):
+    index = BM25Index(**kwargs)
+
+    async def load():
+        return CORPUS
+
+    await index.rebuild(load)
+    return index
+
+
+def test_tokenize_keeps_codes_and_strips_accents():
+    """Test de que los códigos se indexan completos y por partes, sin acentos ni stopwords"""
+    assert tokenize("¿Cuándo se cambia la válvula VX-2041?") == ["cambia", "valvula", "vx-2041", "vx", "2041"]
+    assert identifier_terms("Qué dice Ana del pedido 1234 y del VX-2041") == {"ana", "1234", "vx-2041"}
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_by_bm25_with_query_coverage_score():
+    """Test de ranking BM25: el chunk con el código va primero y su score es la cobertura de la consulta"""
+    index = await build_index()
+
+    results = index.search("mantenimiento de la válvula VX-2041", limit=2)
+
+    assert [result["id"] for result in results] == ["manual_chunk_0", "manual_chunk_1"]
+    assert results[0]["score"] == 1.0
+    assert 0 < results[1]["score"] < 1
+    assert results[0]["metadata"]["document_name"] == "manual.pdf"
+
+
+@pytest.mark.asyncio
+async def test_strong_match_needs_a_rare_term_and_full_coverage():
+    """Test de coincidencia fuerte: códigos sí, preguntas sin códigos o con términos ausentes no"""
+    index = await build_index(fast_path_max_df=1)
+
+    assert index.strong_match("¿Cada cuánto se reemplaza la VX-2041?")
+    assert not index.strong_match("¿Qué incluye el plan?")
+    assert not index.strong_match("¿Cuál es el procedimiento de la VX-2041 en caso de incendio?")
+    assert not BM25Index().strong_match("VX-2041")  # índice sin construir
+
+
+@pytest.mark.asyncio
+async def test_documents_are_added_and_removed_from_events():
+    """Test de mantenimiento por eventos, incluidos los recibidos durante una reconstrucción"""
+    index = BM25Index()
+
+    async def load():
+        # Llega un document.processed mientras se cargan los chunks
+        index.add_document("nuevo", [chunk("nuevo", 0, "Procedimiento de reembolso RB-77.")])
+        return CORPUS
+
+    await index.rebuild(load)
+    assert index.search("RB-77")[0]["document_id"] == "nuevo"
+
+    index.remove_document("manual")
+
+    assert index.search("VX-2041") == []
+    assert index.stats()["documents"] == 2
@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.services.cached_embedding_service import CachedEmbeddingService, normalize_query
+
+
+class TestCachedEmbeddingService:
+    @pytest.fixture
+    def inner(self):
+        mock = AsyncMock()
+        mock.current_model = Mock(return_value="text-embedding-3-small")
+
+        async def embed(texts):
+            return [[float(len(text)), 0.5] for text in texts]
+
+        mock.generate_embeddings_batch.side_effect = embed
+        return mock
+
+    @pytest.fixture
+    def service(self, inner, fake_redis):
+        return CachedEmbeddingService(inner, redis_client=fake_redis, max_entries=2, ttl_seconds=60)
+
+    def test_normalize_query(self):
+        """Test de normalización de la consulta"""
+        assert normalize_query("  ¿Qué es  RAG?\n") == "¿qué es rag?"
+
+    @pytest.mark.asyncio
+    async def test_memory_hit_for_normalized_query(self, service, inner):
+        """Test de acierto en memoria para variaciones triviales de la consulta"""
+        first = await service.generate_embedding("Política de vacaciones")
+        second = await service.generate_embedding("  política   de VACACIONES ")
+
+        assert first == second
+        inner.generate_embeddings_batch.assert_called_once()
+        assert service.stats()["memoryHits"] == 1
+        assert service.stats()["hitRatio"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_after_local_eviction(self, service, inner, fake_redis):
+        """Test de acierto en Redis cuando la entrada ya no está en memoria"""
+        await service.generate_embedding("uno")
+        service.clear()
+
+        embedding = await service.generate_embedding("uno")
+
+        assert embedding == [3.0, 0.5]
+        assert inner.generate_embeddings_batch.call_count == 1
+        assert service.stats()["redisHits"] == 1
+        assert all(key.startswith("embedding:text-embedding-3-small:") for key in fake_redis.data)
+        assert set(fake_redis.expirations.values()) == {service.redis_ttl_seconds}
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, service):
+        """Test de expulsión LRU al superar el tamaño máximo"""
+        await service.generate_embeddings_batch(["a", "b", "c"])
+
+        assert service.stats()["entries"] == 2
+        assert service._get_local(("text-embedding-3-small", "a")) is None
+
+    @pytest.mark.asyncio
+    async def test_model_is_part_of_the_key(self, service, inner):
+        """Test de que un cambio de modelo no reutiliza vectores del anterior"""
+        await service.generate_embedding("consulta")
+        inner.current_model.return_value = "text-embedding-3-large"
+
+        await service.generate_embedding("consulta")
+
+        assert inner.generate_embeddings_batch.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_deduplicates_and_mixes_hits(self, service, inner):
+        """Test de lote con aciertos, fallos y textos repetidos"""
+        await service.generate_embedding("hola mundo")
+
+        results = await service.generate_embeddings_batch(["hola mundo", "adiós", "Adiós"])
+
+        assert results[1] == results[2]
+        assert inner.generate_embeddings_batch.call_args_list[-1].args[0] == ["adiós"]
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_to_inner(self, inner):
+        """Test de que un fallo de Redis se trata como miss"""
+        broken_redis = Mock()
+        broken_redis.mget = AsyncMock(side_effect=ConnectionError("redis down"))
+        broken_redis.pipeline.side_effect = ConnectionError("redis down")
+        service = CachedEmbeddingService(inner, redis_client=broken_redis)
+
+        embedding = await service.generate_embedding("consulta")
+
+        assert embedding == [8.0, 0.5]
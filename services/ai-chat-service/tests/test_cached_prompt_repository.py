@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from src.infrastructure.repositories.cached_prompt_repository import CachedPromptRepository
+
+
+async def wait_until(condition, timeout=1.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+class TestCachedPromptRepository:
+    @pytest.fixture
+    def inner(self, sample_prompt_template):
+        mock = AsyncMock()
+        mock.get_by_id.return_value = sample_prompt_template
+        mock.update.side_effect = lambda prompt: prompt
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_get_by_id_served_from_memory(self, inner):
+        """Test de que lecturas repetidas no vuelven a consultar el repositorio"""
+        repository = CachedPromptRepository(inner)
+
+        await repository.get_by_id("prompt-1")
+        prompt = await repository.get_by_id("prompt-1")
+
+        assert prompt.id == "prompt-1"
+        inner.get_by_id.assert_awaited_once()
+        assert repository.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_prompt_is_cached_briefly(self, inner):
+        """Test de caché negativa para ids inexistentes"""
+        inner.get_by_id.return_value = None
+        repository = CachedPromptRepository(inner, negative_ttl_seconds=60)
+
+        assert await repository.get_by_id("unknown") is None
+        assert await repository.get_by_id("unknown") is None
+
+        inner.get_by_id.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_other_replica_update_invalidates(self, inner, fake_redis, sample_prompt_template):
+        """Test de invalidación por pub/sub cuando otra réplica actualiza el template"""
+        replica_a = CachedPromptRepository(inner, redis_client=fake_redis)
+        replica_b = CachedPromptRepository(inner, redis_client=fake_redis)
+        await replica_a.start()
+        await wait_until(lambda: replica_a.stats()["listening"])
+
+        await replica_a.get_by_id("prompt-1")
+        await replica_b.update(sample_prompt_template)
+        await wait_until(lambda: replica_a.stats()["entries"] == 0)
+        await replica_a.get_by_id("prompt-1")
+        await replica_a.stop()
+
+        assert inner.get_by_id.await_count == 2
+        assert replica_a.stats()["invalidations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reads_pass_through_until_subscribed(self, inner, fake_redis):
+        """Test de que sin suscripción activa no se sirve desde memoria"""
+        repository = CachedPromptRepository(inner, redis_client=fake_redis)
+
+        await repository.get_by_id("prompt-1")
+        await repository.get_by_id("prompt-1")
+
+        assert inner.get_by_id.await_count == 2
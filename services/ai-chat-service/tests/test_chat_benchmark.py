@@ -0,0 +1,68 @@
+import pytest
+from argparse import Namespace
+from benchmarks.fakes import LatencyModel
+from benchmarks.chat_benchmark import ChatFakes, chat_service, build_payloads, stage_durations, run_level
+
+
+def fake_args(**overrides):
+    args = {
+        "seed": 1,
+        "llm_latency": "fixed:0",
+        "embedding_latency": "fixed:0",
+        "search_latency": "fixed:0",
+        "redis_latency": "fixed:0",
+        "mongo_latency": "fixed:0",
+        "output_tokens": 20,
+        "dim": 8,
+        "chunks": 3,
+    }
+    args.update(overrides)
+    return Namespace(**args)
+
+
+class TestChatBenchmark:
+    def test_latency_model_distributions(self):
+        """Test de las distribuciones de latencia soportadas"""
+        assert LatencyModel("fixed:25").sample_ms() == 25
+        assert 10 <= LatencyModel("uniform:10:20", seed=1).sample_ms() <= 20
+        assert LatencyModel("lognormal:100:0.5", seed=1).sample_ms() > 0
+        with pytest.raises(ValueError):
+            LatencyModel("gamma:1:2")
+
+    def test_build_payloads_avoid_generic_queries(self):
+        """Test de que los mensajes generados pasan por RAG y respetan el ratio de templates"""
+        payloads = build_payloads(100, unique_queries=5, template_ratio=1.0, template_id="t-1", seed=1)
+
+        assert len(payloads) == 100
+        assert len({p["message"] for p in payloads}) <= 5
+        assert all(len(p["message"].split()) > 3 for p in payloads)
+        assert all(p["promptTemplateId"] == "t-1" for p in payloads)
+
+    def test_stage_durations_prompt_build_and_overhead(self):
+        """Test de cálculo de prompt build y overhead a partir de la traza"""
+        trace = {"embed": (0.0, 0.1), "search": (0.1, 0.2), "llm": (0.25, 0.75), "evaluation_write": (0.75, 0.8)}
+
+        durations = stage_durations(trace, started=0.0, finished=0.9)
+
+        assert durations["prompt_build"] == pytest.approx(50)
+        assert durations["llm"] == pytest.approx(500)
+        assert durations["service_overhead"] == pytest.approx(150)
+
+    @pytest.mark.asyncio
+    async def test_run_level_against_app(self):
+        """Test end-to-end del benchmark contra la app con dobles"""
+        fakes = ChatFakes(fake_args())
+        payloads = build_payloads(6, unique_queries=3, template_ratio=0.0, template_id="t-1", seed=1)
+
+        with chat_service(fakes) as service:
+            result = await run_level(service.app, payloads, concurrency=3, background_tasks=service.background_tasks)
+            streamed = await run_level(
+                service.app, payloads, concurrency=3, stream=True, background_tasks=service.background_tasks
+            )
+
+        assert result["errors"] == 0
+        assert result["latency_ms"]["count"] == 6
+        assert {"embed", "search", "prompt_build", "llm", "evaluation_write"} <= set(result["stages_ms"].keys())
+        assert streamed["errors"] == 0
+        assert "time_to_first_token" in streamed["stages_ms"]
+        assert len(fakes.evaluation_repository.evaluations) == 12
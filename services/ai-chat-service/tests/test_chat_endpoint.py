@@ -5,6 +5,10 @@ from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 
 from src.main import app
+from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+from src.infrastructure.services.redis_answer_cache import RedisAnswerCache
+from src.infrastructure.services.redis_idempotency_store import RedisIdempotencyStore
+from src.application.services.background_tasks import BackgroundTaskSupervisor
 
 
 class TestChatEndpoint:
@@ -12,6 +16,20 @@ class TestChatEndpoint:
     def client(self):
         return TestClient(app)
 
+    @pytest.fixture(autouse=True)
+    def answer_cache(self, fake_redis):
+        """
+        Cachés de respuestas vacías por test (la exacta sobre Redis en memoria), sin memoria de conversación
+        y con las tareas en segundo plano en línea (la evaluación está guardada al recibir la respuesta)
+        """
+        cache = SemanticAnswerCache()
+        with patch('src.main.answer_cache', cache), \
+             patch('src.main.exact_answer_cache', RedisAnswerCache(fake_redis, version_ttl_seconds=0)), \
+             patch('src.main.idempotency_store', RedisIdempotencyStore(fake_redis)), \
+             patch('src.main.conversation_memory', None), \
+             patch('src.main.background_tasks', BackgroundTaskSupervisor(inline=True)):
+            yield cache
+
     def test_chat_with_rag(self, client):
         """Test de chat con RAG"""
         with patch('src.main.get_user_id', return_value="user-1"), \
@@ -118,3 +136,225 @@ class TestChatEndpoint:
             # Verificar que NO se generó embedding (consulta genérica)
             mock_embedding.generate_embedding.assert_not_called()
             mock_vector.search_similar.assert_not_called()
+
+    def test_chat_stream(self, client):
+        """Test de chat en streaming (SSE) con evaluación al terminar"""
+        async def stream(messages, routing=None):
+            yield {"type": "token", "content": "Hola"}
+            yield {"type": "usage", "tokens": {"input": 10, "output": 1, "total": 11}}
+
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.stream_response = stream
+            mock_embedding.generate_embedding = AsyncMock(return_value=[0.1] * 1536)
+            mock_vector.search_similar = AsyncMock(return_value=[])
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+
+            response = client.post(
+                "/api/ai/chat/stream",
+                json={"message": "What is in the document?", "conversationId": "conv-1"},
+            )
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = response.text
+            assert body.index("event: sources") < body.index("event: token") < body.index("event: done")
+            mock_evaluation_repo.create.assert_called_once()
+            assert mock_evaluation_repo.create.call_args.kwargs["metrics"]["tokens"]["total"] == 11
+
+    def test_chat_stream_error_frame(self, client):
+        """Test de error durante el stream"""
+        async def stream(messages, routing=None):
+            raise Exception("LLM error")
+            yield
+
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.stream_response = stream
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+
+            response = client.post("/api/ai/chat/stream", json={"message": "hola"})
+
+            assert "event: error" in response.text
+            mock_evaluation_repo.create.assert_not_called()
+
+    def test_chat_semantic_cache_hit_and_invalidation(self, client, answer_cache):
+        """Test de acierto de la caché semántica y de su invalidación por evento de documento"""
+        import asyncio
+        from src.main import handle_corpus_changed
+
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.generate_response = AsyncMock(return_value={
+                "content": "Test response",
+                "tokens": {"input": 100, "output": 50, "total": 150},
+            })
+            mock_embedding.generate_embedding = AsyncMock(return_value=[0.1] * 1536)
+            mock_vector.search_similar = AsyncMock(return_value=[
+                {"id": "chunk-1", "score": 0.85, "content": "Relevant context", "document_id": "doc-1",
+                 "metadata": {"document_name": "test.pdf"}},
+            ])
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+
+            client.post("/api/ai/chat", json={"message": "What is the vacation policy?"})
+            cached = client.post("/api/ai/chat", json={"message": "What's the vacation policy?"}).json()["data"]
+            asyncio.run(handle_corpus_changed({"eventType": "document.processed", "documentId": "doc-2"}))
+            client.post("/api/ai/chat", json={"message": "What's the vacation policy?"})
+
+            assert cached["cache"]["type"] == "semantic"
+            assert cached["message"] == "Test response"
+            assert mock_llm.generate_response.call_count == 2
+            metrics = [call.kwargs["metrics"] for call in mock_evaluation_repo.create.call_args_list]
+            assert [m["cached"] for m in metrics] == [False, True, False]
+
+    def test_chat_exact_cache_hit_writes_cached_evaluation(self, client):
+        """Test de acierto de la caché exacta: no recalcula y guarda la evaluación marcada como cached"""
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.answer_cache', None), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.generate_response = AsyncMock(return_value={
+                "content": "Test response",
+                "tokens": {"input": 100, "output": 50, "total": 150},
+            })
+            mock_embedding.generate_embedding = AsyncMock(return_value=[0.1] * 1536)
+            mock_vector.search_similar = AsyncMock(return_value=[
+                {"id": "chunk-1", "score": 0.85, "content": "Relevant context", "document_id": "doc-1",
+                 "metadata": {"document_name": "test.pdf"}},
+            ])
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+
+            client.post("/api/ai/chat", json={"message": "What is the vacation policy?"})
+            cached = client.post("/api/ai/chat", json={"message": "what is the  vacation policy?"}).json()["data"]
+
+            assert cached["cache"] == {"type": "exact"}
+            assert cached["sources"][0]["documentId"] == "doc-1"
+            mock_embedding.generate_embedding.assert_called_once()
+            metrics = mock_evaluation_repo.create.call_args_list[-1].kwargs["metrics"]
+            assert metrics["cached"] is True
+            assert metrics["cost"]["total"] == 0
+
+    def test_chat_evaluation_records_routed_model(self, client):
+        """Test de que la evaluación guarda el modelo elegido por el router, su coste y la decisión"""
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.answer_cache', None), \
+             patch('src.main.exact_answer_cache', None), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            routing = {"tier": "strong", "model": "gpt-4o", "reason": "large_context", "queryTokens": 6, "contextTokens": 7000}
+            mock_llm.generate_response = AsyncMock(return_value={
+                "content": "Test response",
+                "tokens": {"input": 1_000_000, "output": 0, "total": 1_000_000},
+                "model": "gpt-4o",
+                "routing": routing,
+            })
+            mock_embedding.generate_embedding = AsyncMock(return_value=[0.1] * 1536)
+            mock_vector.search_similar = AsyncMock(return_value=[])
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+
+            response = client.post("/api/ai/chat", json={"message": "Resume el informe anual"})
+
+            assert response.status_code == 200
+            metrics = mock_evaluation_repo.create.call_args.kwargs["metrics"]
+            assert metrics["model"] == "gpt-4o"
+            assert metrics["cost"]["total"] == 2.5
+            assert metrics["routing"] == routing
+
+    def test_chat_idempotency_key_replays_response(self, client):
+        """Test de que un POST reintentado con la misma Idempotency-Key devuelve la respuesta original"""
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.exact_answer_cache', None), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.generate_response = AsyncMock(return_value={
+                "content": "Test response",
+                "tokens": {"input": 100, "output": 50, "total": 150},
+            })
+            mock_embedding.generate_embedding = AsyncMock(return_value=[0.1] * 1536)
+            mock_vector.search_similar = AsyncMock(return_value=[])
+            mock_prompt_repo.get_by_id = AsyncMock(return_value=None)
+            mock_evaluation_repo.create = AsyncMock()
+            headers = {"Idempotency-Key": "retry-1"}
+
+            first = client.post("/api/ai/chat", json={"message": "Hola, ¿qué tal?"}, headers=headers)
+            retry = client.post("/api/ai/chat", json={"message": "Hola, ¿qué tal?"}, headers=headers)
+            reused = client.post("/api/ai/chat", json={"message": "Otra pregunta"}, headers=headers)
+
+            assert retry.status_code == 200
+            assert retry.json() == first.json()
+            assert retry.headers["Idempotent-Replayed"] == "true"
+            assert "Idempotent-Replayed" not in first.headers
+            assert reused.status_code == 422
+            mock_llm.generate_response.assert_called_once()
+            mock_evaluation_repo.create.assert_called_once()
+
+    def test_chat_fetches_template_while_embedding(self, client, sample_prompt_template):
+        """Test de que el template se lee mientras se genera el embedding de la consulta"""
+        import asyncio
+
+        embedding_started = asyncio.Event()
+
+        async def generate_embedding(text):
+            embedding_started.set()
+            return [0.1] * 1536
+
+        async def get_by_id(prompt_id):
+            # Si las etapas fueran secuenciales el embedding no habría empezado
+            await asyncio.wait_for(embedding_started.wait(), timeout=1)
+            return sample_prompt_template
+
+        with patch('src.main.get_user_id', return_value="user-1"), \
+             patch('src.main.llm_service') as mock_llm, \
+             patch('src.main.embedding_service') as mock_embedding, \
+             patch('src.main.vector_search') as mock_vector, \
+             patch('src.main.prompt_repository') as mock_prompt_repo, \
+             patch('src.main.evaluation_repository') as mock_evaluation_repo:
+
+            mock_llm.generate_response = AsyncMock(return_value={
+                "content": "Test response",
+                "tokens": {"input": 100, "output": 50, "total": 150},
+            })
+            mock_embedding.generate_embedding = generate_embedding
+            mock_vector.search_similar = AsyncMock(return_value=[])
+            mock_prompt_repo.get_by_id = get_by_id
+            mock_evaluation_repo.create = AsyncMock()
+
+            response = client.post(
+                "/api/ai/chat",
+                json={"message": "What is the document about?", "promptTemplateId": sample_prompt_template.id},
+            )
+
+            assert response.status_code == 200
+            system_prompt = mock_llm.generate_response.call_args.args[0][0]["content"]
+            assert system_prompt.startswith(sample_prompt_template.system_prompt)
+            mock_evaluation_repo.create.assert_called_once()
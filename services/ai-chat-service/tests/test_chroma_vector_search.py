@@ -46,6 +46,25 @@ class TestChromaVectorSearch:
         assert len(results) == 2
         assert all('id' in r and 'score' in r and 'content' in r for r in results)
 
+    @pytest.mark.asyncio
+    async def test_search_similar_includes_embeddings(self, search_service):
+        """Test de que con include_embeddings cada chunk trae su embedding (para MMR)"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 10
+        mock_collection.query.return_value = {
+            'ids': [['chunk-1']],
+            'distances': [[0.1]],
+            'documents': [['content 1']],
+            'metadatas': [[{'document_id': 'doc-1', 'chunk_index': '0'}]],
+            'embeddings': [[[0.5, 0.5]]],
+        }
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+
+        results = await search_service.search_similar([0.1, 0.2], limit=50, include_embeddings=True)
+
+        assert "embeddings" in mock_collection.query.call_args.kwargs["include"]
+        assert list(results[0]["embedding"]) == [0.5, 0.5]
+
     @pytest.mark.asyncio
     async def test_search_similar_empty_collection(self, search_service):
         """Test de búsqueda cuando la colección está vacía"""
@@ -106,3 +125,124 @@ class TestChromaVectorSearch:
         results = await search_service.search_similar(query_embedding)
         
         assert results == []
+
+    @pytest.mark.asyncio
+    async def test_search_similar_uses_active_collection(self, search_service):
+        """Test de búsqueda en la colección activa del alias"""
+        mock_collection = Mock()
+        mock_collection.metadata = {"embedding_model": "text-embedding-3-large"}
+        mock_collection.count.return_value = 0
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+        search_service.collection_registry = Mock()
+        search_service.collection_registry.get_active.return_value = Mock(
+            collection="documents-text-embedding-3-large",
+            embedding_model="text-embedding-3-large",
+        )
+
+        await search_service.search_similar([0.1] * 3072)
+
+        search_service.client.get_collection.assert_called_once_with(name="documents-text-embedding-3-large")
+
+    @pytest.mark.asyncio
+    async def test_search_similar_model_mismatch(self, search_service):
+        """Test de que no se busca con embeddings de otro modelo"""
+        mock_collection = Mock()
+        mock_collection.metadata = {"embedding_model": "text-embedding-ada-002"}
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+        search_service.collection_registry = Mock()
+        search_service.collection_registry.get_active.return_value = Mock(
+            collection="documents",
+            embedding_model="text-embedding-3-small",
+        )
+
+        results = await search_service.search_similar([0.1] * 1536)
+
+        assert results == []
+        mock_collection.query.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_search_similar_reuses_collection_snapshot(self, search_service):
+        """Test de que tras la primera búsqueda cada consulta es una sola petición a Chroma"""
+        mock_collection = Mock()
+        mock_collection.count.return_value = 10
+        mock_collection.query.return_value = {"ids": [[]], "distances": [[]], "documents": [[]], "metadatas": [[]]}
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+
+        for _ in range(3):
+            await search_service.search_similar([0.1] * 1536)
+
+        search_service.client.get_collection.assert_called_once()
+        mock_collection.count.assert_called_once()
+        assert mock_collection.query.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_invalidate_refreshes_empty_collection(self, search_service):
+        """Test de que un evento de documentos hace releer el número de chunks (colección ya no vacía)"""
+        mock_collection = Mock()
+        mock_collection.count.side_effect = [0, 10]
+        mock_collection.query.return_value = {"ids": [[]], "distances": [[]], "documents": [[]], "metadatas": [[]]}
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+
+        await search_service.search_similar([0.1] * 1536)
+        await search_service.search_similar([0.1] * 1536)
+        mock_collection.query.assert_not_called()
+
+        search_service.invalidate()
+        await search_service.search_similar([0.1] * 1536)
+
+        mock_collection.query.assert_called_once()
+        assert search_service.stats()["count"] == 10
+
+    @pytest.mark.asyncio
+    async def test_search_similar_reloads_stale_handle(self, search_service):
+        """Test de que si la consulta falla con el handle cacheado se relee la colección y se reintenta"""
+        stale, fresh = Mock(), Mock()
+        stale.count.return_value = fresh.count.return_value = 10
+        stale.query.side_effect = Exception("Collection does not exist")
+        fresh.query.return_value = {
+            "ids": [["chunk-1"]], "distances": [[0.2]], "documents": [["Content"]],
+            "metadatas": [[{"document_id": "doc-1", "chunk_index": 0}]],
+        }
+        search_service.client.get_collection = Mock(side_effect=[stale, fresh])
+
+        results = await search_service.search_similar([0.1] * 1536)
+
+        assert [chunk["id"] for chunk in results] == ["chunk-1"]
+        assert search_service.client.get_collection.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_active_collection_change_refreshes_snapshot(self, search_service):
+        """Test de que un cambio de colección en el alias no usa el handle de la anterior"""
+        search_service.client.get_collection = Mock(side_effect=lambda name: Mock(metadata={}, count=Mock(return_value=0)))
+        search_service.collection_registry = Mock()
+        search_service.collection_registry.get_active.return_value = Mock(collection="documents-v1", embedding_model="m")
+
+        await search_service.search_similar([0.1] * 1536)
+        search_service.collection_registry.get_active.return_value = Mock(collection="documents-v2", embedding_model="m")
+        await search_service.search_similar([0.1] * 1536)
+
+        assert [call.kwargs["name"] for call in search_service.client.get_collection.call_args_list] == ["documents-v1", "documents-v2"]
+
+    @pytest.mark.asyncio
+    async def test_get_chunks_pages_through_collection(self, search_service):
+        """Test de lectura de los chunks de un documento por páginas"""
+        search_service.page_size = 2
+        mock_collection = Mock()
+        mock_collection.get.side_effect = [
+            {'ids': ['doc-1_chunk_0', 'doc-1_chunk_1'], 'documents': ['uno', 'dos'], 'metadatas': [
+                {'document_id': 'doc-1', 'chunk_index': 0, 'document_name': 'test.pdf'},
+                {'document_id': 'doc-1', 'chunk_index': 1, 'document_name': 'test.pdf'},
+            ]},
+            {'ids': ['doc-1_chunk_2'], 'documents': ['tres'], 'metadatas': [
+                {'document_id': 'doc-1', 'chunk_index': 2, 'document_name': 'test.pdf'},
+            ]},
+        ]
+        search_service.client.get_collection = Mock(return_value=mock_collection)
+
+        chunks = await search_service.get_chunks("doc-1")
+
+        assert [chunk["content"] for chunk in chunks] == ["uno", "dos", "tres"]
+        assert chunks[2]["chunk_index"] == 2
+        assert chunks[0]["metadata"] == {"document_name": "test.pdf"}
+        assert mock_collection.get.call_args.kwargs["where"] == {"document_id": "doc-1"}
+        assert mock_collection.get.call_args.kwargs["offset"] == 2
@@ -0,0 +1,46 @@
+import pytest
+import time
+from unittest.mock import Mock
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
+
+
+def alias_client(embedding_model, delay=0.0):
+    def get(ids, include):
+        time.sleep(delay)
+        return {"ids": ids, "metadatas": [{"collection": f"documents-{embedding_model}", "embedding_model": embedding_model}]}
+
+    client = Mock()
+    client.get_collection.return_value = Mock(get=Mock(side_effect=get))
+    return client
+
+
+class TestCollectionRegistry:
+    @pytest.mark.asyncio
+    async def test_get_active_nowait_refreshes_off_event_loop(self):
+        """Test de que con el alias caducado se devuelve el anterior sin esperar y se relee en un hilo"""
+        client = alias_client("text-embedding-3-small")
+        registry = CollectionRegistry(client, alias="documents")
+        await registry.refresh()
+        client.get_collection.return_value = alias_client("text-embedding-3-large", delay=0.3).get_collection.return_value
+        registry._cached_at -= registry.ttl_seconds
+
+        started = time.monotonic()
+        active = registry.get_active_nowait()
+        registry.get_active_nowait()
+
+        assert time.monotonic() - started < 0.1
+        assert active.embedding_model == "text-embedding-3-small"
+        await registry._refreshing
+        assert registry.get_active_nowait().embedding_model == "text-embedding-3-large"
+        assert client.get_collection.return_value.get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_set_active_skips_chroma(self):
+        """Test de que el evento collection.switched fija el alias sin leer Chroma"""
+        client = Mock()
+        registry = CollectionRegistry(client, alias="documents")
+
+        registry.set_active("documents-text-embedding-3-large", "text-embedding-3-large")
+
+        assert registry.get_active_nowait().embedding_model == "text-embedding-3-large"
+        client.get_collection.assert_not_called()
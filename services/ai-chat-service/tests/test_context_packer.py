@@ -0,0 +1,87 @@
+from src.application.services.context_packer import ContextPacker
+from src.application.services.rank_fusion import reciprocal_rank_fusion
+from src.infrastructure.services.token_counter import TokenCounter
+
+
+def chunk(document_id, chunk_index, score, content):
+    return {
+        "id": f"{document_id}_chunk_{chunk_index}",
+        "score": score,
+        "content": content,
+        "document_id": document_id,
+        "chunk_index": chunk_index,
+        "metadata": {"document_name": f"{document_id}.pdf"},
+    }
+
+
+def packer(**kwargs):
+    return ContextPacker(TokenCounter(use_tiktoken=False), **{"candidates": 8, "token_budget": 1000, "score_gap": 0.1, **kwargs})
+
+
+def test_token_counter_falls_back_to_estimate():
+    """Test de que sin codificación de tiktoken se usa la estimación local"""
+    counter = TokenCounter(use_tiktoken=False)
+
+    assert counter.count("abcd" * 10) == 10
+    assert counter.truncate("abcd" * 10, 2) == "abcdabcd"
+
+
+def test_pack_drops_results_after_score_gap():
+    """Test de que los chunks posteriores a una caída grande de score se descartan"""
+    chunks = [chunk("a", 0, 0.92, "uno"), chunk("b", 0, 0.88, "dos"), chunk("c", 0, 0.6, "tres"), chunk("d", 0, 0.58, "cuatro")]
+
+    packed = packer().pack(chunks)
+
+    assert [block["document_id"] for block in packed] == ["a", "b"]
+
+
+def test_pack_merges_adjacent_chunks_without_overlap():
+    """Test de que chunks consecutivos del mismo documento se unen quitando el texto solapado"""
+    first_overlap = "Texto compartido entre el chunk tres y el cuatro."
+    second_overlap = "Texto compartido entre el chunk cuatro y el cinco."
+    chunks = [
+        chunk("doc", 4, 0.8, f"{first_overlap} Centro del documento. {second_overlap}"),
+        chunk("doc", 3, 0.9, f"Inicio del documento. {first_overlap}"),
+        chunk("doc", 5, 0.85, f"{second_overlap} Final del documento."),
+        chunk("otro", 0, 0.84, "Otro documento."),
+    ]
+
+    packed = packer().pack(chunks)
+
+    assert [block["document_id"] for block in packed] == ["doc", "otro"]
+    assert packed[0]["chunk_indexes"] == [3, 4, 5]
+    assert packed[0]["score"] == 0.9
+    assert packed[0]["content"] == (
+        f"Inicio del documento. {first_overlap} Centro del documento. {second_overlap} Final del documento."
+    )
+
+
+def test_pack_respects_token_budget():
+    """Test de que los bloques que no caben en el presupuesto se saltan y el primero se recorta"""
+    chunks = [chunk("a", 0, 0.9, "x" * 2000), chunk("b", 0, 0.88, "y" * 1200), chunk("c", 0, 0.87, "z" * 200)]
+
+    packed = packer(token_budget=400).pack(chunks)
+
+    assert [block["document_id"] for block in packed] == ["a"]
+    assert len(packed[0]["content"]) == (400 - 20) * 4
+
+    packed = packer(token_budget=1000).pack(chunks, token_budget=450)
+
+    assert [block["document_id"] for block in packed] == ["a"]
+
+    packed = packer().pack(chunks[1:])
+
+    assert [block["document_id"] for block in packed] == ["b", "c"]
+
+
+def test_pack_keeps_rrf_order_of_fused_results():
+    """Test de fusión y empaquetado juntos: los scores léxicos (0-1) no desplazan a los vectoriales"""
+    vector = [chunk("a", 0, 0.62, "uno"), chunk("b", 0, 0.60, "dos"), chunk("c", 0, 0.58, "tres"), chunk("d", 0, 0.57, "cuatro")]
+    lexical = [chunk("d", 0, 0.8, "cuatro"), chunk("e", 0, 1.0, "cinco")]
+
+    fused = reciprocal_rank_fusion([vector, lexical], limit=8)
+    packed = packer().pack(fused)
+
+    assert [block["document_id"] for block in packed] == ["d", "a", "b", "e", "c"]
+    # Cada chunk conserva el score de su buscador (el vectorial si lo encontraron ambos)
+    assert packed[0]["score"] == 0.57
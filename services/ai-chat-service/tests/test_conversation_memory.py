@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.application.services.conversation_memory import ConversationMemory, estimate_tokens
+from src.domain.entities.conversation import Conversation
+from src.domain.repositories.iconversation_repository import IConversationRepository
+
+
+class InMemoryConversationRepository(IConversationRepository):
+    def __init__(self):
+        self.conversations = {}
+
+    async def get(self, conversation_id, limit):
+        conversation = self.conversations.get(conversation_id)
+        if not conversation:
+            return None
+        pending = [m for m in conversation.messages if m.sequence >= conversation.summarized_until]
+        return Conversation(
+            id=conversation.id,
+            user_id=conversation.user_id,
+            title=conversation.title,
+            messages=pending[-limit:],
+            summary=conversation.summary,
+            summarized_until=conversation.summarized_until,
+        )
+
+    async def append_messages(self, conversation_id, user_id, messages):
+        conversation = self.conversations.setdefault(
+            conversation_id, Conversation(id=conversation_id, user_id=user_id, title="", messages=[])
+        )
+        for message in messages:
+            message.sequence = len(conversation.messages)
+            conversation.messages.append(message)
+        return messages
+
+    async def save_summary(self, conversation_id, summary, summarized_until):
+        self.conversations[conversation_id].summary = summary
+        self.conversations[conversation_id].summarized_until = summarized_until
+
+
+class TestConversationMemory:
+    @pytest.fixture
+    def repository(self):
+        return InMemoryConversationRepository()
+
+    @pytest.fixture
+    def llm(self):
+        mock = AsyncMock()
+        mock.generate_response.return_value = {"content": "El usuario pregunta por vacaciones.", "tokens": {}}
+        return mock
+
+    @pytest.fixture
+    def memory(self, repository, llm):
+        return ConversationMemory(repository, llm, history_tokens=100, summary_trigger_tokens=200)
+
+    async def add_turns(self, memory, count, size=40):
+        for i in range(count):
+            await memory.record_turn("conv-1", "user-1", f"pregunta {i} " + "x" * size, {"message": f"respuesta {i} " + "y" * size})
+        await memory.drain()
+
+    def test_estimate_tokens(self):
+        """Test de la estimación local de tokens"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd" * 10) == 10
+
+    @pytest.mark.asyncio
+    async def test_history_window_respects_budget(self, memory):
+        """Test de que el historial incluye los mensajes más recientes que caben en el presupuesto"""
+        await self.add_turns(memory, 3)
+
+        history = await memory.history("conv-1", "user-1")
+
+        assert sum(estimate_tokens(m["content"]) for m in history) <= 100
+        assert history[-1]["role"] == "assistant"
+        assert history[-1]["content"].startswith("respuesta 2")
+        assert await memory.history("new-conversation", "user-1") == []
+
+    @pytest.mark.asyncio
+    async def test_old_turns_are_summarized(self, memory, repository, llm):
+        """Test de que los turnos antiguos se pliegan en un resumen acotado"""
+        await self.add_turns(memory, 10)
+
+        conversation = repository.conversations["conv-1"]
+        history = await memory.history("conv-1", "user-1")
+
+        assert conversation.summarized_until > 0
+        assert history[0]["role"] == "system"
+        assert "vacaciones" in history[0]["content"]
+        assert sum(estimate_tokens(m["content"]) for m in history) <= 100
+        assert "pregunta 0" in llm.generate_response.call_args_list[0].args[0][1]["content"]
+
+    @pytest.mark.asyncio
+    async def test_other_user_conversation_is_ignored(self, memory):
+        """Test de que la conversación de otro usuario no se usa como historial"""
+        await self.add_turns(memory, 1)
+
+        assert await memory.history("conv-1", "user-2") is None
@@ -0,0 +1,33 @@
+import pytest
+import tests.conftest_main  # noqa: F401  (mockea kafka)
+from src.infrastructure.messaging.kafka_event_consumer import KafkaEventConsumer
+
+
+class TestKafkaEventConsumer:
+    @pytest.mark.asyncio
+    async def test_dispatch_calls_handlers_and_isolates_errors(self):
+        """Test de que un handler que falla no impide procesar el resto"""
+        consumer = KafkaEventConsumer(group_id="test-group")
+        received = []
+
+        async def failing(event):
+            raise RuntimeError("boom")
+
+        async def handler(event):
+            received.append(event)
+
+        consumer.subscribe("document.processed", failing)
+        consumer.subscribe("document.processed", handler)
+
+        await consumer.dispatch("document.processed", {"documentId": "doc-1"})
+        await consumer.dispatch("document.deleted", {"documentId": "doc-2"})
+
+        assert received == [{"documentId": "doc-1"}]
+
+    def test_default_group_is_per_replica(self, monkeypatch):
+        """Test de que cada réplica usa su propio consumer group por defecto"""
+        monkeypatch.delenv("KAFKA_CONSUMER_GROUP", raising=False)
+
+        consumer = KafkaEventConsumer()
+
+        assert consumer.group_id.startswith("ai-chat-service-")
@@ -1,6 +1,8 @@
 import tests.conftest_main
 
+import json
 import pytest
+from datetime import datetime
 from unittest.mock import AsyncMock, Mock, patch
 from fastapi.testclient import TestClient
 
@@ -64,6 +66,21 @@ class TestMainEndpoints:
             assert data["success"] is True
             assert isinstance(data["data"], list)
 
+    def test_get_prompts_paginated(self, client, sample_prompt_template):
+        """Test de obtención de prompts paginada por cursor"""
+        with patch('src.main.prompt_repository') as mock_repo:
+            mock_repo.get_page = AsyncMock(return_value=([sample_prompt_template], "next"))
+            
+            response = client.get("/api/ai/prompts?limit=1&cursor=abc")
+            mock_repo.get_page.side_effect = ValueError("Invalid cursor")
+            invalid = client.get("/api/ai/prompts?limit=1&cursor=bad")
+            
+            assert response.status_code == 200
+            assert response.json()["nextCursor"] == "next"
+            assert response.json()["data"][0]["id"] == "prompt-1"
+            mock_repo.get_page.assert_any_call(limit=1, cursor="abc")
+            assert invalid.status_code == 400
+
     def test_get_prompt_by_id(self, client, sample_prompt_template):
         """Test de obtención de prompt por ID"""
         with patch('src.main.prompt_repository') as mock_repo:
@@ -156,3 +173,100 @@ class TestMainEndpoints:
         assert data["success"] is True
         assert "data" in data
         assert "totalConversations" in data["data"]
+
+    def test_get_metrics_time_range(self, client):
+        """Test de métricas de un rango: se leen los rollups (UTC) y se devuelven percentiles"""
+        summary = {
+            "granularity": "minute",
+            "totals": {
+                "messages": 3, "conversations": 1, "cachedMessages": 0,
+                "tokens": {"input": 20, "output": 10, "total": 30}, "cost": 0.002, "averageLatency": 800,
+            },
+            "latencyPercentiles": {"p50": 750.0, "p90": 1100.0, "p95": 1100.0, "p99": 1100.0},
+            "byTemplate": [],
+        }
+        with patch('src.main.evaluation_repository') as mock_repo:
+            mock_repo.rollups.summary = AsyncMock(return_value=summary)
+
+            response = client.get("/api/ai/metrics", params={"from": "2026-10-19T10:00:00+02:00", "to": "2026-10-19T11:00:00+02:00"})
+
+            assert response.status_code == 200
+            data = response.json()["data"]
+            assert data["totalMessages"] == 3
+            assert data["latencyPercentiles"]["p50"] == 750.0
+            assert data["range"]["granularity"] == "minute"
+            assert mock_repo.rollups.summary.call_args.kwargs["start"].isoformat() == "2026-10-19T08:00:00"
+
+    def test_get_evaluations_paginated(self, client):
+        """Test de evaluaciones paginadas por cursor con total estimado"""
+        evaluation = {"conversationId": "conv-1", "promptTemplateId": None, "metrics": {}, "quality": None,
+                      "timestamp": datetime(2026, 10, 19, 10, 0)}
+        with patch('src.main.evaluation_repository') as mock_repo:
+            mock_repo.get_page = AsyncMock(return_value=([evaluation], "next", 1000))
+
+            response = client.get("/api/ai/evaluations", params={"limit": 1, "cursor": "abc"})
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["nextCursor"] == "next"
+            assert data["total"] == 1000
+            assert data["data"][0]["timestamp"] == "2026-10-19T10:00:00"
+            mock_repo.get_page.assert_awaited_once_with(limit=1, cursor="abc", count="estimated")
+
+    def test_export_evaluations_ndjson(self, client):
+        """Test del export en streaming: una evaluación por línea"""
+        async def iter_all(batch_size, start, end):
+            for idx in range(3):
+                yield {"conversationId": f"conv-{idx}", "metrics": {}, "timestamp": datetime(2026, 10, 19, 10, idx)}
+
+        with patch('src.main.evaluation_repository') as mock_repo:
+            mock_repo.iter_all = iter_all
+
+            response = client.get("/api/ai/evaluations/export")
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = response.text.strip().split("\n")
+            assert [json.loads(line)["conversationId"] for line in lines] == ["conv-0", "conv-1", "conv-2"]
+
+    def test_create_chat_job(self, client):
+        """Test de creación de un job de chat por lotes: se encola y responde 202"""
+        job = {"_id": "job-1", "userId": "temp-user-id", "promptTemplateId": "prompt-1", "status": "queued",
+               "total": 2, "createdAt": datetime(2026, 10, 19, 10, 0)}
+        with patch('src.main.chat_job_repository') as mock_repo, \
+             patch('src.main.batch_chat_runner') as mock_runner:
+            mock_repo.create = AsyncMock(return_value=job)
+
+            response = client.post("/api/ai/chat/jobs", json={"questions": ["a", "b"], "promptTemplateId": "prompt-1"})
+            empty = client.post("/api/ai/chat/jobs", json={"questions": []})
+
+            assert response.status_code == 202
+            assert response.json()["data"]["id"] == "job-1"
+            assert response.json()["data"]["createdAt"] == "2026-10-19T10:00:00"
+            mock_repo.create.assert_awaited_once_with("temp-user-id", "prompt-1", ["a", "b"])
+            mock_runner.notify.assert_called_once()
+            assert empty.status_code == 422
+
+    def test_get_chat_job_results_paginated(self, client):
+        """Test de resultados de un job por páginas sobre la posición de la pregunta"""
+        job = {"_id": "job-1", "userId": "temp-user-id", "status": "running", "total": 3}
+        results = [{"index": i, "question": f"q{i}", "status": "done", "message": "ok"} for i in range(3, 6)]
+        with patch('src.main.chat_job_repository') as mock_repo:
+            mock_repo.get = AsyncMock(return_value=job)
+            mock_repo.get_results = AsyncMock(return_value=results)
+
+            response = client.get("/api/ai/chat/jobs/job-1/results", params={"limit": 2, "cursor": "2"})
+
+            assert response.status_code == 200
+            data = response.json()
+            assert [result["index"] for result in data["data"]] == [3, 4]
+            assert data["nextCursor"] == "4"
+            mock_repo.get_results.assert_awaited_once_with("job-1", after=2, limit=3)
+
+    def test_get_chat_job_of_other_user(self, client):
+        """Test de que el job de otro usuario no se encuentra"""
+        with patch('src.main.chat_job_repository') as mock_repo:
+            mock_repo.get = AsyncMock(return_value={"_id": "job-1", "userId": "otro", "status": "queued"})
+
+            assert client.get("/api/ai/chat/jobs/job-1").status_code == 404
+            assert client.get("/api/ai/chat/jobs/job-1/results").status_code == 404
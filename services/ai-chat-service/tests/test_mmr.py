@@ -0,0 +1,49 @@
+import time
+import numpy as np
+from src.application.services.mmr import MMRSelector
+
+
+def chunk(chunk_id, embedding):
+    return {"id": chunk_id, "score": 0.8, "content": chunk_id, "embedding": embedding}
+
+
+def test_select_skips_near_duplicates():
+    """Test de que un casi duplicado del primer resultado cede su puesto a otra fuente"""
+    candidates = [
+        chunk("pasaje", [1.0, 0.0, 0.0]),
+        chunk("pasaje-solapado", [0.99, 0.14, 0.0]),
+        chunk("otra-fuente", [0.0, 0.0, 1.0]),
+    ]
+
+    selected = MMRSelector(fetch_k=10, default_lambda=0.5).select([0.8, 0.0, 0.6], candidates, 2)
+
+    assert [c["id"] for c in selected] == ["pasaje", "otra-fuente"]
+    assert all("embedding" not in c for c in selected)
+
+
+def test_select_lambda_one_keeps_relevance_order():
+    """Test de que con λ = 1 (por template) se conserva el orden por relevancia"""
+    candidates = [chunk("a", [1.0, 0.0]), chunk("b", [0.99, 0.14]), chunk("c", [0.0, 1.0])]
+
+    selected = MMRSelector(fetch_k=10, default_lambda=0.5).select([1.0, 0.0], candidates, 2, lambda_mult=1.0)
+
+    assert [c["id"] for c in selected] == ["a", "b"]
+
+
+def test_select_50_candidates_under_a_millisecond():
+    """Test de que seleccionar entre 50 candidatos de 1536 dimensiones cuesta menos de 1 ms"""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 1536)).astype(np.float32)
+    candidates = [chunk(str(idx), embeddings[idx]) for idx in range(50)]
+    query = rng.normal(size=1536).tolist()
+    selector = MMRSelector(fetch_k=50, default_lambda=0.7)
+    selector.select(query, candidates, 8)
+
+    timings = []
+    for _ in range(50):
+        started = time.perf_counter()
+        selected = selector.select(query, candidates, 8)
+        timings.append(time.perf_counter() - started)
+
+    assert len({c["id"] for c in selected}) == 8
+    assert sorted(timings)[len(timings) // 2] < 0.001
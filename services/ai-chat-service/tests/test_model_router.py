@@ -0,0 +1,83 @@
+import pytest
+from src.infrastructure.services import model_router
+from src.infrastructure.services.model_router import ModelRouter, cheapest_model
+
+
+class TestModelRouter:
+    @pytest.fixture
+    def router(self):
+        return ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", strong_model="gpt-4-turbo", policy="auto")
+
+    def test_fast_model_defaults_to_cheapest(self):
+        """Test de que el modelo rápido por defecto es el más barato de la tabla de precios"""
+        assert cheapest_model() == "gpt-4o-mini"
+        assert ModelRouter(default_model="gpt-4o").models["fast"] == "gpt-4o-mini"
+
+    def test_routes_by_query_and_context(self, router):
+        """Test de las reglas: simple al rápido, razonamiento a LLM_MODEL, contexto grande al fuerte"""
+        simple = router.route("¿Quién fabrica el A320?", context_tokens=800)
+        complex_query = router.route("Compara las dos políticas de vacaciones", context_tokens=800)
+        large_context = router.route("¿Quién fabrica el A320?", context_tokens=8000)
+        long_query = router.route("detalle " * 200)
+
+        assert (simple["model"], simple["reason"]) == ("gpt-4o-mini", "simple")
+        assert (complex_query["model"], complex_query["reason"]) == ("gpt-4o", "complex_query")
+        assert (large_context["model"], large_context["reason"]) == ("gpt-4-turbo", "large_context")
+        assert (long_query["tier"], long_query["reason"]) == ("strong", "long_query")
+
+    def test_template_policy_overrides_rules(self, router):
+        """Test de que la política del template fija el nivel"""
+        decision = router.route("Hola", policy="strong")
+
+        assert decision["model"] == "gpt-4-turbo"
+        assert decision["reason"] == "policy"
+
+    def test_slow_model_yields_to_cheaper_tier(self):
+        """Test de latencia: si el p90 del modelo elegido supera el presupuesto, baja de nivel"""
+        router = ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", policy="auto", latency_budget_ms=5000)
+        for _ in range(10):
+            router.observe("gpt-4o", 9000)
+            router.observe("gpt-4o-mini", 1500)
+
+        decision = router.route("Explica el proceso de aprobación de gastos")
+
+        assert decision["model"] == "gpt-4o-mini"
+        assert decision["reason"] == "latency"
+        assert router.stats()["latencyP90"] == {"gpt-4o": 9000, "gpt-4o-mini": 1500}
+
+    def test_slow_model_recovers_when_samples_expire(self, monkeypatch):
+        """Test de que un modelo desviado por latencia vuelve a usarse cuando caducan sus muestras"""
+        now = [1000.0]
+        monkeypatch.setattr(model_router.time, "monotonic", lambda: now[0])
+        router = ModelRouter(
+            default_model="gpt-4o", fast_model="gpt-4o-mini", policy="auto",
+            latency_budget_ms=5000, latency_max_age_seconds=300,
+        )
+        for _ in range(10):
+            router.observe("gpt-4o", 9000)
+        assert router.route("Explica el proceso de aprobación de gastos")["reason"] == "latency"
+
+        now[0] += 301
+
+        decision = router.route("Explica el proceso de aprobación de gastos")
+        assert decision["model"] == "gpt-4o"
+        assert decision["reason"] == "complex_query"
+        assert router.latency_p90("gpt-4o") is None
+
+    def test_cache_key_changes_with_any_tier_or_policy(self):
+        """Test de que cambiar el modelo de cualquier nivel o la política cambia la clave de caché"""
+        base = ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", strong_model="gpt-4-turbo", policy="auto")
+
+        assert base.cache_key() == ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", strong_model="gpt-4-turbo", policy="auto").cache_key()
+        assert base.cache_key() != ModelRouter(default_model="gpt-4o", fast_model="gpt-4o", strong_model="gpt-4-turbo", policy="auto").cache_key()
+        assert base.cache_key() != ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", strong_model="gpt-4o", policy="auto").cache_key()
+        assert base.cache_key() != ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini", strong_model="gpt-4-turbo", policy="default").cache_key()
+
+    def test_fallback_only_from_fast_tier(self, router):
+        """Test de escalado: sólo el modelo rápido escala a LLM_MODEL"""
+        escalated = router.fallback(router.route("Hola"))
+
+        assert escalated["model"] == "gpt-4o"
+        assert escalated["escalatedFrom"] == "gpt-4o-mini"
+        assert router.fallback(router.route("Compara A y B")) is None
+        assert ModelRouter(default_model="gpt-4o-mini", policy="auto").fallback(router.route("Hola")) is None
@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.repositories import mongo_chat_job_repository
+from src.infrastructure.repositories.mongo_chat_job_repository import MongoChatJobRepository
+
+
+def repository():
+    db = Mock()
+    db.chat_jobs = Mock(insert_one=AsyncMock(), update_one=AsyncMock(), create_index=AsyncMock())
+    db.chat_job_items = Mock(
+        insert_many=AsyncMock(),
+        bulk_write=AsyncMock(return_value=Mock(modified_count=1)),
+        create_index=AsyncMock(),
+        aggregate=Mock(),
+    )
+    return MongoChatJobRepository(db)
+
+
+class TestMongoChatJobRepository:
+    @pytest.mark.asyncio
+    async def test_create_inserts_questions_before_queueing(self, monkeypatch):
+        """Test de que las preguntas se insertan por lotes y el job se encola al final"""
+        monkeypatch.setattr(mongo_chat_job_repository, "INSERT_BATCH_SIZE", 2)
+        repo = repository()
+
+        job = await repo.create("user-1", "prompt-1", ["a", "b", "c"])
+
+        batches = [call.args[0] for call in repo.items.insert_many.await_args_list]
+        assert [[item["index"] for item in batch] for batch in batches] == [[0, 1], [2]]
+        assert all(item["status"] == "pending" and item["jobId"] == job["_id"] for batch in batches for item in batch)
+        inserted = repo.jobs.insert_one.await_args.args[0]
+        assert inserted["status"] == "queued" and inserted["total"] == 3
+
+    @pytest.mark.asyncio
+    async def test_save_results_recomputes_progress_from_items(self):
+        """Test de que el progreso se recalcula desde las preguntas resueltas, sin sumar la página"""
+        repo = repository()
+        repo.items.aggregate.return_value = Mock(to_list=AsyncMock(return_value=[
+            {"completed": 2, "failed": 1, "input": 10, "output": 5, "total": 15},
+        ]))
+
+        await repo.save_results("job-1", [
+            {"index": 0, "status": "done", "message": "ok", "tokens": {"input": 10, "output": 5, "total": 15}, "shared": False},
+            {"index": 1, "status": "failed", "error": "boom", "shared": False},
+        ])
+
+        operations = repo.items.bulk_write.await_args.args[0]
+        assert operations[0]._filter == {"jobId": "job-1", "index": 0, "status": "pending"}
+        pipeline = repo.items.aggregate.call_args.args[0]
+        assert pipeline[0]["$match"] == {"jobId": "job-1", "status": {"$in": ["done", "failed"]}}
+        progress = repo.jobs.update_one.await_args.args[1]["$max"]
+        assert (progress["completed"], progress["failed"], progress["tokens.total"]) == (2, 1, 15)
+
+    @pytest.mark.asyncio
+    async def test_save_results_ignores_page_already_saved(self):
+        """Test de que una página reintentada o de un job retomado no vuelve a contar"""
+        repo = repository()
+        repo.items.bulk_write.return_value = Mock(modified_count=0)
+
+        await repo.save_results("job-1", [{"index": 0, "status": "done", "message": "ok", "shared": False}])
+
+        repo.items.aggregate.assert_not_called()
+        repo.jobs.update_one.assert_not_awaited()
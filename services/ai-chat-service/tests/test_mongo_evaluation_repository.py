@@ -0,0 +1,250 @@
+import asyncio
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.repositories.mongo_evaluation_repository import EVALUATION_INDEXES, MongoEvaluationRepository
+
+
+def repository(**kwargs):
+    repo = MongoEvaluationRepository(**{"batch_size": 3, "flush_interval_ms": 50, "max_buffered": 5, **kwargs})
+    repo.collection = Mock()
+    repo.collection.insert_many = AsyncMock()
+    repo.collection.create_index = AsyncMock()
+    repo.rollups = Mock(apply=AsyncMock(), ensure_indexes=AsyncMock(), backfill=AsyncMock())
+    repo.ensure_collection = AsyncMock(return_value=True)
+    return repo
+
+
+def database(collection_infos):
+    db = Mock()
+    db.list_collections = AsyncMock(return_value=Mock(to_list=AsyncMock(return_value=collection_infos)))
+    db.create_collection = AsyncMock()
+    db.command = AsyncMock()
+    return db
+
+
+async def create(repo, idx):
+    return await repo.create(f"conv-{idx}", None, {"latency": idx})
+
+
+class TestMongoEvaluationRepository:
+    @pytest.mark.asyncio
+    async def test_create_buffers_and_flushes_by_size(self):
+        """Test de que create no escribe en Mongo y al completar un lote se vuelca con insert_many"""
+        repo = repository()
+
+        await create(repo, 1)
+        await create(repo, 2)
+        repo.collection.insert_many.assert_not_called()
+
+        await create(repo, 3)
+        await asyncio.sleep(0)
+
+        repo.collection.insert_many.assert_awaited_once()
+        batch = repo.collection.insert_many.call_args.args[0]
+        assert [evaluation["conversationId"] for evaluation in batch] == ["conv-1", "conv-2", "conv-3"]
+        assert batch[0]["meta"] == {"promptTemplateId": None, "model": None}
+        assert repo.collection.insert_many.call_args.kwargs == {"ordered": False}
+        assert repo.stats()["written"] == 3
+        repo.rollups.apply.assert_awaited_once_with(batch)
+
+    @pytest.mark.asyncio
+    async def test_indexes_created_once(self):
+        """Test de que los índices se crean una sola vez y no en cada evaluación"""
+        repo = repository()
+
+        await repo.start()
+        for idx in range(6):
+            await create(repo, idx)
+        await repo.close()
+
+        assert repo.collection.create_index.await_count == len(EVALUATION_INDEXES)
+        repo.rollups.backfill.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_flush_by_time_and_on_close(self):
+        """Test de volcado periódico y de las evaluaciones pendientes al cerrar"""
+        repo = repository()
+        await repo.start()
+
+        await create(repo, 1)
+        await asyncio.sleep(0.1)
+        assert repo.stats()["written"] == 1
+
+        await create(repo, 2)
+        await repo.close()
+        assert repo.stats() == {"buffered": 0, "written": 2, "failed": 0, "dropped": 0, "rollupErrors": 0}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_memory_bounded(self):
+        """Test de que si Mongo falla el lote vuelve al buffer y, lleno, se descartan las más antiguas"""
+        repo = repository(batch_size=10)
+        repo.collection.insert_many = AsyncMock(side_effect=Exception("Mongo down"))
+
+        for idx in range(7):
+            await create(repo, idx)
+
+        stats = repo.stats()
+        assert stats["buffered"] == 5
+        assert stats["dropped"] == 2
+        # Back-pressure: sólo un intento de volcado mientras Mongo sigue caído
+        assert repo.collection.insert_many.await_count == 1
+
+        repo.collection.insert_many = AsyncMock()
+        await repo.flush()
+        batch = repo.collection.insert_many.call_args.args[0]
+        assert [evaluation["conversationId"] for evaluation in batch] == [f"conv-{idx}" for idx in range(2, 7)]
+
+    @pytest.mark.asyncio
+    async def test_flush_after_lost_ack_does_not_duplicate(self):
+        """Test de que un volcado que se escribió pero falló sin respuesta no se inserta dos veces al reintentar"""
+        repo = repository(batch_size=10)
+        saved = []
+
+        async def insert_lost_ack(documents, ordered):
+            for document in documents:
+                document["_id"] = ObjectId()
+            saved.extend(documents[:2])
+            raise Exception("timed out")
+
+        async def find(query, projection):
+            for document in saved:
+                if document["_id"] in query["_id"]["$in"]:
+                    yield {"_id": document["_id"]}
+
+        repo.collection.insert_many = AsyncMock(side_effect=insert_lost_ack)
+        repo.collection.find = Mock(side_effect=find)
+        for idx in range(3):
+            await create(repo, idx)
+        await repo.flush()
+        assert repo.stats()["buffered"] == 3
+
+        repo.collection.insert_many = AsyncMock()
+        await repo.flush()
+
+        retried = repo.collection.insert_many.call_args.args[0]
+        assert [evaluation["conversationId"] for evaluation in retried] == ["conv-2"]
+        applied = repo.rollups.apply.call_args.args[0]
+        assert [evaluation["conversationId"] for evaluation in applied] == ["conv-0", "conv-1", "conv-2"]
+        assert repo.stats()["written"] == 3
+
+    @pytest.mark.asyncio
+    async def test_get_page_uses_keyset_cursor(self):
+        """Test de paginación por (timestamp, _id): la página siguiente continúa tras la última evaluación"""
+        repo = repository()
+        docs = [
+            {"_id": ObjectId(), "conversationId": f"conv-{idx}", "metrics": {}, "timestamp": datetime(2026, 10, 19, 10, 0, 3 - idx)}
+            for idx in range(3)
+        ]
+        query = Mock()
+        query.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=docs)
+        repo.collection.find = Mock(return_value=query)
+        repo.collection.estimated_document_count = AsyncMock(return_value=1000)
+        repo.collection.count_documents = AsyncMock()
+
+        evaluations, next_cursor, total = await repo.get_page(limit=2)
+
+        assert [evaluation["conversationId"] for evaluation in evaluations] == ["conv-0", "conv-1"]
+        assert total == 1000
+        repo.collection.count_documents.assert_not_called()
+
+        query.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
+        await repo.get_page(limit=2, cursor=next_cursor, count="none")
+
+        assert repo.collection.find.call_args.args[0] == {"$or": [
+            {"timestamp": {"$lt": docs[1]["timestamp"]}},
+            {"timestamp": docs[1]["timestamp"], "_id": {"$lt": docs[1]["_id"]}},
+        ]}
+        with pytest.raises(ValueError):
+            await repo.get_page(limit=2, cursor="not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_ensure_collection_creates_timeseries_with_retention(self):
+        """Test de que `evaluations` se crea como time-series (meta = template y modelo) con TTL"""
+        repo = repository(retention_days=30)
+        repo.db = database([])
+
+        assert await MongoEvaluationRepository.ensure_collection(repo) is True
+
+        options = repo.db.create_collection.call_args.kwargs
+        assert options["timeseries"] == {"timeField": "timestamp", "metaField": "meta", "granularity": "seconds"}
+        assert options["expireAfterSeconds"] == 30 * 86400
+
+    @pytest.mark.asyncio
+    async def test_ensure_collection_updates_retention_and_detects_legacy(self):
+        """Test de que un cambio de retención se aplica con collMod y una colección normal no se toca"""
+        repo = repository(retention_days=7)
+        repo.db = database([{"options": {"timeseries": {"timeField": "timestamp"}, "expireAfterSeconds": 30 * 86400}}])
+
+        assert await MongoEvaluationRepository.ensure_collection(repo) is True
+        repo.db.command.assert_awaited_once_with("collMod", repo.collection.name, expireAfterSeconds=7 * 86400)
+
+        repo.db = database([{"options": {}}])
+        assert await MongoEvaluationRepository.ensure_collection(repo) is False
+        repo.db.create_collection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_migrate_legacy_copies_in_batches_and_checkpoints(self):
+        """Test de la migración: renombra, copia por lotes conservando _id, guarda el avance y omite lo caducado"""
+        repo = repository(retention_days=30)
+        repo.collection.name = "evaluations"
+        repo.collection.rename = AsyncMock()
+        legacy_docs = [
+            {"_id": ObjectId(), "conversationId": f"conv-{idx}", "promptTemplateId": "prompt-1",
+             "metrics": {"model": "gpt-4o-mini"}, "timestamp": datetime.utcnow()}
+            for idx in range(3)
+        ]
+        legacy_docs.insert(0, {"_id": ObjectId(), "conversationId": "old", "metrics": {}, "timestamp": datetime(2000, 1, 1)})
+
+        async def documents():
+            for doc in legacy_docs:
+                yield doc
+
+        legacy = Mock(find_one=AsyncMock(return_value=legacy_docs[-1]))
+        legacy.find.return_value.sort.return_value.batch_size.return_value = documents()
+        repo.collection.delete_many = AsyncMock(return_value=Mock(deleted_count=0))
+        checkpoints = Mock(find_one=AsyncMock(return_value=None), update_one=AsyncMock())
+        repo.db = Mock()
+        repo.db.list_collection_names = AsyncMock(return_value=["evaluations"])
+        repo.db.__getitem__ = Mock(return_value=legacy)
+        repo.db.evaluation_jobs = checkpoints
+        repo.ensure_collection = AsyncMock(side_effect=[False, True])
+
+        result = await repo.migrate_legacy(batch_size=2)
+
+        assert result == {"copied": 3, "skipped": 1}
+        repo.rollups.backfill.assert_awaited_once()
+        repo.collection.rename.assert_awaited_once_with("evaluations_legacy")
+        copied = [doc for call in repo.collection.insert_many.call_args_list for doc in call.args[0]]
+        assert [doc["_id"] for doc in copied] == [doc["_id"] for doc in legacy_docs[1:]]
+        assert copied[0]["meta"] == {"promptTemplateId": "prompt-1", "model": "gpt-4o-mini"}
+        assert checkpoints.update_one.call_args.args[1] == {"$set": {"lastId": legacy_docs[-1]["_id"]}}
+
+    @pytest.mark.asyncio
+    async def test_migrate_legacy_resume_removes_batch_copied_after_checkpoint(self):
+        """Test de que al reanudar se borran las evaluaciones copiadas tras el último checkpoint antes de seguir"""
+        repo = repository(retention_days=0)
+        repo.collection.name = "evaluations"
+        legacy_docs = [{"_id": ObjectId(), "conversationId": f"conv-{idx}", "metrics": {}, "timestamp": datetime.utcnow()} for idx in range(3)]
+
+        async def documents():
+            for doc in legacy_docs[1:]:
+                yield doc
+
+        legacy = Mock(find_one=AsyncMock(return_value=legacy_docs[-1]))
+        legacy.find.return_value.sort.return_value.batch_size.return_value = documents()
+        repo.collection.delete_many = AsyncMock(return_value=Mock(deleted_count=2))
+        checkpoints = Mock(find_one=AsyncMock(return_value={"lastId": legacy_docs[0]["_id"]}), update_one=AsyncMock())
+        repo.db = Mock()
+        repo.db.list_collection_names = AsyncMock(return_value=["evaluations", "evaluations_legacy"])
+        repo.db.__getitem__ = Mock(return_value=legacy)
+        repo.db.evaluation_jobs = checkpoints
+
+        result = await repo.migrate_legacy(batch_size=2)
+
+        assert result == {"copied": 2, "skipped": 0}
+        repo.collection.delete_many.assert_awaited_once_with(
+            {"_id": {"$gt": legacy_docs[0]["_id"], "$lte": legacy_docs[-1]["_id"]}}
+        )
+        legacy.find.assert_called_once_with({"_id": {"$gt": legacy_docs[0]["_id"]}})
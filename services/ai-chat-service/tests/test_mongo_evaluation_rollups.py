@@ -0,0 +1,172 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, Mock
+from src.infrastructure.repositories.mongo_evaluation_rollups import (
+    MongoEvaluationRollups,
+    choose_granularity,
+    latency_bin,
+    percentiles,
+    rollup_increments,
+)
+
+
+def evaluation(timestamp, latency, template="prompt-1", new_conversation=False):
+    return {
+        "promptTemplateId": template,
+        "timestamp": timestamp,
+        "metrics": {
+            "latency": latency,
+            "tokens": {"input": 10, "output": 5, "total": 15},
+            "cost": {"total": 0.001},
+            "model": "gpt-4o-mini",
+            "cached": False,
+            "newConversation": new_conversation,
+        },
+    }
+
+
+def test_rollup_increments_per_granularity():
+    """Test de que cada evaluación suma en su minuto, hora, día y en el total"""
+    timestamp = datetime(2026, 10, 19, 10, 42, 31)
+    increments = rollup_increments([
+        evaluation(timestamp, 1000, new_conversation=True),
+        evaluation(timestamp + timedelta(seconds=5), 0),
+    ])
+
+    minute = increments[("minute", datetime(2026, 10, 19, 10, 42), "prompt-1", "gpt-4o-mini")]
+    assert minute["count"] == 2
+    assert minute["conversations"] == 1
+    assert minute["tokens.total"] == 30
+    assert minute["latency.count"] == 1
+    assert minute[f"latency.histogram.{latency_bin(1000)}"] == 1
+    assert ("hour", datetime(2026, 10, 19, 10), "prompt-1", "gpt-4o-mini") in increments
+    assert ("day", datetime(2026, 10, 19), "prompt-1", "gpt-4o-mini") in increments
+    assert ("total", datetime(1970, 1, 1), "prompt-1", "gpt-4o-mini") in increments
+
+
+def test_percentiles_from_histogram():
+    """Test de percentiles a partir del histograma logarítmico (error < 12%)"""
+    histogram = {}
+    for latency in range(100, 1100, 10):
+        histogram[latency_bin(latency)] = histogram.get(latency_bin(latency), 0) + 1
+
+    result = percentiles(histogram)
+
+    assert abs(result["p50"] - 600) / 600 < 0.12
+    assert abs(result["p99"] - 1090) / 1090 < 0.12
+    assert percentiles({}) == {"p50": 0.0, "p90": 0.0, "p95": 0.0, "p99": 0.0}
+
+
+def test_choose_granularity_bounds_buckets():
+    """Test de que los rangos largos se leen con buckets más gruesos"""
+    now = datetime(2026, 10, 19)
+
+    assert choose_granularity(None, None) == "total"
+    assert choose_granularity(now - timedelta(hours=1), now) == "minute"
+    assert choose_granularity(now - timedelta(days=2), now) == "hour"
+    assert choose_granularity(now - timedelta(days=90), now) == "day"
+
+
+@pytest.mark.asyncio
+async def test_summary_aggregates_in_mongo():
+    """Test de que el resumen se calcula con un pipeline sobre los rollups del rango"""
+    db = MagicMock()
+    rollups = MongoEvaluationRollups(db)
+    cursor = Mock(to_list=AsyncMock(return_value=[{
+        "totals": [{"messages": 4, "conversations": 2, "cached": 1, "tokensTotal": 60, "cost": 0.004,
+                    "latencyCount": 4, "latencyTotal": 2000}],
+        "byTemplate": [{"_id": {"promptTemplateId": "prompt-1", "model": "gpt-4o-mini"}, "messages": 4}],
+        "latency": [{"_id": str(latency_bin(500)), "count": 4}],
+    }]))
+    rollups.collection.aggregate = Mock(return_value=cursor)
+    start = datetime(2026, 10, 19, 10, 30, 15)
+
+    summary = await rollups.summary(start=start, end=start + timedelta(hours=1))
+
+    match = rollups.collection.aggregate.call_args.args[0][0]["$match"]
+    assert match == {"granularity": "minute", "bucket": {"$gte": datetime(2026, 10, 19, 10, 30), "$lte": start + timedelta(hours=1)}}
+    assert summary["totals"]["messages"] == 4
+    assert summary["totals"]["averageLatency"] == 500
+    assert abs(summary["latencyPercentiles"]["p50"] - 500) / 500 < 0.12
+    assert summary["byTemplate"][0]["promptTemplateId"] == "prompt-1"
+
+
+@pytest.mark.asyncio
+async def test_downsample_recomputes_hours_before_expiry():
+    """Test de que las horas a punto de caducar se recalculan desde los datos originales y se podan los minutos"""
+    db = MagicMock()
+    rollups = MongoEvaluationRollups(db)
+    rollups.evaluations.aggregate = Mock(return_value=Mock(to_list=AsyncMock(return_value=[])))
+    rollups.collection.delete_many = AsyncMock(return_value=Mock(deleted_count=60))
+    now = datetime(2026, 10, 19, 12, 30)
+
+    await rollups.downsample(timedelta(days=30), window=timedelta(hours=2), now=now)
+
+    pipeline = rollups.evaluations.aggregate.call_args.args[0]
+    # Primer mensaje de cada conversación numerado antes de recortar el inicio de la franja
+    assert pipeline[0] == {"$match": {"timestamp": {"$lt": datetime(2026, 9, 19, 16)}}}
+    assert "$setWindowFields" in pipeline[1]
+    assert pipeline[2] == {"$match": {"timestamp": {"$gte": datetime(2026, 9, 19, 14)}}}
+    assert pipeline[3]["$project"]["key"]["promptTemplateId"]["$ifNull"][-1] == "default"
+    assert pipeline[-1]["$merge"]["whenMatched"] == "replace"
+    assert rollups.collection.delete_many.call_args.args[0] == {"granularity": "minute", "bucket": {"$lt": now - timedelta(days=30)}}
+
+
+@pytest.mark.asyncio
+async def test_backfill_counts_legacy_conversations_and_model():
+    """Test de que el backfill cuenta la primera evaluación de cada conversación y el modelo de las evaluaciones sin `newConversation`"""
+    db = MagicMock()
+    rollups = MongoEvaluationRollups(db, legacy_model="gpt-4o")
+    rollups.collection.find_one = AsyncMock(return_value=None)
+    rollups.collection.create_index = AsyncMock()
+    rollups.evaluations.find_one = AsyncMock(return_value={"_id": "legacy"})
+    rollups.evaluations.aggregate = Mock(return_value=Mock(to_list=AsyncMock(return_value=[])))
+
+    assert await rollups.backfill() is True
+
+    pipeline = rollups.evaluations.aggregate.call_args.args[0]
+    window = pipeline[0]["$setWindowFields"]
+    assert window["partitionBy"] == "$conversationId"
+    assert window["output"] == {"conversationMessage": {"$documentNumber": {}}}
+    legacy, first_message, _ = pipeline[1]["$project"]["conversations"]["$cond"]
+    assert legacy == {"$eq": [{"$type": "$metrics.newConversation"}, "missing"]}
+    assert first_message == {"$cond": [{"$eq": ["$conversationMessage", 1]}, 1, 0]}
+    assert pipeline[1]["$project"]["key"]["model"] == {"$ifNull": ["$meta.model", "$metrics.model", "gpt-4o"]}
+
+
+def test_rollup_increments_default_template_key():
+    """Test de que las evaluaciones sin prompt template usan la clave "default" (nunca nula)"""
+    document = evaluation(datetime(2026, 10, 19, 10), 100, template=None)
+
+    increments = rollup_increments([document])
+
+    assert {key[2] for key in increments} == {"default"}
+
+
+@pytest.mark.asyncio
+async def test_backfill_and_summary_use_default_template():
+    """Test de que el backfill nunca hace $merge con promptTemplateId nulo y el resumen filtra "default" también por la clave antigua"""
+    db = MagicMock()
+    rollups = MongoEvaluationRollups(db)
+    pipeline = rollups._backfill_pipeline("hour")
+    project = next(stage["$project"] for stage in pipeline if "$project" in stage and "key" in stage["$project"])
+    assert project["key"]["promptTemplateId"] == {"$ifNull": ["$meta.promptTemplateId", "$promptTemplateId", "default"]}
+
+    rollups.collection.aggregate = Mock(return_value=Mock(to_list=AsyncMock(return_value=[])))
+    await rollups.summary(prompt_template_id="default")
+
+    match = rollups.collection.aggregate.call_args.args[0][0]["$match"]
+    assert match["promptTemplateId"] == {"$in": ["default", None]}
+
+
+def test_rollup_increments_read_timeseries_meta():
+    """Test de que en documentos time-series el template y el modelo salen de `meta`"""
+    document = {
+        "timestamp": datetime(2026, 10, 19, 10),
+        "meta": {"promptTemplateId": "prompt-2", "model": "gpt-4o"},
+        "metrics": {"latency": 100},
+    }
+
+    increments = rollup_increments([document])
+
+    assert ("total", datetime(1970, 1, 1), "prompt-2", "gpt-4o") in increments
@@ -62,3 +62,20 @@ class TestOpenAIEmbeddingService:
             service._ensure_client()
             mock_openai.assert_called_once_with(api_key="test-key")
             assert service.client is not None
+
+    @pytest.mark.asyncio
+    async def test_generate_embedding_uses_active_collection_model(self):
+        """Test de que la consulta se embebe con el modelo de la colección activa"""
+        registry = Mock()
+        registry.get_active_nowait.return_value = Mock(embedding_model="text-embedding-3-large")
+        service = OpenAIEmbeddingService(collection_registry=registry)
+        mock_response = Mock()
+        mock_response.data = [Mock(embedding=[0.1] * 3072)]
+        
+        with patch.object(service, '_ensure_client'):
+            service.client = AsyncMock()
+            service.client.embeddings.create = AsyncMock(return_value=mock_response)
+            
+            await service.generate_embedding("test text")
+            
+            assert service.client.embeddings.create.call_args.kwargs["model"] == "text-embedding-3-large"
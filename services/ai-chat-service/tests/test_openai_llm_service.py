@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
+from src.infrastructure.services.model_router import ModelRouter
 from src.infrastructure.services.openai_llm_service import OpenAILLMService
 
 
@@ -74,6 +75,66 @@ class TestOpenAILLMService:
             call_args = service.client.chat.completions.create.call_args
             assert call_args[1]["temperature"] == 0.9
 
+    @pytest.mark.asyncio
+    async def test_stream_response(self, service):
+        """Test de generación en streaming con uso de tokens al final"""
+        def chunk(content=None, usage=None):
+            mock_chunk = Mock()
+            mock_chunk.choices = [Mock()] if content is not None else []
+            if content is not None:
+                mock_chunk.choices[0].delta.content = content
+            mock_chunk.usage = usage
+            return mock_chunk
+
+        usage = Mock(prompt_tokens=100, completion_tokens=2, total_tokens=102)
+
+        async def stream():
+            for item in [chunk("Hola"), chunk(" mundo"), chunk(""), chunk(usage=usage)]:
+                yield item
+
+        with patch.object(service, '_ensure_client'):
+            service.client = AsyncMock()
+            service.client.chat.completions.create = AsyncMock(return_value=stream())
+
+            events = [event async for event in service.stream_response([{"role": "user", "content": "Hola"}])]
+
+            assert events[:2] == [
+                {"type": "token", "content": "Hola"},
+                {"type": "token", "content": " mundo"},
+            ]
+            assert events[2]["type"] == "usage"
+            assert events[2]["tokens"] == {"input": 100, "output": 2, "total": 102}
+            assert events[2]["model"] == events[2]["routing"]["model"]
+            call_kwargs = service.client.chat.completions.create.call_args.kwargs
+            assert call_kwargs["model"] == events[2]["model"]
+            assert call_kwargs["stream"] is True
+            assert call_kwargs["stream_options"] == {"include_usage": True}
+
+    @pytest.mark.asyncio
+    async def test_generate_response_routes_and_escalates(self):
+        """Test de routing: la pregunta simple va al modelo rápido y, si falla, escala a LLM_MODEL"""
+        service = OpenAILLMService(router=ModelRouter(default_model="gpt-4o", fast_model="gpt-4o-mini"))
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hola"
+        mock_response.usage = Mock(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+
+        with patch.object(service, '_ensure_client'):
+            service.client = AsyncMock()
+            service.client.chat.completions.create = AsyncMock(side_effect=[Exception("rate limited"), mock_response])
+
+            response = await service.generate_response(
+                [{"role": "user", "content": "Hola"}],
+                routing={"query": "Hola", "contextTokens": 0, "policy": None},
+            )
+
+            models = [call.kwargs["model"] for call in service.client.chat.completions.create.call_args_list]
+            assert models == ["gpt-4o-mini", "gpt-4o"]
+            assert response["model"] == "gpt-4o"
+            assert response["routing"]["reason"] == "simple"
+            assert response["routing"]["escalatedFrom"] == "gpt-4o-mini"
+            assert service.router.stats()["escalations"] == 1
+
     @pytest.mark.asyncio
     async def test_ensure_client_without_api_key(self, service):
         """Test de inicialización sin API key"""
@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.services.redis_answer_cache import RedisAnswerCache
+
+RESPONSE = {
+    "message": "Tienes 15 días de vacaciones.",
+    "conversationId": "conv-1",
+    "tokens": {"input": 100, "output": 20, "total": 120},
+    "sources": [{"documentId": "doc-1", "documentName": "politicas.pdf"}],
+}
+
+
+class TestRedisAnswerCache:
+    @pytest.fixture
+    def cache(self, fake_redis):
+        return RedisAnswerCache(fake_redis, ttl_seconds=60, max_entries=2, wait_seconds=0.5, version_ttl_seconds=0)
+
+    @pytest.mark.asyncio
+    async def test_hit_for_normalized_message(self, cache, fake_redis):
+        """Test de acierto para el mismo mensaje normalizado, scope y modelo"""
+        compute = AsyncMock(return_value=RESPONSE)
+
+        first, first_cached = await cache.get_or_compute("¿Cuántos días de vacaciones?", "default:abc", "gpt-4o-mini", compute)
+        second, second_cached = await cache.get_or_compute("  ¿cuántos días de VACACIONES? ", "default:abc", "gpt-4o-mini", compute)
+
+        assert first == RESPONSE and first_cached is False
+        assert second == {"message": RESPONSE["message"], "sources": RESPONSE["sources"]} and second_cached is True
+        compute.assert_awaited_once()
+        assert 60 in fake_redis.expirations.values()
+        assert not any(key.startswith("answer-lock:") for key in fake_redis.data)
+
+    @pytest.mark.asyncio
+    async def test_key_changes_with_scope_model_and_corpus_version(self, cache):
+        """Test de que template, modelo y versión del corpus forman parte de la clave"""
+        key = cache.make_key("hola", "default:abc", "gpt-4o-mini", "0")
+
+        assert key != cache.make_key("hola", "prompt-1:def", "gpt-4o-mini", "0")
+        assert key != cache.make_key("hola", "default:abc", "gpt-4o", "0")
+        assert key != cache.make_key("hola", "default:abc", "gpt-4o-mini", "1")
+
+    @pytest.mark.asyncio
+    async def test_bump_corpus_version_invalidates(self, cache):
+        """Test de que un cambio de corpus hace que no se sirvan respuestas anteriores"""
+        compute = AsyncMock(return_value=RESPONSE)
+        await cache.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", compute)
+
+        await cache.bump_corpus_version()
+        _, cached = await cache.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", compute)
+
+        assert cached is False
+        assert compute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_size_limits(self, cache, fake_redis):
+        """Test de límite de entradas, tamaño máximo y respuestas sin fuentes"""
+        for i in range(3):
+            await cache.get_or_compute(f"pregunta {i}", "default:abc", "gpt-4o-mini", AsyncMock(return_value=RESPONSE))
+        await cache.get_or_compute("sin fuentes", "default:abc", "gpt-4o-mini", AsyncMock(return_value={**RESPONSE, "sources": []}))
+        cache.max_bytes = 10
+        await cache.get_or_compute("enorme", "default:abc", "gpt-4o-mini", AsyncMock(return_value=RESPONSE))
+
+        answers = [key for key in fake_redis.data if key.startswith("answer:")]
+        assert len(answers) == 2
+        assert await fake_redis.zcard("answers:index") == 2
+
+    @pytest.mark.asyncio
+    async def test_stampede_guard_single_computation(self, cache):
+        """Test de que peticiones concurrentes idénticas llaman al LLM una sola vez"""
+        async def slow_compute():
+            await asyncio.sleep(0.1)
+            return RESPONSE
+
+        compute = AsyncMock(side_effect=slow_compute)
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", compute) for _ in range(5)
+        ])
+
+        assert compute.await_count == 1
+        assert sum(1 for _, cached in results if cached) == 4
+        assert cache.stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_stampede_guard_across_replicas(self, fake_redis):
+        """Test de que otra réplica espera la respuesta de la que tiene el lock en lugar de calcularla"""
+        replicas = [RedisAnswerCache(fake_redis, wait_seconds=0.5, version_ttl_seconds=0) for _ in range(2)]
+
+        async def slow_compute():
+            await asyncio.sleep(0.1)
+            return RESPONSE
+
+        compute = AsyncMock(side_effect=slow_compute)
+
+        results = await asyncio.gather(*[
+            replica.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", compute) for replica in replicas
+        ])
+
+        assert compute.await_count == 1
+        assert [cached for _, cached in results] == [False, True]
+        assert replicas[1].stats()["waitedHits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_coalescing_shares_uncached_answers_and_survives_cancellation(self, cache):
+        """Test de que las peticiones agrupadas reciben la respuesta aunque no se cachee y aunque la primera se cancele"""
+        release = asyncio.Event()
+
+        async def slow_compute():
+            await release.wait()
+            return {**RESPONSE, "sources": []}
+
+        compute = AsyncMock(side_effect=slow_compute)
+        first = asyncio.create_task(cache.get_or_compute("hola", "default:abc", "gpt-4o-mini", compute))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_compute("hola", "default:abc", "gpt-4o-mini", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+
+        response, cached = await second
+
+        assert response == {"message": RESPONSE["message"], "sources": []} and cached is True
+        compute.assert_awaited_once()
+        assert not cache._inflight
+
+    @pytest.mark.asyncio
+    async def test_coalesced_requests_share_errors(self, cache):
+        """Test de que un fallo del cálculo compartido llega a todas las peticiones agrupadas"""
+        async def failing_compute():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("llm down")
+
+        results = await asyncio.gather(*[
+            cache.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", AsyncMock(side_effect=failing_compute))
+            for _ in range(3)
+        ], return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.stats()["coalesced"] == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_computes(self):
+        """Test de que un fallo de Redis se trata como miss"""
+        broken_redis = Mock()
+        broken_redis.get = AsyncMock(side_effect=ConnectionError("redis down"))
+        cache = RedisAnswerCache(broken_redis)
+
+        response, cached = await cache.get_or_compute("pregunta", "default:abc", "gpt-4o-mini", AsyncMock(return_value=RESPONSE))
+
+        assert response == RESPONSE and cached is False
+        assert cache.stats()["errors"] == 1
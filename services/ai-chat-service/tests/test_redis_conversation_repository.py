@@ -0,0 +1,66 @@
+import pytest
+from unittest.mock import AsyncMock
+from src.domain.entities.conversation import Conversation
+from src.domain.entities.message import Message, MessageRole
+from src.infrastructure.repositories.redis_conversation_repository import RedisConversationRepository
+
+
+def message(sequence, content="hola"):
+    return Message(id=f"m-{sequence}", role=MessageRole.USER, content=content, conversation_id="conv-1", sequence=sequence)
+
+
+class TestRedisConversationRepository:
+    @pytest.fixture
+    def cold(self):
+        mock = AsyncMock()
+        mock.get.return_value = Conversation(
+            id="conv-1", user_id="user-1", title="t", messages=[message(2), message(3)],
+            summary="resumen", summarized_until=2, message_count=4,
+        )
+
+        async def append(conversation_id, user_id, messages):
+            for offset, m in enumerate(messages):
+                m.sequence = 4 + offset
+            return messages
+
+        mock.append_messages.side_effect = append
+        return mock
+
+    @pytest.fixture
+    def repository(self, fake_redis, cold):
+        return RedisConversationRepository(fake_redis, cold, hot_messages=3, ttl_seconds=60)
+
+    @pytest.mark.asyncio
+    async def test_miss_loads_cold_tier_then_serves_hot(self, repository, cold):
+        """Test de que un miss carga desde Mongo y las siguientes lecturas salen de Redis"""
+        first = await repository.get("conv-1", limit=10)
+        second = await repository.get("conv-1", limit=10)
+
+        cold.get.assert_awaited_once()
+        assert [m.sequence for m in second.messages] == [2, 3]
+        assert second.summary == "resumen"
+        assert second.user_id == first.user_id == "user-1"
+
+    @pytest.mark.asyncio
+    async def test_append_writes_both_tiers_and_trims(self, repository, cold, fake_redis):
+        """Test de escritura en ambos niveles con la lista caliente acotada"""
+        await repository.get("conv-1", limit=10)
+
+        await repository.append_messages("conv-1", "user-1", [message(None, "a"), message(None, "b")])
+        conversation = await repository.get("conv-1", limit=10)
+
+        cold.append_messages.assert_awaited_once()
+        assert [m.sequence for m in conversation.messages] == [3, 4, 5]
+        assert conversation.message_count == 6
+        assert fake_redis.expirations["conversation:conv-1:messages"] == 60
+
+    @pytest.mark.asyncio
+    async def test_summary_hides_folded_messages(self, repository):
+        """Test de que los mensajes ya resumidos no vuelven al historial"""
+        await repository.get("conv-1", limit=10)
+
+        await repository.save_summary("conv-1", "nuevo resumen", 3)
+        conversation = await repository.get("conv-1", limit=10)
+
+        assert conversation.summary == "nuevo resumen"
+        assert [m.sequence for m in conversation.messages] == [3]
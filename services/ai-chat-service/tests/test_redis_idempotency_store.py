@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.infrastructure.services.redis_idempotency_store import IdempotencyKeyInUse, RedisIdempotencyStore
+
+RESPONSE = {"message": "Tienes 15 días de vacaciones.", "conversationId": "conv-1", "sources": []}
+
+
+class TestRedisIdempotencyStore:
+    @pytest.fixture
+    def store(self, fake_redis):
+        return RedisIdempotencyStore(fake_redis, ttl_seconds=600, lock_seconds=30)
+
+    @pytest.mark.asyncio
+    async def test_retry_replays_original_response(self, store, fake_redis):
+        """Test de que un reintento con la misma clave devuelve la respuesta original sin recalcularla"""
+        compute = AsyncMock(return_value=RESPONSE)
+
+        first, first_replayed = await store.run("user-1", "key-1", "fp", compute)
+        second, second_replayed = await store.run("user-1", "key-1", "fp", compute)
+
+        assert first == second == RESPONSE
+        assert (first_replayed, second_replayed) == (False, True)
+        compute.assert_awaited_once()
+        assert 600 in fake_redis.expirations.values()
+
+    @pytest.mark.asyncio
+    async def test_keys_are_scoped_per_user(self, store):
+        """Test de que la misma clave de dos usuarios no comparte respuesta"""
+        compute = AsyncMock(return_value=RESPONSE)
+
+        await store.run("user-1", "key-1", "fp", compute)
+        _, replayed = await store.run("user-2", "key-1", "fp", compute)
+
+        assert replayed is False
+        assert compute.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_reused_key_with_different_request(self, store):
+        """Test de que reutilizar la clave con otra petición es un error"""
+        await store.run("user-1", "key-1", "fp", AsyncMock(return_value=RESPONSE))
+
+        with pytest.raises(ValueError):
+            await store.run("user-1", "key-1", "otra", AsyncMock(return_value=RESPONSE))
+
+    @pytest.mark.asyncio
+    async def test_concurrent_retry_while_in_progress(self, store):
+        """Test de que un reintento mientras la primera petición sigue en curso se rechaza"""
+        release = asyncio.Event()
+
+        async def slow_compute():
+            await release.wait()
+            return RESPONSE
+
+        first = asyncio.create_task(store.run("user-1", "key-1", "fp", slow_compute))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(IdempotencyKeyInUse):
+            await store.run("user-1", "key-1", "fp", AsyncMock(return_value=RESPONSE))
+        release.set()
+        assert (await first)[1] is False
+
+    @pytest.mark.asyncio
+    async def test_failure_releases_key(self, store):
+        """Test de que si el cálculo falla el reintento vuelve a calcular"""
+        with pytest.raises(RuntimeError):
+            await store.run("user-1", "key-1", "fp", AsyncMock(side_effect=RuntimeError("llm down")))
+
+        response, replayed = await store.run("user-1", "key-1", "fp", AsyncMock(return_value=RESPONSE))
+
+        assert response == RESPONSE and replayed is False
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_computes(self):
+        """Test de que un fallo de Redis no impide responder"""
+        broken_redis = Mock()
+        broken_redis.set = AsyncMock(side_effect=ConnectionError("redis down"))
+        store = RedisIdempotencyStore(broken_redis)
+
+        response, replayed = await store.run("user-1", "key-1", "fp", AsyncMock(return_value=RESPONSE))
+
+        assert response == RESPONSE and replayed is False
+        assert store.stats()["errors"] == 1
@@ -8,6 +8,7 @@ import pytest
 from unittest.mock import AsyncMock, Mock, patch
 from src.infrastructure.repositories.redis_prompt_repository import RedisPromptRepository
 from src.domain.entities.prompt_template import PromptTemplate
+from datetime import datetime, timedelta
 
 
 class TestRedisPromptRepository:
@@ -19,16 +20,15 @@ class TestRedisPromptRepository:
             return repo
 
     @pytest.mark.asyncio
-    async def test_create_prompt(self, repository, sample_prompt_template):
+    async def test_create_prompt(self, repository, sample_prompt_template, fake_redis):
         """Test de creación de prompt"""
-        repository.client.hset = AsyncMock()
-        repository.client.sadd = AsyncMock()
+        repository.client = fake_redis
         
         result = await repository.create(sample_prompt_template)
         
         assert result.id == sample_prompt_template.id
-        repository.client.hset.assert_called_once()
-        repository.client.sadd.assert_called_once()
+        assert fake_redis.data["prompt:prompt-1"]["name"] == sample_prompt_template.name
+        assert fake_redis.sorted_sets["prompts:by-created"] == {"prompt-1": sample_prompt_template.created_at.timestamp()}
 
     @pytest.mark.asyncio
     async def test_get_by_id_found(self, repository, sample_prompt_template):
@@ -50,6 +50,42 @@ class TestRedisPromptRepository:
         assert result.id == sample_prompt_template.id
         assert result.name == sample_prompt_template.name
 
+    @pytest.mark.asyncio
+    async def test_context_token_budget_round_trip(self, repository, sample_prompt_template, fake_redis):
+        """Test de que el presupuesto de contexto del template se guarda y se lee"""
+        repository.client = fake_redis
+        sample_prompt_template.context_token_budget = 800
+
+        await repository.create(sample_prompt_template)
+        result = await repository.get_by_id(sample_prompt_template.id)
+
+        assert result.context_token_budget == 800
+        assert result.to_dict()["contextTokenBudget"] == 800
+
+    @pytest.mark.asyncio
+    async def test_mmr_lambda_round_trip(self, repository, sample_prompt_template, fake_redis):
+        """Test de que el λ de MMR del template se guarda y se lee (0 incluido)"""
+        repository.client = fake_redis
+        sample_prompt_template.mmr_lambda = 0.0
+
+        await repository.create(sample_prompt_template)
+        result = await repository.get_by_id(sample_prompt_template.id)
+
+        assert result.mmr_lambda == 0.0
+        assert result.to_dict()["mmrLambda"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_model_policy_round_trip(self, repository, sample_prompt_template, fake_redis):
+        """Test de que la política de modelo del template se guarda y se lee"""
+        repository.client = fake_redis
+        sample_prompt_template.model_policy = "fast"
+
+        await repository.create(sample_prompt_template)
+        result = await repository.get_by_id(sample_prompt_template.id)
+
+        assert result.model_policy == "fast"
+        assert result.to_dict()["modelPolicy"] == "fast"
+
     @pytest.mark.asyncio
     async def test_get_by_id_not_found(self, repository):
         """Test de obtención de prompt inexistente"""
@@ -60,35 +96,74 @@ class TestRedisPromptRepository:
         assert result is None
 
     @pytest.mark.asyncio
-    async def test_get_all(self, repository, sample_prompt_template):
-        """Test de obtención de todos los prompts"""
-        repository.client.smembers = AsyncMock(return_value={sample_prompt_template.id})
-        repository.client.hgetall = AsyncMock(return_value={
-            "id": sample_prompt_template.id,
-            "name": sample_prompt_template.name,
-            "description": sample_prompt_template.description,
-            "system_prompt": sample_prompt_template.system_prompt,
-            "user_prompt_template": sample_prompt_template.user_prompt_template or "",
-            "parameters": "[]",
-            "created_at": sample_prompt_template.created_at.isoformat(),
-            "updated_at": sample_prompt_template.updated_at.isoformat(),
-        })
+    async def test_get_all(self, repository, sample_prompt_template, fake_redis):
+        """Test de obtención de todos los prompts (más recientes primero)"""
+        repository.client = fake_redis
+        older = PromptTemplate(id="prompt-0", name="Old", description="d", system_prompt="s",
+                               created_at=sample_prompt_template.created_at - timedelta(days=1))
+        await repository.create(older)
+        await repository.create(sample_prompt_template)
         
         result = await repository.get_all()
         
         assert isinstance(result, list)
-        assert len(result) == 1
-        assert result[0].id == sample_prompt_template.id
+        assert [prompt.id for prompt in result] == ["prompt-1", "prompt-0"]
 
     @pytest.mark.asyncio
-    async def test_get_all_empty(self, repository):
+    async def test_get_all_empty(self, repository, fake_redis):
         """Test de obtención cuando no hay prompts"""
-        repository.client.smembers = AsyncMock(return_value=set())
+        repository.client = fake_redis
         
         result = await repository.get_all()
         
         assert result == []
 
+    @pytest.mark.asyncio
+    async def test_get_page_with_cursor(self, repository, fake_redis):
+        """Test de paginación por cursor, incluidos empates de created_at"""
+        repository.client = fake_redis
+        created_at = datetime(2024, 1, 1)
+        for i in range(5):
+            await repository.create(PromptTemplate(
+                id=f"prompt-{i}", name=f"P{i}", description="d", system_prompt="s",
+                created_at=created_at + timedelta(minutes=i // 2),
+            ))
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await repository.get_page(limit=2, cursor=cursor)
+            seen.extend(prompt.id for prompt in page)
+            if cursor is None:
+                break
+
+        assert seen == ["prompt-4", "prompt-3", "prompt-2", "prompt-1", "prompt-0"]
+
+    @pytest.mark.asyncio
+    async def test_get_page_invalid_cursor(self, repository, fake_redis):
+        """Test de cursor inválido"""
+        repository.client = fake_redis
+        
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            await repository.get_page(limit=2, cursor="not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_legacy_index_is_migrated(self, repository, sample_prompt_template, fake_redis):
+        """Test de migración del índice SET antiguo al sorted set"""
+        repository.client = fake_redis
+        await fake_redis.hset("prompt:prompt-1", mapping={
+            "id": "prompt-1", "name": "Legacy", "description": "d", "system_prompt": "s",
+            "user_prompt_template": "", "parameters": "[]",
+            "created_at": sample_prompt_template.created_at.isoformat(),
+            "updated_at": sample_prompt_template.updated_at.isoformat(),
+        })
+        await fake_redis.sadd("prompts:index", "prompt-1")
+        
+        result = await repository.get_all()
+        
+        assert [prompt.name for prompt in result] == ["Legacy"]
+        assert "prompts:index" not in fake_redis.data
+
     @pytest.mark.asyncio
     async def test_update_prompt(self, repository, sample_prompt_template):
         """Test de actualización de prompt"""
@@ -110,22 +185,21 @@ class TestRedisPromptRepository:
             await repository.update(sample_prompt_template)
 
     @pytest.mark.asyncio
-    async def test_delete_prompt(self, repository):
+    async def test_delete_prompt(self, repository, sample_prompt_template, fake_redis):
         """Test de eliminación de prompt"""
-        repository.client.delete = AsyncMock(return_value=1)
-        repository.client.srem = AsyncMock()
+        repository.client = fake_redis
+        await repository.create(sample_prompt_template)
         
         result = await repository.delete("prompt-1")
         
         assert result is True
-        repository.client.delete.assert_called_once()
-        repository.client.srem.assert_called_once()
+        assert "prompt:prompt-1" not in fake_redis.data
+        assert fake_redis.sorted_sets["prompts:by-created"] == {}
 
     @pytest.mark.asyncio
-    async def test_delete_prompt_not_found(self, repository):
+    async def test_delete_prompt_not_found(self, repository, fake_redis):
         """Test de eliminación de prompt inexistente"""
-        repository.client.delete = AsyncMock(return_value=0)
-        repository.client.srem = AsyncMock()
+        repository.client = fake_redis
         
         result = await repository.delete("non-existent")
         
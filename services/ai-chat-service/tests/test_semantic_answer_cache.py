@@ -0,0 +1,59 @@
+import pytest
+from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+
+ANSWER = {"message": "Tienes 15 días de vacaciones.", "sources": [{"documentId": "doc-1"}]}
+
+
+class TestSemanticAnswerCache:
+    @pytest.fixture
+    def cache(self):
+        return SemanticAnswerCache(threshold=0.95, max_entries=2, ttl_seconds=60)
+
+    @pytest.mark.asyncio
+    async def test_hit_above_threshold(self, cache):
+        """Test de acierto para una consulta parecida en el mismo scope"""
+        await cache.store([1.0, 0.0, 0.0], "default:abc", ANSWER, cache.corpus_version())
+
+        cached = await cache.lookup([0.99, 0.05, 0.0], "default:abc")
+
+        assert cached["answer"] == ANSWER
+        assert cached["similarity"] >= 0.95
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_miss_below_threshold_or_other_scope(self, cache):
+        """Test de fallo por similitud baja o por otro template"""
+        await cache.store([1.0, 0.0, 0.0], "default:abc", ANSWER, cache.corpus_version())
+
+        assert await cache.lookup([0.7, 0.7, 0.0], "default:abc") is None
+        assert await cache.lookup([1.0, 0.0, 0.0], "prompt-1:def") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_bumps_version_and_rejects_stale_store(self, cache):
+        """Test de invalidación: vacía la caché y descarta respuestas de la versión anterior"""
+        version = cache.corpus_version()
+        await cache.store([1.0, 0.0], "default:abc", ANSWER, version)
+
+        cache.invalidate(reason="document.processed")
+
+        assert cache.corpus_version() == version + 1
+        assert await cache.lookup([1.0, 0.0], "default:abc") is None
+        assert await cache.store([1.0, 0.0], "default:abc", ANSWER, version) is False
+        assert cache.stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_oldest_entries_evicted(self, cache):
+        """Test de expulsión de las entradas más antiguas al superar el tamaño"""
+        for vector in ([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]):
+            await cache.store(vector, "default:abc", {**ANSWER, "message": str(vector)}, 0)
+
+        assert cache.stats()["entries"] == 2
+        assert await cache.lookup([1.0, 0.0, 0.0], "default:abc") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_ignored(self, cache):
+        """Test de que las entradas caducadas no se sirven"""
+        cache.ttl_seconds = -1
+        await cache.store([1.0, 0.0], "default:abc", ANSWER, 0)
+
+        assert await cache.lookup([1.0, 0.0], "default:abc") is None
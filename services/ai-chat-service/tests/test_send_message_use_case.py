@@ -1,6 +1,9 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, Mock
+from src.application.services.context_packer import ContextPacker
+from src.application.services.mmr import MMRSelector
 from src.application.use_cases.send_message_use_case import SendMessageUseCase
+from src.infrastructure.services.token_counter import TokenCounter
 
 
 class TestSendMessageUseCase:
@@ -165,3 +168,230 @@ class TestSendMessageUseCase:
         assert "latency" in result
         assert isinstance(result["latency"], int)
         assert result["latency"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_execute_stream_sources_tokens_done(self, use_case, mock_llm_service, mock_embedding_service):
+        """Test de streaming: fuentes primero, luego tokens y respuesta final con uso"""
+        async def stream(messages, routing=None):
+            yield {"type": "token", "content": "Hola"}
+            yield {"type": "token", "content": " mundo"}
+            yield {"type": "usage", "tokens": {"input": 10, "output": 2, "total": 12}}
+
+        mock_llm_service.stream_response = stream
+
+        events = [
+            event async for event in use_case.execute_stream(
+                user_message="What is the document about?",
+                conversation_id="conv-1",
+                user_id="user-1",
+            )
+        ]
+
+        assert [event["event"] for event in events] == ["sources", "token", "token", "done"]
+        assert len(events[0]["data"]["sources"]) == 2
+        done = events[-1]["data"]
+        assert done["message"] == "Hola mundo"
+        assert done["conversationId"] == "conv-1"
+        assert done["tokens"] == {"input": 10, "output": 2, "total": 12}
+        assert done["timeToFirstToken"] is not None
+        mock_embedding_service.generate_embedding.assert_called_once()
+        mock_llm_service.generate_response.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_execute_semantic_cache_hit_skips_llm(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de que una consulta parecida reutiliza la respuesta sin llamar al LLM"""
+        from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            answer_cache=SemanticAnswerCache(threshold=0.95),
+            cache_scope="default:abc",
+        )
+
+        first = await use_case.execute("What is the document about?", "conv-1", "user-1")
+        second = await use_case.execute("What's this document about?", "conv-2", "user-1")
+        events = [item async for item in use_case.execute_stream("What is the document about", "conv-3", "user-1")]
+
+        assert second["message"] == first["message"]
+        assert second["sources"] == first["sources"]
+        assert second["tokens"]["total"] == 0
+        assert second["cache"]["type"] == "semantic"
+        assert [item["event"] for item in events] == ["sources", "token", "done"]
+        assert events[-1]["data"]["cache"]["type"] == "semantic"
+        mock_llm_service.generate_response.assert_called_once()
+        mock_vector_search.search_similar.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_execute_does_not_cache_across_corpus_change(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de que una respuesta generada antes de invalidar no se guarda"""
+        from src.infrastructure.services.semantic_answer_cache import SemanticAnswerCache
+
+        cache = SemanticAnswerCache(threshold=0.95)
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            answer_cache=cache,
+        )
+
+        async def search_while_document_is_processed(*args, **kwargs):
+            cache.invalidate(reason="document.processed")
+            return [{"id": "c", "score": 0.9, "content": "x", "document_id": "doc-1", "metadata": {}}]
+
+        mock_vector_search.search_similar.side_effect = search_while_document_is_processed
+
+        await use_case.execute("What is the document about?", "conv-1", "user-1")
+
+        assert cache.stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_execute_includes_conversation_history(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de que el historial de la conversación se envía al LLM y el turno se guarda"""
+        memory = AsyncMock()
+        memory.history.return_value = [
+            {"role": "user", "content": "¿Cuántos días de vacaciones tengo?"},
+            {"role": "assistant", "content": "15 días."},
+        ]
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            conversation_memory=memory,
+        )
+
+        await use_case.execute("¿Y si llevo cinco años?", "conv-1", "user-1")
+
+        messages = mock_llm_service.generate_response.call_args.args[0]
+        assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+        assert messages[-1]["content"] == "¿Y si llevo cinco años?"
+        memory.record_turn.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_execute_packs_context_within_template_budget(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de que el contexto se recupera con más candidatos y se empaqueta dentro del presupuesto del template"""
+        mock_vector_search.search_similar.return_value = [
+            {"id": "a", "score": 0.9, "content": "a" * 2000, "document_id": "doc-1", "chunk_index": 0, "metadata": {}},
+            {"id": "b", "score": 0.88, "content": "b" * 2000, "document_id": "doc-2", "chunk_index": 0, "metadata": {}},
+        ]
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            context_packer=ContextPacker(TokenCounter(use_tiktoken=False), candidates=8, token_budget=2000),
+            context_token_budget=600,
+        )
+
+        result = await use_case.execute("What is the document about?", "conv-1", "user-1")
+
+        assert mock_vector_search.search_similar.call_args.kwargs["limit"] == 8
+        system_prompt = mock_llm_service.generate_response.call_args.args[0][0]["content"]
+        assert "a" * 500 in system_prompt and "b" * 500 not in system_prompt
+        assert [source["documentId"] for source in result["sources"]] == ["doc-1"]
+
+    @pytest.mark.asyncio
+    async def test_execute_uses_embedding_in_flight(self, use_case, mock_embedding_service, mock_vector_search):
+        """Test de que un embedding ya en curso se reutiliza en lugar de calcularlo otra vez"""
+        async def prefetched():
+            return [0.2] * 1536
+
+        await use_case.execute("What is the document about?", "conv-1", "user-1", query_embedding=prefetched())
+
+        mock_embedding_service.generate_embedding.assert_not_called()
+        assert mock_vector_search.search_similar.call_args.args[0] == [0.2] * 1536
+
+    @pytest.mark.asyncio
+    async def test_execute_fuses_vector_and_lexical_results(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de búsqueda híbrida: los resultados léxicos se fusionan con los vectoriales (RRF)"""
+        lexical_index = Mock()
+        lexical_index.strong_match.return_value = False
+        lexical_index.search.return_value = [
+            {"id": "chunk-9", "score": 0.9, "content": "Código VX-2041", "document_id": "doc-9", "chunk_index": 0, "metadata": {}},
+            {"id": "chunk-1", "score": 0.7, "content": "Relevant", "document_id": "doc-1", "chunk_index": 0, "metadata": {}},
+        ]
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            lexical_index=lexical_index,
+        )
+
+        result = await use_case.execute("What is the VX-2041 valve?", "conv-1", "user-1")
+
+        mock_embedding_service.generate_embedding.assert_called_once()
+        # chunk-1 aparece en ambas listas: primero; chunk-9 sólo en la léxica pero con mejor posición
+        assert [source["documentId"] for source in result["sources"]][:2] == ["doc-1", "doc-9"]
+
+    @pytest.mark.asyncio
+    async def test_execute_strong_lexical_match_skips_embedding(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test del camino rápido: con coincidencia léxica fuerte no se genera embedding ni se busca en Chroma"""
+        lexical_index = Mock()
+        lexical_index.strong_match.return_value = True
+        lexical_index.search.return_value = [
+            {"id": "chunk-9", "score": 1.0, "content": "Código VX-2041", "document_id": "doc-9", "chunk_index": 0, "metadata": {}},
+        ]
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            lexical_index=lexical_index,
+        )
+
+        result = await use_case.execute("What is the VX-2041 valve?", "conv-1", "user-1")
+
+        mock_embedding_service.generate_embedding.assert_not_called()
+        mock_vector_search.search_similar.assert_not_called()
+        assert [source["documentId"] for source in result["sources"]] == ["doc-9"]
+
+    @pytest.mark.asyncio
+    async def test_execute_diversifies_overfetched_chunks(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de MMR: se piden más candidatos con embeddings y se descartan los casi duplicados"""
+        mock_embedding_service.generate_embedding.return_value = [0.95, 0.31]
+        mock_vector_search.search_similar.return_value = [
+            {"id": "a", "score": 0.9, "content": "A", "document_id": "doc-1", "chunk_index": 0, "metadata": {}, "embedding": [1.0, 0.0]},
+            {"id": "b", "score": 0.89, "content": "B", "document_id": "doc-1", "chunk_index": 1, "metadata": {}, "embedding": [0.99, -0.1]},
+            {"id": "c", "score": 0.8, "content": "C", "document_id": "doc-2", "chunk_index": 0, "metadata": {}, "embedding": [0.6, 0.8]},
+        ]
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            context_packer=ContextPacker(TokenCounter(use_tiktoken=False), candidates=2, score_gap=1.0),
+            mmr_selector=MMRSelector(fetch_k=20, default_lambda=1.0),
+            mmr_lambda=0.5,
+        )
+
+        result = await use_case.execute("What is the document about?", "conv-1", "user-1")
+
+        assert mock_vector_search.search_similar.call_args.kwargs == {"limit": 20, "include_embeddings": True}
+        assert [source["documentId"] for source in result["sources"]] == ["doc-1", "doc-2"]
+
+    @pytest.mark.asyncio
+    async def test_execute_passes_routing_and_returns_model(self, mock_llm_service, mock_vector_search, mock_embedding_service):
+        """Test de routing: el LLM recibe la pregunta, el tamaño del contexto y la política del template"""
+        mock_vector_search.search_similar.return_value = [
+            {"id": "a", "score": 0.9, "content": "x" * 400, "document_id": "doc-1", "metadata": {}},
+        ]
+        mock_llm_service.generate_response.return_value = {
+            "content": "Respuesta",
+            "tokens": {"input": 10, "output": 5, "total": 15},
+            "model": "gpt-4o-mini",
+            "routing": {"tier": "fast", "model": "gpt-4o-mini", "reason": "policy"},
+        }
+        use_case = SendMessageUseCase(
+            llm_service=mock_llm_service,
+            vector_search=mock_vector_search,
+            embedding_service=mock_embedding_service,
+            model_policy="fast",
+        )
+
+        result = await use_case.execute("What is the document about?", "conv-1", "user-1")
+
+        assert mock_llm_service.generate_response.call_args.kwargs["routing"] == {
+            "query": "What is the document about?",
+            "contextTokens": 100,
+            "policy": "fast",
+        }
+        assert result["model"] == "gpt-4o-mini"
+        assert result["routing"]["reason"] == "policy"
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from benchmarks.stats import latency_summary, percentile
+from benchmarks.vector_search_benchmark import (
+    generate_corpus,
+    exact_top_k,
+    recall_at_k,
+    run_backend,
+    NumpyExactBackend,
+)
+
+
+class TestVectorSearchBenchmark:
+    def test_exact_top_k_orders_by_distance(self):
+        """Test de top-k exacto ordenado por distancia"""
+        corpus = np.array([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]], dtype=np.float32)
+        queries = np.array([[1.0, 0.1]], dtype=np.float32)
+
+        result = exact_top_k(corpus, queries, k=2)
+
+        assert result.tolist() == [[0, 2]]
+
+    def test_recall_at_k(self):
+        """Test de cálculo de recall@k"""
+        exact = np.array([[0, 1], [2, 3]])
+
+        assert recall_at_k([[0, 1], [2, 3]], exact) == 1.0
+        assert recall_at_k([[0], [3, 9]], exact) == 0.5
+        assert recall_at_k([], exact) == 0.0
+
+    def test_latency_summary_percentiles(self):
+        """Test de percentiles de latencia"""
+        summary = latency_summary([float(i) for i in range(1, 101)])
+
+        assert summary["count"] == 100
+        assert summary["p50"] == pytest.approx(50.5)
+        assert summary["p99"] == pytest.approx(99.01)
+        assert percentile([], 50) == 0.0
+
+    def test_generate_corpus_is_deterministic(self):
+        """Test de corpus sintético reproducible"""
+        corpus_a, queries_a = generate_corpus(n_docs=50, n_queries=5, dim=8, seed=1)
+        corpus_b, queries_b = generate_corpus(n_docs=50, n_queries=5, dim=8, seed=1)
+
+        assert corpus_a.shape == (50, 8)
+        assert np.array_equal(corpus_a, corpus_b)
+        assert np.array_equal(queries_a, queries_b)
+
+    @pytest.mark.asyncio
+    async def test_numpy_backend_has_full_recall(self):
+        """Test de que el backend exacto alcanza recall 1.0"""
+        corpus, queries = generate_corpus(n_docs=100, n_queries=10, dim=16, seed=3)
+
+        results = await run_backend(NumpyExactBackend(), corpus, queries, ks=[1, 5], warmup=0)
+
+        assert [row["k"] for row in results] == [1, 5]
+        assert all(row["recall_at_k"] == 1.0 for row in results)
+        assert results[0]["latency_ms"]["count"] == 10
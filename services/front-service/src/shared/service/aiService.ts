@@ -89,6 +89,9 @@ export interface PromptTemplate {
         description: string;
         required: boolean;
     }>;
+    contextTokenBudget?: number;
+    mmrLambda?: number;
+    modelPolicy?: 'auto' | 'fast' | 'default' | 'strong';
     createdAt: Date;
     updatedAt: Date;
 }
@@ -108,6 +111,15 @@ export interface PromptEvaluation {
             output: number;
             total: number;
         };
+        model?: string;
+        routing?: {
+            tier: 'fast' | 'default' | 'strong';
+            model: string;
+            reason: string;
+            queryTokens: number;
+            contextTokens: number;
+            escalatedFrom?: string;
+        };
     };
     quality?: {
         relevance: number;
@@ -218,18 +230,23 @@ export const aiService = {
     },
 
     // Evaluaciones y métricas
-    async getEvaluations(limit?: number, offset?: number): Promise<{ success: boolean; data: PromptEvaluation[]; total: number }> {
+    async getEvaluations(
+        limit?: number,
+        offset?: number,
+        cursor?: string
+    ): Promise<{ success: boolean; data: PromptEvaluation[]; total: number; nextCursor?: string | null }> {
         const params = new URLSearchParams();
         if (limit) params.append('limit', limit.toString());
         if (offset) params.append('offset', offset.toString());
+        if (cursor) params.append('cursor', cursor);
 
-        const response = await aiChatApi.get<{ success: boolean; data: PromptEvaluation[]; total: number }>(
+        const response = await aiChatApi.get<{ success: boolean; data: PromptEvaluation[]; total: number; nextCursor?: string | null }>(
             `/evaluations?${params.toString()}`
         );
         return response.data;
     },
 
-    async getMetrics(): Promise<{
+    async getMetrics(from?: string, to?: string): Promise<{
         success: boolean;
         data: {
             totalConversations: number;
@@ -237,10 +254,16 @@ export const aiService = {
             totalTokens: number;
             totalCost: number;
             averageLatency: number;
+            latencyPercentiles?: { p50: number; p90: number; p95: number; p99: number };
             documentsProcessed: number;
         };
     }> {
-        const response = await aiChatApi.get('/metrics');
+        const params = new URLSearchParams();
+        if (from) params.append('from', from);
+        if (to) params.append('to', to);
+
+        const query = params.toString();
+        const response = await aiChatApi.get(query ? `/metrics?${query}` : '/metrics');
         return response.data;
     },
 };
@@ -0,0 +1,164 @@
+"""
+Dobles deterministas de los puertos del servicio para medir la ingesta sin
+OpenAI, Chroma ni Kafka.
+"""
+import asyncio
+import hashlib
+import random
+import time
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.ievent_publisher import IEventPublisher
+from src.domain.entities.document_chunk import DocumentChunk
+from src.domain.repositories.ivector_repository import IVectorRepository
+from src.infrastructure.vector_db.collection_registry import ActiveCollection
+
+
+class StageTimer:
+    """Acumula el tiempo (ms) de cada llamada por etapa"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, started: float) -> None:
+        self.samples[stage].append((time.perf_counter() - started) * 1000)
+
+    def reset(self) -> None:
+        self.samples = defaultdict(list)
+
+
+class FakeEmbeddingService(IEmbeddingService):
+    """
+    Embeddings pseudoaleatorios derivados del hash del texto (mismo texto, mismo
+    vector). La latencia simula la de la API: fija por petición más un coste por
+    texto del lote.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        latency_ms: float = 0.0,
+        latency_per_item_ms: float = 0.0,
+        timer: Optional[StageTimer] = None,
+    ):
+        self.dimensions = dimensions
+        self.latency_ms = latency_ms
+        self.latency_per_item_ms = latency_per_item_ms
+        self.timer = timer
+        self.requests = 0
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        return (await self.generate_embeddings_batch([text]))[0]
+
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        self.requests += 1
+        delay = (self.latency_ms + self.latency_per_item_ms * len(texts)) / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+        embeddings = [self._embed(text) for text in texts]
+        if self.timer:
+            self.timer.record("embedding", started)
+        return embeddings
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        return [rng.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+
+
+class InMemoryVectorRepository(IVectorRepository):
+    """Repositorio de vectores en memoria con la semántica de upsert de Chroma"""
+
+    def __init__(self, upsert_latency_ms: float = 0.0, timer: Optional[StageTimer] = None):
+        self.collections: Dict[str, Dict[str, DocumentChunk]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self.upsert_latency_ms = upsert_latency_ms
+        self.timer = timer
+
+    async def create_collection(self, collection_name: str, vector_size: int, embedding_model: Optional[str] = None) -> bool:
+        if collection_name not in self.collections:
+            self.collections[collection_name] = {}
+            self.metadata[collection_name] = {"embedding_model": embedding_model, "embedding_dimensions": vector_size}
+        return True
+
+    async def upsert_chunks(self, collection_name: str, chunks: List[DocumentChunk]) -> bool:
+        started = time.perf_counter()
+        if self.upsert_latency_ms > 0:
+            await asyncio.sleep(self.upsert_latency_ms / 1000)
+        collection = self.collections.setdefault(collection_name, {})
+        for chunk in chunks:
+            collection[chunk.id] = chunk
+        if self.timer:
+            self.timer.record("upsert", started)
+        return True
+
+    async def search_similar(
+        self,
+        collection_name: str,
+        query_embedding: List[float],
+        limit: int = 5,
+        score_threshold: float = 0.7,
+    ) -> List[dict]:
+        scored = []
+        for chunk in self.collections.get(collection_name, {}).values():
+            distance = sum((a - b) ** 2 for a, b in zip(chunk.embedding or [], query_embedding))
+            scored.append((distance, chunk))
+        scored.sort(key=lambda item: item[0])
+        return [
+            {"id": chunk.id, "content": chunk.content, "metadata": chunk.metadata, "score": 1 / (1 + distance)}
+            for distance, chunk in scored[:limit]
+            if 1 / (1 + distance) >= score_threshold
+        ]
+
+    async def delete_document_chunks(self, collection_name: str, document_id: str) -> bool:
+        collection = self.collections.get(collection_name, {})
+        for chunk_id in [cid for cid, chunk in collection.items() if chunk.document_id == document_id]:
+            del collection[chunk_id]
+        return True
+
+    async def count_chunks(self, collection_name: str) -> int:
+        return len(self.collections.get(collection_name, {}))
+
+    async def get_chunks(self, collection_name: str, limit: int, offset: int = 0) -> List[DocumentChunk]:
+        return list(self.collections.get(collection_name, {}).values())[offset:offset + limit]
+
+    async def get_chunk_ids(self, collection_name: str) -> List[str]:
+        return list(self.collections.get(collection_name, {}).keys())
+
+    async def delete_chunks(self, collection_name: str, chunk_ids: List[str]) -> bool:
+        collection = self.collections.get(collection_name, {})
+        for chunk_id in chunk_ids:
+            collection.pop(chunk_id, None)
+        return True
+
+
+class NullEventPublisher(IEventPublisher):
+    """Publicador que sólo cuenta eventos"""
+
+    def __init__(self):
+        self.events: Dict[str, int] = defaultdict(int)
+
+    async def connect(self) -> None:
+        pass
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def publish(self, event_name: str, payload: Dict[str, Any]) -> None:
+        self.events[event_name] += 1
+
+
+class StaticCollectionRegistry:
+    """Alias fijo, sin leer `collection_aliases` de Chroma"""
+
+    def __init__(self, collection: str = "documents", embedding_model: str = "fake-embedding"):
+        self.active = ActiveCollection(collection, embedding_model)
+
+    def get_active(self, refresh: bool = False) -> ActiveCollection:
+        return self.active
+
+    def invalidate(self) -> None:
+        pass
@@ -0,0 +1,218 @@
+"""
+Benchmark offline de la ingesta de documentos.
+
+Genera un corpus de PDFs de varios tamaños y los pasa por el procesador de
+documentos, por `handle_document_uploaded` (consumidor de Kafka) y por el
+endpoint `upload_document`, con embeddings falsos deterministas (latencia
+configurable), repositorio de vectores en memoria y sin Kafka. Reporta tiempo
+por etapa, pico de RSS y throughput.
+
+Uso:
+    python -m benchmarks.ingestion_benchmark --pages 1 10 50 --docs-per-size 5 \\
+        --embedding-latency-ms 150 --embedding-latency-per-item-ms 2 \\
+        --output benchmarks/results/ingestion.json
+"""
+import argparse
+import asyncio
+import importlib
+import io
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from unittest.mock import patch, MagicMock
+
+from fastapi import UploadFile
+
+from benchmarks.fakes import (
+    StageTimer,
+    FakeEmbeddingService,
+    InMemoryVectorRepository,
+    NullEventPublisher,
+    StaticCollectionRegistry,
+)
+from benchmarks.pdf_corpus import generate_corpus
+from benchmarks.stats import latency_summary, environment_info, peak_rss_mb, write_results
+from src.infrastructure.services.document_processor import DocumentProcessor
+
+SCENARIOS = ["document_processor", "handle_document_uploaded", "upload_document"]
+
+
+class TimedDocumentProcessor(DocumentProcessor):
+    def __init__(self, timer: StageTimer):
+        self.timer = timer
+
+    async def process_file(self, file_path: str) -> List[str]:
+        started = time.perf_counter()
+        try:
+            return await super().process_file(file_path)
+        finally:
+            self.timer.record("extract", started)
+
+
+@contextmanager
+def ingestion_service(upload_dir: str, embedding_service, vector_repository, event_publisher, document_processor):
+    """
+    Importa `src.main` sin conectar con Kafka ni Chroma y sustituye sus
+    dependencias por los dobles del benchmark mientras dura el contexto.
+    """
+    with patch.dict(os.environ, {"UPLOAD_DIR": upload_dir}), \
+            patch("src.infrastructure.messaging.kafka_event_publisher.KafkaEventPublisher", MagicMock()), \
+            patch("src.infrastructure.messaging.kafka_event_consumer.KafkaEventConsumer", MagicMock()), \
+            patch("src.infrastructure.vector_db.chroma_vector_repository.ChromaVectorRepository", MagicMock()):
+        main = importlib.import_module("src.main")
+
+    replacements = {
+        "upload_dir": upload_dir,
+        "embedding_service": embedding_service,
+        "vector_repository": vector_repository,
+        "event_publisher": event_publisher,
+        "document_processor": document_processor,
+        "collection_registry": StaticCollectionRegistry(),
+    }
+    original = {name: getattr(main, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(main, name, value)
+    try:
+        yield main
+    finally:
+        for name, value in original.items():
+            setattr(main, name, value)
+
+
+async def run_scenario(
+    scenario: str,
+    corpus: List[Dict[str, Any]],
+    main,
+    timer: StageTimer,
+    processor: DocumentProcessor,
+    vector_repository: InMemoryVectorRepository,
+    concurrency: int = 1,
+) -> Dict[str, Any]:
+    """Ingiere todo el corpus con el escenario indicado y devuelve sus métricas"""
+    timer.reset()
+    vector_repository.collections.clear()
+    totals: List[float] = []
+    by_size: Dict[int, List[float]] = {}
+    chunks = 0
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def ingest(document: Dict[str, Any]) -> None:
+        nonlocal chunks
+        async with semaphore:
+            started = time.perf_counter()
+            if scenario == "document_processor":
+                chunks += len(await processor.process_file(document["path"]))
+            elif scenario == "handle_document_uploaded":
+                await main.handle_document_uploaded({
+                    "documentId": str(uuid.uuid4()),
+                    "filePath": document["path"],
+                    "userId": "benchmark",
+                    "fileName": os.path.basename(document["path"]),
+                })
+            else:
+                with open(document["path"], "rb") as f:
+                    upload = UploadFile(file=io.BytesIO(f.read()), filename=os.path.basename(document["path"]))
+                response = await main.upload_document(file=upload, name=None, description=None, user_id="benchmark")
+                os.remove(os.path.join(main.upload_dir, f"{response['data']['documentId']}_{upload.filename}"))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            totals.append(elapsed_ms)
+            by_size.setdefault(document["pages"], []).append(elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[ingest(document) for document in corpus])
+    elapsed = time.perf_counter() - started
+
+    if scenario != "document_processor":
+        chunks = sum(len(collection) for collection in vector_repository.collections.values())
+    pages = sum(document["pages"] for document in corpus)
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "docs": len(corpus),
+        "pages": pages,
+        "chunks": chunks,
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_second": round(len(corpus) / elapsed, 2),
+        "pages_per_second": round(pages / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 2),
+        "total_ms": latency_summary(totals),
+        "stages_ms": {stage: latency_summary(samples) for stage, samples in sorted(timer.samples.items())},
+        "by_pages_ms": {str(size): latency_summary(samples) for size, samples in sorted(by_size.items())},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def main(args) -> Dict[str, Any]:
+    timer = StageTimer()
+    embedding_service = FakeEmbeddingService(
+        dimensions=args.dim,
+        latency_ms=args.embedding_latency_ms,
+        latency_per_item_ms=args.embedding_latency_per_item_ms,
+        timer=timer,
+    )
+    vector_repository = InMemoryVectorRepository(upsert_latency_ms=args.upsert_latency_ms, timer=timer)
+    event_publisher = NullEventPublisher()
+    processor = TimedDocumentProcessor(timer)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = os.path.join(workdir, "corpus")
+        upload_dir = os.path.join(workdir, "uploads")
+        os.makedirs(upload_dir)
+        corpus = generate_corpus(corpus_dir, args.pages, args.docs_per_size, seed=args.seed)
+
+        results = []
+        with ingestion_service(upload_dir, embedding_service, vector_repository, event_publisher, processor) as service:
+            for scenario in args.scenarios:
+                results.append(await run_scenario(
+                    scenario, corpus, service, timer, processor, vector_repository, concurrency=args.concurrency,
+                ))
+
+    payload = {
+        "benchmark": "ingestion",
+        "environment": environment_info(),
+        "corpus": {
+            "pages": args.pages,
+            "docs_per_size": args.docs_per_size,
+            "bytes": sum(document["bytes"] for document in corpus),
+            "seed": args.seed,
+        },
+        "fakes": {
+            "dim": args.dim,
+            "embedding_latency_ms": args.embedding_latency_ms,
+            "embedding_latency_per_item_ms": args.embedding_latency_per_item_ms,
+            "upsert_latency_ms": args.upsert_latency_ms,
+        },
+        "results": results,
+    }
+    write_results(args.output, payload)
+    return payload
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline ingestion throughput benchmark")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50], help="Tamaños de documento (páginas)")
+    parser.add_argument("--docs-per-size", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=1, help="Documentos ingeridos a la vez")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embedding-latency-ms", type=float, default=0.0)
+    parser.add_argument("--embedding-latency-per-item-ms", type=float, default=0.0)
+    parser.add_argument("--upsert-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", default="benchmarks/results/ingestion.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    payload = asyncio.run(main(parse_args()))
+    for row in payload["results"]:
+        stages = " ".join(f"{stage}={summary['p50']:.1f}ms" for stage, summary in row["stages_ms"].items())
+        print(
+            f"{row['scenario']:26s} docs/s={row['docs_per_second']:<8.2f} pages/s={row['pages_per_second']:<8.2f} "
+            f"chunks/s={row['chunks_per_second']:<8.2f} p50={row['total_ms']['p50']:.1f}ms "
+            f"rss={row['peak_rss_mb']}MB {stages}"
+        )
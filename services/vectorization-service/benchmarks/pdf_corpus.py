@@ -0,0 +1,91 @@
+"""
+Generador de PDFs sintéticos con texto extraíble (Helvetica, sin dependencias
+externas) para alimentar `DocumentProcessor` con documentos de tamaño conocido.
+"""
+import os
+import random
+from typing import List, Dict, Any
+
+WORDS = (
+    "política vacaciones empleado solicitud aprobación gerente días hábiles "
+    "contrato seguro médico reembolso gastos viaje oficina remoto horario "
+    "evaluación desempeño capacitación beneficios nómina impuestos documento "
+    "procedimiento seguridad información cliente proveedor factura pago"
+).split()
+
+
+def generate_page_lines(rng: random.Random, lines: int = 45, words_per_line: int = 12) -> List[str]:
+    result = []
+    for _ in range(lines):
+        sentence = " ".join(rng.choice(WORDS) for _ in range(words_per_line))
+        result.append(sentence.capitalize() + ".")
+    return result
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """Construye un PDF mínimo válido con una página por lista de líneas"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # se rellena al final
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for lines in pages:
+        stream = _content_stream(lines)
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font_id, content_id)
+        ))
+
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+def generate_corpus(directory: str, page_counts: List[int], docs_per_size: int = 1, seed: int = 42) -> List[Dict[str, Any]]:
+    """Escribe `docs_per_size` PDFs por cada tamaño (en páginas) y devuelve su descripción"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for pages in page_counts:
+        for index in range(docs_per_size):
+            path = os.path.join(directory, f"doc_{pages:04d}p_{index:03d}.pdf")
+            content = build_pdf([generate_page_lines(rng) for _ in range(pages)])
+            with open(path, "wb") as f:
+                f.write(content)
+            corpus.append({"path": path, "pages": pages, "bytes": len(content)})
+    return corpus
+
+
+def _content_stream(lines: List[str]) -> bytes:
+    parts = [b"BT", b"/F1 10 Tf", b"14 TL", b"50 760 Td"]
+    for line in lines:
+        parts.append(b"(%s) Tj T*" % _escape(line))
+    parts.append(b"ET")
+    return b"\n".join(parts)
+
+
+def _escape(text: str) -> bytes:
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
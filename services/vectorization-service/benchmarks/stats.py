@@ -0,0 +1,75 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+from typing import List, Dict, Any, Optional
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """Resume una lista de latencias (ms) en percentiles p50/p95/p99"""
+    if not samples_ms:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "min": round(ordered[0], 3),
+        "p50": round(percentile(ordered, 50), 3),
+        "p95": round(percentile(ordered, 95), 3),
+        "p99": round(percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada"""
+    if not ordered:
+        return 0.0
+    if len(ordered) == 1:
+        return float(ordered[0])
+
+    rank = (pct / 100) * (len(ordered) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    weight = rank - lower
+    return float(ordered[lower] * (1 - weight) + ordered[upper] * weight)
+
+
+def environment_info() -> Dict[str, Any]:
+    """Información del entorno para poder comparar resultados entre commits"""
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso (MB) desde que arrancó"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KB, macOS en bytes
+    divisor = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def write_results(path: str, payload: Dict[str, Any]) -> None:
+    """Escribe los resultados como JSON estable (claves ordenadas) para poder hacer diff"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except Exception:
+        return None
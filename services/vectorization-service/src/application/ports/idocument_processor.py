@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Tuple
 from src.domain.entities.document_chunk import DocumentChunk
 
 
@@ -9,6 +9,11 @@ class IDocumentProcessor(ABC):
         """Extrae texto del archivo y lo divide en chunks"""
         pass
 
+    @abstractmethod
+    async def process_file_with_stats(self, file_path: str) -> Tuple[List[str], int]:
+        """Extrae y divide el texto, devolviendo también el número de páginas"""
+        pass
+
     @abstractmethod
     async def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """Divide el texto en chunks con overlap"""
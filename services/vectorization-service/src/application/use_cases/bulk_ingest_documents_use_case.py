@@ -0,0 +1,313 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Callable, Awaitable, Tuple
+from src.domain.entities.document_chunk import DocumentChunk
+from src.domain.repositories.ivector_repository import IVectorRepository
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.idocument_processor import IDocumentProcessor
+from src.application.ports.ievent_publisher import IEventPublisher
+from src.infrastructure.config.logger import logger
+
+_DONE = object()
+
+
+class IngestionStats:
+    def __init__(self):
+        self.documents = 0
+        self.skipped = 0
+        self.failed = 0
+        self.pages = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    def summary(self) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "documents": self.documents,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "tokens_estimated": self.tokens,
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_second": round(self.documents / elapsed, 2),
+            "pages_per_second": round(self.pages / elapsed, 2),
+            "chunks_per_second": round(self.chunks / elapsed, 2),
+            "tokens_per_second": round(self.tokens / elapsed, 2),
+        }
+
+
+class BulkIngestDocumentsUseCase:
+    """
+    Ingesta masiva de PDFs sin pasar por HTTP: extracción en paralelo, embeddings
+    en lotes que mezclan chunks de varios documentos y upserts en lote. Un
+    documento sólo se marca como completado en el checkpoint cuando todos sus
+    chunks están guardados, así que relanzar el job reanuda donde se quedó.
+    """
+
+    def __init__(
+        self,
+        document_processor: IDocumentProcessor,
+        embedding_service: IEmbeddingService,
+        vector_repository: IVectorRepository,
+        checkpoint_store: Any,
+        collection_name: str,
+        extraction_workers: int = 4,
+        embedding_batch_size: int = 256,
+        embedding_concurrency: int = 4,
+        upsert_batch_size: int = 500,
+        rate_limiter: Optional[Any] = None,
+        extractor: Optional[Callable[[str], Awaitable[Tuple[List[str], int]]]] = None,
+        event_publisher: Optional[IEventPublisher] = None,
+        user_id: str = "bulk-ingest",
+        max_retries: int = 3,
+        checkpoint_every: int = 10,
+    ):
+        self.document_processor = document_processor
+        self.embedding_service = embedding_service
+        self.vector_repository = vector_repository
+        self.checkpoint_store = checkpoint_store
+        self.collection_name = collection_name
+        self.extraction_workers = max(1, extraction_workers)
+        self.embedding_batch_size = max(1, embedding_batch_size)
+        self.embedding_concurrency = max(1, embedding_concurrency)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.rate_limiter = rate_limiter
+        # Por defecto se extrae en el propio proceso; el CLI inyecta un ProcessPoolExecutor
+        self.extractor = extractor or document_processor.process_file_with_stats
+        self.event_publisher = event_publisher
+        self.user_id = user_id
+        self.max_retries = max_retries
+        self.checkpoint_every = max(1, checkpoint_every)
+
+    async def execute(self, file_paths: List[str]) -> dict:
+        self.stats = IngestionStats()
+        self.state = self.checkpoint_store.load() or {"completed": {}, "failed": {}}
+        self._pending_chunks: Dict[str, int] = {}
+        self._documents: Dict[str, dict] = {}
+        self._since_checkpoint = 0
+
+        pending_paths = []
+        for path in file_paths:
+            if path in self.state["completed"]:
+                self.stats.skipped += 1
+            else:
+                pending_paths.append(path)
+
+        logger.info("Bulk ingestion started", documents=len(pending_paths), skipped=self.stats.skipped, collection_name=self.collection_name)
+
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.extraction_workers * 2)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embedding_concurrency * 2)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=self.embedding_concurrency * 2)
+
+        extraction = asyncio.create_task(self._extract_all(pending_paths, chunk_queue))
+        batcher = asyncio.create_task(self._batch_chunks(chunk_queue, embed_queue))
+        embedders = [
+            asyncio.create_task(self._embed_batches(embed_queue, upsert_queue))
+            for _ in range(self.embedding_concurrency)
+        ]
+        upserter = asyncio.create_task(self._upsert_chunks(upsert_queue))
+        closer = asyncio.create_task(self._close_stages(extraction, batcher, embedders, embed_queue, upsert_queue))
+        tasks = [extraction, batcher, *embedders, upserter, closer]
+
+        try:
+            # Todas las etapas bajo supervisión: si una falla, las demás quedarían
+            # bloqueadas en colas llenas, así que se cancelan y se propaga el error
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._save_checkpoint()
+
+        summary = self.stats.summary()
+        logger.info("Bulk ingestion finished", **summary)
+        return summary
+
+    async def _close_stages(
+        self,
+        extraction: asyncio.Task,
+        batcher: asyncio.Task,
+        embedders: List[asyncio.Task],
+        embed_queue: asyncio.Queue,
+        upsert_queue: asyncio.Queue,
+    ) -> None:
+        # Cada etapa recibe el fin de la entrada cuando termina la anterior
+        await extraction
+        await batcher
+        for _ in embedders:
+            await embed_queue.put(_DONE)
+        await asyncio.gather(*embedders)
+        await upsert_queue.put(_DONE)
+
+    async def _extract_all(self, paths: List[str], chunk_queue: asyncio.Queue) -> None:
+        semaphore = asyncio.Semaphore(self.extraction_workers)
+
+        async def extract(path: str) -> None:
+            async with semaphore:
+                try:
+                    text_chunks, pages = await self.extractor(path)
+                except Exception as e:
+                    self._mark_failed(path, e)
+                    return
+            if not text_chunks:
+                self._mark_failed(path, ValueError("No text chunks extracted from document"))
+                return
+            self.stats.pages += pages
+            await chunk_queue.put((path, text_chunks))
+
+        await asyncio.gather(*[extract(path) for path in paths])
+        await chunk_queue.put(_DONE)
+
+    async def _batch_chunks(self, chunk_queue: asyncio.Queue, embed_queue: asyncio.Queue) -> None:
+        batch: List[DocumentChunk] = []
+        while True:
+            item = await chunk_queue.get()
+            if item is _DONE:
+                break
+
+            path, text_chunks = item
+            document_id = self._document_id(path)
+            document_name = os.path.basename(path)
+            self._documents[document_id] = {"path": path, "name": document_name, "chunks": len(text_chunks)}
+            self._pending_chunks[document_id] = len(text_chunks)
+
+            for idx, text in enumerate(text_chunks):
+                batch.append(DocumentChunk(
+                    id=f"{document_id}_{idx}",
+                    document_id=document_id,
+                    chunk_index=idx,
+                    content=text,
+                    metadata={
+                        "document_name": document_name,
+                        "user_id": self.user_id,
+                        "source_path": path,
+                    },
+                ))
+                if len(batch) >= self.embedding_batch_size:
+                    await embed_queue.put(batch)
+                    batch = []
+
+        if batch:
+            await embed_queue.put(batch)
+
+    async def _embed_batches(self, embed_queue: asyncio.Queue, upsert_queue: asyncio.Queue) -> None:
+        while True:
+            batch = await embed_queue.get()
+            if batch is _DONE:
+                return
+
+            texts = [chunk.content for chunk in batch]
+            tokens = sum(max(1, len(text) // 4) for text in texts)
+            try:
+                embeddings = await self._embed_with_retry(texts, tokens)
+            except Exception as e:
+                self._fail_batch(batch, e)
+                continue
+
+            for chunk, embedding in zip(batch, embeddings):
+                chunk.embedding = embedding
+            self.stats.tokens += tokens
+            await upsert_queue.put(batch)
+
+    async def _upsert_chunks(self, upsert_queue: asyncio.Queue) -> None:
+        buffer: List[DocumentChunk] = []
+        while True:
+            batch = await upsert_queue.get()
+            if batch is not _DONE:
+                buffer.extend(batch)
+            if buffer and (batch is _DONE or len(buffer) >= self.upsert_batch_size):
+                await self._flush(buffer)
+                buffer = []
+            if batch is _DONE:
+                return
+
+    async def _flush(self, chunks: List[DocumentChunk]) -> None:
+        # Los chunks de documentos que ya fallaron en otro lote no se guardan
+        chunks = [chunk for chunk in chunks if chunk.document_id in self._pending_chunks]
+        if not chunks:
+            return
+        try:
+            await self.vector_repository.upsert_chunks(self.collection_name, chunks)
+        except Exception as e:
+            self._fail_batch(chunks, e)
+            return
+
+        self.stats.chunks += len(chunks)
+        for chunk in chunks:
+            if chunk.document_id not in self._pending_chunks:
+                continue
+            self._pending_chunks[chunk.document_id] -= 1
+            if self._pending_chunks[chunk.document_id] == 0:
+                await self._mark_completed(chunk.document_id)
+
+    async def _embed_with_retry(self, texts: List[str], tokens: int) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(tokens=tokens)
+            try:
+                return await self.embedding_service.generate_embeddings_batch(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                backoff = 2 ** attempt
+                logger.warning("Embedding batch failed, retrying", attempt=attempt, backoff_seconds=backoff, error=str(e))
+                await asyncio.sleep(backoff)
+
+    async def _mark_completed(self, document_id: str) -> None:
+        document = self._documents.pop(document_id)
+        self._pending_chunks.pop(document_id, None)
+        self.state["completed"][document["path"]] = document_id
+        self.state["failed"].pop(document["path"], None)
+        self.stats.documents += 1
+
+        if self.event_publisher:
+            try:
+                await self.event_publisher.publish(
+                    "document.processed",
+                    {
+                        "documentId": document_id,
+                        "userId": self.user_id,
+                        "chunks": document["chunks"],
+                        "status": "completed",
+                    },
+                )
+            except Exception:
+                pass  # No crítico si falla
+
+        self._since_checkpoint += 1
+        if self._since_checkpoint >= self.checkpoint_every:
+            self._save_checkpoint()
+
+    def _fail_batch(self, chunks: List[DocumentChunk], error: Exception) -> None:
+        for document_id in {chunk.document_id for chunk in chunks}:
+            document = self._documents.pop(document_id, None)
+            self._pending_chunks.pop(document_id, None)
+            if document:
+                self._mark_failed(document["path"], error)
+
+    def _mark_failed(self, path: str, error: Exception) -> None:
+        logger.error("Error ingesting document", file_path=path, error=str(error))
+        self.state["failed"][path] = str(error)
+        self.stats.failed += 1
+
+    def _save_checkpoint(self) -> None:
+        self.state["updated_at"] = datetime.utcnow().isoformat()
+        self.state["stats"] = self.stats.summary()
+        self.checkpoint_store.save(self.state)
+        self._since_checkpoint = 0
+
+    @staticmethod
+    def _document_id(path: str) -> str:
+        # Id determinista: reintentar un documento sobreescribe sus chunks en lugar de duplicarlos
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, os.path.abspath(path)))
@@ -0,0 +1,266 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Optional, Any
+from src.domain.entities.document_chunk import DocumentChunk
+from src.domain.repositories.ivector_repository import IVectorRepository
+from src.application.ports.iembedding_service import IEmbeddingService
+from src.application.ports.ievent_publisher import IEventPublisher
+from src.infrastructure.config.logger import logger
+
+
+class ReembedCollectionUseCase:
+    """
+    Migración blue/green de embeddings: re-embebe todos los chunks de la colección
+    activa en una colección versionada nueva y, cuando está completa, cambia el
+    alias de forma atómica y publica `collection.switched` (los ai-chat
+    descartan cachés e índice léxico de la colección anterior). Las réplicas
+    siguen escribiendo en la colección anterior hasta que caduca su caché del
+    alias, así que tras el cambio se espera ese TTL y se copian a la nueva las
+    altas y bajas ocurridas desde la reconciliación. El progreso se guarda en un
+    checkpoint para reanudar.
+    """
+
+    def __init__(
+        self,
+        vector_repository: IVectorRepository,
+        embedding_service: IEmbeddingService,
+        collection_registry: Any,
+        checkpoint_store: Any,
+        target_model: str,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        rate_limiter: Optional[Any] = None,
+        max_retries: int = 3,
+        switch_when_done: bool = True,
+        event_publisher: Optional[IEventPublisher] = None,
+        user_id: str = "embedding-migration",
+        switch_grace_seconds: float = 2.0,
+    ):
+        self.vector_repository = vector_repository
+        self.embedding_service = embedding_service
+        self.collection_registry = collection_registry
+        self.checkpoint_store = checkpoint_store
+        self.target_model = target_model
+        self.batch_size = batch_size
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.switch_when_done = switch_when_done
+        self.event_publisher = event_publisher
+        self.user_id = user_id
+        self.switch_grace_seconds = switch_grace_seconds
+
+    async def execute(self, vector_size: int = 1536) -> dict:
+        active = self.collection_registry.get_active(refresh=True)
+        source = active.collection
+        target = self.collection_registry.versioned_name(self.target_model)
+
+        if source == target or active.embedding_model == self.target_model:
+            logger.info("Active collection already uses target model", collection=source, embedding_model=self.target_model)
+            return {"status": "up_to_date", "source_collection": source, "target_collection": source}
+
+        state = self._load_state(source, target)
+        if state["status"] == "switched":
+            return state
+
+        await self.vector_repository.create_collection(target, vector_size, embedding_model=self.target_model)
+        state["total"] = await self.vector_repository.count_chunks(source)
+        state["status"] = "running"
+        self._save(state)
+
+        started = time.monotonic()
+        migrated_at_start = state["migrated"]
+        try:
+            # 1. Copia principal, paginada por offset y en oleadas de `concurrency` lotes
+            while True:
+                offsets = [state["offset"] + i * self.batch_size for i in range(self.concurrency)]
+                pages = await asyncio.gather(*[
+                    self.vector_repository.get_chunks(source, limit=self.batch_size, offset=offset)
+                    for offset in offsets
+                ])
+                pages = [page for page in pages if page]
+                if not pages:
+                    break
+
+                await asyncio.gather(*[self._migrate_batch(target, page) for page in pages])
+
+                state["offset"] += sum(len(page) for page in pages)
+                state["migrated"] += sum(len(page) for page in pages)
+                self._save(state)
+                self._report(state, started, migrated_at_start)
+
+                if len(pages[-1]) < self.batch_size:
+                    break
+
+            # 2. Reconciliación: chunks subidos o eliminados durante la migración
+            state["status"] = "reconciling"
+            self._save(state)
+            reconciled_ids = await self._reconcile(source, target, state)
+
+            # 3. Cambio atómico del alias
+            self.collection_registry.stamp_collection(
+                target,
+                self.target_model,
+                migrated_from=source,
+                migration_completed_at=datetime.utcnow().isoformat(),
+            )
+            state["status"] = "completed"
+            self._save(state)
+
+            if self.switch_when_done:
+                self.collection_registry.switch(target, self.target_model)
+                state["status"] = "switched"
+                self._save(state)
+                await self._publish_switched(target)
+                await self._catch_up(source, target, reconciled_ids, state)
+
+            logger.info("Re-embedding migration finished", **self._log_fields(state))
+            return state
+        except Exception as e:
+            state["status"] = "failed"
+            state["error"] = str(e)
+            self._save(state)
+            logger.error("Re-embedding migration failed", error=str(e), exc_info=True, **self._log_fields(state))
+            raise
+
+    async def _publish_switched(self, target: str) -> None:
+        if not self.event_publisher:
+            return
+        try:
+            await self.event_publisher.publish(
+                "collection.switched",
+                {
+                    "userId": self.user_id,
+                    "collection": target,
+                    "embeddingModel": self.target_model,
+                },
+            )
+        except Exception as e:
+            # El alias ya apunta a la nueva colección; los ai-chat la verán al caducar su caché del alias
+            logger.warning("Error publishing collection.switched", collection=target, error=str(e))
+
+    async def _migrate_batch(self, target: str, chunks: List[DocumentChunk]) -> None:
+        texts = [chunk.content for chunk in chunks]
+        embeddings = await self._embed_with_retry(texts)
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk.embedding = embedding
+        await self.vector_repository.upsert_chunks(target, chunks)
+
+    async def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(tokens=sum(max(1, len(text) // 4) for text in texts))
+            try:
+                return await self.embedding_service.generate_embeddings_batch(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                backoff = 2 ** attempt
+                logger.warning("Embedding batch failed, retrying", attempt=attempt, backoff_seconds=backoff, error=str(e))
+                await asyncio.sleep(backoff)
+
+    async def _reconcile(self, source: str, target: str, state: dict) -> set:
+        source_ids = set(await self.vector_repository.get_chunk_ids(source))
+        target_ids = set(await self.vector_repository.get_chunk_ids(target))
+
+        stale_ids = sorted(target_ids - source_ids)
+        if stale_ids:
+            await self.vector_repository.delete_chunks(target, stale_ids)
+
+        missing_ids = source_ids - target_ids
+        if missing_ids:
+            # Los chunks nuevos se añaden al final de la colección origen
+            offset = 0
+            while True:
+                page = await self.vector_repository.get_chunks(source, limit=self.batch_size, offset=offset)
+                if not page:
+                    break
+                pending = [chunk for chunk in page if chunk.id in missing_ids]
+                if pending:
+                    await self._migrate_batch(target, pending)
+                    state["migrated"] += len(pending)
+                offset += len(page)
+
+        state["total"] = len(source_ids)
+        state["reconciled"] = {"added": len(missing_ids), "removed": len(stale_ids)}
+        self._save(state)
+        return source_ids
+
+    async def _catch_up(self, source: str, target: str, reconciled_ids: set, state: dict) -> None:
+        # Subidas y borrados que llegaron a la colección anterior entre la reconciliación
+        # y el cambio, o desde réplicas que aún no han refrescado el alias
+        await asyncio.sleep(self.collection_registry.ttl_seconds + self.switch_grace_seconds)
+        source_ids = set(await self.vector_repository.get_chunk_ids(source))
+
+        # Solo se borran de la nueva los ids que desaparecieron de la anterior: los que
+        # existen únicamente en la nueva son subidas posteriores al cambio
+        removed_ids = sorted(reconciled_ids - source_ids)
+        if removed_ids:
+            await self.vector_repository.delete_chunks(target, removed_ids)
+
+        added_ids = source_ids - reconciled_ids
+        if added_ids:
+            offset = 0
+            while True:
+                page = await self.vector_repository.get_chunks(source, limit=self.batch_size, offset=offset)
+                if not page:
+                    break
+                pending = [chunk for chunk in page if chunk.id in added_ids]
+                if pending:
+                    await self._migrate_batch(target, pending)
+                    state["migrated"] += len(pending)
+                offset += len(page)
+
+        state["reconciled_after_switch"] = {"added": len(added_ids), "removed": len(removed_ids)}
+        self._save(state)
+
+    def _load_state(self, source: str, target: str) -> dict:
+        state = self.checkpoint_store.load()
+        if (
+            state
+            and state.get("source_collection") == source
+            and state.get("target_collection") == target
+            and state.get("target_model") == self.target_model
+        ):
+            logger.info("Resuming re-embedding migration from checkpoint", offset=state.get("offset", 0))
+            state.pop("error", None)
+            return state
+
+        return {
+            "source_collection": source,
+            "target_collection": target,
+            "target_model": self.target_model,
+            "status": "pending",
+            "offset": 0,
+            "migrated": 0,
+            "total": 0,
+            "started_at": datetime.utcnow().isoformat(),
+        }
+
+    def _save(self, state: dict) -> None:
+        state["updated_at"] = datetime.utcnow().isoformat()
+        self.checkpoint_store.save(state)
+
+    def _report(self, state: dict, started: float, migrated_at_start: int) -> None:
+        elapsed = max(time.monotonic() - started, 1e-6)
+        rate = (state["migrated"] - migrated_at_start) / elapsed
+        percent = (state["migrated"] / state["total"] * 100) if state["total"] else 100.0
+        logger.info(
+            "Re-embedding progress",
+            percent=round(min(percent, 100.0), 1),
+            chunks_per_second=round(rate, 1),
+            **self._log_fields(state),
+        )
+
+    @staticmethod
+    def _log_fields(state: dict) -> dict:
+        return {
+            "source_collection": state.get("source_collection"),
+            "target_collection": state.get("target_collection"),
+            "migrated": state.get("migrated"),
+            "total": state.get("total"),
+            "status": state.get("status"),
+        }
@@ -5,7 +5,9 @@ from src.domain.entities.document_chunk import DocumentChunk
 
 class IVectorRepository(ABC):
     @abstractmethod
-    async def create_collection(self, collection_name: str, vector_size: int) -> bool:
+    async def create_collection(
+        self, collection_name: str, vector_size: int, embedding_model: Optional[str] = None
+    ) -> bool:
         pass
 
     @abstractmethod
@@ -29,3 +31,22 @@ class IVectorRepository(ABC):
         self, collection_name: str, document_id: str
     ) -> bool:
         pass
+
+    @abstractmethod
+    async def count_chunks(self, collection_name: str) -> int:
+        pass
+
+    @abstractmethod
+    async def get_chunks(
+        self, collection_name: str, limit: int, offset: int = 0
+    ) -> List[DocumentChunk]:
+        """Lee chunks (sin embeddings) en el orden de inserción"""
+        pass
+
+    @abstractmethod
+    async def get_chunk_ids(self, collection_name: str) -> List[str]:
+        pass
+
+    @abstractmethod
+    async def delete_chunks(self, collection_name: str, chunk_ids: List[str]) -> bool:
+        pass
@@ -0,0 +1,37 @@
+import json
+import os
+from typing import Optional
+from src.infrastructure.config.logger import logger
+
+
+class JsonCheckpointStore:
+    """Guarda el progreso de un job en un fichero JSON para poder reanudarlo tras un fallo"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[dict]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning("Could not read checkpoint, starting from scratch", path=self.path, error=str(e))
+            return None
+
+    def save(self, state: dict) -> None:
+        # Escritura atómica: un crash a mitad nunca deja un checkpoint corrupto
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,4 +1,5 @@
-from typing import List
+from typing import List, Tuple
+import asyncio
 import os
 from pathlib import Path
 from PyPDF2 import PdfReader
@@ -18,12 +19,24 @@ class DocumentProcessor(IDocumentProcessor):
         # Dividir en chunks
         return await self.chunk_text(text)
 
+    async def process_file_with_stats(self, file_path: str) -> Tuple[List[str], int]:
+        """Como process_file, pero devuelve también el número de páginas"""
+        ext = Path(file_path).suffix.lower()
+
+        if ext != ".pdf":
+            raise ValueError(f"Only PDF files are supported. Received: {ext}")
+
+        pages = await self._extract_pdf_pages(file_path)
+        text = "".join(page + "\n" for page in pages)
+        return await self.chunk_text(text), len(pages)
+
     async def _extract_pdf_text(self, file_path: str) -> str:
+        pages = await self._extract_pdf_pages(file_path)
+        return "".join(page + "\n" for page in pages)
+
+    async def _extract_pdf_pages(self, file_path: str) -> List[str]:
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        return [page.extract_text() for page in reader.pages]
 
     async def _extract_text_file(self, file_path: str) -> str:
         with open(file_path, "r", encoding="utf-8") as f:
@@ -54,3 +67,8 @@ class DocumentProcessor(IDocumentProcessor):
             start = end - overlap  # Overlap para mantener contexto
 
         return [chunk for chunk in chunks if chunk]  # Filtrar chunks vacíos
+
+
+def extract_document(file_path: str) -> Tuple[List[str], int]:
+    """Versión síncrona de process_file_with_stats para ejecutarla en un ProcessPoolExecutor"""
+    return asyncio.run(DocumentProcessor().process_file_with_stats(file_path))
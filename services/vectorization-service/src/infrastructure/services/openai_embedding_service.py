@@ -1,16 +1,26 @@
-from typing import List
+from typing import List, Optional, Any
 import os
 from openai import AsyncOpenAI
 from src.application.ports.iembedding_service import IEmbeddingService
 
 
 class OpenAIEmbeddingService(IEmbeddingService):
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, collection_registry: Optional[Any] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.model = model or os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        # Sin modelo explícito se usa el de la colección activa (ver CollectionRegistry)
+        self.collection_registry = None if model else collection_registry
         self.client = None
         # El cliente se inicializará lazy cuando se necesite
 
+    def _current_model(self) -> str:
+        if self.collection_registry:
+            try:
+                return self.collection_registry.get_active().embedding_model
+            except Exception:
+                pass
+        return self.model
+
     def _ensure_client(self):
         """Inicializa el cliente si no está inicializado"""
         if not self.client:
@@ -21,7 +31,7 @@ class OpenAIEmbeddingService(IEmbeddingService):
     async def generate_embedding(self, text: str) -> List[float]:
         self._ensure_client()
         response = await self.client.embeddings.create(
-            model=self.model,
+            model=self._current_model(),
             input=text,
         )
         return response.data[0].embedding
@@ -29,7 +39,7 @@ class OpenAIEmbeddingService(IEmbeddingService):
     async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         self._ensure_client()
         response = await self.client.embeddings.create(
-            model=self.model,
+            model=self._current_model(),
             input=texts,
         )
         return [item.embedding for item in response.data]
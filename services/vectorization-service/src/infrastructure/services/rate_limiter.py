@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """Token bucket asíncrono para respetar los límites de peticiones y tokens por minuto de OpenAI"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_allowance = float(requests_per_minute or 0)
+        self._token_allowance = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Espera hasta que haya capacidad para una petición de `tokens` tokens"""
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+
+        async with self._lock:
+            while True:
+                self._refill()
+                wait_seconds = self._wait_time(tokens)
+                if wait_seconds <= 0:
+                    if self.requests_per_minute:
+                        self._request_allowance -= 1
+                    if self.tokens_per_minute:
+                        self._token_allowance -= min(tokens, self.tokens_per_minute)
+                    return
+                await asyncio.sleep(wait_seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                float(self.requests_per_minute),
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                float(self.tokens_per_minute),
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def _wait_time(self, tokens: int) -> float:
+        wait_seconds = 0.0
+        if self.requests_per_minute and self._request_allowance < 1:
+            wait_seconds = max(wait_seconds, (1 - self._request_allowance) * 60.0 / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # Una petición mayor que el límite por minuto se deja pasar con el bucket lleno
+            needed = min(tokens, self.tokens_per_minute)
+            if self._token_allowance < needed:
+                wait_seconds = max(wait_seconds, (needed - self._token_allowance) * 60.0 / self.tokens_per_minute)
+        return wait_seconds
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación rápida de tokens (~4 caracteres por token) para el rate limiting"""
+    return max(1, len(text) // 4)
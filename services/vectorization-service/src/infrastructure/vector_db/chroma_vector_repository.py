@@ -1,11 +1,11 @@
 from typing import List, Optional
+import asyncio
 import os
 import chromadb
 from chromadb.config import Settings
 from src.domain.entities.document_chunk import DocumentChunk
 from src.domain.repositories.ivector_repository import IVectorRepository
 from src.infrastructure.config.logger import logger
-from src.infrastructure.config.logger import logger
 
 
 class ChromaVectorRepository(IVectorRepository):
@@ -19,7 +19,9 @@ class ChromaVectorRepository(IVectorRepository):
         )
         self.collection_name = os.getenv("CHROMA_COLLECTION_NAME", "documents")
 
-    async def create_collection(self, collection_name: str, vector_size: int) -> bool:
+    async def create_collection(
+        self, collection_name: str, vector_size: int, embedding_model: Optional[str] = None
+    ) -> bool:
         try:
             # Intentar obtener la colección existente primero
             try:
@@ -36,12 +38,17 @@ class ChromaVectorRepository(IVectorRepository):
                         logger.warning("Could not delete collection", collection_name=collection_name, error=str(delete_error))
                 
                 # Crear nueva colección con metadata válido (no vacío)
+                metadata = {"description": "Document embeddings collection"}
+                if embedding_model:
+                    # Estampar el modelo para no mezclar nunca vectores de modelos distintos
+                    metadata["embedding_model"] = embedding_model
+                    metadata["embedding_dimensions"] = vector_size
                 try:
                     collection = self.client.create_collection(
                         name=collection_name,
-                        metadata={"description": "Document embeddings collection"}
+                        metadata=metadata
                     )
-                    logger.info("Created collection", collection_name=collection_name)
+                    logger.info("Created collection", collection_name=collection_name, embedding_model=embedding_model)
                     return True
                 except Exception as create_error:
                     # Si ya existe, intentar obtenerla de nuevo
@@ -61,6 +68,10 @@ class ChromaVectorRepository(IVectorRepository):
     async def upsert_chunks(
         self, collection_name: str, chunks: List[DocumentChunk]
     ) -> bool:
+        # El cliente HTTP de Chroma es bloqueante: fuera del event loop
+        return await asyncio.to_thread(self._upsert_chunks, collection_name, chunks)
+
+    def _upsert_chunks(self, collection_name: str, chunks: List[DocumentChunk]) -> bool:
         try:
             # Intentar obtener la colección existente primero
             collection = None
@@ -192,3 +203,75 @@ class ChromaVectorRepository(IVectorRepository):
         except Exception as e:
             logger.error("Error deleting chunks", collection_name=collection_name, document_id=document_id, error=str(e), exc_info=True)
             return False
+
+    async def count_chunks(self, collection_name: str) -> int:
+        return await asyncio.to_thread(self._count_chunks, collection_name)
+
+    def _count_chunks(self, collection_name: str) -> int:
+        try:
+            collection = self.client.get_collection(name=collection_name)
+            return collection.count()
+        except Exception as e:
+            logger.warning("Error counting chunks", collection_name=collection_name, error=str(e))
+            return 0
+
+    async def get_chunks(
+        self, collection_name: str, limit: int, offset: int = 0
+    ) -> List[DocumentChunk]:
+        return await asyncio.to_thread(self._get_chunks, collection_name, limit, offset)
+
+    def _get_chunks(self, collection_name: str, limit: int, offset: int) -> List[DocumentChunk]:
+        collection = self.client.get_collection(name=collection_name)
+        results = collection.get(
+            limit=limit,
+            offset=offset,
+            include=["documents", "metadatas"],
+        )
+
+        chunks = []
+        for i, chunk_id in enumerate(results.get('ids') or []):
+            metadata = dict(results['metadatas'][i] or {}) if results.get('metadatas') else {}
+            content = results['documents'][i] if results.get('documents') else ""
+            document_id = metadata.pop("document_id", "")
+            chunk_index = int(metadata.pop("chunk_index", 0) or 0)
+            chunks.append(DocumentChunk(
+                id=chunk_id,
+                document_id=document_id,
+                chunk_index=chunk_index,
+                content=content or "",
+                metadata=metadata,
+            ))
+        return chunks
+
+    async def get_chunk_ids(self, collection_name: str) -> List[str]:
+        return await asyncio.to_thread(self._get_chunk_ids, collection_name)
+
+    def _get_chunk_ids(self, collection_name: str) -> List[str]:
+        try:
+            collection = self.client.get_collection(name=collection_name)
+        except Exception:
+            return []
+
+        ids = []
+        page_size = 5000
+        offset = 0
+        while True:
+            results = collection.get(limit=page_size, offset=offset, include=[])
+            page = results.get('ids') or []
+            ids.extend(page)
+            if len(page) < page_size:
+                return ids
+            offset += page_size
+
+    async def delete_chunks(self, collection_name: str, chunk_ids: List[str]) -> bool:
+        return await asyncio.to_thread(self._delete_chunks, collection_name, chunk_ids)
+
+    def _delete_chunks(self, collection_name: str, chunk_ids: List[str]) -> bool:
+        try:
+            if chunk_ids:
+                collection = self.client.get_collection(name=collection_name)
+                collection.delete(ids=chunk_ids)
+            return True
+        except Exception as e:
+            logger.error("Error deleting chunks", collection_name=collection_name, error=str(e), exc_info=True)
+            return False
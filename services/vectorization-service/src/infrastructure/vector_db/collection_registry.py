@@ -0,0 +1,113 @@
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Optional
+from src.infrastructure.config.logger import logger
+
+
+class ActiveCollection:
+    def __init__(self, collection: str, embedding_model: str):
+        self.collection = collection
+        self.embedding_model = embedding_model
+
+    def to_dict(self):
+        return {
+            "collection": self.collection,
+            "embeddingModel": self.embedding_model,
+        }
+
+
+class CollectionRegistry:
+    """
+    Alias de colecciones guardado en Chroma. El alias (`documents`) apunta a la
+    colección versionada activa y al modelo de embeddings con el que se generó,
+    de modo que ambos servicios cambian de colección con un único upsert.
+    """
+
+    def __init__(self, client: Any, alias: Optional[str] = None):
+        self.client = client
+        self.alias = alias or os.getenv("CHROMA_COLLECTION_NAME", "documents")
+        self.aliases_collection = os.getenv("CHROMA_ALIASES_COLLECTION", "collection_aliases")
+        self.default_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.ttl_seconds = float(os.getenv("CHROMA_ALIAS_TTL_SECONDS", "10"))
+        self._cached: Optional[ActiveCollection] = None
+        self._cached_at = 0.0
+
+    def get_active(self, refresh: bool = False) -> ActiveCollection:
+        """Colección activa para el alias (cacheada durante `CHROMA_ALIAS_TTL_SECONDS`)"""
+        if not refresh and self._cached and time.monotonic() - self._cached_at < self.ttl_seconds:
+            return self._cached
+
+        active = self._read_alias() or self._legacy_collection()
+        self._cached = active
+        self._cached_at = time.monotonic()
+        return active
+
+    def invalidate(self) -> None:
+        self._cached = None
+
+    def versioned_name(self, embedding_model: str) -> str:
+        """Nombre de colección versionada por modelo, p. ej. `documents-text-embedding-3-large`"""
+        slug = re.sub(r"[^a-z0-9]+", "-", embedding_model.lower()).strip("-")
+        return f"{self.alias}-{slug}"
+
+    def switch(self, collection: str, embedding_model: str) -> ActiveCollection:
+        """Apunta el alias a otra colección de forma atómica (un único upsert)"""
+        aliases = self.client.get_or_create_collection(
+            name=self.aliases_collection,
+            metadata={"description": "Collection aliases"},
+        )
+        aliases.upsert(
+            ids=[self.alias],
+            embeddings=[[0.0]],
+            documents=[collection],
+            metadatas=[{
+                "collection": collection,
+                "embedding_model": embedding_model,
+                "switched_at": datetime.utcnow().isoformat(),
+            }],
+        )
+        logger.info("Collection alias switched", alias=self.alias, collection=collection, embedding_model=embedding_model)
+        return self.get_active(refresh=True)
+
+    def stamp_collection(self, collection_name: str, embedding_model: str, **extra: Any) -> None:
+        """Guarda el modelo de embeddings (y otros datos) en la metadata de la colección"""
+        collection = self.client.get_collection(name=collection_name)
+        metadata = {
+            k: v
+            for k, v in (collection.metadata or {}).items()
+            if not k.startswith("hnsw:")
+        }
+        metadata["embedding_model"] = embedding_model
+        metadata.update(extra)
+        collection.modify(metadata=metadata)
+
+    def _read_alias(self) -> Optional[ActiveCollection]:
+        try:
+            aliases = self.client.get_collection(name=self.aliases_collection)
+            records = aliases.get(ids=[self.alias], include=["metadatas"])
+        except Exception:
+            return None
+
+        if not isinstance(records, dict) or not records.get("metadatas"):
+            return None
+        metadata = records["metadatas"][0] or {}
+        if not isinstance(metadata.get("collection"), str):
+            return None
+        return ActiveCollection(
+            collection=metadata["collection"],
+            embedding_model=metadata.get("embedding_model") or self.default_model,
+        )
+
+    def _legacy_collection(self) -> ActiveCollection:
+        # Sin alias: la colección se llama igual que el alias y el modelo se lee de su metadata
+        embedding_model = self.default_model
+        try:
+            collection = self.client.get_collection(name=self.alias)
+            stamped = (collection.metadata or {}).get("embedding_model")
+            if isinstance(stamped, str) and stamped:
+                embedding_model = stamped
+        except Exception:
+            pass
+        return ActiveCollection(collection=self.alias, embedding_model=embedding_model)
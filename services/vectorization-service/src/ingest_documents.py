@@ -0,0 +1,125 @@
+"""
+Job de ingesta masiva de documentos.
+
+Procesa un directorio (recursivo) o un manifiesto con una ruta por línea sin
+pasar por el endpoint de subida: extrae texto en varios procesos, genera
+embeddings en lotes y hace upserts en lote sobre la colección activa. Se puede
+interrumpir y volver a lanzar: los documentos completados se saltan.
+
+Uso:
+    python -m src.ingest_documents --dir /data/pdfs --workers 8 \\
+        --embedding-batch-size 256 --requests-per-minute 3000
+    python -m src.ingest_documents --manifest files.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, List
+from dotenv import load_dotenv
+
+from src.application.use_cases.bulk_ingest_documents_use_case import BulkIngestDocumentsUseCase
+from src.infrastructure.messaging.kafka_event_publisher import KafkaEventPublisher
+from src.infrastructure.services.document_processor import DocumentProcessor, extract_document
+from src.infrastructure.services.openai_embedding_service import OpenAIEmbeddingService
+from src.infrastructure.services.rate_limiter import AsyncRateLimiter
+from src.infrastructure.persistence.json_checkpoint_store import JsonCheckpointStore
+from src.infrastructure.vector_db.chroma_vector_repository import ChromaVectorRepository
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
+
+
+def default_checkpoint_path() -> str:
+    upload_dir = os.getenv("UPLOAD_DIR", "/app/uploads")
+    return os.getenv("INGEST_CHECKPOINT_PATH", os.path.join(upload_dir, ".bulk_ingest.json"))
+
+
+def collect_files(directory: Optional[str] = None, manifest: Optional[str] = None) -> List[str]:
+    """Rutas a ingerir, en orden estable para que los checkpoints sean reproducibles"""
+    paths: List[str] = []
+    if directory:
+        paths.extend(
+            str(path) for path in sorted(Path(directory).rglob("*"))
+            if path.is_file() and path.suffix.lower() == ".pdf"
+        )
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(line)
+
+    # Quitar duplicados manteniendo el orden
+    return list(dict.fromkeys(paths))
+
+
+def process_pool_extractor(executor: ProcessPoolExecutor):
+    loop = asyncio.get_running_loop()
+
+    async def extract(file_path: str):
+        return await loop.run_in_executor(executor, extract_document, file_path)
+
+    return extract
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk ingest PDF documents into the active collection")
+    source = parser.add_argument_group("source")
+    source.add_argument("--dir", dest="directory", default=None, help="Directorio con PDFs (recursivo)")
+    source.add_argument("--manifest", default=None, help="Fichero con una ruta por línea")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Procesos de extracción de texto")
+    parser.add_argument("--embedding-batch-size", type=int, default=256)
+    parser.add_argument("--embedding-concurrency", type=int, default=4)
+    parser.add_argument("--upsert-batch-size", type=int, default=500)
+    parser.add_argument("--vector-size", type=int, default=int(os.getenv("EMBEDDING_DIMENSIONS", "1536")))
+    parser.add_argument("--requests-per-minute", type=int, default=int(os.getenv("EMBEDDING_RPM_LIMIT", "0")) or None)
+    parser.add_argument("--tokens-per-minute", type=int, default=int(os.getenv("EMBEDDING_TPM_LIMIT", "0")) or None)
+    parser.add_argument("--user-id", default="bulk-ingest")
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--no-events", action="store_true", help="No publicar document.processed en Kafka")
+    args = parser.parse_args(argv)
+    if not args.directory and not args.manifest:
+        parser.error("one of --dir or --manifest is required")
+    return args
+
+
+async def main(argv: Optional[List[str]] = None) -> dict:
+    load_dotenv()
+    args = parse_args(argv)
+    file_paths = collect_files(args.directory, args.manifest)
+
+    vector_repository = ChromaVectorRepository()
+    collection_registry = CollectionRegistry(vector_repository.client)
+    active = collection_registry.get_active()
+    await vector_repository.create_collection(active.collection, args.vector_size, embedding_model=active.embedding_model)
+
+    event_publisher = None if args.no_events else KafkaEventPublisher()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        use_case = BulkIngestDocumentsUseCase(
+            document_processor=DocumentProcessor(),
+            # Modelo fijado junto con la colección: un cambio de alias a mitad de la ingesta no los separa
+            embedding_service=OpenAIEmbeddingService(model=active.embedding_model),
+            vector_repository=vector_repository,
+            checkpoint_store=JsonCheckpointStore(args.checkpoint or default_checkpoint_path()),
+            collection_name=active.collection,
+            extraction_workers=args.workers,
+            embedding_batch_size=args.embedding_batch_size,
+            embedding_concurrency=args.embedding_concurrency,
+            upsert_batch_size=args.upsert_batch_size,
+            rate_limiter=AsyncRateLimiter(args.requests_per_minute, args.tokens_per_minute),
+            extractor=process_pool_extractor(executor),
+            event_publisher=event_publisher,
+            user_id=args.user_id,
+        )
+        try:
+            return await use_case.execute(file_paths)
+        finally:
+            if event_publisher:
+                await event_publisher.disconnect()
+
+
+if __name__ == "__main__":
+    summary = asyncio.run(main())
+    print(json.dumps(summary, indent=2))
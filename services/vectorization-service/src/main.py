@@ -1,6 +1,8 @@
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import os
 import uuid
 import aiofiles
@@ -14,7 +16,10 @@ from src.infrastructure.messaging.kafka_event_consumer import KafkaEventConsumer
 from src.infrastructure.services.openai_embedding_service import OpenAIEmbeddingService
 from src.infrastructure.services.document_processor import DocumentProcessor
 from src.infrastructure.vector_db.chroma_vector_repository import ChromaVectorRepository
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
+from src.infrastructure.persistence.json_checkpoint_store import JsonCheckpointStore
 from src.infrastructure.config.logger import logger
+from src.migrate_embeddings import build_migration_use_case, default_checkpoint_path
 
 load_dotenv()
 
@@ -35,9 +40,12 @@ os.makedirs(upload_dir, exist_ok=True)
 
 event_publisher = KafkaEventPublisher()
 event_consumer = KafkaEventConsumer("vectorization-service-group")
-embedding_service = OpenAIEmbeddingService()
-document_processor = DocumentProcessor()
 vector_repository = ChromaVectorRepository()
+# Alias `documents` -> colección versionada activa + modelo de embeddings
+collection_registry = CollectionRegistry(vector_repository.client)
+embedding_service = OpenAIEmbeddingService(collection_registry=collection_registry)
+document_processor = DocumentProcessor()
+migration_task: Optional[asyncio.Task] = None
 
 # Función de dependencia para obtener user_id del JWT
 async def get_user_id(authorization: Optional[str] = Header(None)) -> str:
@@ -93,7 +101,8 @@ async def handle_document_uploaded(message: dict):
         if not text_chunks:
             raise ValueError("No text chunks extracted from document")
         
-        # 2. Generar embeddings para todos los chunks
+        # 2. Generar embeddings para todos los chunks (con el modelo de la colección activa)
+        active = collection_registry.get_active()
         embeddings = await embedding_service.generate_embeddings_batch(text_chunks)
         logger.info("Document embeddings generated", document_id=document_id, embeddings_count=len(embeddings))
         
@@ -115,7 +124,7 @@ async def handle_document_uploaded(message: dict):
             document_chunks.append(chunk)
         
         # 4. Guardar chunks en Chroma
-        await vector_repository.upsert_chunks("documents", document_chunks)
+        await vector_repository.upsert_chunks(active.collection, document_chunks)
         logger.info("Document chunks saved to Chroma", document_id=document_id, chunks_count=len(document_chunks))
         
         # 5. Publicar evento de completado
@@ -255,8 +264,9 @@ async def upload_document(
     
     try:
         # Asegurar que la colección existe (lazy creation)
+        active = collection_registry.get_active()
         try:
-            await vector_repository.create_collection("documents", 1536)
+            await vector_repository.create_collection(active.collection, 1536, embedding_model=active.embedding_model)
         except:
             pass  # Ya existe o se creará automáticamente
         
@@ -291,7 +301,7 @@ async def upload_document(
             document_chunks.append(chunk)
         
         # 4. Guardar en Chroma
-        upsert_result = await vector_repository.upsert_chunks("documents", document_chunks)
+        upsert_result = await vector_repository.upsert_chunks(active.collection, document_chunks)
         if not upsert_result:
             raise HTTPException(status_code=500, detail="Failed to save document chunks to vector database")
         
@@ -371,7 +381,7 @@ async def get_documents():
     try:
         # Intentar obtener la colección, si no existe retornar lista vacía
         try:
-            collection = vector_repository.client.get_collection(name="documents")
+            collection = vector_repository.client.get_collection(name=collection_registry.get_active().collection)
         except Exception as e:
             # Si la colección no existe, retornar lista vacía
             if "does not exist" in str(e) or "NotFoundError" in str(type(e).__name__):
@@ -443,8 +453,9 @@ async def delete_document(
     try:
         # Obtener información del documento antes de eliminarlo para auditoría
         document_name = "unknown"
+        active = collection_registry.get_active()
         try:
-            collection = vector_repository.client.get_collection(name="documents")
+            collection = vector_repository.client.get_collection(name=active.collection)
             chunks_info = collection.get(
                 where={"document_id": document_id},
                 limit=1
@@ -458,7 +469,7 @@ async def delete_document(
             raise
         
         # Eliminar chunks del documento de Chroma
-        await vector_repository.delete_document_chunks("documents", document_id)
+        await vector_repository.delete_document_chunks(active.collection, document_id)
         
         # Publicar evento de eliminación
         try:
@@ -494,6 +505,72 @@ async def delete_document(
         logger.error("Error deleting document", document_id=document_id, error=str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+class StartMigrationRequest(BaseModel):
+    targetModel: Optional[str] = None
+    batchSize: int = 100
+    concurrency: int = 4
+    requestsPerMinute: Optional[int] = None
+    tokensPerMinute: Optional[int] = None
+
+
+@app.post("/api/ai/documents/migrations")
+async def start_embedding_migration(
+    request: StartMigrationRequest,
+    user_id: str = Depends(get_user_id),
+):
+    """Lanza en segundo plano la migración de embeddings al modelo indicado (por defecto EMBEDDING_MODEL)"""
+    global migration_task
+
+    if migration_task and not migration_task.done():
+        raise HTTPException(status_code=409, detail="A migration is already running")
+
+    target_model = request.targetModel or os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    use_case = build_migration_use_case(
+        vector_repository=vector_repository,
+        collection_registry=collection_registry,
+        target_model=target_model,
+        batch_size=request.batchSize,
+        concurrency=request.concurrency,
+        requests_per_minute=request.requestsPerMinute,
+        tokens_per_minute=request.tokensPerMinute,
+        event_publisher=event_publisher,
+        user_id=user_id,
+    )
+
+    async def run_migration():
+        try:
+            # El caso de uso publica collection.switched al cambiar el alias
+            await use_case.execute()
+        except Exception as e:
+            logger.error("Embedding migration task failed", target_model=target_model, error=str(e))
+
+    migration_task = asyncio.create_task(run_migration())
+    logger.info("Embedding migration started", target_model=target_model, user_id=user_id)
+
+    return {
+        "success": True,
+        "data": {
+            "targetModel": target_model,
+            "targetCollection": collection_registry.versioned_name(target_model),
+            "status": "started",
+        },
+    }
+
+
+@app.get("/api/ai/documents/migrations/status")
+async def get_embedding_migration_status():
+    """Progreso de la migración de embeddings (leído del checkpoint) y colección activa"""
+    checkpoint = JsonCheckpointStore(default_checkpoint_path()).load()
+    return {
+        "success": True,
+        "data": {
+            "running": bool(migration_task and not migration_task.done()),
+            "active": collection_registry.get_active().to_dict(),
+            "checkpoint": checkpoint,
+        },
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "3003"))
@@ -0,0 +1,103 @@
+"""
+Job de migración de embeddings (blue/green).
+
+Re-embebe todos los chunks de la colección activa con `--target-model` en una
+colección versionada nueva y cambia el alias cuando termina. Se puede
+interrumpir y volver a lanzar: reanuda desde el checkpoint.
+
+Uso:
+    python -m src.migrate_embeddings --target-model text-embedding-3-large \\
+        --concurrency 4 --batch-size 100 --requests-per-minute 500
+"""
+import argparse
+import asyncio
+import os
+from typing import Optional, List
+from dotenv import load_dotenv
+
+from src.application.ports.ievent_publisher import IEventPublisher
+from src.application.use_cases.reembed_collection_use_case import ReembedCollectionUseCase
+from src.infrastructure.messaging.kafka_event_publisher import KafkaEventPublisher
+from src.infrastructure.services.openai_embedding_service import OpenAIEmbeddingService
+from src.infrastructure.services.rate_limiter import AsyncRateLimiter
+from src.infrastructure.persistence.json_checkpoint_store import JsonCheckpointStore
+from src.infrastructure.vector_db.chroma_vector_repository import ChromaVectorRepository
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
+
+
+def default_checkpoint_path() -> str:
+    upload_dir = os.getenv("UPLOAD_DIR", "/app/uploads")
+    return os.getenv("MIGRATION_CHECKPOINT_PATH", os.path.join(upload_dir, ".embedding_migration.json"))
+
+
+def build_migration_use_case(
+    vector_repository: ChromaVectorRepository,
+    collection_registry: CollectionRegistry,
+    target_model: str,
+    checkpoint_path: Optional[str] = None,
+    batch_size: int = 100,
+    concurrency: int = 4,
+    requests_per_minute: Optional[int] = None,
+    tokens_per_minute: Optional[int] = None,
+    switch_when_done: bool = True,
+    event_publisher: Optional[IEventPublisher] = None,
+    user_id: str = "embedding-migration",
+) -> ReembedCollectionUseCase:
+    return ReembedCollectionUseCase(
+        vector_repository=vector_repository,
+        embedding_service=OpenAIEmbeddingService(model=target_model),
+        collection_registry=collection_registry,
+        checkpoint_store=JsonCheckpointStore(checkpoint_path or default_checkpoint_path()),
+        target_model=target_model,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        rate_limiter=AsyncRateLimiter(requests_per_minute, tokens_per_minute),
+        switch_when_done=switch_when_done,
+        event_publisher=event_publisher,
+        user_id=user_id,
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-embed the active collection with a new embedding model")
+    parser.add_argument("--target-model", default=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"))
+    parser.add_argument("--vector-size", type=int, default=int(os.getenv("EMBEDDING_DIMENSIONS", "1536")))
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests-per-minute", type=int, default=int(os.getenv("EMBEDDING_RPM_LIMIT", "0")) or None)
+    parser.add_argument("--tokens-per-minute", type=int, default=int(os.getenv("EMBEDDING_TPM_LIMIT", "0")) or None)
+    parser.add_argument("--checkpoint", default=None)
+    parser.add_argument("--no-switch", action="store_true", help="No cambiar el alias al terminar")
+    parser.add_argument("--no-events", action="store_true", help="No publicar collection.switched en Kafka")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> dict:
+    load_dotenv()
+    args = parse_args(argv)
+
+    vector_repository = ChromaVectorRepository()
+    collection_registry = CollectionRegistry(vector_repository.client)
+    event_publisher = None if args.no_events else KafkaEventPublisher()
+    use_case = build_migration_use_case(
+        vector_repository=vector_repository,
+        collection_registry=collection_registry,
+        target_model=args.target_model,
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        switch_when_done=not args.no_switch,
+        event_publisher=event_publisher,
+    )
+    try:
+        return await use_case.execute(vector_size=args.vector_size)
+    finally:
+        if event_publisher:
+            await event_publisher.disconnect()
+
+
+if __name__ == "__main__":
+    result = asyncio.run(main())
+    print(result)
@@ -0,0 +1,192 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.application.use_cases.bulk_ingest_documents_use_case import BulkIngestDocumentsUseCase
+from src.infrastructure.persistence.json_checkpoint_store import JsonCheckpointStore
+from src import ingest_documents
+from src.infrastructure.vector_db.collection_registry import ActiveCollection
+from src.ingest_documents import collect_files
+
+
+class TestBulkIngestDocumentsUseCase:
+    @pytest.fixture
+    def documents(self):
+        return {
+            "/data/a.pdf": (["a0", "a1", "a2"], 2),
+            "/data/b.pdf": (["b0"], 1),
+            "/data/c.pdf": (["c0", "c1"], 1),
+        }
+
+    @pytest.fixture
+    def extractor(self, documents):
+        async def extract(path):
+            if path not in documents:
+                raise ValueError("corrupt pdf")
+            return documents[path]
+        return AsyncMock(side_effect=extract)
+
+    @pytest.fixture
+    def vector_repository(self):
+        stored = {}
+        mock = AsyncMock()
+
+        async def upsert_chunks(collection_name, chunks):
+            for chunk in chunks:
+                stored[chunk.id] = chunk
+            return True
+
+        mock.upsert_chunks.side_effect = upsert_chunks
+        mock.stored = stored
+        return mock
+
+    @pytest.fixture
+    def embedding_service(self):
+        mock = AsyncMock()
+
+        async def embed(texts):
+            return [[0.1] * 3 for _ in texts]
+
+        mock.generate_embeddings_batch.side_effect = embed
+        return mock
+
+    @pytest.fixture
+    def checkpoint_store(self, tmp_path):
+        return JsonCheckpointStore(str(tmp_path / "ingest.json"))
+
+    def build(self, vector_repository, embedding_service, checkpoint_store, extractor, **kwargs):
+        return BulkIngestDocumentsUseCase(
+            document_processor=Mock(),
+            embedding_service=embedding_service,
+            vector_repository=vector_repository,
+            checkpoint_store=checkpoint_store,
+            collection_name="documents",
+            extraction_workers=2,
+            embedding_batch_size=2,
+            embedding_concurrency=2,
+            upsert_batch_size=3,
+            extractor=extractor,
+            **kwargs,
+        )
+
+    @pytest.mark.asyncio
+    async def test_execute_ingests_all_documents(self, vector_repository, embedding_service, checkpoint_store, extractor, documents):
+        """Test de ingesta completa con lotes que mezclan documentos"""
+        event_publisher = AsyncMock()
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor, event_publisher=event_publisher)
+
+        summary = await use_case.execute(list(documents.keys()))
+
+        assert summary["documents"] == 3
+        assert summary["pages"] == 4
+        assert summary["chunks"] == 6
+        assert summary["failed"] == 0
+        assert len(vector_repository.stored) == 6
+        assert all(chunk.embedding == [0.1] * 3 for chunk in vector_repository.stored.values())
+        # Lotes de 2 textos aunque los documentos tengan 3, 1 y 2 chunks
+        assert all(len(call.args[0]) <= 2 for call in embedding_service.generate_embeddings_batch.call_args_list)
+        assert event_publisher.publish.call_count == 3
+        assert set(checkpoint_store.load()["completed"].keys()) == set(documents.keys())
+
+    @pytest.mark.asyncio
+    async def test_execute_skips_completed_documents(self, vector_repository, embedding_service, checkpoint_store, extractor, documents):
+        """Test de reanudación: los documentos del checkpoint no se reprocesan"""
+        checkpoint_store.save({"completed": {"/data/a.pdf": "doc-a"}, "failed": {}})
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor)
+
+        summary = await use_case.execute(list(documents.keys()))
+
+        assert summary["skipped"] == 1
+        assert summary["documents"] == 2
+        extracted = [call.args[0] for call in extractor.call_args_list]
+        assert "/data/a.pdf" not in extracted
+
+    @pytest.mark.asyncio
+    async def test_execute_records_failed_documents(self, vector_repository, embedding_service, checkpoint_store, extractor):
+        """Test de documento corrupto: se registra y el resto continúa"""
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor)
+
+        summary = await use_case.execute(["/data/b.pdf", "/data/broken.pdf"])
+
+        assert summary["documents"] == 1
+        assert summary["failed"] == 1
+        state = checkpoint_store.load()
+        assert state["failed"]["/data/broken.pdf"] == "corrupt pdf"
+        assert "/data/b.pdf" in state["completed"]
+
+    @pytest.mark.asyncio
+    async def test_execute_embedding_failure_does_not_complete_document(self, vector_repository, embedding_service, checkpoint_store, extractor):
+        """Test de que un documento sin todos sus chunks guardados no se marca como completado"""
+        embedding_service.generate_embeddings_batch.side_effect = Exception("rate limited")
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor, max_retries=0)
+
+        summary = await use_case.execute(["/data/a.pdf"])
+
+        assert summary["documents"] == 0
+        assert summary["failed"] == 1
+        assert checkpoint_store.load()["completed"] == {}
+        vector_repository.upsert_chunks.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_execute_stage_failure_cancels_pipeline(self, vector_repository, embedding_service, checkpoint_store, extractor, documents):
+        """Test de que un error en una etapa (checkpoint que no se puede guardar) se propaga sin bloquear el pipeline"""
+        save = checkpoint_store.save
+        failures = iter([OSError("disk full")])
+
+        def save_once_failing(state):
+            error = next(failures, None)
+            if error:
+                raise error
+            save(state)
+
+        checkpoint_store.save = save_once_failing
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor, checkpoint_every=1)
+
+        with pytest.raises(OSError, match="disk full"):
+            await asyncio.wait_for(use_case.execute(list(documents.keys())), timeout=5)
+
+        # El checkpoint final se guarda con lo que llegó a completarse
+        assert len(checkpoint_store.load()["completed"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_document_ids_are_deterministic(self, vector_repository, embedding_service, checkpoint_store, extractor):
+        """Test de ids estables para que reintentar sobreescriba en lugar de duplicar"""
+        use_case = self.build(vector_repository, embedding_service, checkpoint_store, extractor)
+        await use_case.execute(["/data/b.pdf"])
+        first_ids = set(vector_repository.stored.keys())
+
+        checkpoint_store.clear()
+        await use_case.execute(["/data/b.pdf"])
+
+        assert set(vector_repository.stored.keys()) == first_ids
+
+
+def test_collect_files_from_dir_and_manifest(tmp_path):
+    """Test de recolección de rutas desde directorio y manifiesto"""
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "b.pdf").write_bytes(b"")
+    (tmp_path / "nested" / "a.PDF").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("ignored")
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f"# comentario\n{tmp_path / 'b.pdf'}\n\n/other/c.pdf\n")
+
+    paths = collect_files(str(tmp_path), str(manifest))
+
+    assert paths == [str(tmp_path / "b.pdf"), str(tmp_path / "nested" / "a.PDF"), "/other/c.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_cli_pins_embedding_model_with_collection(tmp_path, monkeypatch):
+    """Test de que el CLI fija el modelo de la colección activa (un cambio de alias no los separa)"""
+    (tmp_path / "a.pdf").write_bytes(b"")
+    registry = Mock(get_active=Mock(return_value=ActiveCollection("documents-v1", "text-embedding-3-large")))
+    embedding_service = Mock()
+    use_case = Mock(execute=AsyncMock(return_value={}))
+    monkeypatch.setattr(ingest_documents, "ChromaVectorRepository", Mock(return_value=AsyncMock()))
+    monkeypatch.setattr(ingest_documents, "CollectionRegistry", Mock(return_value=registry))
+    monkeypatch.setattr(ingest_documents, "OpenAIEmbeddingService", embedding_service)
+    monkeypatch.setattr(ingest_documents, "BulkIngestDocumentsUseCase", Mock(return_value=use_case))
+
+    await ingest_documents.main(["--dir", str(tmp_path), "--no-events", "--workers", "1", "--checkpoint", str(tmp_path / "c.json")])
+
+    embedding_service.assert_called_once_with(model="text-embedding-3-large")
+    assert ingest_documents.BulkIngestDocumentsUseCase.call_args.kwargs["collection_name"] == "documents-v1"
@@ -1,3 +1,5 @@
+import asyncio
+import time
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from src.infrastructure.vector_db.chroma_vector_repository import ChromaVectorRepository
@@ -139,3 +141,18 @@ class TestChromaVectorRepositoryExtended:
         result = await repository.create_collection("test_collection", 1536)
         
         assert result is False
+
+    @pytest.mark.asyncio
+    async def test_get_chunks_runs_off_event_loop(self, repository):
+        """Test de que las lecturas de Chroma no bloquean el event loop (las páginas se solapan)"""
+        def slow_get(**kwargs):
+            time.sleep(0.2)
+            return {"ids": ["doc-1_0"], "documents": ["texto"], "metadatas": [{"document_id": "doc-1", "chunk_index": "0"}]}
+
+        repository.client.get_collection = Mock(return_value=Mock(get=Mock(side_effect=slow_get)))
+
+        started = time.monotonic()
+        pages = await asyncio.gather(*[repository.get_chunks("documents", limit=1, offset=i) for i in range(3)])
+
+        assert [page[0].id for page in pages] == ["doc-1_0"] * 3
+        assert time.monotonic() - started < 0.5
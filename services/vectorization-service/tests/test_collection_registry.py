@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import Mock
+from src.infrastructure.vector_db.collection_registry import CollectionRegistry
+from src.infrastructure.services.rate_limiter import AsyncRateLimiter
+
+
+class TestCollectionRegistry:
+    @pytest.fixture
+    def client(self):
+        return Mock()
+
+    @pytest.fixture
+    def registry(self, client):
+        return CollectionRegistry(client, alias="documents")
+
+    def test_get_active_from_alias(self, registry, client):
+        """Test de resolución del alias a la colección versionada"""
+        aliases = Mock()
+        aliases.get.return_value = {
+            "ids": ["documents"],
+            "metadatas": [{"collection": "documents-text-embedding-3-large", "embedding_model": "text-embedding-3-large"}],
+        }
+        client.get_collection.return_value = aliases
+
+        active = registry.get_active()
+
+        assert active.collection == "documents-text-embedding-3-large"
+        assert active.embedding_model == "text-embedding-3-large"
+
+    def test_get_active_legacy_collection_uses_stamped_model(self, registry, client):
+        """Test sin alias: se usa la colección legacy y su modelo estampado"""
+        legacy = Mock()
+        legacy.metadata = {"embedding_model": "text-embedding-ada-002"}
+
+        def get_collection(name):
+            if name == "collection_aliases":
+                raise Exception("Collection does not exist")
+            return legacy
+
+        client.get_collection.side_effect = get_collection
+
+        active = registry.get_active()
+
+        assert active.collection == "documents"
+        assert active.embedding_model == "text-embedding-ada-002"
+
+    def test_get_active_is_cached(self, registry, client):
+        """Test de caché del alias durante el TTL"""
+        client.get_collection.side_effect = Exception("does not exist")
+
+        registry.get_active()
+        registry.get_active()
+
+        assert client.get_collection.call_count == 2  # alias + legacy, sólo la primera vez
+
+    def test_versioned_name(self, registry):
+        """Test de nombre de colección versionada"""
+        assert registry.versioned_name("text-embedding-3-large") == "documents-text-embedding-3-large"
+        assert registry.versioned_name("Org/Model_V2") == "documents-org-model-v2"
+
+    def test_switch_upserts_alias(self, registry, client):
+        """Test de cambio atómico del alias"""
+        aliases = Mock()
+        client.get_or_create_collection.return_value = aliases
+        client.get_collection.return_value = aliases
+        aliases.get.return_value = {
+            "ids": ["documents"],
+            "metadatas": [{"collection": "documents-v2", "embedding_model": "text-embedding-3-large"}],
+        }
+
+        active = registry.switch("documents-v2", "text-embedding-3-large")
+
+        aliases.upsert.assert_called_once()
+        assert aliases.upsert.call_args.kwargs["metadatas"][0]["collection"] == "documents-v2"
+        assert active.collection == "documents-v2"
+
+    def test_stamp_collection_keeps_metadata(self, registry, client):
+        """Test de estampado del modelo en la metadata de la colección"""
+        collection = Mock()
+        collection.metadata = {"description": "Docs", "hnsw:space": "l2"}
+        client.get_collection.return_value = collection
+
+        registry.stamp_collection("documents-v2", "text-embedding-3-large", migrated_from="documents")
+
+        collection.modify.assert_called_once_with(metadata={
+            "description": "Docs",
+            "embedding_model": "text-embedding-3-large",
+            "migrated_from": "documents",
+        })
+
+
+class TestAsyncRateLimiter:
+    @pytest.mark.asyncio
+    async def test_acquire_without_limits(self):
+        """Test de limitador sin límites configurados"""
+        limiter = AsyncRateLimiter()
+
+        await limiter.acquire(tokens=1000)
+
+    @pytest.mark.asyncio
+    async def test_acquire_consumes_allowance(self):
+        """Test de consumo del bucket de peticiones"""
+        limiter = AsyncRateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+
+        await limiter.acquire(tokens=100)
+
+        assert limiter._request_allowance < 60
+        assert limiter._token_allowance <= 900
+        assert limiter._wait_time(tokens=5000) > 0
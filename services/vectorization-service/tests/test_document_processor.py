@@ -83,6 +83,25 @@ class TestDocumentProcessor:
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
 
+    @pytest.mark.asyncio
+    async def test_process_file_with_stats(self, processor):
+        """Test de procesamiento de PDF devolviendo el número de páginas"""
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+
+        try:
+            with patch('src.infrastructure.services.document_processor.PdfReader') as mock_reader:
+                mock_page = Mock()
+                mock_page.extract_text.return_value = "Test content. " * 50
+                mock_reader.return_value.pages = [mock_page, mock_page, mock_page]
+
+                chunks, pages = await processor.process_file_with_stats(tmp_path)
+                assert pages == 3
+                assert chunks == await processor.process_file(tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
     @pytest.mark.asyncio
     async def test_process_file_invalid_extension(self, processor):
         """Test de procesamiento con extensión inválida"""
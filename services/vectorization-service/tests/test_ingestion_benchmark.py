@@ -0,0 +1,67 @@
+import pytest
+from benchmarks.fakes import StageTimer, FakeEmbeddingService, InMemoryVectorRepository, NullEventPublisher
+from benchmarks.pdf_corpus import generate_corpus
+from benchmarks.ingestion_benchmark import TimedDocumentProcessor, ingestion_service, run_scenario
+from src.domain.entities.document_chunk import DocumentChunk
+
+
+class TestIngestionBenchmark:
+    @pytest.mark.asyncio
+    async def test_fake_embeddings_are_deterministic(self):
+        """Test de embeddings falsos deterministas por texto"""
+        service = FakeEmbeddingService(dimensions=8)
+
+        first = await service.generate_embeddings_batch(["hola", "adiós"])
+        second = await service.generate_embeddings_batch(["hola"])
+
+        assert len(first[0]) == 8
+        assert first[0] == second[0]
+        assert first[0] != first[1]
+
+    @pytest.mark.asyncio
+    async def test_in_memory_repository_upsert_overwrites(self):
+        """Test de upsert en memoria con la semántica de Chroma"""
+        repository = InMemoryVectorRepository()
+        chunk = DocumentChunk(id="doc-1_0", document_id="doc-1", chunk_index=0, content="a", embedding=[0.1])
+
+        await repository.upsert_chunks("documents", [chunk])
+        await repository.upsert_chunks("documents", [chunk])
+        assert await repository.count_chunks("documents") == 1
+
+        await repository.delete_document_chunks("documents", "doc-1")
+        assert await repository.count_chunks("documents") == 0
+
+    @pytest.mark.asyncio
+    async def test_generated_pdfs_are_extractable(self, tmp_path):
+        """Test de PDFs generados con el número de páginas pedido y texto extraíble"""
+        corpus = generate_corpus(str(tmp_path), [1, 3])
+        processor = TimedDocumentProcessor(StageTimer())
+
+        chunks, pages = await processor.process_file_with_stats(corpus[1]["path"])
+
+        assert [document["pages"] for document in corpus] == [1, 3]
+        assert pages == 3
+        assert len(chunks) > 1
+
+    @pytest.mark.asyncio
+    async def test_run_scenarios_through_service(self, tmp_path):
+        """Test de los escenarios que pasan por main.py con dobles"""
+        timer = StageTimer()
+        embedding_service = FakeEmbeddingService(dimensions=4, timer=timer)
+        repository = InMemoryVectorRepository(timer=timer)
+        publisher = NullEventPublisher()
+        processor = TimedDocumentProcessor(timer)
+        corpus = generate_corpus(str(tmp_path / "corpus"), [1, 2])
+        (tmp_path / "uploads").mkdir()
+
+        with ingestion_service(str(tmp_path / "uploads"), embedding_service, repository, publisher, processor) as service:
+            handled = await run_scenario("handle_document_uploaded", corpus, service, timer, processor, repository)
+            uploaded = await run_scenario("upload_document", corpus, service, timer, processor, repository, concurrency=2)
+
+        assert handled["docs"] == 2
+        assert handled["pages"] == 3
+        assert handled["chunks"] > 0
+        assert set(handled["stages_ms"].keys()) == {"extract", "embedding", "upsert"}
+        assert uploaded["chunks"] == handled["chunks"]
+        assert publisher.events["document.processed"] == 4
+        assert list((tmp_path / "uploads").iterdir()) == []
@@ -0,0 +1,202 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.application.use_cases.reembed_collection_use_case import ReembedCollectionUseCase
+from src.infrastructure.persistence.json_checkpoint_store import JsonCheckpointStore
+from src.infrastructure.vector_db.collection_registry import ActiveCollection
+from src.domain.entities.document_chunk import DocumentChunk
+
+
+def make_chunks(count):
+    return [
+        DocumentChunk(
+            id=f"doc-1_{i}",
+            document_id="doc-1",
+            chunk_index=i,
+            content=f"chunk {i}",
+            metadata={"document_name": "test.pdf"},
+        )
+        for i in range(count)
+    ]
+
+
+class TestReembedCollectionUseCase:
+    @pytest.fixture
+    def source_chunks(self):
+        return make_chunks(5)
+
+    @pytest.fixture
+    def vector_repository(self, source_chunks):
+        target = {}
+        mock = AsyncMock()
+        mock.create_collection.return_value = True
+        mock.count_chunks.return_value = len(source_chunks)
+
+        async def get_chunks(collection_name, limit, offset=0):
+            return [
+                DocumentChunk(id=c.id, document_id=c.document_id, chunk_index=c.chunk_index, content=c.content, metadata=dict(c.metadata))
+                for c in source_chunks[offset:offset + limit]
+            ]
+
+        async def upsert_chunks(collection_name, chunks):
+            for chunk in chunks:
+                target[chunk.id] = chunk
+            return True
+
+        async def get_chunk_ids(collection_name):
+            if collection_name == "documents":
+                return [c.id for c in source_chunks]
+            return list(target.keys())
+
+        mock.get_chunks.side_effect = get_chunks
+        mock.upsert_chunks.side_effect = upsert_chunks
+        mock.get_chunk_ids.side_effect = get_chunk_ids
+        mock.target = target
+        return mock
+
+    @pytest.fixture
+    def collection_registry(self):
+        mock = Mock()
+        mock.get_active.return_value = ActiveCollection("documents", "text-embedding-3-small")
+        mock.versioned_name.return_value = "documents-text-embedding-3-large"
+        mock.ttl_seconds = 0
+        return mock
+
+    @pytest.fixture
+    def embedding_service(self):
+        mock = AsyncMock()
+
+        async def embed(texts):
+            return [[0.5] * 3 for _ in texts]
+
+        mock.generate_embeddings_batch.side_effect = embed
+        return mock
+
+    @pytest.fixture
+    def checkpoint_store(self, tmp_path):
+        return JsonCheckpointStore(str(tmp_path / "migration.json"))
+
+    def build(self, vector_repository, embedding_service, collection_registry, checkpoint_store, **kwargs):
+        return ReembedCollectionUseCase(
+            vector_repository=vector_repository,
+            embedding_service=embedding_service,
+            collection_registry=collection_registry,
+            checkpoint_store=checkpoint_store,
+            target_model="text-embedding-3-large",
+            batch_size=2,
+            concurrency=2,
+            switch_grace_seconds=0,
+            **kwargs,
+        )
+
+    @pytest.mark.asyncio
+    async def test_execute_migrates_all_chunks_and_switches(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test de migración completa con cambio de alias"""
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store)
+
+        result = await use_case.execute()
+
+        assert result["status"] == "switched"
+        assert result["migrated"] == 5
+        assert sorted(vector_repository.target.keys()) == [f"doc-1_{i}" for i in range(5)]
+        assert all(chunk.embedding == [0.5] * 3 for chunk in vector_repository.target.values())
+        vector_repository.create_collection.assert_called_once_with(
+            "documents-text-embedding-3-large", 1536, embedding_model="text-embedding-3-large"
+        )
+        collection_registry.stamp_collection.assert_called_once()
+        collection_registry.switch.assert_called_once_with("documents-text-embedding-3-large", "text-embedding-3-large")
+        assert checkpoint_store.load()["status"] == "switched"
+
+    @pytest.mark.asyncio
+    async def test_execute_catches_up_writes_during_switch(self, vector_repository, embedding_service, collection_registry, checkpoint_store, source_chunks):
+        """Test de que las altas y bajas en la colección anterior durante el cambio llegan a la nueva"""
+        async def delete_chunks(collection_name, ids):
+            for chunk_id in ids:
+                vector_repository.target.pop(chunk_id, None)
+            return True
+
+        def switch(collection, embedding_model):
+            # Una réplica con el alias cacheado escribe en la colección anterior...
+            source_chunks.pop(0)
+            source_chunks.extend(make_chunks(7)[5:])
+            # ...y otra ya ve el alias nuevo
+            vector_repository.target["doc-2_0"] = DocumentChunk(id="doc-2_0", document_id="doc-2", chunk_index=0, content="nuevo")
+
+        vector_repository.delete_chunks.side_effect = delete_chunks
+        collection_registry.switch.side_effect = switch
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store)
+
+        result = await use_case.execute()
+
+        assert result["reconciled_after_switch"] == {"added": 2, "removed": 1}
+        assert sorted(vector_repository.target.keys()) == ["doc-1_1", "doc-1_2", "doc-1_3", "doc-1_4", "doc-1_5", "doc-1_6", "doc-2_0"]
+        assert checkpoint_store.load()["status"] == "switched"
+
+    @pytest.mark.asyncio
+    async def test_execute_publishes_collection_switched(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test de que el cambio de alias publica collection.switched (también desde el CLI)"""
+        event_publisher = AsyncMock()
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store, event_publisher=event_publisher)
+
+        await use_case.execute()
+
+        event_publisher.publish.assert_called_once_with(
+            "collection.switched",
+            {"userId": "embedding-migration", "collection": "documents-text-embedding-3-large", "embeddingModel": "text-embedding-3-large"},
+        )
+
+    @pytest.mark.asyncio
+    async def test_execute_resumes_from_checkpoint(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test de reanudación desde el checkpoint tras un fallo"""
+        checkpoint_store.save({
+            "source_collection": "documents",
+            "target_collection": "documents-text-embedding-3-large",
+            "target_model": "text-embedding-3-large",
+            "status": "failed",
+            "offset": 4,
+            "migrated": 4,
+            "total": 5,
+            "error": "boom",
+        })
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store)
+
+        result = await use_case.execute()
+
+        first_offset = vector_repository.get_chunks.call_args_list[0].kwargs["offset"]
+        assert first_offset == 4
+        assert "error" not in result
+        assert result["status"] == "switched"
+
+    @pytest.mark.asyncio
+    async def test_execute_failure_saves_checkpoint(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test de que un fallo deja el checkpoint en estado failed"""
+        embedding_service.generate_embeddings_batch.side_effect = Exception("rate limited")
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store, max_retries=0)
+
+        with pytest.raises(Exception, match="rate limited"):
+            await use_case.execute()
+
+        state = checkpoint_store.load()
+        assert state["status"] == "failed"
+        assert state["offset"] == 0
+        collection_registry.switch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_execute_without_switch(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test de migración sin cambiar el alias"""
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store, switch_when_done=False)
+
+        result = await use_case.execute()
+
+        assert result["status"] == "completed"
+        collection_registry.switch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_execute_already_on_target_model(self, vector_repository, embedding_service, collection_registry, checkpoint_store):
+        """Test cuando la colección activa ya usa el modelo destino"""
+        collection_registry.get_active.return_value = ActiveCollection("documents-text-embedding-3-large", "text-embedding-3-large")
+        use_case = self.build(vector_repository, embedding_service, collection_registry, checkpoint_store)
+
+        result = await use_case.execute()
+
+        assert result["status"] == "up_to_date"
+        vector_repository.get_chunks.assert_not_called()